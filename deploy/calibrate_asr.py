@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+ASR 引擎标定脚本
+
+在参考音频上实测候选配置（线程数、int8/fp32、模型大小、beam size）的 RTF 和内存，
+生成调优配置文件，主程序启动时自动加载（见 src/config.py 的 ASR_PROFILE_PATH）。
+
+用法:
+    python deploy/calibrate_asr.py                      # 标定已安装的引擎
+    python deploy/calibrate_asr.py --engines sherpa     # 仅标定 sherpa
+    python deploy/calibrate_asr.py --clip my.wav --max-rtf 0.4
+    python deploy/calibrate_asr.py --dry-run            # 只输出结果，不写入配置
+"""
+
+import os
+import sys
+import argparse
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+
+def detect_engines():
+    """检测已安装的 ASR 引擎"""
+    engines = []
+    try:
+        import sherpa_onnx  # noqa: F401
+        engines.append('sherpa')
+    except ImportError:
+        pass
+    try:
+        import faster_whisper  # noqa: F401
+        engines.append('whisper')
+    except ImportError:
+        pass
+    return engines
+
+
+def main():
+    from src.config import SHERPA_MODEL_DIR, ASR_PROFILE_PATH
+    from src import asr_tuner
+
+    parser = argparse.ArgumentParser(description='Life Coach ASR 引擎标定')
+    parser.add_argument('--clip', default=None, help='参考音频（16kHz 单声道 WAV），默认使用模型包自带的 test_wavs')
+    parser.add_argument('--engines', default=None, help='要标定的引擎，逗号分隔（sherpa,whisper），默认自动检测')
+    parser.add_argument('--max-rtf', type=float, default=asr_tuner.DEFAULT_MAX_RTF, help='RTF 目标上限')
+    parser.add_argument('--mem-budget', type=float, default=0, help='峰值内存预算（MB），0 表示按总内存的 50%%')
+    parser.add_argument('--output', default=ASR_PROFILE_PATH, help='调优配置输出路径')
+    parser.add_argument('--dry-run', action='store_true', help='只输出结果，不写入配置文件')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Life Coach ASR 引擎标定")
+    print("=" * 60)
+
+    engines = args.engines.split(',') if args.engines else detect_engines()
+    if not engines:
+        print("✗ 未检测到可用的 ASR 引擎（sherpa-onnx / faster-whisper）")
+        return 1
+
+    clip = args.clip or asr_tuner.default_clip_path(SHERPA_MODEL_DIR)
+    if not clip or not os.path.exists(clip):
+        print("✗ 未找到参考音频，请通过 --clip 指定 16kHz 单声道 WAV 文件")
+        return 1
+
+    mem_budget = args.mem_budget or asr_tuner.get_mem_total_mb() * 0.5
+
+    profile = asr_tuner.calibrate(
+        clip_path=clip,
+        engines=engines,
+        sherpa_model_dir=SHERPA_MODEL_DIR,
+        max_rtf=args.max_rtf,
+        mem_budget_mb=mem_budget
+    )
+
+    print("\n" + "=" * 60)
+    print(f"标定结果（{profile['tier']}）:")
+    for engine, params in profile['selected'].items():
+        print(f"  {engine}: {params}")
+    if not profile['selected']:
+        print("  ✗ 没有可用的配置")
+        return 1
+
+    if args.dry_run:
+        print("\n--dry-run: 未写入配置文件")
+    else:
+        path = asr_tuner.save_profile(profile, args.output)
+        print(f"\n✓ 调优配置已写入: {path}")
+        print("  重启服务后生效（环境变量显式设置的参数优先）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+导出 ONNX int8 文本纠错模型
+
+把 macro-correct 使用的 MacBERT 错别字纠正模型（及标点模型）导出为 ONNX，
+再做 int8 动态量化，供 TEXT_CORRECTOR_ENGINE=onnx 使用。
+导出需要 PyTorch + transformers（可在开发机上导出后拷贝到设备），设备端只需要 onnxruntime。
+
+用法:
+    python deploy/export_onnx_corrector.py [--output 目录] [--csc-model 模型] [--punct-model 模型] [--no-punct]
+
+输出目录:
+    csc.int8.onnx / vocab.txt / punct.int8.onnx / punct_labels.json
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+DEFAULT_CSC_MODEL = "Macropodus/macbert4mdcspell_v2"
+DEFAULT_PUNCT_MODEL = "Macropodus/bert4sl_punct_zh_public"
+
+
+def export_model(model, output_path, opset=14):
+    """导出为 ONNX（批大小、序列长度为动态维度）"""
+    import torch
+
+    model.eval()
+    dummy = {
+        "input_ids": torch.ones((1, 16), dtype=torch.long),
+        "attention_mask": torch.ones((1, 16), dtype=torch.long),
+        "token_type_ids": torch.zeros((1, 16), dtype=torch.long),
+    }
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in dummy}
+    dynamic_axes["logits"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+            output_path,
+            input_names=list(dummy.keys()),
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+
+
+def quantize(fp32_path, int8_path):
+    """int8 动态量化（权重量化，激活按批动态计算）"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+
+def file_size_mb(path):
+    return os.path.getsize(path) / 1024 / 1024
+
+
+def main():
+    from src.config import ONNX_CORRECTOR_MODEL_DIR
+
+    parser = argparse.ArgumentParser(description="导出 ONNX int8 文本纠错模型")
+    parser.add_argument("--output", default=ONNX_CORRECTOR_MODEL_DIR, help="输出目录")
+    parser.add_argument("--csc-model", default=DEFAULT_CSC_MODEL, help="错别字模型（Hugging Face 名称或本地目录）")
+    parser.add_argument("--punct-model", default=DEFAULT_PUNCT_MODEL, help="标点模型（Hugging Face 名称或本地目录）")
+    parser.add_argument("--no-punct", action="store_true", help="不导出标点模型")
+    parser.add_argument("--opset", type=int, default=14, help="ONNX opset 版本")
+    args = parser.parse_args()
+
+    try:
+        from transformers import AutoTokenizer, BertForMaskedLM, BertForTokenClassification
+        import onnxruntime  # noqa: F401
+    except ImportError as e:
+        print(f"✗ 缺少依赖: {e}")
+        print("  安装命令: pip install torch transformers==4.30.2 onnx onnxruntime")
+        return 1
+
+    os.makedirs(args.output, exist_ok=True)
+
+    print("=" * 60)
+    print("导出 ONNX int8 文本纠错模型")
+    print("=" * 60)
+
+    # 1. 错别字纠正模型
+    print(f"\n[1/2] 错别字模型: {args.csc_model}")
+    tokenizer = AutoTokenizer.from_pretrained(args.csc_model)
+    model = BertForMaskedLM.from_pretrained(args.csc_model)
+    fp32_path = os.path.join(args.output, "csc.onnx")
+    int8_path = os.path.join(args.output, "csc.int8.onnx")
+    export_model(model, fp32_path, args.opset)
+    print(f"  ✓ 导出完成 ({file_size_mb(fp32_path):.0f}MB)")
+    quantize(fp32_path, int8_path)
+    print(f"  ✓ int8 量化完成 ({file_size_mb(int8_path):.0f}MB): {int8_path}")
+
+    vocab_file = getattr(tokenizer, "vocab_file", None)
+    if vocab_file and os.path.exists(vocab_file):
+        shutil.copy(vocab_file, os.path.join(args.output, "vocab.txt"))
+    else:
+        vocab = sorted(tokenizer.get_vocab().items(), key=lambda item: item[1])
+        with open(os.path.join(args.output, "vocab.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(token for token, _ in vocab) + "\n")
+    print("  ✓ 词表已保存")
+
+    # 2. 标点模型
+    if args.no_punct:
+        print("\n[2/2] 跳过标点模型")
+    else:
+        print(f"\n[2/2] 标点模型: {args.punct_model}")
+        try:
+            punct_model = BertForTokenClassification.from_pretrained(args.punct_model)
+            fp32_path = os.path.join(args.output, "punct.onnx")
+            int8_path = os.path.join(args.output, "punct.int8.onnx")
+            export_model(punct_model, fp32_path, args.opset)
+            quantize(fp32_path, int8_path)
+            labels = [punct_model.config.id2label[i] for i in range(punct_model.config.num_labels)]
+            with open(os.path.join(args.output, "punct_labels.json"), "w", encoding="utf-8") as f:
+                json.dump(labels, f, ensure_ascii=False)
+            print(f"  ✓ 导出并量化完成 ({file_size_mb(int8_path):.0f}MB), 标签 {len(labels)} 个")
+        except Exception as e:
+            print(f"  ✗ 标点模型导出失败（仅使用错别字纠正）: {e}")
+
+    print("\n" + "=" * 60)
+    print("✓ 完成，在 .env 中设置:")
+    print("  TEXT_CORRECTOR_ENGINE=onnx")
+    print(f"  ONNX_CORRECTOR_MODEL_DIR={args.output}")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
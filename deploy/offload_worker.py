@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+局域网算力工作节点
+
+在局域网内的台式机上运行，为 Life Coach 设备提供 ASR 转录和文本纠错。
+设备端设置 OFFLOAD_WORKERS=http://<本机IP>:8765 和相同的 OFFLOAD_TOKEN 后自动使用，
+节点不可用时回退设备本地引擎。默认只监听本机，对局域网开放需指定 --host 0.0.0.0。
+
+用法:
+    python deploy/offload_worker.py --host 0.0.0.0 --token <令牌>   # ASR(whisper) + 纠错
+    python deploy/offload_worker.py --asr sherpa --port 9000
+    python deploy/offload_worker.py --asr none               # 只提供纠错
+    python deploy/offload_worker.py --no-correct             # 只提供 ASR
+"""
+
+import os
+import sys
+import argparse
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Life Coach 局域网算力工作节点')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（局域网使用时设为 0.0.0.0）')
+    parser.add_argument('--token', default=os.getenv('OFFLOAD_TOKEN', ''),
+                        help='共享令牌，设备端 OFFLOAD_TOKEN 需一致（默认读取环境变量 OFFLOAD_TOKEN）')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--asr', default='whisper', help='ASR 引擎（sherpa / whisper / none）')
+    parser.add_argument('--no-correct', action='store_true', help='不提供文本纠错')
+    args = parser.parse_args()
+
+    from src.remote_worker import WorkerServer
+
+    print("=" * 60)
+    print("Life Coach 算力工作节点")
+    print("=" * 60)
+
+    asr_engine = None
+    if args.asr != 'none':
+        from src.asr_registry import create_asr_engine
+        print(f"\n加载 ASR 引擎: {args.asr}")
+        asr_engine = create_asr_engine(args.asr)
+
+    text_corrector = None
+    if not args.no_correct:
+        try:
+            from src.text_corrector import get_text_corrector
+            print("\n加载文本纠错器...")
+            text_corrector = get_text_corrector()
+        except Exception as e:
+            print(f"  ✗ 文本纠错器不可用: {e}")
+
+    if asr_engine is None and text_corrector is None:
+        print("✗ 没有可提供的服务")
+        return 1
+
+    server = WorkerServer(asr_engine=asr_engine, text_corrector=text_corrector,
+                          host=args.host, port=args.port, token=args.token)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[算力节点] 已停止")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
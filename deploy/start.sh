@@ -124,6 +124,23 @@ else
     echo "  → 文本纠错未启用，跳过预热"
 fi
 
+# 6. 首次启动时标定 ASR 引擎（生成设备专属的调优配置）
+echo ""
+echo "[6/6] 检查 ASR 调优配置..."
+ASR_PROFILE="${ASR_PROFILE_PATH:-$HOME/LifeCoach/asr_profile.json}"
+if [ "${ASR_AUTOTUNE:-true}" != "true" ]; then
+    echo "  → ASR_AUTOTUNE 已关闭，使用静态默认配置"
+elif [ -f "$ASR_PROFILE" ]; then
+    echo "  ✓ 已有调优配置: $ASR_PROFILE"
+else
+    echo "  → 首次启动，标定 ASR 配置（可能需要几分钟）..."
+    if python deploy/calibrate_asr.py --output "$ASR_PROFILE"; then
+        echo "  ✓ ASR 标定完成"
+    else
+        echo "  ⚠ ASR 标定失败，使用静态默认配置"
+    fi
+fi
+
 echo ""
 echo "======================================"
 echo "启动 Life Coach 服务..."
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+录音存储维护工具
+
+用法:
+    python deploy/storage_tool.py rebuild            # 扫描录音目录，重建元数据索引和每日统计
+    python deploy/storage_tool.py stats              # 查看索引统计
+    python deploy/storage_tool.py peaks              # 为缺少波形峰值的录音补算峰值文件（--force 全部重算）
+    python deploy/storage_tool.py maintain           # 按配置压缩/删除旧音频、清理孤立文件（--dry-run 只统计）
+    python deploy/storage_tool.py compress           # 把已有的 WAV 录音无损压缩为 FLAC
+    python deploy/storage_tool.py sync               # 对比索引与磁盘，只重新解析有差异的录音（外部同步后）
+    python deploy/storage_tool.py rebuild --path 目录  # 指定录音目录（默认读取配置 STORAGE_BASE）
+"""
+
+import os
+import sys
+import json
+import argparse
+
+# 添加项目路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+os.chdir(project_root)
+
+
+def main():
+    import src.config as config
+
+    parser = argparse.ArgumentParser(description='Life Coach 录音存储维护')
+    parser.add_argument('command', choices=['rebuild', 'stats', 'peaks', 'maintain', 'compress', 'sync'],
+                        help='rebuild: 重建元数据索引和每日统计; stats: 索引统计; peaks: 补算波形峰值; '
+                             'maintain: 存储维护; compress: WAV 压缩为 FLAC; sync: 增量同步索引')
+    parser.add_argument('--path', default=None, help='录音目录（默认读取配置 STORAGE_BASE）')
+    parser.add_argument('--force', action='store_true', help='peaks: 全部重新计算')
+    parser.add_argument('--dry-run', action='store_true', help='maintain: 只统计将要处理的文件，不修改')
+    args = parser.parse_args()
+
+    if args.path:
+        config.STORAGE_BASE = args.path
+
+    from src.file_storage import FileStorage
+
+    storage = FileStorage()
+    if args.command == 'peaks':
+        result = storage.backfill_peaks(force=args.force)
+        print(f"✓ 波形峰值: {result['generated']} 个已生成, {result['failed']} 个失败, 共 {result['total']} 个音频")
+        return 1 if result['failed'] else 0
+
+    if args.command == 'compress':
+        from src.audio_codec import AudioCompressor
+        compressor = AudioCompressor(config.AUDIO_FLAC_COMPRESSION_LEVEL)
+        if not compressor.available:
+            print("✗ 没有可用的 FLAC 编码后端（pip install soundfile 或安装 ffmpeg）")
+            return 1
+        result = storage.compress_audio(compressor)
+        print(f"✓ 已压缩 {result['compressed']}/{result['total']} 个 WAV: "
+              f"{result['input_bytes'] / 1024 / 1024:.1f}MB → {result['output_bytes'] / 1024 / 1024:.1f}MB")
+        print(json.dumps(compressor.get_stats(), ensure_ascii=False, indent=2))
+        storage.cleanup()
+        return 1 if result['failed'] else 0
+
+    if args.command == 'maintain':
+        from src.storage_maintenance import StorageMaintenance
+        from src.audio_preview import get_preview_encoder
+        maintenance = StorageMaintenance(
+            storage,
+            compress_after_days=config.AUDIO_COMPRESS_AFTER_DAYS,
+            audio_quota_gb=config.AUDIO_QUOTA_GB,
+            min_free_gb=config.STORAGE_WARNING_THRESHOLD,
+            free_space_cleanup=config.STORAGE_FREE_SPACE_CLEANUP,
+            orphan_grace=config.STORAGE_ORPHAN_GRACE_SECONDS,
+            io_pause=config.STORAGE_MAINTENANCE_IO_PAUSE,
+            encoder=get_preview_encoder()
+        )
+        report = maintenance.run(dry_run=args.dry_run)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        storage.cleanup()
+        return 1 if report.get('errors') else 0
+
+    index = storage.index
+    if index is None:
+        print("✗ 元数据索引不可用（检查 RECORDING_INDEX_ENABLED 和目录权限）")
+        return 1
+
+    if args.command == 'rebuild':
+        count = storage.rebuild_index()
+        print(f"✓ 已重建索引: {count} 条录音 → {index.db_path}")
+    elif args.command == 'sync':
+        result = storage.reconcile()
+        print(f"✓ 已检查 {result['checked']} 条录音: 新增 {result['added']}, 更新 {result['updated']}, "
+              f"删除 {result['removed']}")
+    print(json.dumps(index.get_stats(), ensure_ascii=False, indent=2))
+    storage.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.config import *
 from src import api_server
+from src.recording_sidecar import build_segment, build_sidecar, correction_record, timeline, segment_at
 
 # 尝试导入psutil用于系统监控
 try:
@@ -40,7 +41,15 @@ class LifeCoachApp:
         self.buttons = None
         self.storage = None
         self.realtime_transcriber = None  # 实时转录管理器
+        self.incremental_corrector = None  # 录音过程中的增量纠错
+        self.wake_listener = None  # 免按键唤醒监听
+        self.model_manager = None  # 模型内存管理
+        self.maintenance = None  # 存储维护（音频压缩/配额/孤立文件清理）
+        self.watcher = None  # 录音目录监听（外部同步的文件增量更新索引）
+        self.handsfree_recording = False  # 当前录音是否由唤醒触发
+        self.last_speech_time = 0  # 最近一次检测到语音的时间（唤醒录音自动停止用）
         self.accumulated_text = ""  # 实时累积的文本
+        self.accumulated_segments = []  # 实时转录分段（时间线条目，见 recording_sidecar.build_segment），纠错时按置信度分流
         
         # 统计信息
         self.today_count = 0  # 今日录音次数
@@ -62,29 +71,53 @@ class LifeCoachApp:
             
             self.display = DisplayController()
             self.buttons = ButtonHandler()
+            
+            # 根据配置选择 ASR 引擎（支持运行时热切换，见 switch_asr_engine）
+            from src.config import ASR_ENGINE, ASR_WARM_STANDBY
+            from src.asr_registry import ASREngineManager
+            print(f"[ASR] 使用 {ASR_ENGINE} 引擎")
+            self.asr = ASREngineManager(
+                ASR_ENGINE,
+                warm_standby=ASR_WARM_STANDBY,
+                cutover_guard=lambda: self.state == AppState.IDLE
+            )
+            self.asr.add_switch_listener(self._on_asr_engine_switched)
+            asr_manager = self.asr
+
+            # 局域网算力卸载：转录/纠错优先发往工作节点，失败回退本机
+            from src.config import OFFLOAD_WORKERS
+            if OFFLOAD_WORKERS:
+                from src.config import (OFFLOAD_ASR, OFFLOAD_CORRECT, OFFLOAD_TIMEOUT,
+                                        OFFLOAD_TIMEOUT_PER_SECOND, OFFLOAD_HEALTH_INTERVAL, OFFLOAD_TOKEN)
+                from src.remote_worker import WorkerScheduler, OffloadASREngine
+                print(f"[算力卸载] 工作节点: {', '.join(OFFLOAD_WORKERS)}")
+                scheduler = WorkerScheduler(
+                    OFFLOAD_WORKERS,
+                    timeout=OFFLOAD_TIMEOUT,
+                    timeout_per_second=OFFLOAD_TIMEOUT_PER_SECOND,
+                    health_interval=OFFLOAD_HEALTH_INTERVAL,
+                    token=OFFLOAD_TOKEN
+                )
+                self.asr = OffloadASREngine(self.asr, scheduler,
+                                            offload_asr=OFFLOAD_ASR, offload_correct=OFFLOAD_CORRECT)
+
+            # 实时分段器：单遍端点模式直接复用流式识别器，否则使用 Silero VAD
+            segmenter = self._create_segmenter()
+            
             # AudioRecorder启用实时分段和VAD
             self.recorder = AudioRecorder(
                 realtime_transcribe=True,  # 启用VAD和实时分段
-                segment_callback=self._on_audio_segment
+                segment_callback=self._on_audio_segment,
+                segmenter=segmenter
             )
             
-            # 根据配置选择 ASR 引擎
-            from src.config import ASR_ENGINE
-            if ASR_ENGINE == 'sherpa':
-                print("[ASR] 使用 Sherpa-ONNX Paraformer 引擎")
-                from src.asr_sherpa import SherpaASREngine
-                from src.config import SHERPA_MODEL_DIR, SHERPA_USE_INT8, SHERPA_NUM_THREADS
-                self.asr = SherpaASREngine(
-                    model_dir=SHERPA_MODEL_DIR,
-                    use_int8=SHERPA_USE_INT8,
-                    num_threads=SHERPA_NUM_THREADS
-                )
-            else:
-                print("[ASR] 使用 faster-whisper 引擎")
-                from src.asr_engine_real import ASREngine
-                self.asr = ASREngine()
-            
             self.storage = FileStorage()
+            from src.config import STORAGE_MAINTENANCE_ENABLED
+            if STORAGE_MAINTENANCE_ENABLED:
+                self._init_storage_maintenance()
+            from src.config import STORAGE_WATCHER_ENABLED
+            if STORAGE_WATCHER_ENABLED:
+                self._init_storage_watcher()
             self.voiceprint = VoiceprintEngine()
             
             # 创建实时转录器（不立即启动）
@@ -93,12 +126,143 @@ class LifeCoachApp:
                 callback=self._on_segment_transcribed
             )
             
+            # 模型内存管理（内存紧张时卸载空闲的纠错/声纹模型）
+            from src.config import MODEL_MANAGER_ENABLED
+            if MODEL_MANAGER_ENABLED:
+                self._init_model_manager(asr_manager)
+            
+            # 免按键唤醒（空闲时低功耗监听，录音/处理中自动释放麦克风）
+            from src.config import HANDSFREE_ENABLED
+            if HANDSFREE_ENABLED:
+                try:
+                    from src.wake_listener import create_wake_listener
+                    self.wake_listener = create_wake_listener(
+                        on_trigger=self._on_wake_trigger,
+                        can_listen=lambda: self.state == AppState.IDLE
+                    )
+                except Exception as e:
+                    print(f"[唤醒监听] 初始化失败，仅支持按键/网页开始录音: {e}")
+                    self.wake_listener = None
+            
             print("[主程序] 所有模块初始化完成")
             
         except Exception as e:
             print(f"[错误] 模块初始化失败: {e}")
             raise
     
+    def _init_model_manager(self, asr_manager):
+        """登记 ASR、纠错、声纹模型并启动内存监控"""
+        from src.config import (MEMORY_WARNING_THRESHOLD, MEMORY_LOW_THRESHOLD, MODEL_IDLE_UNLOAD_SECONDS,
+                                MODEL_CHECK_INTERVAL, MODEL_MIN_RESIDENT_SECONDS)
+        from src.model_manager import ModelManager
+        
+        manager = ModelManager(
+            memory_threshold=MEMORY_WARNING_THRESHOLD,
+            memory_low_threshold=MEMORY_LOW_THRESHOLD,
+            idle_unload_seconds=MODEL_IDLE_UNLOAD_SECONDS,
+            check_interval=MODEL_CHECK_INTERVAL,
+            min_resident_seconds=MODEL_MIN_RESIDENT_SECONDS
+        )
+        
+        # 当前 ASR 引擎常驻（只统计）；热备引擎可释放
+        manager.register('asr', lambda: None, lambda: None, lambda: True, pinned=True)
+        if asr_manager.warm_standby:
+            manager.register(
+                'asr_standby',
+                load_fn=lambda: None,
+                unload_fn=asr_manager.release_standby,
+                is_loaded_fn=lambda: bool(asr_manager.get_status()['standby']),
+                priority=0
+            )
+        
+        corrector = self.asr.text_corrector
+        if corrector is not None:
+            # 独立纠错进程模式下，模型内存按子进程的常驻内存计量
+            isolated = corrector.get_model_rss_mb() is not None
+            manager.register(
+                'corrector',
+                load_fn=corrector.load,
+                unload_fn=corrector.unload,
+                is_loaded_fn=lambda: corrector.is_loaded,
+                warmup_fn=corrector.warmup,
+                priority=2,
+                size_hint_mb=1400,
+                rss_fn=corrector.get_model_rss_mb if isolated else None
+            )
+            corrector.attach_model_manager(manager, 'corrector')
+        
+        if self.voiceprint and self.voiceprint.available:
+            # librosa 首次使用时才导入；导入后无法从进程中释放，登记为常驻（只统计）
+            manager.register(
+                'voiceprint',
+                load_fn=self.voiceprint.load,
+                unload_fn=self.voiceprint.unload,
+                is_loaded_fn=lambda: self.voiceprint.is_loaded,
+                priority=1,
+                pinned=True
+            )
+            self.voiceprint.on_use = lambda: manager.touch('voiceprint')
+        
+        manager.start()
+        self.model_manager = manager
+    
+    def _init_storage_maintenance(self):
+        """启动存储维护后台线程（录音/转写期间暂停）"""
+        from src.config import (STORAGE_MAINTENANCE_INTERVAL, AUDIO_COMPRESS_AFTER_DAYS, AUDIO_QUOTA_GB,
+                                STORAGE_WARNING_THRESHOLD, STORAGE_FREE_SPACE_CLEANUP, STORAGE_ORPHAN_GRACE_SECONDS,
+                                STORAGE_MAINTENANCE_IO_PAUSE)
+        from src.storage_maintenance import StorageMaintenance
+        from src.audio_preview import get_preview_encoder
+        
+        self.maintenance = StorageMaintenance(
+            self.storage,
+            compress_after_days=AUDIO_COMPRESS_AFTER_DAYS,
+            audio_quota_gb=AUDIO_QUOTA_GB,
+            min_free_gb=STORAGE_WARNING_THRESHOLD,
+            free_space_cleanup=STORAGE_FREE_SPACE_CLEANUP,
+            orphan_grace=STORAGE_ORPHAN_GRACE_SECONDS,
+            io_pause=STORAGE_MAINTENANCE_IO_PAUSE,
+            interval=STORAGE_MAINTENANCE_INTERVAL,
+            is_busy=lambda: self.state in (AppState.RECORDING, AppState.PROCESSING),
+            encoder=get_preview_encoder()
+        )
+        self.maintenance.start()
+    
+    def _init_storage_watcher(self):
+        """启动录音目录监听（外部同步工具新增/修改/删除的录音增量更新索引和统计）"""
+        from src.config import (STORAGE_WATCHER_DEBOUNCE, STORAGE_WATCHER_CHECK_INTERVAL,
+                                STORAGE_WATCHER_POLL_INTERVAL)
+        from src.storage_watcher import StorageWatcher
+        
+        self.watcher = StorageWatcher(
+            self.storage,
+            debounce=STORAGE_WATCHER_DEBOUNCE,
+            check_interval=STORAGE_WATCHER_CHECK_INTERVAL,
+            poll_interval=STORAGE_WATCHER_POLL_INTERVAL
+        )
+        self.watcher.start()
+    
+    def _create_segmenter(self):
+        """按配置创建实时分段器（None 表示使用 Silero VAD）"""
+        from src.config import REALTIME_SEGMENTER
+        if REALTIME_SEGMENTER != 'endpoint':
+            return None
+        if hasattr(self.asr.active, 'create_endpoint_segmenter'):
+            print("[实时转录] 使用单遍端点分段模式（流式识别器端点检测）")
+            return self.asr.create_endpoint_segmenter()
+        print("[实时转录警告] 当前ASR引擎不支持端点分段，回退到 Silero VAD")
+        return None
+    
+    def switch_asr_engine(self, engine_name):
+        """运行时切换 ASR 引擎（后台加载，空闲时切换）"""
+        return self.asr.switch(engine_name)
+    
+    def _on_asr_engine_switched(self, old_name, new_name, engine):
+        """ASR 引擎切换完成：重建与引擎绑定的实时分段器"""
+        if self.recorder:
+            self.recorder.set_segmenter(self._create_segmenter())
+        api_server.broadcast_status_update(self.state, f"ASR引擎已切换为 {new_name}")
+    
     def get_status(self):
         """获取当前状态"""
         return {
@@ -114,22 +278,50 @@ class LifeCoachApp:
             "hardware": {
                 "oled": True,
                 "gpio": True
-            }
+            },
+            "handsfree": self.wake_listener.get_stats() if self.wake_listener else None,
+            "models": self.model_manager.get_status() if self.model_manager else None
         }
     
+    def get_asr_info(self):
+        """当前识别引擎信息（写入录音元数据）"""
+        try:
+            return self.asr.get_info() if self.asr else {}
+        except Exception:
+            return {}
+    
+    def get_corrector_info(self):
+        """当前纠错引擎信息（写入录音元数据）"""
+        corrector = getattr(self.asr, 'text_corrector', None) if self.asr else None
+        if corrector is None:
+            return {}
+        return {'engine': getattr(corrector, 'engine_type', None), 'model_path': getattr(corrector, 'model_path', None)}
+    
     def _get_today_count(self):
         if self.storage:
             return self.storage.get_today_count()
         return 0
     
+    def _ensure_storage_space(self, bytes_needed):
+        """确保剩余空间放得下 bytes_needed（启用 STORAGE_FREE_SPACE_CLEANUP 时存储维护会删除最早的录音音频）"""
+        if self.maintenance:
+            return self.maintenance.ensure_free(bytes_needed)
+        return self._get_storage_left() * 1024**3 >= bytes_needed
+    
     def _get_storage_left(self):
         if self.storage:
             info = self.storage.get_storage_info()
             return info['free_gb']
         return 0.0
     
-    def start_recording(self):
-        """开始录音"""
+    def start_recording(self, preroll=None, trigger=None):
+        """
+        开始录音
+        
+        Args:
+            preroll: 唤醒触发前的预录音频（int16）
+            trigger: 唤醒触发原因（None 表示按键/网页手动开始）
+        """
         if self.state != AppState.IDLE:
             return {
                 "success": False,
@@ -139,6 +331,16 @@ class LifeCoachApp:
                 }
             }
         
+        from src.config import STORAGE_RECORDING_RESERVE_MB
+        if not self._ensure_storage_space(int(STORAGE_RECORDING_RESERVE_MB * 1024 * 1024)):
+            return {
+                "success": False,
+                "error": {
+                    "code": ErrorCode.STORAGE_FULL,
+                    "message": "存储空间不足，无法开始录音"
+                }
+            }
+        
         try:
             now = datetime.now()
             self.recording_id = now.strftime("%Y-%m-%d/%H-%M")
@@ -153,11 +355,19 @@ class LifeCoachApp:
                 self.realtime_transcriber.start()
                 print(f"[调试] realtime_transcriber.is_running = {self.realtime_transcriber.is_running}")
                 self.accumulated_text = ""
+                self.accumulated_segments = []
+                self._start_incremental_correction()
             else:
                 print("[实时转录] 已禁用实时转录")
                 self.recorder.realtime_transcribe = False
             
-            self.recorder.start()
+            # 录音前腾出内存，避免录音过程中发生交换（增量纠错已持有纠错模型，不会被卸载）
+            if self.model_manager:
+                self.model_manager.ensure_headroom()
+            
+            self.recorder.start(preroll=preroll)
+            self.handsfree_recording = trigger is not None
+            self.last_speech_time = time.time()
             
             if self.display:
                 self.display.update_status("录音中", recording=True)
@@ -178,6 +388,7 @@ class LifeCoachApp:
             
         except Exception as e:
             print(f"[错误] 启动录音失败: {e}")
+            self._cancel_incremental_correction()
             self.state = AppState.IDLE
             return {
                 "success": False,
@@ -221,6 +432,8 @@ class LifeCoachApp:
                 api_server.broadcast_status_update(self.state, "正在纠错...")
                 threading.Thread(target=self._process_realtime_text, args=(audio_data,), daemon=True).start()
             else:
+                # 没有实时转录文本时不会走到 finish()，结束增量纠错线程并释放纠错模型
+                self._cancel_incremental_correction()
                 print(f"[录音] 停止录音，开始完整转写")
                 api_server.broadcast_status_update(self.state, "正在转写...")
                 threading.Thread(target=self._transcribe_recording, args=(audio_data,), daemon=True).start()
@@ -254,6 +467,7 @@ class LifeCoachApp:
         
         try:
             self.recorder.cancel()
+            self._cancel_incremental_correction()
             
             if self.display:
                 self.display.update_status("已取消")
@@ -279,16 +493,29 @@ class LifeCoachApp:
                 }
             }
     
-    def _finish_recording(self, content, audio_data=None, correction_info=None):
+    def _finish_recording(self, content, audio_data=None, correction_info=None, segments=None, mode=None):
         """完成录音"""
         metadata = {
             'duration': self.recording_duration,
             'word_count': self.word_count
         }
         
-        self.storage.save(self.recording_id, content, metadata)
+        # 结构化元数据：分段时间线、识别/纠错引擎、纠错记录
+        sidecar = build_sidecar(self.recording_id, duration=self.recording_duration, segments=segments or [],
+                                asr=self.get_asr_info(), mode=mode)
+        if correction_info and correction_info.get('applied'):
+            sidecar['corrections'].append(correction_record(
+                correction_info.get('changes'), engine=self.get_corrector_info(),
+                time_ms=correction_info.get('time_ms'), incremental=bool(correction_info.get('incremental'))
+            ))
         
-        # 保存音频文件
+        self.storage.save(self.recording_id, content, metadata, sidecar=sidecar)
+        
+        # 保存音频文件（16bit 单声道，先腾出空间，空间不足时只保留转写文本）
+        if audio_data is not None and not self._ensure_storage_space(int(self.recording_duration * 16000 * 2)):
+            print("[错误] 存储空间不足，未保存音频文件")
+            api_server.broadcast_log("存储空间不足，本次录音只保存了转写文本", level='warning')
+            audio_data = None
         if audio_data is not None:
             try:
                 self.storage.save_audio(self.recording_id, audio_data, sample_rate=16000)
@@ -308,10 +535,8 @@ class LifeCoachApp:
         self.state = AppState.DONE
         api_server.broadcast_status_update(self.state, f"已保存 共{self.word_count}字")
         
-        # 更新今日统计和最近转录
-        self.today_count += 1
-        self.today_duration += self.recording_duration
-        self.last_transcript = content[:50] if content else ""
+        # 更新今日统计和最近转录（保存时已写入每日统计）
+        self._update_today_stats()
         
         # 3秒后自动重置为待机状态
         import time
@@ -323,14 +548,33 @@ class LifeCoachApp:
             # 切换回仪表盘模式
             self.display.switch_to_dashboard_mode()
     
-    def get_recordings(self, date=None, limit=10):
-        """获取录音列表"""
+    def get_daily_stats(self, date_from=None, date_to=None):
+        """获取每日录音统计"""
+        try:
+            return {
+                "success": True,
+                "days": self.storage.stats.get_days(date_from=date_from, date_to=date_to)
+            }
+        except Exception as e:
+            print(f"[错误] 查询每日统计失败: {e}")
+            return {
+                "success": False,
+                "error": {"code": ErrorCode.INTERNAL_ERROR, "message": str(e)}
+            }
+    
+    def get_recordings(self, date=None, limit=10, before=None, date_from=None, date_to=None,
+                       has_correction=None, fields=None):
+        """获取录音列表（游标分页，next_before 为下一页的 before 参数，没有更多时为 None）"""
         try:
-            recordings = self.storage.query(date=date, limit=limit)
+            recordings = self.storage.query(date=date, limit=limit + 1, before=before, date_from=date_from,
+                                            date_to=date_to, has_correction=has_correction, fields=fields)
+            has_more = len(recordings) > limit
+            recordings = recordings[:limit]
             return {
                 "success": True,
                 "count": len(recordings),
-                "recordings": recordings
+                "recordings": recordings,
+                "next_before": recordings[-1]['cursor'] if has_more else None
             }
         except Exception as e:
             print(f"[错误] 查询录音失败: {e}")
@@ -339,6 +583,113 @@ class LifeCoachApp:
                 "error": {"code": ErrorCode.INTERNAL_ERROR, "message": str(e)}
             }
     
+    def search_recordings(self, query, date_from=None, date_to=None, has_correction=None, limit=20, offset=0):
+        """全文检索录音"""
+        try:
+            start_time = time.time()
+            found = self.storage.search(query, date_from=date_from, date_to=date_to,
+                                        has_correction=has_correction, limit=limit, offset=offset)
+            return {
+                "success": True,
+                "query": query,
+                "total": found['total'],
+                "count": len(found['results']),
+                "results": found['results'],
+                "time_ms": int((time.time() - start_time) * 1000)
+            }
+        except Exception as e:
+            print(f"[错误] 检索录音失败: {e}")
+            return {
+                "success": False,
+                "error": {"code": ErrorCode.INTERNAL_ERROR, "message": str(e)}
+            }
+    
+    def get_recording_timeline(self, recording_id, at=None):
+        """获取录音分段时间线和处理记录（at: 秒，同时返回该时间点所在的分段）"""
+        try:
+            sidecar = self.storage.get_sidecar(recording_id)
+            if sidecar is None:
+                return {
+                    "success": False,
+                    "error": {"code": ErrorCode.RECORDING_NOT_FOUND, "message": "录音不存在或没有分段元数据"}
+                }
+            result = {
+                "success": True,
+                "id": recording_id,
+                "duration": sidecar.get('duration'),
+                "mode": sidecar.get('mode'),
+                "asr": sidecar['asr'],
+                "segments": timeline(sidecar),
+                "corrections": sidecar['corrections']
+            }
+            if at is not None:
+                result["segment"] = segment_at(sidecar, at)
+            return result
+        except Exception as e:
+            print(f"[错误] 读取录音时间线失败: {e}")
+            return {
+                "success": False,
+                "error": {"code": ErrorCode.INTERNAL_ERROR, "message": str(e)}
+            }
+    
+    def get_storage_maintenance(self):
+        """存储维护状态（策略、累计释放空间、最近一轮报告）"""
+        if not self.maintenance:
+            return {"success": True, "enabled": False}
+        return {"success": True, "enabled": True, **self.maintenance.get_status()}
+    
+    def run_storage_maintenance(self, dry_run=False):
+        """立即维护：dry_run 时同步返回将要处理的文件统计，否则在后台执行"""
+        if not self.maintenance:
+            return {
+                "success": False,
+                "error": {"code": ErrorCode.INVALID_STATE, "message": "存储维护未启用"}
+            }
+        if dry_run:
+            return {"success": True, "report": self.maintenance.run(dry_run=True)}
+        self.maintenance.trigger()
+        return {"success": True, "message": "存储维护已开始"}
+    
+    def get_storage_watcher(self):
+        """录音目录监听状态（事件来源、待同步数、累计同步/修正数、最近一次一致性检查）"""
+        if not self.watcher:
+            return {"success": True, "enabled": False}
+        return {"success": True, "enabled": True, **self.watcher.get_status()}
+    
+    def check_storage_consistency(self):
+        """立即做一次索引与磁盘的一致性检查"""
+        try:
+            if self.watcher:
+                result = self.watcher.check()
+                if result is None:
+                    raise RuntimeError(self.watcher.stats['last_error'])
+            else:
+                result = self.storage.reconcile()
+            return {"success": True, **result}
+        except Exception as e:
+            print(f"[错误] 一致性检查失败: {e}")
+            return {
+                "success": False,
+                "error": {"code": ErrorCode.INTERNAL_ERROR, "message": str(e)}
+            }
+    
+    def get_recording_peaks(self, recording_id, zoom=None, width=None, start=None, end=None):
+        """获取录音波形峰值（一级，按 zoom 或目标宽度 width 选择，start/end 为时间范围秒）"""
+        try:
+            result = self.storage.get_peaks(recording_id, zoom=zoom, width=width, start=start, end=end)
+            if result is None:
+                return {
+                    "success": False,
+                    "error": {"code": ErrorCode.RECORDING_NOT_FOUND, "message": "录音不存在或没有音频文件"}
+                }
+            return {"success": True, "id": recording_id, **result}
+        except Exception as e:
+            print(f"[错误] 读取波形峰值失败: {e}")
+            return {
+                "success": False,
+                "error": {"code": ErrorCode.INTERNAL_ERROR, "message": str(e)}
+            }
+    
     def get_recording_detail(self, recording_id):
         """获取录音详情"""
         try:
@@ -400,6 +751,14 @@ class LifeCoachApp:
                 self.word_count  # 使用实时字数而不是recording_id
             )
             
+            # 唤醒触发的录音：长时间没有语音时自动停止
+            from src.config import HANDSFREE_SILENCE_TIMEOUT
+            if (self.handsfree_recording and HANDSFREE_SILENCE_TIMEOUT > 0
+                    and time.time() - self.last_speech_time > HANDSFREE_SILENCE_TIMEOUT):
+                print(f"[唤醒监听] {HANDSFREE_SILENCE_TIMEOUT:.0f}秒无语音，自动停止录音")
+                self.stop_recording()
+                break
+            
             time.sleep(1)
     
     def _process_realtime_text(self, audio_data):
@@ -412,10 +771,27 @@ class LifeCoachApp:
             
             # 进行文本纠错
             correction_info = None
-            if self.asr.text_corrector is not None:
+            if self.incremental_corrector is not None:
+                # 录音过程中已逐段纠错，这里只等待最后几段
+                result = self.incremental_corrector.finish()
+                self.incremental_corrector = None
+                content = result['corrected']
+                if result['changed']:
+                    correction_info = {
+                        'applied': True,
+                        'changes': result['changes'],
+                        'time_ms': result['finish_ms'],
+                        'incremental': True
+                    }
+                else:
+                    print(f"[纠错] 无需修改")
+            elif self.asr.text_corrector is not None:
                 print(f"[纠错] 开始纠错实时转录文本...")
                 try:
-                    correction_result = self.asr.text_corrector.correct(content)
+                    if self.accumulated_segments:
+                        correction_result = self.asr.text_corrector.correct_segments(self.accumulated_segments)
+                    else:
+                        correction_result = self.asr.text_corrector.correct(content)
                     
                     if correction_result['success'] and correction_result['changed']:
                         print(f"[纠错] 完成: {correction_result['time_ms']}ms")
@@ -433,10 +809,12 @@ class LifeCoachApp:
                     print(f"[纠错警告] 纠错失败: {e}")
             
             self.word_count = len(content)
-            self._finish_recording(content, audio_data, correction_info)
+            self._finish_recording(content, audio_data, correction_info,
+                                   segments=self.accumulated_segments, mode='realtime')
             
         except Exception as e:
             print(f"[错误] 处理实时转录文本失败: {e}")
+            self._cancel_incremental_correction()
             self.state = AppState.ERROR
             api_server.broadcast_error("处理失败", str(e))
             
@@ -461,7 +839,11 @@ class LifeCoachApp:
             
             # 处理返回结果：可能是字符串或字典（带纠错信息）
             correction_info = None
+            segments = None
             if isinstance(result, dict):
+                if result.get('segments'):
+                    segments = [build_segment(segment.get('text', ''), segment, index=i)
+                                for i, segment in enumerate(result['segments'])]
                 # 纠错模式返回的字典
                 content = result.get('text', '')
                 print(f"[转写] 完成（纠错模式）: 原文 {len(result.get('text_original', ''))} 字 → 纠正后 {len(content)} 字")
@@ -478,7 +860,9 @@ class LifeCoachApp:
                 print(f"[转写] 完成，共 {len(content)} 字")
             
             self.word_count = len(content)
-            self._finish_recording(content, audio_data, correction_info)
+            if segments is None:
+                segments = [build_segment(content, {'start': 0, 'duration': self.recording_duration}, index=0)]
+            self._finish_recording(content, audio_data, correction_info, segments=segments, mode='full')
             
         except Exception as e:
             print(f"[错误] 转写失败: {e}")
@@ -493,8 +877,37 @@ class LifeCoachApp:
             if self.display:
                 self.display.update_status("就绪")
     
+    def _start_incremental_correction(self):
+        """开始增量纠错（纠错功能可用时）"""
+        from src.config import INCREMENTAL_CORRECTION_ENABLED, INCREMENTAL_CORRECTION_CONTEXT_CHARS
+        self._cancel_incremental_correction()
+        if not INCREMENTAL_CORRECTION_ENABLED or self.asr.text_corrector is None:
+            return
+        from src.incremental_corrector import IncrementalCorrector
+        self.incremental_corrector = IncrementalCorrector(
+            self.asr.text_corrector,
+            context_chars=INCREMENTAL_CORRECTION_CONTEXT_CHARS,
+            on_update=api_server.broadcast_realtime_corrected
+        )
+        self.incremental_corrector.start()
+        print("[增量纠错] 已启动，录音过程中逐段纠错")
+    
+    def _cancel_incremental_correction(self):
+        """取消增量纠错（结束后台线程，释放对纠错模型的持有）"""
+        corrector, self.incremental_corrector = self.incremental_corrector, None
+        if corrector is not None:
+            corrector.cancel()
+    
+    def _on_wake_trigger(self, preroll, reason):
+        """唤醒监听触发 - 带预录音频开始录音"""
+        api_server.broadcast_log(f"[唤醒] 检测到 {reason}，自动开始录音", 'info')
+        result = self.start_recording(preroll=preroll, trigger=reason)
+        if not result.get('success'):
+            print(f"[唤醒监听] 自动开始录音失败: {result.get('error')}")
+    
     def _on_audio_segment(self, audio_segment, metadata):
         """音频分段回调 - 将音频段添加到转录队列"""
+        self.last_speech_time = time.time()
         print(f"[调试] _on_audio_segment 被调用: realtime_transcriber={self.realtime_transcriber is not None}, is_running={self.realtime_transcriber.is_running if self.realtime_transcriber else 'N/A'}")
         if self.realtime_transcriber and self.realtime_transcriber.is_running:
             print(f"[实时转录] 收到音频段 {metadata.get('segment_index')}，长度: {len(audio_segment)} 样本")
@@ -511,8 +924,14 @@ class LifeCoachApp:
         """转录结果回调 - 通过WebSocket推送给前端并更新OLED副屏"""
         try:
             self.accumulated_text += text
+            self.accumulated_segments.append(build_segment(text, metadata))
             self.word_count = len(self.accumulated_text)
             
+            incremental_corrector = self.incremental_corrector
+            if incremental_corrector:
+                incremental_corrector.add_segment(text, metadata.get('segment_index', 0),
+                                                  metadata.get('confidence'))
+            
             segment_idx = metadata.get('segment_index', 0)
             transcribe_time = metadata.get('transcribe_time', 0)
             
@@ -554,7 +973,13 @@ class LifeCoachApp:
         """关闭程序"""
         print("[主程序] 准备关闭...")
         
-        # 停止实时转录器
+        # 停止唤醒监听、存储维护、目录监听和实时转录器
+        if self.maintenance:
+            self.maintenance.stop()
+        if self.watcher:
+            self.watcher.stop()
+        if self.wake_listener:
+            self.wake_listener.stop()
         if self.realtime_transcriber:
             self.realtime_transcriber.stop()
         
@@ -630,18 +1055,12 @@ class LifeCoachApp:
         return stats
     
     def _update_today_stats(self):
-        """更新今日统计信息（从存储中读取）"""
+        """更新今日统计信息（读取存储的内存汇总，不读文件）"""
         try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            recordings = self.storage.query(date=today, limit=100)
-            
-            self.today_count = len(recordings)
-            self.today_duration = sum(r.get('duration', 0) for r in recordings)
-            
-            # 获取最近一次转录
-            if recordings:
-                latest = recordings[0]  # 假设按时间倒序
-                self.last_transcript = latest.get('content', '')[:50]  # 截取前50字符
+            today = self.storage.get_today_stats()
+            self.today_count = today['count']
+            self.today_duration = int(today['duration'])
+            self.last_transcript = today['last_transcript']
         except Exception as e:
             print(f"[统计] 更新今日统计失败: {e}")
             import traceback
@@ -655,6 +1074,9 @@ class LifeCoachApp:
         # 初始更新统计信息
         self._update_today_stats()
         
+        if self.wake_listener:
+            self.wake_listener.start()
+        
         last_stats_update = 0  # 上次更新统计的时间
         
         try:
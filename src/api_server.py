@@ -4,16 +4,20 @@ Flask Web API 服务
 """
 
 from flask import Flask, jsonify, request, send_from_directory
+from werkzeug.exceptions import HTTPException
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import os
 import sys
 import time
+from datetime import datetime
 
 # 添加父目录到路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.config import *
 from src.display_controller import get_display_controller
+from src.file_storage import LIST_FIELDS
+from src.recording_sidecar import build_segment
 
 # 初始化显示控制器（全局单例）
 display = get_display_controller(enable_display=DISPLAY_ENABLED)
@@ -55,7 +59,14 @@ def index():
 
 @app.route('/api/recordings/<path:recording_id>/audio', methods=['GET'])
 def get_recording_audio(recording_id):
-    """获取录音音频文件"""
+    """
+    获取录音音频（支持 Range 分段请求和 ETag/If-Modified-Since 条件请求）
+    
+    参数:
+        format: preview（默认，有压缩试听版本时返回试听版本，没有时返回 WAV 并在后台生成）/ original（原始 WAV）
+    
+    响应头 X-Audio-Variant 标明返回的是 preview、original 还是 archive（WAV 已被存储维护压缩归档）
+    """
     if not app_manager:
         return jsonify({"success": False, "error": "服务未初始化"}), 500
     
@@ -68,10 +79,29 @@ def get_recording_audio(recording_id):
         if not audio_path or not os.path.exists(audio_path):
             return jsonify({"success": False, "error": "音频文件不存在"}), 404
         
-        # 返回音频文件
         from flask import send_file
-        return send_file(audio_path, mimetype='audio/wav')
+        from src.audio_preview import get_preview_encoder, PREVIEW_FORMATS
+        mimetype = 'audio/flac' if audio_path.endswith('.flac') else 'audio/wav'
+        path, variant = audio_path, 'original'
+        archive_format = os.path.splitext(audio_path)[1][1:]
+        if archive_format in PREVIEW_FORMATS:
+            # 存储维护已把 WAV 压缩归档，直接返回归档音频
+            mimetype, variant = PREVIEW_FORMATS[archive_format][3], 'archive'
+        elif request.args.get('format', 'preview') != 'original':
+            encoder = get_preview_encoder()
+            preview = encoder.get(audio_path) if encoder else None
+            if preview is not None:
+                path, mimetype, variant = str(preview), encoder.mimetype, 'preview'
+        
+        # conditional=True: 处理 Range（206/416）和 ETag/Last-Modified（304）
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=True, max_age=0)
+        response.headers['X-Audio-Variant'] = variant
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
         
+    except HTTPException:
+        # Range 越界（416）等由 Flask 按 HTTP 语义返回
+        raise
     except Exception as e:
         print(f"[API错误] 获取音频失败: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -87,6 +117,64 @@ def get_status():
     status = app_manager.get_status()
     return jsonify(status)
 
+@app.route('/api/stats/daily', methods=['GET'])
+def get_daily_stats():
+    """
+    每日录音统计（次数、时长、字数），只含有录音的日期
+    
+    参数:
+        date_from / date_to: 日期范围（含，格式 2026-01-21）
+    """
+    if not app_manager:
+        return jsonify({"success": False, "error": "服务未初始化"}), 500
+    
+    date_from = request.args.get('date_from') or None
+    date_to = request.args.get('date_to') or None
+    error = _check_dates(date_from, date_to)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+    
+    result = app_manager.get_daily_stats(date_from=date_from, date_to=date_to)
+    return jsonify(result), (200 if result['success'] else 500)
+
+@app.route('/api/storage/maintenance', methods=['GET'])
+def get_storage_maintenance():
+    """存储维护状态：策略、累计释放空间、最近一轮报告"""
+    if not app_manager:
+        return jsonify({"success": False, "error": "服务未初始化"}), 500
+    return jsonify(app_manager.get_storage_maintenance())
+
+@app.route('/api/storage/maintenance', methods=['POST'])
+def run_storage_maintenance():
+    """
+    立即执行存储维护
+    
+    参数:
+        dry_run: true 时只返回将要压缩/删除/清理的统计，不修改文件
+    """
+    if not app_manager:
+        return jsonify({"success": False, "error": "服务未初始化"}), 500
+    dry_run = _parse_bool_arg('dry_run') or False
+    result = app_manager.run_storage_maintenance(dry_run=dry_run)
+    if not result['success']:
+        return jsonify(result), 400
+    return jsonify(result), (200 if dry_run else 202)
+
+@app.route('/api/storage/watcher', methods=['GET'])
+def get_storage_watcher():
+    """录音目录监听状态：事件来源、待同步数、累计同步数、最近一次一致性检查"""
+    if not app_manager:
+        return jsonify({"success": False, "error": "服务未初始化"}), 500
+    return jsonify(app_manager.get_storage_watcher())
+
+@app.route('/api/storage/watcher/check', methods=['POST'])
+def check_storage_consistency():
+    """立即对比索引与磁盘，修正外部同步造成的差异"""
+    if not app_manager:
+        return jsonify({"success": False, "error": "服务未初始化"}), 500
+    result = app_manager.check_storage_consistency()
+    return jsonify(result), (200 if result['success'] else 500)
+
 @app.route('/api/recording/start', methods=['POST'])
 def start_recording():
     """开始录音"""
@@ -101,6 +189,8 @@ def start_recording():
             'detail': '录音已开始'
         })
         return jsonify(result)
+    elif result['error']['code'] == ErrorCode.STORAGE_FULL:
+        return jsonify(result), 507
     else:
         return jsonify(result), 400
 
@@ -130,16 +220,61 @@ def cancel_recording():
     result = app_manager.cancel_recording()
     return jsonify(result)
 
+def _check_dates(*values):
+    """校验日期参数（YYYY-MM-DD），返回错误信息或 None"""
+    for value in values:
+        if value is not None:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return f"日期格式错误: {value}（应为 YYYY-MM-DD）"
+    return None
+
+def _parse_bool_arg(name):
+    """布尔查询参数：true/1/yes 为 True，其他非空值为 False，缺省为 None"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    return value.lower() in ('true', '1', 'yes')
+
 @app.route('/api/recordings', methods=['GET'])
 def get_recordings():
-    """获取录音列表"""
+    """
+    获取录音列表（按录音时间倒序，不含全文，全文通过详情接口获取）
+    
+    参数:
+        limit: 返回数量（1~500，默认 20）
+        before: 游标，传上一页响应中的 next_before
+        date: 指定日期；date_from / date_to: 日期范围（含，格式 2026-01-21）
+        has_correction: true / false，按是否有纠正文本过滤
+        fields: 逗号分隔的返回字段，如 id,preview,duration（cursor 总是返回）
+    """
     if not app_manager:
         return jsonify({"success": False, "error": "服务未初始化"}), 500
     
-    date = request.args.get('date', None)
-    limit = int(request.args.get('limit', 20))
+    date = request.args.get('date') or None
+    date_from = request.args.get('date_from') or None
+    date_to = request.args.get('date_to') or None
+    error = _check_dates(date, date_from, date_to)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
     
-    result = app_manager.get_recordings(date=date, limit=limit)
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 500)
+    except ValueError:
+        return jsonify({"success": False, "error": "limit 必须是整数"}), 400
+    
+    fields = None
+    if request.args.get('fields'):
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in LIST_FIELDS]
+        if unknown:
+            return jsonify({"success": False,
+                            "error": f"未知字段: {', '.join(unknown)}（可选: {', '.join(LIST_FIELDS)}）"}), 400
+    
+    result = app_manager.get_recordings(date=date, limit=limit, before=request.args.get('before') or None,
+                                        date_from=date_from, date_to=date_to,
+                                        has_correction=_parse_bool_arg('has_correction'), fields=fields)
     return jsonify(result)
 
 @app.route('/api/recordings/<path:recording_id>', methods=['GET'])
@@ -166,6 +301,45 @@ def delete_recording(recording_id):
     else:
         return jsonify(result), 404
 
+@app.route('/api/search', methods=['GET'])
+def search_recordings():
+    """
+    全文检索录音
+    
+    参数:
+        q: 关键词（必填，空格分隔的多个词须同时出现）
+        date_from / date_to: 日期范围（含，格式 2026-01-21）
+        has_correction: true / false，按是否有纠正文本过滤
+        limit: 返回数量（1~100，默认 20）
+        offset: 分页偏移
+    """
+    if not app_manager:
+        return jsonify({"success": False, "error": "服务未初始化"}), 500
+    
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"success": False, "error": "缺少参数 q"}), 400
+    if len(query) > 100:
+        return jsonify({"success": False, "error": "关键词过长（最多100字）"}), 400
+    
+    date_from = request.args.get('date_from') or None
+    date_to = request.args.get('date_to') or None
+    error = _check_dates(date_from, date_to)
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+    
+    has_correction = _parse_bool_arg('has_correction')
+    
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({"success": False, "error": "limit/offset 必须是整数"}), 400
+    
+    result = app_manager.search_recordings(query, date_from=date_from, date_to=date_to,
+                                           has_correction=has_correction, limit=limit, offset=offset)
+    return jsonify(result), (200 if result['success'] else 500)
+
 @app.route('/api/recordings/<path:recording_id>/corrected', methods=['POST'])
 def save_corrected_text(recording_id):
     """保存纠正后的文本"""
@@ -183,10 +357,22 @@ def save_corrected_text(recording_id):
         # 保存纠正后文本
         path = app_manager.storage.save_corrected(recording_id, corrected_text, changes)
         
+        # 对比原始识别文本，学习反复出现的混淆词对
+        learned = 0
+        corrector = getattr(app_manager.asr, 'text_corrector', None) if app_manager.asr else None
+        if corrector is not None and hasattr(corrector, 'learn'):
+            try:
+                recording = app_manager.storage.get(recording_id)
+                if recording and recording.get('original_content'):
+                    learned = corrector.learn(recording['original_content'], corrected_text)
+            except Exception as e:
+                print(f"[API警告] 学习纠正词对失败: {e}")
+        
         return jsonify({
             "success": True,
             "message": "纠正文本已保存",
-            "path": path
+            "path": path,
+            "learned_pairs": learned
         })
     except Exception as e:
         print(f"[API错误] 保存纠正文本失败: {e}")
@@ -215,6 +401,73 @@ def get_corrected_text(recording_id):
         print(f"[API错误] 获取纠正文本失败: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/recordings/<path:recording_id>/timeline', methods=['GET'])
+def get_recording_timeline(recording_id):
+    """
+    录音分段时间线（每段起始时间、时长、文本、置信度）、识别引擎和纠错记录
+    
+    参数:
+        at: 秒（可选），同时返回该时间点所在的分段，用于音频定位
+    """
+    if not app_manager:
+        return jsonify({"success": False, "error": "服务未初始化"}), 500
+    
+    at = request.args.get('at')
+    if at is not None:
+        try:
+            at = float(at)
+        except ValueError:
+            return jsonify({"success": False, "error": "at 必须是数字（秒）"}), 400
+    
+    result = app_manager.get_recording_timeline(recording_id, at=at)
+    if result['success']:
+        return jsonify(result)
+    if result['error']['code'] == ErrorCode.RECORDING_NOT_FOUND:
+        return jsonify(result), 404
+    return jsonify(result), 500
+
+@app.route('/api/recordings/<path:recording_id>/peaks', methods=['GET'])
+def get_recording_peaks(recording_id):
+    """
+    录音波形峰值（预先计算的多级 min/max，用于绘制时间线波形）
+    
+    参数:
+        zoom: 级别，0 为整段总览（约 512 对以内），每加 1 细 4 倍；不传时按 width 选择
+        width: 目标对数（如画布像素宽度），返回不少于该对数的最粗级别
+        start, end: 时间范围（秒），放大查看时只取可见部分
+        format: json（默认，peaks 为 [min, max, min, max, ...]）/ binary（int16 小端原始数据，元信息在 X-Peaks-* 响应头）
+    """
+    if not app_manager:
+        return jsonify({"success": False, "error": "服务未初始化"}), 500
+    
+    params = {}
+    try:
+        for name, cast in (('zoom', int), ('width', int), ('start', float), ('end', float)):
+            if request.args.get(name) is not None:
+                params[name] = cast(request.args.get(name))
+    except ValueError:
+        return jsonify({"success": False, "error": "zoom/width 必须是整数，start/end 必须是数字（秒）"}), 400
+    if params.get('width') is not None and not 1 <= params['width'] <= 100000:
+        return jsonify({"success": False, "error": "width 必须在 1-100000 之间"}), 400
+    
+    result = app_manager.get_recording_peaks(recording_id, **params)
+    if not result['success']:
+        status = 404 if result['error']['code'] == ErrorCode.RECORDING_NOT_FOUND else 500
+        return jsonify(result), status
+    
+    peaks = result.pop('peaks')
+    if request.args.get('format') == 'binary':
+        response = app.response_class(peaks.astype('<i2').tobytes(), mimetype='application/octet-stream')
+        for name in ('zoom', 'levels', 'sample_rate', 'samples_per_peak', 'duration', 'start'):
+            response.headers[f"X-Peaks-{name.replace('_', '-').title()}"] = str(result[name])
+    else:
+        result['peaks'] = peaks.ravel().tolist()
+        response = jsonify(result)
+    # 峰值随音频重新保存而变化：用 ETag 让浏览器缓存并以 304 验证
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 @app.route('/api/recordings/<path:recording_id>/retranscribe', methods=['POST'])
 def retranscribe_recording(recording_id):
     """重新识别录音文件"""
@@ -230,26 +483,24 @@ def retranscribe_recording(recording_id):
         if not recording:
             return jsonify({"success": False, "error": "录音不存在"}), 404
         
-        # 构建音频文件路径
-        date_str, time_str = recording_id.split('/')
-        audio_path = app_manager.storage.base_path / date_str / f"{time_str}.wav"
-        if not audio_path.exists():
-            return jsonify({"success": False, "error": "音频文件不存在"}), 404
-        
-        audio_path_str = str(audio_path)
-        print(f"[重新识别] 音频文件: {audio_path_str}", file=sys.stderr, flush=True)
-        
         # 使用ASR引擎重新识别
         if not app_manager.asr:
             return jsonify({"success": False, "error": "ASR引擎未初始化"}), 500
         
-        # 转写音频文件
+        # 读取音频（WAV/FLAC/压缩归档统一解码）
+        loaded = app_manager.storage.load_audio(recording_id)
+        if loaded is None:
+            return jsonify({"success": False, "error": "音频文件不存在"}), 404
+        audio_data, sample_rate = loaded
+        print(f"[重新识别] 音频: {len(audio_data) / sample_rate:.1f}秒", file=sys.stderr, flush=True)
+        
+        # 转写音频
         import time
         start_time = time.time()
         print(f"[重新识别] 调用ASR引擎...", file=sys.stderr, flush=True)
         
         try:
-            result = app_manager.asr.transcribe_file(audio_path_str)
+            result = app_manager.asr.transcribe(audio_data)
             elapsed = time.time() - start_time
             print(f"[重新识别] ASR返回结果: {result}", file=sys.stderr, flush=True)
         except Exception as e:
@@ -265,8 +516,13 @@ def retranscribe_recording(recording_id):
         new_text = result['text'].strip()
         print(f"[重新识别] 识别完成，耗时: {elapsed:.2f}秒，文本长度: {len(new_text)}", file=sys.stderr, flush=True)
         
-        # 保存新的识别结果（更新original_content）
-        app_manager.storage.update_transcription(recording_id, new_text)
+        # 保存新的识别结果（更新original_content，分段时间线和识别引擎写入元数据）
+        segments = None
+        if result.get('segments'):
+            segments = [build_segment(segment.get('text', ''), segment, index=i)
+                        for i, segment in enumerate(result['segments'])]
+        app_manager.storage.update_transcription(recording_id, new_text, segments=segments,
+                                                 asr=app_manager.get_asr_info())
         
         return jsonify({
             "success": True,
@@ -399,6 +655,108 @@ def correct_text():
             "error": f"纠错失败: {str(e)}"
         }), 500
 
+@app.route('/api/correct_text/batch', methods=['POST'])
+def correct_text_batch():
+    """
+    批量文本纠错 API（多条文本合并为一次批量推理）
+
+    请求体:
+    {
+        "texts": ["文本1", "文本2", ...]
+    }
+
+    响应:
+    {
+        "success": true,
+        "results": [{"success": true, "original": ..., "corrected": ..., ...}, ...],
+        "time_ms": 3245
+    }
+    """
+    try:
+        if not app_manager:
+            return jsonify({"success": False, "error": "服务未初始化"}), 500
+
+        data = request.get_json()
+        if not data or not isinstance(data.get('texts'), list):
+            return jsonify({
+                "success": False,
+                "error": "缺少参数: texts"
+            }), 400
+
+        texts = data['texts']
+
+        if not texts:
+            return jsonify({
+                "success": False,
+                "error": "文本列表不能为空"
+            }), 400
+
+        if len(texts) > 64:
+            return jsonify({
+                "success": False,
+                "error": "文本过多（最多 64 条）"
+            }), 400
+
+        for text in texts:
+            if not isinstance(text, str):
+                return jsonify({
+                    "success": False,
+                    "error": "texts 中每一项必须是字符串"
+                }), 400
+            if len(text) > 5000:
+                return jsonify({
+                    "success": False,
+                    "error": "文本过长（每条最多 5000 字符）"
+                }), 400
+
+        from src.config import TEXT_CORRECTION_ENABLED
+        if not TEXT_CORRECTION_ENABLED:
+            return jsonify({
+                "success": False,
+                "error": "文本纠错功能未启用",
+                "hint": "请在 .env 中设置 TEXT_CORRECTION_ENABLED=true"
+            }), 503
+
+        if not hasattr(app_manager, 'asr') or not hasattr(app_manager.asr, 'text_corrector'):
+            return jsonify({
+                "success": False,
+                "error": "文本纠错模块未初始化"
+            }), 503
+
+        corrector = app_manager.asr.text_corrector
+
+        if corrector is None:
+            return jsonify({
+                "success": False,
+                "error": "文本纠错模块不可用",
+                "hint": "可能是模型文件不存在或加载失败"
+            }), 503
+
+        import sys
+        import time
+        start_time = time.time()
+        print(f"[纠错API] 批量纠错开始: {len(texts)} 条, 总长度 {sum(len(t) for t in texts)} 字符", file=sys.stderr, flush=True)
+
+        results = corrector.correct_batch(texts)
+
+        time_ms = int((time.time() - start_time) * 1000)
+        changed = sum(1 for r in results if r.get('changed'))
+        print(f"[纠错API] 批量纠错完成: 耗时={time_ms}ms, 有修改 {changed}/{len(results)} 条", file=sys.stderr, flush=True)
+
+        return jsonify({
+            "success": all(r.get('success') for r in results),
+            "results": results,
+            "time_ms": time_ms
+        })
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            "success": False,
+            "error": f"批量纠错失败: {str(e)}"
+        }), 500
+
 @app.route('/api/correct_text/stats', methods=['GET'])
 def get_correction_stats():
     """
@@ -450,6 +808,54 @@ def get_correction_stats():
             "error": f"获取统计信息失败: {str(e)}"
         }), 500
 
+# ==================== ASR 引擎 API ====================
+
+@app.route('/api/asr/engines', methods=['GET'])
+def get_asr_engines():
+    """
+    获取 ASR 引擎状态
+
+    响应:
+    {
+        "success": true,
+        "active": "sherpa",
+        "engines": [{"name": "sherpa", "installed": true, ...}, ...],
+        "standby": [],
+        "switching": false,
+        ...
+    }
+    """
+    if not app_manager:
+        return jsonify({"success": False, "error": "服务未初始化"}), 500
+
+    if not hasattr(app_manager.asr, 'get_status'):
+        return jsonify({"success": False, "error": "当前ASR引擎不支持热切换"}), 503
+
+    return jsonify({"success": True, **app_manager.asr.get_status()})
+
+@app.route('/api/asr/engine', methods=['POST'])
+def switch_asr_engine():
+    """
+    运行时切换 ASR 引擎（后台加载模型，录音结束后切换）
+
+    请求体:
+    {
+        "engine": "whisper"
+    }
+    """
+    if not app_manager:
+        return jsonify({"success": False, "error": "服务未初始化"}), 500
+
+    data = request.get_json() or {}
+    engine_name = (data.get('engine') or '').strip().lower()
+    if not engine_name:
+        return jsonify({"success": False, "error": "缺少 engine 参数"}), 400
+
+    result = app_manager.switch_asr_engine(engine_name)
+    if result['success']:
+        return jsonify(result)
+    return jsonify(result), 400
+
 # ==================== 系统控制 API ====================
 
 @app.route('/api/system/shutdown', methods=['POST'])
@@ -560,15 +966,11 @@ def register_voiceprint():
                     "error": error_msg
                 }), 400
             
-            # 加载音频数据
+            # 加载音频数据（WAV/FLAC/压缩归档统一解码）
             try:
-                import numpy as np
-                import wave
-                with wave.open(audio_path, 'rb') as wf:
-                    frames = wf.readframes(wf.getnframes())
-                    audio_data = np.frombuffer(frames, dtype=np.int16)
-                    print(f"[声纹API] 成功加载音频: 长度={len(audio_data)}")
-                    audio_samples.append(audio_data)
+                audio_data, _ = app_manager.storage.load_audio(rec_id)
+                print(f"[声纹API] 成功加载音频: 长度={len(audio_data)}")
+                audio_samples.append(audio_data)
             except Exception as e:
                 print(f"[声纹API错误] 读取音频失败: {e}")
                 import traceback
@@ -646,11 +1048,7 @@ def identify_voiceprint():
             }), 404
         
         try:
-            import numpy as np
-            import wave
-            with wave.open(audio_path, 'rb') as wf:
-                frames = wf.readframes(wf.getnframes())
-                audio_data = np.frombuffer(frames, dtype=np.int16)
+            audio_data, _ = app_manager.storage.load_audio(recording_id)
             print(f"[声纹API] 成功加载音频: 长度={len(audio_data)}")
         except Exception as e:
             print(f"[声纹API错误] 读取音频失败: {e}")
@@ -806,6 +1204,14 @@ def broadcast_realtime_transcript(segment, full_text, segment_index, transcribe_
         display.update_transcript(segment, append=True)
         # 同时更新OLED #2显示最新转录内容
         display.update_stats(transcript_text=full_text)
+def broadcast_realtime_corrected(segment_index, corrected_segment, corrected_full_text):
+    """广播增量纠错结果（录音过程中逐段纠错）"""
+    socketio.emit('realtime_corrected', {
+        'segment_index': segment_index,          # 片段序号
+        'corrected_segment': corrected_segment,  # 纠错后的片段
+        'full_text': corrected_full_text         # 纠错后的完整文本
+    })
+
 def broadcast_log(message, level='info'):
     """广播日志消息到前端"""
     socketio.emit('log_message', {
@@ -0,0 +1,87 @@
+"""
+ASR 引擎基类
+统一 faster-whisper 和 sherpa-onnx 引擎的对外接口
+"""
+
+import time
+import wave
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Callable, Optional
+
+
+class BaseASREngine(ABC):
+    """
+    ASR 引擎基类
+
+    统一接口:
+    - transcribe(audio) -> Dict: 转录音频数组，返回 {'text', 'duration', 'transcribe_time', 'rtf', 'engine'}
+    - transcribe_stream(audio, callback) -> str: 兼容旧接口，只返回文本
+    - transcribe_file(path) -> Dict: 转录 WAV 文件，返回 {'text', ...}
+    - text_corrector: 文本纠错器（全局单例，未启用时为 None）
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.text_corrector = None
+        self._init_text_corrector()
+
+    def _init_text_corrector(self):
+        """初始化文本纠错模块（所有引擎共享同一个纠错器单例）"""
+        from src.config import TEXT_CORRECTION_ENABLED
+        if not TEXT_CORRECTION_ENABLED:
+            return
+        try:
+            from src.text_corrector import get_text_corrector
+            self.text_corrector = get_text_corrector()
+        except Exception as e:
+            print(f"[ASR警告] 文本纠错初始化失败: {e}, 将跳过纠错")
+            self.text_corrector = None
+
+    @staticmethod
+    def _to_float32(audio_data) -> np.ndarray:
+        """将音频输入（numpy数组或分块列表，int16或float）统一为 float32 [-1, 1]"""
+        if isinstance(audio_data, list):
+            chunks = [np.asarray(chunk).reshape(-1) for chunk in audio_data if hasattr(chunk, '__len__')]
+            audio_data = np.concatenate(chunks) if chunks else np.array([], dtype=np.float32)
+
+        if audio_data.dtype == np.int16:
+            return audio_data.astype(np.float32) / 32768.0
+
+        audio_np = audio_data.astype(np.float32)
+        if len(audio_np) > 0 and np.abs(audio_np).max() > 1.0:
+            audio_np = audio_np / 32768.0
+        return audio_np
+
+    @abstractmethod
+    def transcribe(self, audio_data) -> Dict[str, Any]:
+        """转录音频数据"""
+        pass
+
+    def transcribe_stream(self, audio_data, callback: Optional[Callable] = None, **kwargs) -> str:
+        """流式转录接口（兼容现有代码），只返回文本"""
+        result = self.transcribe(audio_data)
+        text = result.get('text', '')
+        if callback:
+            callback(100, text)
+        return text
+
+    def transcribe_file(self, audio_path: str) -> Dict[str, Any]:
+        """转录 WAV 文件"""
+        with wave.open(str(audio_path), 'rb') as wf:
+            frames = wf.readframes(wf.getnframes())
+        audio_data = np.frombuffer(frames, dtype=np.int16)
+        return self.transcribe(audio_data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取性能统计"""
+        return {}
+
+    def get_info(self) -> Dict[str, Any]:
+        """获取引擎信息（名称、模型）"""
+        return {'engine': self.name}
+
+    def unload(self):
+        """释放模型资源"""
+        pass
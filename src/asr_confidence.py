@@ -0,0 +1,82 @@
+"""
+ASR 识别置信度
+把各识别引擎自带的打分统一换算为 0~1 的置信度，随分段文本一起传给文本纠错：
+- sherpa-onnx: get_result_all() 返回的 ys_probs（每个 token 的对数概率），取几何平均
+  （部分模型/旧版本不提供 ys_probs，此时置信度为 None，纠错按低置信度处理）
+- faster-whisper: 分段的 avg_logprob、no_speech_prob、compression_ratio
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+# compression_ratio 超过该值通常是重复/幻觉输出（与 faster-whisper 默认阈值一致）
+WHISPER_COMPRESSION_RATIO_THRESHOLD = 2.4
+
+
+def _logprob_to_confidence(logprobs) -> Optional[float]:
+    try:
+        values = [float(p) for p in logprobs or []]
+    except (TypeError, ValueError):
+        return None
+    if not values:
+        return None
+    return round(min(1.0, math.exp(sum(values) / len(values))), 4)
+
+
+def sherpa_result(recognizer, stream) -> Tuple[str, Optional[float], Optional[float]]:
+    """
+    读取 sherpa-onnx 流的识别结果
+
+    Returns:
+        (text, confidence, start_time)
+        confidence 为 None 表示模型未提供 token 概率；start_time 为本段在流中的起始秒数（未知时为 None）
+    """
+    if hasattr(recognizer, 'get_result_all'):
+        try:
+            result = recognizer.get_result_all(stream)
+            text = getattr(result, 'text', None)
+            if isinstance(text, str):
+                start_time = getattr(result, 'start_time', None)
+                return (text.strip(),
+                        _logprob_to_confidence(getattr(result, 'ys_probs', None)),
+                        float(start_time) if isinstance(start_time, (int, float)) else None)
+        except Exception:
+            pass
+
+    result = recognizer.get_result(stream)
+    if isinstance(result, str):
+        return result.strip(), None, None
+    if hasattr(result, 'text'):
+        return result.text.strip(), None, None
+    return "", None, None
+
+
+def whisper_segment_confidence(segment) -> Optional[float]:
+    """
+    faster-whisper 分段置信度: exp(avg_logprob) × (1 - no_speech_prob)，
+    压缩比过高（重复输出）时减半
+    """
+    avg_logprob = getattr(segment, 'avg_logprob', None)
+    if avg_logprob is None:
+        return None
+    confidence = math.exp(min(0.0, float(avg_logprob)))
+    confidence *= 1.0 - float(getattr(segment, 'no_speech_prob', 0.0) or 0.0)
+    compression_ratio = getattr(segment, 'compression_ratio', None)
+    if compression_ratio is not None and compression_ratio > WHISPER_COMPRESSION_RATIO_THRESHOLD:
+        confidence *= 0.5
+    return round(confidence, 4)
+
+
+def combine_confidence(segments: List[Dict]) -> Optional[float]:
+    """整段置信度：按文本长度加权平均（任一分段缺少置信度时返回 None）"""
+    total = 0
+    weighted = 0.0
+    for segment in segments:
+        length = len(segment.get('text') or '')
+        if not length:
+            continue
+        if segment.get('confidence') is None:
+            return None
+        total += length
+        weighted += segment['confidence'] * length
+    return round(weighted / total, 4) if total else None
@@ -46,9 +46,15 @@ except ImportError as e:
     print(f"[ASR警告] {ASR_ENGINE_TYPE} 未安装: {e}")
     print("[ASR警告] 将使用模拟模式")
 
-class ASREngine:
+from src.asr_base import BaseASREngine
+from src.asr_confidence import whisper_segment_confidence, combine_confidence
+
+
+class ASREngine(BaseASREngine):
     """ASR转写引擎（支持真实和模拟模式 + 文本纠错）"""
     
+    name = "whisper"
+    
     def __init__(self, model_size=None, device="cpu", compute_type=None):
         """
         初始化ASR引擎
@@ -62,20 +68,12 @@ class ASREngine:
         self.model_size = model_size if model_size is not None else ASR_MODEL_SIZE
         self.device = device
         self.compute_type = compute_type if compute_type is not None else ASR_COMPUTE_TYPE
+        self._last_segments = []  # 最近一次 Whisper 转写的分段（含置信度）
         
-        # 初始化文本纠错模块
-        self.text_corrector = None
-        if TEXT_CORRECTION_ENABLED:
-            try:
-                from src.text_corrector import get_text_corrector
-                # 使用新的双引擎架构，自动从环境变量读取引擎类型
-                self.text_corrector = get_text_corrector()
-                print(f"[ASR] 文本纠错功能已启用，引擎: {os.getenv('TEXT_CORRECTOR_ENGINE', 'macro-correct')}")
-            except Exception as e:
-                print(f"[ASR警告] 文本纠错初始化失败: {e}, 将跳过纠错")
-                import traceback
-                traceback.print_exc()
-                self.text_corrector = None
+        # 初始化文本纠错模块（基类中创建全局单例）
+        super().__init__()
+        if self.text_corrector is not None:
+            print(f"[ASR] 文本纠错功能已启用，引擎: {os.getenv('TEXT_CORRECTOR_ENGINE', 'macro-correct')}")
         else:
             print("[ASR] 文本纠错功能未启用")
         
@@ -147,6 +145,37 @@ class ASREngine:
         else:
             return self._mock_transcribe(audio_chunks, callback)
     
+    def transcribe(self, audio_data):
+        """转录音频数据（统一接口，不做文本纠错）"""
+        start_time = time.time()
+        audio_np = self._to_float32(audio_data)
+        self._last_segments = []
+        text = self.transcribe_stream(audio_np)
+        transcribe_time = time.time() - start_time
+        duration = len(audio_np) / 16000
+        return {
+            'text': text,
+            'duration': duration,
+            'transcribe_time': transcribe_time,
+            'rtf': transcribe_time / max(duration, 0.001),
+            'engine': f"whisper-{self.model_size}",
+            'segments': self._last_segments,
+            'confidence': combine_confidence(self._last_segments)
+        }
+    
+    def get_info(self):
+        """获取引擎信息"""
+        return {
+            'engine': self.name,
+            'model': f"whisper-{self.model_size}" if REAL_ASR and self.model else "simulated",
+            'compute_type': self.compute_type,
+            'beam_size': ASR_BEAM_SIZE
+        }
+    
+    def unload(self):
+        """释放模型"""
+        self.model = None
+    
     def _real_transcribe(self, audio_chunks, callback=None, skip_correction=False):
         """真实转写（支持Whisper和Paraformer）"""
         print("[ASR] 开始真实转写...")
@@ -331,14 +360,21 @@ class ASREngine:
         
         print(f"[ASR] 检测语言: {info.language} (概率: {info.language_probability:.2f})")
         
-        # 收集转写结果
+        # 收集转写结果（保留分段置信度，供文本纠错决定是否调用模型）
         full_text = []
         segment_count = 0
+        self._last_segments = []
         
         for segment in segments:
             text = segment.text.strip()
             full_text.append(text)
             segment_count += 1
+            self._last_segments.append({
+                'text': text,
+                'start': segment.start,
+                'end': segment.end,
+                'confidence': whisper_segment_confidence(segment),
+            })
             
             if callback:
                 partial = "".join(full_text)
@@ -0,0 +1,291 @@
+"""
+ASR 引擎注册表与运行时热切换
+- 注册表: 按名称创建引擎（sherpa / whisper，可扩展）
+- ASREngineManager: 对外表现为一个 ASR 引擎，后台预加载新模型后再切换，
+  可选保留旧引擎作为热备，避免切换引擎时重启和重复加载模型
+"""
+
+import time
+import threading
+import importlib.util
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from src.asr_base import BaseASREngine
+
+
+# ==================== 引擎注册表 ====================
+
+_ENGINE_REGISTRY: Dict[str, Dict] = {}
+
+
+def register_asr_engine(name: str, factory: Callable[[], BaseASREngine],
+                        description: str = "", requires: Optional[str] = None):
+    """
+    注册 ASR 引擎
+
+    Args:
+        name: 引擎名称
+        factory: 无参工厂函数，返回 BaseASREngine 实例
+        description: 引擎说明
+        requires: 依赖的 Python 包名（用于检测是否已安装）
+    """
+    _ENGINE_REGISTRY[name] = {
+        'factory': factory,
+        'description': description,
+        'requires': requires,
+    }
+
+
+def create_asr_engine(name: str) -> BaseASREngine:
+    """按名称创建 ASR 引擎"""
+    if name not in _ENGINE_REGISTRY:
+        raise ValueError(f"不支持的ASR引擎: {name}（可选: {', '.join(_ENGINE_REGISTRY)}）")
+    return _ENGINE_REGISTRY[name]['factory']()
+
+
+def list_asr_engines() -> List[Dict]:
+    """列出已注册的引擎及其依赖是否已安装"""
+    engines = []
+    for name, entry in _ENGINE_REGISTRY.items():
+        requires = entry['requires']
+        installed = requires is None or importlib.util.find_spec(requires) is not None
+        engines.append({
+            'name': name,
+            'description': entry['description'],
+            'installed': installed,
+        })
+    return engines
+
+
+def _create_sherpa_engine() -> BaseASREngine:
+    from src.asr_sherpa import SherpaASREngine
+    from src.config import (SHERPA_MODEL_DIR, SHERPA_USE_INT8, SHERPA_NUM_THREADS,
+                            SHERPA_RULE1_MIN_TRAILING_SILENCE, SHERPA_RULE2_MIN_TRAILING_SILENCE,
+                            SHERPA_RULE3_MIN_UTTERANCE_LENGTH)
+    return SherpaASREngine(
+        model_dir=SHERPA_MODEL_DIR,
+        use_int8=SHERPA_USE_INT8,
+        num_threads=SHERPA_NUM_THREADS,
+        rule1_min_trailing_silence=SHERPA_RULE1_MIN_TRAILING_SILENCE,
+        rule2_min_trailing_silence=SHERPA_RULE2_MIN_TRAILING_SILENCE,
+        rule3_min_utterance_length=SHERPA_RULE3_MIN_UTTERANCE_LENGTH
+    )
+
+
+def _create_whisper_engine() -> BaseASREngine:
+    from src.asr_engine_real import ASREngine
+    return ASREngine()
+
+
+register_asr_engine('sherpa', _create_sherpa_engine,
+                    "Sherpa-ONNX 流式 Paraformer（ARM 设备更快）", requires='sherpa_onnx')
+register_asr_engine('whisper', _create_whisper_engine,
+                    "faster-whisper（精度更高，自带标点）", requires='faster_whisper')
+
+
+# ==================== 热切换管理器 ====================
+
+class ASREngineManager:
+    """
+    ASR 引擎管理器（对外兼容 BaseASREngine 接口）
+
+    切换流程:
+    1. 后台线程加载目标引擎（或直接取用热备）
+    2. 等待 cutover_guard() 允许（例如不在录音中）
+    3. 加锁替换当前引擎，旧引擎转为热备或卸载（卸载前等待仍在旧引擎上执行的转录结束）
+    4. 通知切换监听器（如重建端点分段器）
+    """
+
+    def __init__(self, engine_name: str, warm_standby: bool = False,
+                 cutover_guard: Optional[Callable[[], bool]] = None):
+        """
+        Args:
+            engine_name: 初始引擎名称
+            warm_standby: 切换后是否保留旧引擎在内存中（再次切回无需加载）
+            cutover_guard: 返回 True 时才允许切换（None 表示随时可切换）
+        """
+        self.warm_standby = warm_standby
+        self.cutover_guard = cutover_guard
+
+        self._lock = threading.RLock()
+        self._active_name = engine_name
+        self._active = create_asr_engine(engine_name)
+        self._standby: Dict[str, BaseASREngine] = {}
+        self._listeners: List[Callable] = []
+        # 各引擎正在执行的转录调用数（id(engine) → 调用数）
+        self._in_flight: Dict[int, int] = {}
+        self._in_flight_cond = threading.Condition()
+
+        self.switch_state = {
+            'switching': False,
+            'target': None,
+            'last_error': None,
+            'last_switch_time': None,
+            'last_load_seconds': None,
+        }
+
+        print(f"[ASR管理] 当前引擎: {engine_name}, 热备: {'启用' if warm_standby else '禁用'}")
+
+    @property
+    def active(self) -> BaseASREngine:
+        with self._lock:
+            return self._active
+
+    @property
+    def active_name(self) -> str:
+        return self._active_name
+
+    @property
+    def text_corrector(self):
+        return self.active.text_corrector
+
+    def add_switch_listener(self, listener: Callable[[str, str, BaseASREngine], None]):
+        """注册切换监听器 listener(old_name, new_name, new_engine)"""
+        self._listeners.append(listener)
+
+    def switch(self, engine_name: str, wait: bool = False) -> Dict:
+        """
+        切换 ASR 引擎（默认后台加载后切换，立即返回）
+
+        Returns:
+            {"success": bool, "message": str} 或 {"success": False, "error": str}
+        """
+        with self._lock:
+            if engine_name == self._active_name:
+                return {"success": True, "message": f"当前已是 {engine_name} 引擎"}
+            if self.switch_state['switching']:
+                return {"success": False, "error": f"正在切换到 {self.switch_state['target']}，请稍候"}
+            if engine_name not in _ENGINE_REGISTRY:
+                return {"success": False, "error": f"不支持的ASR引擎: {engine_name}"}
+            self.switch_state['switching'] = True
+            self.switch_state['target'] = engine_name
+            self.switch_state['last_error'] = None
+
+        worker = threading.Thread(
+            target=self._switch_worker,
+            args=(engine_name,),
+            daemon=True,
+            name="ASRSwitchWorker"
+        )
+        worker.start()
+        if wait:
+            worker.join()
+            if self.switch_state['last_error']:
+                return {"success": False, "error": self.switch_state['last_error']}
+            return {"success": True, "message": f"已切换到 {engine_name}"}
+
+        if engine_name in self._standby:
+            return {"success": True, "message": f"{engine_name} 已在热备中，即将切换"}
+        return {"success": True, "message": f"正在后台加载 {engine_name}，加载完成后自动切换"}
+
+    def _switch_worker(self, engine_name: str):
+        """后台加载并切换"""
+        try:
+            start_time = time.time()
+            engine = self._standby.pop(engine_name, None)
+            if engine is None:
+                print(f"[ASR管理] 后台加载 {engine_name} 引擎...")
+                engine = create_asr_engine(engine_name)
+            load_seconds = time.time() - start_time
+
+            # 等待可以安全切换（例如录音结束）
+            while self.cutover_guard and not self.cutover_guard():
+                time.sleep(0.5)
+
+            with self._lock:
+                old_name, old_engine = self._active_name, self._active
+                self._active_name, self._active = engine_name, engine
+                if self.warm_standby:
+                    self._standby[old_name] = old_engine
+                self.switch_state['last_switch_time'] = time.strftime('%Y-%m-%d %H:%M:%S')
+                self.switch_state['last_load_seconds'] = round(load_seconds, 2)
+
+            if not self.warm_standby:
+                self._unload_when_idle(old_engine)
+
+            print(f"[ASR管理] 已切换: {old_name} → {engine_name}（加载 {load_seconds:.2f}s）")
+
+            for listener in self._listeners:
+                try:
+                    listener(old_name, engine_name, engine)
+                except Exception as e:
+                    print(f"[ASR管理] 切换监听器异常: {e}")
+
+        except Exception as e:
+            print(f"[ASR管理错误] 切换到 {engine_name} 失败: {e}")
+            import traceback
+            traceback.print_exc()
+            self.switch_state['last_error'] = str(e)
+        finally:
+            self.switch_state['switching'] = False
+            self.switch_state['target'] = None
+
+    def release_standby(self):
+        """释放热备引擎（内存紧张时由模型管理器调用，下次切换时重新加载）"""
+        with self._lock:
+            standby = list(self._standby.items())
+            self._standby.clear()
+        for name, engine in standby:
+            self._unload_when_idle(engine)
+            print(f"[ASR管理] 已释放热备引擎 {name}")
+
+    @contextmanager
+    def _use_active(self):
+        """取当前引擎并登记一次调用（切换后旧引擎等登记的调用全部结束才卸载）"""
+        with self._in_flight_cond:
+            engine = self.active
+            self._in_flight[id(engine)] = self._in_flight.get(id(engine), 0) + 1
+        try:
+            yield engine
+        finally:
+            with self._in_flight_cond:
+                remaining = self._in_flight.pop(id(engine)) - 1
+                if remaining:
+                    self._in_flight[id(engine)] = remaining
+                self._in_flight_cond.notify_all()
+
+    def _unload_when_idle(self, engine: BaseASREngine):
+        """等待该引擎上正在执行的转录结束后卸载"""
+        with self._in_flight_cond:
+            if self._in_flight.get(id(engine)):
+                print(f"[ASR管理] 等待 {self._in_flight[id(engine)]} 个转录完成后卸载旧引擎")
+            self._in_flight_cond.wait_for(lambda: not self._in_flight.get(id(engine)))
+        engine.unload()
+
+    def get_status(self) -> Dict:
+        """获取引擎状态"""
+        return {
+            'active': self._active_name,
+            'info': self.active.get_info(),
+            'engines': list_asr_engines(),
+            'standby': list(self._standby.keys()),
+            'warm_standby': self.warm_standby,
+            **self.switch_state,
+        }
+
+    # ==================== 委托给当前引擎 ====================
+
+    def transcribe(self, audio_data):
+        with self._use_active() as engine:
+            return engine.transcribe(audio_data)
+
+    def transcribe_stream(self, audio_data, callback=None, **kwargs):
+        with self._use_active() as engine:
+            return engine.transcribe_stream(audio_data, callback=callback, **kwargs)
+
+    def transcribe_file(self, audio_path):
+        with self._use_active() as engine:
+            return engine.transcribe_file(audio_path)
+
+    def get_stats(self):
+        return self.active.get_stats()
+
+    def get_info(self):
+        return self.active.get_info()
+
+    def __getattr__(self, item):
+        # 引擎特有能力（如 create_endpoint_segmenter）透传给当前引擎
+        if item.startswith('_'):
+            raise AttributeError(item)
+        return getattr(self.active, item)
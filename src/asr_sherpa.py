@@ -9,17 +9,25 @@ import time
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+from src.asr_base import BaseASREngine
+from src.asr_confidence import sherpa_result, combine_confidence
 
-class SherpaASREngine:
+
+class SherpaASREngine(BaseASREngine):
     """Sherpa-ONNX ASR 引擎 - 使用流式 Paraformer 模型"""
     
+    name = "sherpa"
+    
     def __init__(
         self,
         model_dir: str = "models/sherpa/paraformer",
         use_int8: bool = True,
         sample_rate: int = 16000,
         num_threads: int = 4,
-        provider: str = "cpu"
+        provider: str = "cpu",
+        rule1_min_trailing_silence: float = 3.0,
+        rule2_min_trailing_silence: float = 2.0,
+        rule3_min_utterance_length: float = 30.0
     ):
         """
         初始化 Sherpa-ONNX ASR 引擎
@@ -30,8 +38,14 @@ class SherpaASREngine:
             sample_rate: 音频采样率
             num_threads: 推理线程数
             provider: 推理后端 ("cpu", "coreml", "cuda")
+            rule1_min_trailing_silence: 端点规则1 - 未识别出文字时的尾部静音时长（秒）
+            rule2_min_trailing_silence: 端点规则2 - 已识别出文字后的尾部静音时长（秒）
+            rule3_min_utterance_length: 端点规则3 - 单句最大时长（秒），超过强制切分
         """
+        super().__init__()
+        
         self.model_dir = Path(model_dir)
+        self.use_int8 = use_int8
         self.sample_rate = sample_rate
         self.num_threads = num_threads
         self.provider = provider
@@ -67,9 +81,9 @@ class SherpaASREngine:
             sample_rate=sample_rate,
             provider=provider,
             enable_endpoint_detection=True,
-            rule1_min_trailing_silence=3.0,
-            rule2_min_trailing_silence=2.0,
-            rule3_min_utterance_length=30.0
+            rule1_min_trailing_silence=rule1_min_trailing_silence,
+            rule2_min_trailing_silence=rule2_min_trailing_silence,
+            rule3_min_utterance_length=rule3_min_utterance_length
         )
         init_time = time.time() - start_time
         
@@ -94,37 +108,31 @@ class SherpaASREngine:
         """
         start_time = time.time()
         
-        if audio_data.dtype != np.float32:
-            audio_data = audio_data.astype(np.float32)
-        
-        max_val = np.abs(audio_data).max()
-        if max_val > 1.0:
-            audio_data = audio_data / 32768.0
+        audio_data = self._to_float32(audio_data)
         
         audio_duration = len(audio_data) / self.sample_rate
         
         stream = self.recognizer.create_stream()
         stream.accept_waveform(self.sample_rate, audio_data)
         
-        text_parts = []
+        # 按端点分段收集文本和置信度
+        segments = []
+        
+        def collect():
+            text, confidence, start = sherpa_result(self.recognizer, stream)
+            if text:
+                segments.append({'text': text, 'start': start, 'confidence': confidence})
+        
         while self.recognizer.is_ready(stream):
             self.recognizer.decode_stream(stream)
             if self.recognizer.is_endpoint(stream):
-                text = self.recognizer.get_result(stream)
-                if isinstance(text, str):
-                    text_parts.append(text)
-                elif hasattr(text, 'text'):
-                    text_parts.append(text.text)
+                collect()
                 self.recognizer.reset(stream)
         
         if not self.recognizer.is_endpoint(stream):
-            text = self.recognizer.get_result(stream)
-            if isinstance(text, str):
-                text_parts.append(text)
-            elif hasattr(text, 'text'):
-                text_parts.append(text.text)
+            collect()
         
-        result_text = ''.join(text_parts)
+        result_text = ''.join(segment['text'] for segment in segments)
         transcribe_time = time.time() - start_time
         
         self.stats['total_audio_duration'] += audio_duration
@@ -137,20 +145,42 @@ class SherpaASREngine:
             'duration': audio_duration,
             'transcribe_time': transcribe_time,
             'rtf': transcribe_time / max(audio_duration, 0.001),
-            'engine': 'sherpa-paraformer-streaming'
+            'engine': 'sherpa-paraformer-streaming',
+            'segments': segments,
+            'confidence': combine_confidence(segments)
         }
     
-    def transcribe_stream(self, audio_data: np.ndarray, **kwargs) -> str:
+    def create_endpoint_segmenter(self):
         """
-        流式转录接口（兼容现有代码）
+        创建单遍端点分段器（共享本引擎的识别器）
+        
+        音频连续送入同一识别流，以识别器端点作为分段边界，
+        分段文本在分段时即已解码，不再需要 Silero VAD 和逐段重新转录
         """
-        result = self.transcribe(audio_data)
-        return result['text']
+        from src.endpoint_segmenter import EndpointSegmenter
+        return EndpointSegmenter(
+            recognizer=self.recognizer,
+            sample_rate=self.sample_rate,
+            engine_name='sherpa-paraformer-streaming'
+        )
     
     def get_stats(self) -> Dict[str, Any]:
         """获取性能统计"""
         return self.stats.copy()
     
+    def get_info(self) -> Dict[str, Any]:
+        """获取引擎信息"""
+        return {
+            'engine': self.name,
+            'model': f"streaming-paraformer{'-int8' if self.use_int8 else ''}",
+            'model_dir': str(self.model_dir),
+            'num_threads': self.num_threads
+        }
+    
+    def unload(self):
+        """释放识别器"""
+        self.recognizer = None
+    
     def __str__(self):
         return f"SherpaASREngine(model=streaming-paraformer, threads={self.num_threads})"
 
@@ -0,0 +1,321 @@
+"""
+ASR 引擎自动调优
+在参考音频上标定候选配置（线程数、int8/fp32、模型大小、beam size），
+测量 RTF 和内存占用，生成设备专属的调优配置文件（asr_profile.json）。
+启动时 config.py 自动加载该文件，替代按 IS_RASPBERRY_PI 二分的静态默认值。
+"""
+
+import os
+import json
+import time
+import wave
+import platform
+import multiprocessing
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILE_VERSION = 1
+
+# RTF 目标：实时转录需要给录音、VAD、纠错留出余量
+DEFAULT_MAX_RTF = 0.5
+
+# 单个候选配置的标定超时（秒）
+CANDIDATE_TIMEOUT = 600
+
+# Whisper 模型由小到大，对应 PRD 中的"轻量版"→"标准版"
+WHISPER_MODEL_SIZES = ["tiny", "base", "small"]
+
+
+def detect_board() -> str:
+    """检测板卡型号（Pi 4 / Pi 5 / RDK X3 等）"""
+    for path in ('/proc/device-tree/model', '/sys/firmware/devicetree/base/model'):
+        try:
+            with open(path, 'r') as f:
+                model = f.read().strip('\x00').strip()
+                if model:
+                    return model
+        except Exception:
+            pass
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            for line in f:
+                if line.startswith('Model') or line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except Exception:
+        pass
+    return f"{platform.system()} {platform.machine()}"
+
+
+def get_mem_total_mb() -> float:
+    """读取系统总内存（MB）"""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) / 1024
+    except Exception:
+        pass
+    return 0.0
+
+
+def load_clip(clip_path) -> np.ndarray:
+    """加载参考音频（16kHz 单声道 16bit WAV）为 float32"""
+    with wave.open(str(clip_path), 'rb') as wf:
+        if wf.getframerate() != 16000 or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"参考音频需为 16kHz 单声道 16bit WAV: {clip_path}")
+        frames = wf.readframes(wf.getnframes())
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def default_clip_path(sherpa_model_dir: str) -> Optional[Path]:
+    """默认参考音频：sherpa 模型包自带的 test_wavs"""
+    for name in ("0.wav", "1.wav"):
+        path = Path(sherpa_model_dir) / "test_wavs" / name
+        if path.exists():
+            return path
+    return None
+
+
+def build_candidates(engines: List[str], sherpa_model_dir: str, cpu_count: int) -> List[Dict]:
+    """生成候选配置列表"""
+    candidates = []
+
+    if 'sherpa' in engines:
+        model_dir = Path(sherpa_model_dir)
+        precisions = []
+        if (model_dir / "encoder.int8.onnx").exists():
+            precisions.append(True)
+        if (model_dir / "encoder.onnx").exists():
+            precisions.append(False)
+        thread_options = sorted({t for t in (1, 2, 4, cpu_count) if 1 <= t <= cpu_count})
+        for use_int8 in precisions:
+            for threads in thread_options:
+                candidates.append({
+                    'engine': 'sherpa',
+                    'params': {'num_threads': threads, 'use_int8': use_int8}
+                })
+
+    if 'whisper' in engines:
+        for size in WHISPER_MODEL_SIZES:
+            for beam in (1, 3, 5):
+                candidates.append({
+                    'engine': 'whisper',
+                    'params': {'model_size': size, 'beam_size': beam, 'compute_type': 'int8'}
+                })
+
+    return candidates
+
+
+def _peak_rss_mb() -> float:
+    """进程峰值常驻内存（MB）"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except Exception:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except Exception:
+        return 0.0
+
+
+def _benchmark_worker(candidate: Dict, clip_path: str, sherpa_model_dir: str, result_queue):
+    """子进程中标定单个候选配置（独立进程保证内存测量互不干扰）"""
+    try:
+        audio = load_clip(clip_path)
+        audio_duration = len(audio) / 16000
+        baseline_rss = _peak_rss_mb()
+        params = candidate['params']
+
+        start = time.time()
+        if candidate['engine'] == 'sherpa':
+            from src.asr_sherpa import SherpaASREngine
+            engine = SherpaASREngine(
+                model_dir=sherpa_model_dir,
+                use_int8=params['use_int8'],
+                num_threads=params['num_threads']
+            )
+            transcribe = lambda a: engine.transcribe(a)['text']
+        else:
+            from faster_whisper import WhisperModel
+            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            local_models_dir = os.path.join(project_root, "models")
+            model = WhisperModel(
+                params['model_size'],
+                device="cpu",
+                compute_type=params['compute_type'],
+                download_root=local_models_dir if os.path.exists(local_models_dir) else None
+            )
+
+            def transcribe(a):
+                segments, _ = model.transcribe(a, language="zh", beam_size=params['beam_size'])
+                return "".join(seg.text for seg in segments)
+        load_time = time.time() - start
+
+        # 预热 1 秒，再计时完整音频
+        transcribe(audio[:16000])
+        start = time.time()
+        text = transcribe(audio)
+        transcribe_time = time.time() - start
+
+        peak_rss = _peak_rss_mb()
+        result_queue.put({
+            'engine': candidate['engine'],
+            'params': params,
+            'ok': True,
+            'load_time': round(load_time, 2),
+            'transcribe_time': round(transcribe_time, 3),
+            'rtf': round(transcribe_time / max(audio_duration, 0.001), 3),
+            'peak_rss_mb': round(peak_rss, 1),
+            'model_rss_mb': round(max(0.0, peak_rss - baseline_rss), 1),
+            'text': text,
+        })
+    except Exception as e:
+        result_queue.put({
+            'engine': candidate['engine'],
+            'params': candidate['params'],
+            'ok': False,
+            'error': str(e),
+        })
+
+
+def benchmark_candidate(candidate: Dict, clip_path, sherpa_model_dir: str,
+                        timeout: float = CANDIDATE_TIMEOUT) -> Dict:
+    """在独立子进程中标定候选配置"""
+    ctx = multiprocessing.get_context('spawn')
+    result_queue = ctx.Queue()
+    process = ctx.Process(
+        target=_benchmark_worker,
+        args=(candidate, str(clip_path), sherpa_model_dir, result_queue),
+        daemon=True
+    )
+    process.start()
+    try:
+        result = result_queue.get(timeout=timeout)
+    except Exception:
+        result = {
+            'engine': candidate['engine'],
+            'params': candidate['params'],
+            'ok': False,
+            'error': f'超时（>{timeout}s）',
+        }
+    process.join(timeout=5)
+    if process.is_alive():
+        process.kill()
+    return result
+
+
+def select_profile(results: List[Dict], max_rtf: float = DEFAULT_MAX_RTF,
+                   mem_budget_mb: float = 0) -> Dict:
+    """
+    根据标定结果选择最优配置
+
+    - sherpa: RTF 达标时优先少线程（把 CPU 留给录音和纠错），否则取最快
+    - whisper: 取 RTF 达标的最大模型（标准版），其次 beam 最大；都不达标则取最快（轻量版）
+    - mem_budget_mb > 0 时剔除峰值内存超出预算的配置
+    """
+    valid = [r for r in results if r.get('ok')]
+    if mem_budget_mb > 0:
+        valid = [r for r in valid if r.get('peak_rss_mb', 0) <= mem_budget_mb]
+
+    selected = {}
+
+    sherpa = [r for r in valid if r['engine'] == 'sherpa']
+    if sherpa:
+        passing = [r for r in sherpa if r['rtf'] <= max_rtf]
+        if passing:
+            fastest = min(r['rtf'] for r in passing)
+            # 与最快配置相差 10% 以内时选线程更少、int8 优先
+            near = [r for r in passing if r['rtf'] <= fastest * 1.1]
+            best = min(near, key=lambda r: (r['params']['num_threads'], not r['params']['use_int8'], r['rtf']))
+        else:
+            best = min(sherpa, key=lambda r: r['rtf'])
+        selected['sherpa'] = dict(best['params'], rtf=best['rtf'])
+
+    whisper = [r for r in valid if r['engine'] == 'whisper']
+    if whisper:
+        passing = [r for r in whisper if r['rtf'] <= max_rtf]
+        if passing:
+            best = max(passing, key=lambda r: (WHISPER_MODEL_SIZES.index(r['params']['model_size']),
+                                               r['params']['beam_size'], -r['rtf']))
+        else:
+            best = min(whisper, key=lambda r: r['rtf'])
+        selected['whisper'] = dict(best['params'], rtf=best['rtf'])
+
+    # PRD: "轻量版"（优先速度）/"标准版"（平衡速度与精度）
+    tier = "轻量版"
+    whisper_sel = selected.get('whisper')
+    sherpa_sel = selected.get('sherpa')
+    if whisper_sel and whisper_sel['model_size'] == WHISPER_MODEL_SIZES[-1] and whisper_sel['rtf'] <= max_rtf:
+        tier = "标准版"
+    elif not whisper_sel and sherpa_sel and not sherpa_sel['use_int8'] and sherpa_sel['rtf'] <= max_rtf:
+        tier = "标准版"
+
+    return {'selected': selected, 'tier': tier}
+
+
+def calibrate(clip_path, engines: List[str], sherpa_model_dir: str,
+              max_rtf: float = DEFAULT_MAX_RTF, mem_budget_mb: float = 0) -> Dict:
+    """标定所有候选配置并返回完整的调优结果"""
+    cpu_count = os.cpu_count() or 1
+    candidates = build_candidates(engines, sherpa_model_dir, cpu_count)
+    clip_duration = len(load_clip(clip_path)) / 16000
+
+    print(f"[ASR调优] 板卡: {detect_board()}, CPU: {cpu_count} 核, 内存: {get_mem_total_mb():.0f}MB")
+    print(f"[ASR调优] 参考音频: {clip_path} ({clip_duration:.1f}s), 候选配置: {len(candidates)} 个")
+
+    results = []
+    for i, candidate in enumerate(candidates, 1):
+        print(f"[ASR调优] ({i}/{len(candidates)}) {candidate['engine']} {candidate['params']} ...", flush=True)
+        result = benchmark_candidate(candidate, clip_path, sherpa_model_dir)
+        if result['ok']:
+            print(f"[ASR调优]   RTF={result['rtf']:.3f}, 加载={result['load_time']:.1f}s, "
+                  f"峰值内存={result['peak_rss_mb']:.0f}MB")
+        else:
+            print(f"[ASR调优]   失败: {result['error']}")
+        results.append(result)
+
+    profile = select_profile(results, max_rtf=max_rtf, mem_budget_mb=mem_budget_mb)
+    profile.update({
+        'version': PROFILE_VERSION,
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'board': detect_board(),
+        'cpu_count': cpu_count,
+        'mem_total_mb': round(get_mem_total_mb()),
+        'clip': str(clip_path),
+        'clip_duration': round(clip_duration, 2),
+        'max_rtf': max_rtf,
+        'results': results,
+    })
+    return profile
+
+
+def save_profile(profile: Dict, path) -> str:
+    """写入调优配置文件"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(profile, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(tmp_path, path)
+    return str(path)
+
+
+def load_profile(path) -> Optional[Dict]:
+    """读取调优配置文件，不存在或版本不符时返回 None"""
+    try:
+        path = Path(path)
+        if not path.exists():
+            return None
+        profile = json.loads(path.read_text(encoding='utf-8'))
+        if profile.get('version') != PROFILE_VERSION:
+            print(f"[ASR调优] 配置文件版本 {profile.get('version')} 与当前版本 {PROFILE_VERSION} 不符，已忽略: {path}")
+            return None
+        return profile
+    except Exception as e:
+        print(f"[ASR调优] 配置文件读取失败: {e}")
+        return None
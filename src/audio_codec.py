@@ -0,0 +1,264 @@
+"""
+录音音频编解码
+录音先以 16bit PCM WAV 保存（约 115MB/小时），占满 SD 卡、同步（Resilio Sync）也慢。
+AUDIO_STORAGE_CODEC=flac 时，保存 WAV 后由后台线程无损压缩为 FLAC（语音约为 WAV 的 40%~60%），
+校验通过后替换 WAV；压缩期间和压缩失败时 WAV 照常可用。
+
+所有读取录音音频的地方（重新识别、声纹、波形峰值）都通过 read_audio() 解码，
+按文件头识别 WAV，其余格式（FLAC、存储维护压缩归档的 Opus/MP3）交给编解码后端：
+- soundfile（libsndfile，进程内编解码，librosa 的依赖，优先使用）
+- ffmpeg 命令行
+都没有时不压缩，始终保存 WAV。
+"""
+
+import os
+import sys
+import time
+import wave
+import queue
+import shutil
+import threading
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import soundfile
+    SOUNDFILE_AVAILABLE = True
+except Exception:   # 未安装，或缺少 libsndfile 时抛出 OSError
+    soundfile = None
+    SOUNDFILE_AVAILABLE = False
+
+FLAC_SUFFIX = ".flac"
+
+
+def codec_backend() -> Optional[str]:
+    """可用的编解码后端："soundfile" / "ffmpeg" / None"""
+    if SOUNDFILE_AVAILABLE:
+        return 'soundfile'
+    if shutil.which('ffmpeg'):
+        return 'ffmpeg'
+    return None
+
+
+def _is_wav(path) -> bool:
+    with open(path, 'rb') as f:
+        header = f.read(12)
+    return header[:4] == b'RIFF' and header[8:12] == b'WAVE'
+
+
+def read_audio(path) -> Tuple[np.ndarray, int]:
+    """
+    解码录音音频为 int16 单声道采样
+
+    Returns:
+        (采样, 采样率)
+    """
+    path = str(path)
+    if _is_wav(path):
+        with wave.open(path, 'rb') as wf:
+            channels, sample_rate = wf.getnchannels(), wf.getframerate()
+            audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype='<i2')
+    elif SOUNDFILE_AVAILABLE and not path.endswith(('.opus', '.mp3')):
+        audio, sample_rate = soundfile.read(path, dtype='int16', always_2d=True)
+        channels = audio.shape[1]
+        audio = audio.ravel()
+    elif shutil.which('ffmpeg'):
+        return _ffmpeg_decode(path)
+    else:
+        raise RuntimeError(f"无法解码 {Path(path).suffix} 音频（需要安装 soundfile 或 ffmpeg）")
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio.astype(np.int16, copy=False), sample_rate
+
+
+def _ffmpeg_decode(path: str, sample_rate: int = 16000) -> Tuple[np.ndarray, int]:
+    result = subprocess.run(
+        ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-i', path,
+         '-ac', '1', '-ar', str(sample_rate), '-f', 's16le', 'pipe:1'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=600
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip()[-200:] or "ffmpeg 解码失败")
+    return np.frombuffer(result.stdout, dtype='<i2').copy(), sample_rate
+
+
+def encode_flac(wav_path, flac_path, compression_level: int = 5, backend: Optional[str] = None):
+    """WAV 无损压缩为 FLAC"""
+    backend = backend or codec_backend()
+    if backend == 'soundfile':
+        with soundfile.SoundFile(str(wav_path)) as source, \
+                soundfile.SoundFile(str(flac_path), 'w', samplerate=source.samplerate, channels=source.channels,
+                                    subtype='PCM_16', format='FLAC',
+                                    compression_level=compression_level / 8) as target:
+            # 分块读写，内存占用与录音长度无关
+            for block in source.blocks(blocksize=1 << 18, dtype='int16'):
+                target.write(block)
+    elif backend == 'ffmpeg':
+        result = subprocess.run(
+            ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-y', '-i', str(wav_path),
+             '-c:a', 'flac', '-compression_level', str(compression_level), '-f', 'flac', str(flac_path)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=600
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.decode('utf-8', 'replace').strip()[-200:] or "ffmpeg 编码失败")
+    else:
+        raise RuntimeError("没有可用的 FLAC 编码后端（需要安装 soundfile 或 ffmpeg）")
+
+
+class AudioCompressor:
+    """后台 FLAC 压缩（单线程队列，校验通过后替换 WAV）"""
+
+    def __init__(self, compression_level: int = 5, backend: Optional[str] = None, nice: int = 10):
+        """
+        Args:
+            compression_level: FLAC 压缩级别（0~8，越高越小越慢，解码速度基本不变）
+            backend: 编码后端（默认自动选择）
+            nice: 后台线程调度优先级增量（Linux 下线程单独生效）
+        """
+        self.compression_level = compression_level
+        self.backend = backend or codec_backend()
+        self.nice = nice
+
+        self._queue: queue.Queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            'compressed': 0,
+            'failed': 0,
+            'input_bytes': 0,
+            'output_bytes': 0,
+            'audio_seconds': 0.0,
+            'encode_seconds': 0.0,
+            'last_error': None,
+        }
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    def request(self, wav_path, on_done: Optional[Callable[[Path], None]] = None) -> bool:
+        """加入后台压缩队列，完成后以 FLAC 路径调用 on_done（已在队列中或不可用时返回 False）"""
+        if not self.available:
+            return False
+        wav_path = str(wav_path)
+        with self._lock:
+            if wav_path in self._pending:
+                return False
+            self._pending.add(wav_path)
+            self._queue.put((wav_path, on_done))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, daemon=True, name="AudioCompressor")
+                self._thread.start()
+        return True
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待队列中的压缩全部完成（测试和命令行工具使用）"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return True
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.05)
+
+    def _worker(self):
+        if self.nice and sys.platform.startswith('linux'):
+            try:
+                os.nice(self.nice)   # Linux 下 nice 只作用于当前线程
+            except Exception:
+                pass
+        while True:
+            try:
+                wav_path, on_done = self._queue.get(timeout=30)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+            try:
+                flac_path = self.compress(wav_path)
+                if flac_path is not None and on_done is not None:
+                    on_done(flac_path)
+            except Exception as e:
+                print(f"[音频压缩] 回调失败: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(wav_path)
+
+    def _encode(self, wav_path: Path, flac_path: Path):
+        encode_flac(wav_path, flac_path, self.compression_level, backend=self.backend)
+
+    def compress(self, wav_path) -> Optional[Path]:
+        """
+        同步压缩：写临时文件 → 解码校验采样数 → 替换为 15-30.flac 并删除 WAV
+
+        Returns:
+            FLAC 路径，失败时返回 None（保留 WAV）
+        """
+        wav_path = Path(wav_path)
+        flac_path = wav_path.with_suffix(FLAC_SUFFIX)
+        tmp_path = flac_path.with_name(flac_path.name + '.tmp')
+        start_time = time.time()
+        try:
+            with wave.open(str(wav_path), 'rb') as wf:
+                frames, sample_rate = wf.getnframes(), wf.getframerate()
+            self._encode(wav_path, tmp_path)
+            decoded, _ = read_audio(tmp_path)
+            if len(decoded) != frames:
+                raise RuntimeError(f"校验失败: 解码 {len(decoded)} 个采样，原始 {frames} 个")
+            input_bytes = wav_path.stat().st_size
+            os.replace(tmp_path, flac_path)
+            wav_path.unlink()
+        except Exception as e:
+            Path(tmp_path).unlink(missing_ok=True)
+            self.stats['failed'] += 1
+            self.stats['last_error'] = str(e)
+            print(f"[音频压缩] 压缩失败，保留 WAV: {wav_path}, 错误: {e}")
+            return None
+
+        elapsed = time.time() - start_time
+        output_bytes = flac_path.stat().st_size
+        self.stats['compressed'] += 1
+        self.stats['input_bytes'] += input_bytes
+        self.stats['output_bytes'] += output_bytes
+        self.stats['audio_seconds'] += frames / sample_rate if sample_rate else 0.0
+        self.stats['encode_seconds'] += elapsed
+        print(f"[音频压缩] 已压缩 {flac_path.name}: {input_bytes / 1024 / 1024:.1f}MB → "
+              f"{output_bytes / 1024 / 1024:.1f}MB ({elapsed:.1f}s)")
+        return flac_path
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats['backend'] = self.backend
+        stats['compression_level'] = self.compression_level
+        stats['pending'] = len(self._pending)
+        if stats['output_bytes']:
+            stats['compression_ratio'] = round(stats['output_bytes'] / stats['input_bytes'], 3)
+        if stats['encode_seconds']:
+            stats['realtime_factor'] = round(stats['audio_seconds'] / stats['encode_seconds'], 1)
+        return stats
+
+
+# 全局单例
+_compressor_instance: Optional[AudioCompressor] = None
+_compressor_lock = threading.Lock()
+
+
+def get_audio_compressor() -> Optional[AudioCompressor]:
+    """获取 FLAC 压缩器单例（AUDIO_STORAGE_CODEC 不是 flac 或没有编码后端时返回 None）"""
+    global _compressor_instance
+    from src.config import AUDIO_STORAGE_CODEC, AUDIO_FLAC_COMPRESSION_LEVEL
+    if AUDIO_STORAGE_CODEC != 'flac':
+        return None
+    with _compressor_lock:
+        if _compressor_instance is None:
+            _compressor_instance = AudioCompressor(AUDIO_FLAC_COMPRESSION_LEVEL)
+            if not _compressor_instance.available:
+                print("[音频压缩] 未安装 soundfile 或 ffmpeg，录音保存为 WAV")
+        return _compressor_instance if _compressor_instance.available else None
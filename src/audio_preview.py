@@ -0,0 +1,213 @@
+"""
+录音试听版本（压缩音频缓存）
+原始录音是 16kHz 16bit 单声道 WAV（约 115MB/小时），通过 Wi-Fi 从树莓派传给浏览器较慢。
+这里按需用 ffmpeg 在后台把 WAV 转为低码率 Opus（默认 24kbps，约 11MB/小时）或 MP3，
+与 WAV 同目录缓存为 15-30.preview.opus：
+- 第一次请求时加入后台编码队列，本次仍返回 WAV（支持 Range，浏览器可边下边播、拖动定位）
+- 编码完成后的请求直接返回试听文件
+- WAV 比试听文件新（重新保存过）时视为过期，重新编码
+- 单个后台线程依次编码，ffmpeg 以低调度优先级运行，不影响录音和识别
+
+未安装 ffmpeg 时始终返回 WAV。
+"""
+
+import os
+import sys
+import time
+import queue
+import shutil
+import threading
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 格式 → (文件扩展名, ffmpeg 封装格式, 编码器, MIME 类型)
+PREVIEW_FORMATS = {
+    'opus': ('.preview.opus', 'ogg', 'libopus', 'audio/ogg'),
+    'mp3': ('.preview.mp3', 'mp3', 'libmp3lame', 'audio/mpeg'),
+}
+
+
+def preview_path(wav_path, fmt: str = 'opus') -> Path:
+    """WAV 对应的试听文件路径（15-30.wav → 15-30.preview.opus）"""
+    wav_path = Path(wav_path)
+    return wav_path.with_name(wav_path.stem + PREVIEW_FORMATS[fmt][0])
+
+
+def is_fresh(wav_path, path) -> bool:
+    """试听文件存在、非空且不比 WAV 旧"""
+    try:
+        stat = Path(path).stat()
+        return stat.st_size > 0 and stat.st_mtime >= Path(wav_path).stat().st_mtime
+    except OSError:
+        return False
+
+
+class AudioPreviewEncoder:
+    """后台试听音频编码器（单线程队列，同一文件不重复排队）"""
+
+    def __init__(self, fmt: str = 'opus', bitrate: str = '24k', timeout: float = 600.0, nice: int = 10):
+        """
+        Args:
+            fmt: 试听格式（"opus" 或 "mp3"）
+            bitrate: 码率（ffmpeg -b:a 参数）
+            timeout: 单个文件编码超时（秒）
+            nice: ffmpeg 调度优先级增量
+        """
+        if fmt not in PREVIEW_FORMATS:
+            raise ValueError(f"不支持的试听格式: {fmt}（可选: {', '.join(PREVIEW_FORMATS)}）")
+        self.fmt = fmt
+        self.bitrate = bitrate
+        self.timeout = timeout
+        self.nice = nice
+        self.mimetype = PREVIEW_FORMATS[fmt][3]
+
+        self._queue: queue.Queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._available: Optional[bool] = None
+        self.stats = {
+            'encoded': 0,
+            'failed': 0,
+            'total_encode_time': 0.0,
+            'input_bytes': 0,
+            'output_bytes': 0,
+            'last_error': None,
+        }
+
+    @property
+    def available(self) -> bool:
+        """编码程序是否已安装（首次检查后缓存）"""
+        if self._available is None:
+            self._available = shutil.which(self._command('', '')[0]) is not None
+        return self._available
+
+    def get(self, wav_path) -> Optional[Path]:
+        """返回可用的试听文件；没有或已过期时加入后台编码队列并返回 None"""
+        path = preview_path(wav_path, self.fmt)
+        if is_fresh(wav_path, path):
+            return path
+        self.request(wav_path)
+        return None
+
+    def request(self, wav_path) -> bool:
+        """加入后台编码队列（已在队列中或编码器不可用时返回 False）"""
+        if not self.available:
+            return False
+        wav_path = str(wav_path)
+        with self._lock:
+            if wav_path in self._pending:
+                return False
+            self._pending.add(wav_path)
+            self._queue.put(wav_path)
+            # 工作线程空闲退出时在锁内置空 _thread，这里据此决定是否重新启动
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, daemon=True, name="AudioPreviewEncoder")
+                self._thread.start()
+        return True
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待队列中的编码全部完成（测试和命令行工具使用）"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return True
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.05)
+
+    def _worker(self):
+        while True:
+            try:
+                wav_path = self._queue.get(timeout=30)
+            except queue.Empty:
+                # 空闲时退出线程，下次请求时重新启动
+                with self._lock:
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+            try:
+                path = preview_path(wav_path, self.fmt)
+                if not is_fresh(wav_path, path):
+                    self.encode(wav_path)
+            finally:
+                with self._lock:
+                    self._pending.discard(wav_path)
+
+    def _command(self, wav_path: str, output_path: str) -> List[str]:
+        _, container, codec, _ = PREVIEW_FORMATS[self.fmt]
+        return ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+                '-i', wav_path, '-ac', '1', '-c:a', codec, '-b:a', self.bitrate,
+                *(['-application', 'voip'] if codec == 'libopus' else []),
+                '-f', container, output_path]
+
+    def encode(self, wav_path) -> Optional[Path]:
+        """同步编码（先写临时文件再替换），返回试听文件路径，失败返回 None"""
+        wav_path = Path(wav_path)
+        path = preview_path(wav_path, self.fmt)
+        tmp_path = path.with_name(path.name + '.tmp')
+        start_time = time.time()
+
+        def lower_priority():
+            try:
+                os.nice(self.nice)
+            except Exception:
+                pass
+
+        try:
+            result = subprocess.run(
+                self._command(str(wav_path), str(tmp_path)),
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=self.timeout,
+                preexec_fn=lower_priority if self.nice and sys.platform != 'win32' else None
+            )
+            if result.returncode != 0 or not tmp_path.exists() or tmp_path.stat().st_size == 0:
+                raise RuntimeError((result.stderr or b'').decode('utf-8', 'replace').strip()[-200:]
+                                   or f"ffmpeg 退出码 {result.returncode}")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            self.stats['failed'] += 1
+            self.stats['last_error'] = str(e)
+            print(f"[试听音频] 编码失败: {wav_path}, 错误: {e}")
+            return None
+
+        elapsed = time.time() - start_time
+        input_bytes, output_bytes = wav_path.stat().st_size, path.stat().st_size
+        self.stats['encoded'] += 1
+        self.stats['total_encode_time'] += elapsed
+        self.stats['input_bytes'] += input_bytes
+        self.stats['output_bytes'] += output_bytes
+        print(f"[试听音频] 已生成 {path.name}: {input_bytes / 1024 / 1024:.1f}MB → "
+              f"{output_bytes / 1024 / 1024:.1f}MB ({elapsed:.1f}s)")
+        return path
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.stats)
+        stats['format'] = self.fmt
+        stats['bitrate'] = self.bitrate
+        stats['available'] = self.available
+        stats['pending'] = len(self._pending)
+        if stats['input_bytes']:
+            stats['compression_ratio'] = round(stats['input_bytes'] / max(stats['output_bytes'], 1), 1)
+        return stats
+
+
+# 全局单例
+_encoder_instance: Optional[AudioPreviewEncoder] = None
+_encoder_lock = threading.Lock()
+
+
+def get_preview_encoder() -> Optional[AudioPreviewEncoder]:
+    """获取试听编码器单例（AUDIO_PREVIEW_ENABLED 关闭时返回 None）"""
+    global _encoder_instance
+    from src.config import AUDIO_PREVIEW_ENABLED, AUDIO_PREVIEW_FORMAT, AUDIO_PREVIEW_BITRATE, AUDIO_PREVIEW_TIMEOUT
+    if not AUDIO_PREVIEW_ENABLED:
+        return None
+    with _encoder_lock:
+        if _encoder_instance is None:
+            _encoder_instance = AudioPreviewEncoder(AUDIO_PREVIEW_FORMAT, AUDIO_PREVIEW_BITRATE,
+                                                    timeout=AUDIO_PREVIEW_TIMEOUT)
+        return _encoder_instance
@@ -52,7 +52,7 @@ class AudioRecorder:
     """音频录制器（真实采集 + Silero VAD 实时分段）"""
     
     def __init__(self, sample_rate=16000, channels=1, 
-                 realtime_transcribe=False, segment_callback=None):
+                 realtime_transcribe=False, segment_callback=None, segmenter=None):
         """
         初始化录音器
         
@@ -61,6 +61,7 @@ class AudioRecorder:
             channels: 声道数
             realtime_transcribe: 是否启用实时转录分段
             segment_callback: 分段回调函数 callback(audio_segment, metadata)
+            segmenter: 自定义分段器（如 EndpointSegmenter），None 则使用 Silero VAD
         """
         global REAL_AUDIO
         self.sample_rate = sample_rate
@@ -77,12 +78,33 @@ class AudioRecorder:
         self.segment_count = 0
         
         # 初始化 VAD（如果启用实时转录）
-        if self.realtime_transcribe and HAS_SILERO_VAD:
+        self._init_segmenter(segmenter)
+        
+        if REAL_AUDIO:
+            try:
+                print(f"[音频录制] 初始化真实音频录制器 ({sample_rate}Hz, {channels}声道)")
+                default_input = sd.query_devices(kind='input')
+                print(f"[音频录制] 默认输入设备: {default_input['name']}")
+            except Exception as e:
+                print(f"[音频录制] 错误: 无法初始化音频设备 ({e})")
+                print("[音频录制] 可能原因: 未插入麦克风或声卡驱动未加载")
+                REAL_AUDIO = False
+        else:
+            print("[音频录制] 初始化模拟音频录制器")
+        
+    def _init_segmenter(self, segmenter=None):
+        """初始化实时分段器（自定义分段器优先，否则使用 Silero VAD）"""
+        if self.realtime_transcribe and segmenter is not None:
+            # 单遍端点模式：由流式识别器分段，不加载 Silero VAD
+            segmenter.on_segment_callback = self._on_vad_segment
+            self.vad = segmenter
+            print(f"[音频录制] 使用自定义分段器: {type(segmenter).__name__}")
+        elif self.realtime_transcribe and HAS_SILERO_VAD:
             try:
                 from src.config import (REALTIME_MIN_SPEECH_DURATION, REALTIME_VAD_THRESHOLD, 
                                        REALTIME_MAX_SPEECH_DURATION, REALTIME_SPEECH_PAD_MS)
                 self.vad = SileroVAD(
-                    sample_rate=sample_rate,
+                    sample_rate=self.sample_rate,
                     min_silence_duration=REALTIME_MIN_SILENCE_DURATION,
                     min_speech_duration=REALTIME_MIN_SPEECH_DURATION,
                     threshold=REALTIME_VAD_THRESHOLD,
@@ -99,19 +121,25 @@ class AudioRecorder:
         elif self.realtime_transcribe and not HAS_SILERO_VAD:
             print(f"[音频录制] 警告: Silero VAD 不可用，实时转录已禁用")
             self.realtime_transcribe = False
+    
+    def set_segmenter(self, segmenter=None):
+        """
+        替换实时分段器（ASR 引擎热切换后调用，仅在空闲时调用）
         
-        if REAL_AUDIO:
-            try:
-                print(f"[音频录制] 初始化真实音频录制器 ({sample_rate}Hz, {channels}声道)")
-                default_input = sd.query_devices(kind='input')
-                print(f"[音频录制] 默认输入设备: {default_input['name']}")
-            except Exception as e:
-                print(f"[音频录制] 错误: 无法初始化音频设备 ({e})")
-                print("[音频录制] 可能原因: 未插入麦克风或声卡驱动未加载")
-                REAL_AUDIO = False
-        else:
-            print("[音频录制] 初始化模拟音频录制器")
-        
+        Args:
+            segmenter: 新的分段器，None 则恢复为 Silero VAD
+        """
+        if self.is_recording:
+            raise RuntimeError("录音中不能替换分段器")
+        old = self.vad
+        if segmenter is None and HAS_SILERO_VAD and isinstance(old, SileroVAD):
+            return  # 已是 Silero VAD，无需重建
+        if old is not None and old is not segmenter and hasattr(old, 'stop'):
+            old.stop()
+        self.vad = None
+        self.realtime_transcribe = True
+        self._init_segmenter(segmenter)
+    
     def _preprocess_audio(self, audio_samples: np.ndarray) -> np.ndarray:
         """音频预处理：仅保留归一化，暂时禁用高通滤波以确保稳定性"""
         if len(audio_samples) == 0:
@@ -175,8 +203,13 @@ class AudioRecorder:
             import traceback
             traceback.print_exc()
     
-    def start(self):
-        """开始录音"""
+    def start(self, preroll=None):
+        """
+        开始录音
+        
+        Args:
+            preroll: 触发前已采集的 int16 音频（免按键唤醒的预录缓冲），计入录音开头
+        """
         if self.is_recording:
             raise Exception("录音已在进行中")
             
@@ -189,6 +222,15 @@ class AudioRecorder:
         if self.vad:
             self.vad.reset()
         
+        # 预录音频：写入录音开头并送入分段器，唤醒词和第一句话不丢失
+        if preroll is not None and len(preroll) > 0:
+            preroll = np.asarray(preroll, dtype=np.int16).flatten()
+            self.audio_data.append(preroll)
+            self.start_time -= len(preroll) / self.sample_rate
+            if self.vad:
+                self.vad.process_chunk(preroll.astype(np.float32) / 32768.0)
+            print(f"[音频录制] 已加入预录音频 {len(preroll) / self.sample_rate:.1f}秒")
+        
         if REAL_AUDIO:
             print("[音频录制] 开始录音（真实采集 + Silero VAD）")
             self.recording_thread = threading.Thread(target=self._real_recording_loop, daemon=True)
@@ -52,6 +52,24 @@ else:
 
 WHISPER_DEVICE = "cpu"
 STORAGE_BASE_PATH = STORAGE_BASE
+# 录音元数据索引（SQLite）：列表/详情直接查索引，不再逐个解析文本文件
+RECORDING_INDEX_ENABLED = os.getenv('RECORDING_INDEX_ENABLED', 'true').lower() == 'true'
+# 索引文件位置：默认在录音目录旁（~/LifeCoach/recordings.index.db），不放进 Resilio Sync 同步的录音目录
+RECORDING_INDEX_PATH = os.getenv('RECORDING_INDEX_PATH', '')
+# 试听音频：后台用 ffmpeg 把 WAV 转为低码率压缩音频并缓存在 WAV 旁（未安装 ffmpeg 时直接返回 WAV）
+AUDIO_PREVIEW_ENABLED = os.getenv('AUDIO_PREVIEW_ENABLED', 'true').lower() == 'true'
+AUDIO_PREVIEW_FORMAT = os.getenv('AUDIO_PREVIEW_FORMAT', 'opus')  # opus / mp3（旧版 Safari 不支持 Ogg Opus 时用 mp3）
+AUDIO_PREVIEW_BITRATE = os.getenv('AUDIO_PREVIEW_BITRATE', '24k')
+AUDIO_PREVIEW_TIMEOUT = float(os.getenv('AUDIO_PREVIEW_TIMEOUT', '600'))  # 单个文件编码超时（秒）
+# 录音音频存储格式：wav（默认）/ flac（保存 WAV 后后台无损压缩并替换，需要 soundfile 或 ffmpeg）
+AUDIO_STORAGE_CODEC = os.getenv('AUDIO_STORAGE_CODEC', 'wav').lower()
+AUDIO_FLAC_COMPRESSION_LEVEL = int(os.getenv('AUDIO_FLAC_COMPRESSION_LEVEL', '5'))  # 0~8，越高越小越慢
+# 波形峰值：保存音频时预先计算多级 min/max 峰值（15-30.peaks），网页时间线按缩放级别读取
+WAVEFORM_PEAKS_ENABLED = os.getenv('WAVEFORM_PEAKS_ENABLED', 'true').lower() == 'true'
+# 每日统计（内存汇总 + 汇总文件）：剩余磁盘空间采样间隔（秒）
+STATS_FREE_SPACE_INTERVAL = float(os.getenv('STATS_FREE_SPACE_INTERVAL', '60'))
+# 汇总文件位置：默认在录音目录旁（~/LifeCoach/recordings.daily_stats.json），不放进同步的录音目录
+RECORDING_STATS_PATH = os.getenv('RECORDING_STATS_PATH', '')
 
 print(f"[配置] Platform: {'Raspberry Pi' if IS_RASPBERRY_PI else 'Windows/Mac'}, WEB_PORT={WEB_PORT}, MODEL={WHISPER_MODEL}")
 
@@ -60,11 +78,46 @@ print(f"[配置] Platform: {'Raspberry Pi' if IS_RASPBERRY_PI else 'Windows/Mac'
 # sherpa 使用 Paraformer 模型，在 ARM 设备上更快
 ASR_ENGINE = os.getenv('ASR_ENGINE', 'sherpa' if IS_RASPBERRY_PI else 'whisper').lower()
 
+# 运行时切换引擎后是否保留旧引擎作为热备（切回无需重新加载，但占用双份内存，树莓派默认关闭）
+ASR_WARM_STANDBY = os.getenv('ASR_WARM_STANDBY', 'false' if IS_RASPBERRY_PI else 'true').lower() == 'true'
+
 # Sherpa-ONNX 配置
 SHERPA_MODEL_DIR = os.getenv('SHERPA_MODEL_DIR', 'models/sherpa/paraformer')
 SHERPA_USE_INT8 = os.getenv('SHERPA_USE_INT8', 'true').lower() == 'true'
 SHERPA_NUM_THREADS = int(os.getenv('SHERPA_NUM_THREADS', '4'))
 
+# Sherpa 流式识别器端点检测规则（秒）
+SHERPA_RULE1_MIN_TRAILING_SILENCE = float(os.getenv('SHERPA_RULE1_MIN_TRAILING_SILENCE', '3.0'))  # 未识别出文字时的静音时长
+SHERPA_RULE2_MIN_TRAILING_SILENCE = float(os.getenv('SHERPA_RULE2_MIN_TRAILING_SILENCE', '2.0'))  # 识别出文字后的静音时长
+SHERPA_RULE3_MIN_UTTERANCE_LENGTH = float(os.getenv('SHERPA_RULE3_MIN_UTTERANCE_LENGTH', '30.0'))  # 单句最大时长
+
+# ==================== ASR 调优配置 ====================
+# 设备标定结果（由 deploy/calibrate_asr.py 在参考音频上实测生成）
+# 存在时覆盖上面的静态默认值；环境变量显式设置的参数优先
+ASR_PROFILE_PATH = os.getenv('ASR_PROFILE_PATH', os.path.join(os.path.dirname(STORAGE_BASE), "asr_profile.json"))
+ASR_PROFILE_TIER = None  # "轻量版" / "标准版"，未标定时为 None
+
+from src.asr_tuner import load_profile as _load_asr_profile
+
+_asr_profile = _load_asr_profile(ASR_PROFILE_PATH)
+if _asr_profile:
+    _sherpa_profile = _asr_profile.get('selected', {}).get('sherpa') or {}
+    _whisper_profile = _asr_profile.get('selected', {}).get('whisper') or {}
+    if 'num_threads' in _sherpa_profile and 'SHERPA_NUM_THREADS' not in os.environ:
+        SHERPA_NUM_THREADS = int(_sherpa_profile['num_threads'])
+    if 'use_int8' in _sherpa_profile and 'SHERPA_USE_INT8' not in os.environ:
+        SHERPA_USE_INT8 = bool(_sherpa_profile['use_int8'])
+    if 'model_size' in _whisper_profile and 'ASR_MODEL_SIZE' not in os.environ:
+        ASR_MODEL_SIZE = _whisper_profile['model_size']
+    if 'beam_size' in _whisper_profile and 'ASR_BEAM_SIZE' not in os.environ:
+        ASR_BEAM_SIZE = int(_whisper_profile['beam_size'])
+    if 'compute_type' in _whisper_profile:
+        ASR_COMPUTE_TYPE = _whisper_profile['compute_type']
+    ASR_PROFILE_TIER = _asr_profile.get('tier')
+    print(f"[配置] 已加载ASR调优配置 ({_asr_profile.get('board', '未知设备')}, {ASR_PROFILE_TIER}): "
+          f"sherpa threads={SHERPA_NUM_THREADS} int8={SHERPA_USE_INT8}, "
+          f"whisper model={ASR_MODEL_SIZE} beam={ASR_BEAM_SIZE}")
+
 # ==================== GPIO 引脚定义 ====================
 # 基于扩展板实际物理引脚映射
 GPIO_K1 = 4   # 录音按键（Pin 7）
@@ -152,6 +205,44 @@ TEXT_CORRECTION_TEMPERATURE = float(os.getenv('TEXT_CORRECTION_TEMPERATURE', '0.
 # 推理超时时间（秒）
 TEXT_CORRECTION_TIMEOUT = int(os.getenv('TEXT_CORRECTION_TIMEOUT', '15'))
 
+# ONNX 纠错引擎（TEXT_CORRECTOR_ENGINE=onnx）：deploy/export_onnx_corrector.py 导出的模型目录
+ONNX_CORRECTOR_MODEL_DIR = os.getenv('ONNX_CORRECTOR_MODEL_DIR', os.path.join(MODEL_CACHE, "onnx_corrector"))
+ONNX_CORRECTOR_NUM_THREADS = int(os.getenv('ONNX_CORRECTOR_NUM_THREADS', '2'))
+
+# 长文本分块纠错：超过模型 max_len 的文本按标点/停顿分块，每块带上文重叠（字数）
+TEXT_CORRECTION_CHUNK_OVERLAP = int(os.getenv('TEXT_CORRECTION_CHUNK_OVERLAP', '16'))
+
+# 混淆词典快速纠错：模型前用词典替换已知的同音/近音错误，并从用户保存的纠正文本中学习
+CONFUSION_DICT_ENABLED = os.getenv('CONFUSION_DICT_ENABLED', 'true').lower() == 'true'
+CONFUSION_DICT_SEED_PATH = os.getenv('CONFUSION_DICT_SEED_PATH', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "confusions.txt"))
+CONFUSION_DICT_LEARNED_PATH = os.getenv('CONFUSION_DICT_LEARNED_PATH', os.path.join(os.path.dirname(STORAGE_BASE), "learned_confusions.json"))
+CONFUSION_DICT_MIN_COUNT = int(os.getenv('CONFUSION_DICT_MIN_COUNT', '2'))  # 学习到的词对出现几次后启用
+CONFUSION_DICT_SKIP_CONFIDENCE = float(os.getenv('CONFUSION_DICT_SKIP_CONFIDENCE', '0.9'))  # 词典完全确定时跳过模型
+
+# 独立纠错进程：引擎在子进程中推理，超时强制结束并重启，调用方使用原文
+CORRECTOR_WORKER_ENABLED = os.getenv('CORRECTOR_WORKER_ENABLED', 'true').lower() == 'true'
+CORRECTOR_WORKER_TIMEOUT = float(os.getenv('CORRECTOR_WORKER_TIMEOUT', '15'))  # 单次推理超时（秒）
+CORRECTOR_WORKER_LOAD_TIMEOUT = float(os.getenv('CORRECTOR_WORKER_LOAD_TIMEOUT', '180'))  # 子进程加载模型超时（秒）
+CORRECTOR_WORKER_NICE = int(os.getenv('CORRECTOR_WORKER_NICE', '5'))  # 子进程调度优先级（让出 CPU 给录音和 ASR）
+CORRECTOR_NUM_THREADS = int(os.getenv('CORRECTOR_NUM_THREADS', '2'))  # 纠错进程 torch/BLAS 线程数（0 表示不限制）
+
+# 置信度门控：ASR 识别置信度（0~1）不低于门限的分段只补标点，不送错别字模型
+ASR_CONFIDENCE_GATE_ENABLED = os.getenv('ASR_CONFIDENCE_GATE_ENABLED', 'true').lower() == 'true'
+ASR_CONFIDENCE_THRESHOLD = float(os.getenv('ASR_CONFIDENCE_THRESHOLD', '0.85'))
+
+# 微批处理：并发纠错请求在等待窗口内合并为一批推理（0 表示逐条推理）
+TEXT_CORRECTION_BATCH_WAIT_MS = float(os.getenv('TEXT_CORRECTION_BATCH_WAIT_MS', '20'))
+TEXT_CORRECTION_MAX_BATCH = int(os.getenv('TEXT_CORRECTION_MAX_BATCH', '16'))
+
+# 纠错结果持久化缓存（按句缓存，LRU 淘汰）
+CORRECTION_CACHE_ENABLED = os.getenv('CORRECTION_CACHE_ENABLED', 'true').lower() == 'true'
+CORRECTION_CACHE_PATH = os.getenv('CORRECTION_CACHE_PATH', os.path.join(os.path.dirname(STORAGE_BASE), "correction_cache.db"))
+CORRECTION_CACHE_MAX_ENTRIES = int(os.getenv('CORRECTION_CACHE_MAX_ENTRIES', '20000'))
+
+# 增量纠错：录音过程中逐段纠错实时转录文本，停止后只需纠错最后几段
+INCREMENTAL_CORRECTION_ENABLED = os.getenv('INCREMENTAL_CORRECTION_ENABLED', 'true').lower() == 'true'
+INCREMENTAL_CORRECTION_CONTEXT_CHARS = int(os.getenv('INCREMENTAL_CORRECTION_CONTEXT_CHARS', '20'))  # 上文窗口（字）
+
 # ==================== 实时转录配置 ====================
 # 是否启用实时转录功能（录音时实时显示识别文本）
 REALTIME_TRANSCRIBE_ENABLED = os.getenv('REALTIME_TRANSCRIBE_ENABLED', 'true').lower() == 'true'
@@ -173,12 +264,40 @@ REALTIME_VOICE_DETECTION_ENABLED = os.getenv('REALTIME_VOICE_DETECTION_ENABLED',
 REALTIME_VOICE_FREQ_MIN = int(os.getenv('REALTIME_VOICE_FREQ_MIN', '85'))  # 人声最低频率（Hz）
 REALTIME_VOICE_FREQ_MAX = int(os.getenv('REALTIME_VOICE_FREQ_MAX', '3400'))  # 人声最高频率（Hz）
 
+# 实时分段模式
+# "silero": Silero VAD 分段 + 逐段转录（默认）
+# "endpoint": 单遍模式，流式识别器端点检测直接分段并输出文本（仅 sherpa 引擎，省去 VAD 推理和填充重叠的重复解码）
+REALTIME_SEGMENTER = os.getenv('REALTIME_SEGMENTER', 'silero').lower()
+
 # 实时转录队列大小（避免内存溢出）
 REALTIME_QUEUE_MAX_SIZE = int(os.getenv('REALTIME_QUEUE_MAX_SIZE', '10'))
 
 # 实时转录性能优化
 REALTIME_BEAM_SIZE = int(os.getenv('REALTIME_BEAM_SIZE', '3'))  # 降低beam size加速转录（准确度略降）
 
+# ==================== 免按键唤醒配置 ====================
+# 空闲时低功耗监听麦克风，检测到唤醒词或持续说话时自动开始录音
+HANDSFREE_ENABLED = os.getenv('HANDSFREE_ENABLED', 'false').lower() == 'true'
+# 触发方式: "vad"（持续说话，仅 Silero VAD）或 "kws"（唤醒词，sherpa-onnx 关键词检测）
+HANDSFREE_MODE = os.getenv('HANDSFREE_MODE', 'vad').lower()
+HANDSFREE_KWS_MODEL_DIR = os.getenv('HANDSFREE_KWS_MODEL_DIR', 'models/sherpa/kws')
+HANDSFREE_KEYWORDS_FILE = os.getenv('HANDSFREE_KEYWORDS_FILE', '')  # 为空时使用模型目录下的 keywords.txt
+HANDSFREE_VAD_THRESHOLD = float(os.getenv('HANDSFREE_VAD_THRESHOLD', '0.6'))  # 比实时分段更严格，减少误触发
+HANDSFREE_MIN_SPEECH_DURATION = float(os.getenv('HANDSFREE_MIN_SPEECH_DURATION', '1.0'))  # 连续说话多久触发（秒）
+HANDSFREE_PREROLL_SECONDS = float(os.getenv('HANDSFREE_PREROLL_SECONDS', '2.0'))  # 触发前保留的音频（秒）
+HANDSFREE_SILENCE_TIMEOUT = float(os.getenv('HANDSFREE_SILENCE_TIMEOUT', '15'))  # 唤醒录音无语音多久后自动停止（秒），0 表示不自动停止
+
+# ==================== 局域网算力卸载配置 ====================
+# 工作节点地址，逗号分隔（如 http://192.168.1.10:8765），为空则全部在本机执行
+# 工作节点启动: python deploy/offload_worker.py --host 0.0.0.0 --token <令牌>
+OFFLOAD_WORKERS = [u.strip() for u in os.getenv('OFFLOAD_WORKERS', '').split(',') if u.strip()]
+OFFLOAD_ASR = os.getenv('OFFLOAD_ASR', 'true').lower() == 'true'  # 是否卸载 ASR 转录
+OFFLOAD_CORRECT = os.getenv('OFFLOAD_CORRECT', 'true').lower() == 'true'  # 是否卸载文本纠错
+OFFLOAD_TIMEOUT = float(os.getenv('OFFLOAD_TIMEOUT', '5.0'))  # 基础超时（秒），超时回退本地
+OFFLOAD_TIMEOUT_PER_SECOND = float(os.getenv('OFFLOAD_TIMEOUT_PER_SECOND', '0.5'))  # 转录每秒音频追加的超时（秒）
+OFFLOAD_HEALTH_INTERVAL = float(os.getenv('OFFLOAD_HEALTH_INTERVAL', '30'))  # 节点健康检查间隔（秒）
+OFFLOAD_TOKEN = os.getenv('OFFLOAD_TOKEN', '')  # 工作节点共享令牌（与 offload_worker.py --token 一致）
+
 # ==================== 音频预处理配置 ====================
 # 音频归一化
 AUDIO_NORMALIZE_ENABLED = os.getenv('AUDIO_NORMALIZE_ENABLED', 'true').lower() == 'true'  # 是否启用音量归一化
@@ -212,10 +331,34 @@ BUTTON_DEBOUNCE_TIME = 0.05  # 50ms
 BUTTON_LONG_PRESS_TIME = 3.0  # 长按3秒触发退出
 
 # 存储空间告警阈值（GB）
-STORAGE_WARNING_THRESHOLD = 1.0  # 剩余<1GB时警告
+STORAGE_WARNING_THRESHOLD = float(os.getenv('STORAGE_WARNING_THRESHOLD', '1.0'))  # 剩余<1GB时警告
+
+# 存储维护（后台线程，录音/转写期间暂停）：转写文本永久保留，只压缩/删除音频
+STORAGE_MAINTENANCE_ENABLED = os.getenv('STORAGE_MAINTENANCE_ENABLED', 'true').lower() == 'true'
+STORAGE_MAINTENANCE_INTERVAL = float(os.getenv('STORAGE_MAINTENANCE_INTERVAL', '3600'))  # 维护间隔（秒）
+AUDIO_COMPRESS_AFTER_DAYS = int(os.getenv('AUDIO_COMPRESS_AFTER_DAYS', '0'))  # 超过N天的WAV压缩归档（0=不压缩，需要ffmpeg）
+AUDIO_QUOTA_GB = float(os.getenv('AUDIO_QUOTA_GB', '0'))  # 音频总量配额，超过时从最早的录音删除音频（0=不限制）
+# 剩余空间低于 STORAGE_WARNING_THRESHOLD（后台）或不够本次录音时，从最早的录音删除音频（默认关闭，只告警）
+STORAGE_FREE_SPACE_CLEANUP = os.getenv('STORAGE_FREE_SPACE_CLEANUP', 'false').lower() == 'true'
+STORAGE_ORPHAN_GRACE_SECONDS = float(os.getenv('STORAGE_ORPHAN_GRACE_SECONDS', '3600'))  # 孤立的派生/临时文件多久未变动（mtime/ctime）才清理
+STORAGE_MAINTENANCE_IO_PAUSE = float(os.getenv('STORAGE_MAINTENANCE_IO_PAUSE', '0.05'))  # 每处理一个文件后暂停（秒）
+STORAGE_RECORDING_RESERVE_MB = float(os.getenv('STORAGE_RECORDING_RESERVE_MB', '200'))  # 开始录音前预留空间（约1.7小时WAV）
+
+# 录音目录监听（Resilio Sync 等在程序之外改动的文件增量同步到索引和统计，需要 watchdog，未安装时定期检查）
+STORAGE_WATCHER_ENABLED = os.getenv('STORAGE_WATCHER_ENABLED', 'true').lower() == 'true'
+STORAGE_WATCHER_DEBOUNCE = float(os.getenv('STORAGE_WATCHER_DEBOUNCE', '2.0'))  # 一条录音最后一个事件后多久同步（秒）
+STORAGE_WATCHER_CHECK_INTERVAL = float(os.getenv('STORAGE_WATCHER_CHECK_INTERVAL', '900'))  # 一致性检查间隔（秒）
+STORAGE_WATCHER_POLL_INTERVAL = float(os.getenv('STORAGE_WATCHER_POLL_INTERVAL', '60'))  # 无法监听事件时的检查间隔（秒）
 
 # 内存占用告警阈值（百分比）
-MEMORY_WARNING_THRESHOLD = 0.8  # 超过80%时警告
+MEMORY_WARNING_THRESHOLD = float(os.getenv('MEMORY_WARNING_THRESHOLD', '0.8'))  # 超过80%时卸载低优先级模型
+MEMORY_LOW_THRESHOLD = float(os.getenv('MEMORY_LOW_THRESHOLD', '0.7'))  # 卸载到低于70%为止（两者之间不动作）
+
+# 模型内存管理：内存紧张时卸载空闲的纠错/声纹模型，使用时按需重新加载
+MODEL_MANAGER_ENABLED = os.getenv('MODEL_MANAGER_ENABLED', 'true').lower() == 'true'
+MODEL_IDLE_UNLOAD_SECONDS = float(os.getenv('MODEL_IDLE_UNLOAD_SECONDS', '0'))  # 空闲多久后卸载（0=仅内存紧张时）
+MODEL_CHECK_INTERVAL = float(os.getenv('MODEL_CHECK_INTERVAL', '5'))  # 后台检查间隔（秒）
+MODEL_MIN_RESIDENT_SECONDS = float(os.getenv('MODEL_MIN_RESIDENT_SECONDS', '120'))  # 加载/使用后至少保留多久（秒）
 
 # 日志配置
 LOG_LEVEL = "INFO"       # DEBUG/INFO/WARNING/ERROR
@@ -0,0 +1,263 @@
+"""
+混淆词典快速纠错
+语音识别的错误大多是反复出现的同音/近音词（如 "天汽" → "天气"）。
+这里用 Aho-Corasick 自动机一次扫描完成所有已知错误的替换（微秒级），在神经网络模型之前运行：
+- 种子词典来自 data/confusions.txt（每行 "错误<TAB>正确"）
+- 用户在网页上保存纠正文本时，对比原始识别文本学习新的混淆对，出现足够次数后启用
+- 所有替换都是等长的，纠错位置与原文一一对应
+"""
+
+import json
+import time
+import hashlib
+import difflib
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# 句末标点（文本已有标点时，模型只剩错别字工作，可由词典独立完成）
+_SENTENCE_END = "。！？!?"
+
+
+def _is_chinese(text: str) -> bool:
+    return bool(text) and all('一' <= ch <= '鿿' for ch in text)
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配自动机"""
+
+    def __init__(self, patterns):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[str]] = [None]  # 以该状态结尾的最长模式
+        self._suffix_out: List[int] = [0]            # 失败链上最近的有输出状态
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(None)
+                self._suffix_out.append(0)
+            state = nxt
+        self._output[state] = pattern
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0) if self._goto[fail].get(ch, 0) != nxt else 0
+                target = self._fail[nxt]
+                self._suffix_out[nxt] = target if self._output[target] else self._suffix_out[target]
+
+    def search(self, text: str) -> List[Tuple[int, str]]:
+        """返回所有匹配 [(起始位置, 模式), ...]"""
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            out = state if self._output[state] else self._suffix_out[state]
+            while out:
+                pattern = self._output[out]
+                matches.append((i - len(pattern) + 1, pattern))
+                out = self._suffix_out[out]
+        return matches
+
+
+class ConfusionDict:
+    """
+    混淆词典
+
+    apply(text) → (corrected, changes, confident)
+    confident: 有替换、所有替换都是高置信词条，且文本已有句末标点（模型无需再补标点）
+    """
+
+    def __init__(self, seed_path=None, learned_path=None, min_count: int = 2,
+                 skip_confidence: float = 0.9):
+        """
+        Args:
+            seed_path: 种子词典文件（每行 "错误<TAB>正确"，# 开头为注释）
+            learned_path: 学习到的混淆对保存位置（JSON）
+            min_count: 学习到的混淆对出现多少次后启用
+            skip_confidence: 跳过模型所需的最低词条置信度
+        """
+        self.seed_path = Path(seed_path) if seed_path else None
+        self.learned_path = Path(learned_path) if learned_path else None
+        self.min_count = min_count
+        self.skip_confidence = skip_confidence
+
+        self._lock = threading.Lock()
+        self._seed: Dict[str, str] = {}
+        self._learned: Dict[str, Dict] = {}
+        self._active: Dict[str, Tuple[str, float]] = {}
+        self._automaton = AhoCorasick([])
+        self.version = ""
+        self.stats = {
+            'texts': 0,
+            'hit_texts': 0,
+            'replacements': 0,
+            'learned_pairs': 0,
+            'time_us': 0,
+        }
+
+        if self.seed_path and self.seed_path.exists():
+            self._seed = self._load_seed(self.seed_path)
+        if self.learned_path and self.learned_path.exists():
+            try:
+                self._learned = json.loads(self.learned_path.read_text(encoding='utf-8'))
+            except Exception as e:
+                print(f"[混淆词典] 读取学习记录失败: {e}")
+        self._rebuild()
+        print(f"[混淆词典] 已加载 {len(self._seed)} 条种子词条, {len(self._learned)} 条学习记录, 启用 {len(self._active)} 条")
+
+    @staticmethod
+    def _load_seed(path: Path) -> Dict[str, str]:
+        pairs = {}
+        for line in path.read_text(encoding='utf-8').splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split('\t') if '\t' in line else line.split()
+            if len(parts) >= 2 and len(parts[0]) == len(parts[1]) and parts[0] != parts[1]:
+                pairs[parts[0]] = parts[1]
+        return pairs
+
+    def _rebuild(self):
+        """
+        重建自动机（种子词条置信度 1.0，学习词条随出现次数升高）
+
+        version 为启用词条的摘要（词条及是否达到跳过模型的置信度），词条变化会改变纠错结果，
+        纠错缓存以它区分命名空间；与重启无关，学习记录相同则版本相同
+        """
+        active = {wrong: (right, 1.0) for wrong, right in self._seed.items()}
+        for wrong, entry in self._learned.items():
+            count = entry['count']
+            if count >= self.min_count and wrong not in active:
+                active[wrong] = (entry['right'], round(count / (count + 1), 3))
+        self._active = active
+        self._automaton = AhoCorasick(active.keys())
+        digest = json.dumps(sorted((wrong, right, confidence >= self.skip_confidence)
+                                   for wrong, (right, confidence) in active.items()), ensure_ascii=False)
+        self.version = hashlib.sha1(digest.encode('utf-8')).hexdigest()[:12]
+
+    @property
+    def size(self) -> int:
+        return len(self._active)
+
+    def apply(self, text: str):
+        """
+        替换文本中的已知错误（重叠时取靠左、较长的匹配）
+
+        Returns:
+            (corrected, changes, confident)
+            changes 格式: [[old, new, position, confidence], ...]
+        """
+        start = time.perf_counter()
+        with self._lock:
+            automaton, active = self._automaton, self._active
+        matches = sorted(automaton.search(text), key=lambda m: (m[0], -len(m[1])))
+
+        chars = list(text)
+        changes = []
+        covered = 0
+        for position, wrong in matches:
+            if position < covered:
+                continue
+            right, confidence = active[wrong]
+            for offset, (old, new) in enumerate(zip(wrong, right)):
+                if old != new:
+                    chars[position + offset] = new
+                    changes.append([old, new, position + offset, confidence])
+            covered = position + len(wrong)
+
+        self.stats['texts'] += 1
+        if changes:
+            self.stats['hit_texts'] += 1
+            self.stats['replacements'] += len(changes)
+        self.stats['time_us'] += int((time.perf_counter() - start) * 1e6)
+
+        confident = (bool(changes)
+                     and all(change[3] >= self.skip_confidence for change in changes)
+                     and text.rstrip()[-1:] in _SENTENCE_END)
+        return "".join(chars), changes, confident
+
+    def learn(self, original: str, corrected: str) -> int:
+        """
+        对比原始识别文本和用户保存的纠正文本，记录等长的汉字替换
+
+        单字替换带上一个相邻字作为上下文（如 "汽→气" 记为 "天汽→天气"），避免误伤。
+
+        Returns:
+            本次记录的混淆对数量
+        """
+        if not original or not corrected:
+            return 0
+        pairs = []
+        matcher = difflib.SequenceMatcher(None, original, corrected, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag != 'replace' or i2 - i1 != j2 - j1 or i2 - i1 > 4:
+                continue
+            wrong, right = original[i1:i2], corrected[j1:j2]
+            if not _is_chinese(wrong) or not _is_chinese(right):
+                continue
+            if len(wrong) == 1:
+                if i1 > 0 and _is_chinese(original[i1 - 1]):
+                    wrong, right = original[i1 - 1] + wrong, original[i1 - 1] + right
+                elif i2 < len(original) and _is_chinese(original[i2]):
+                    wrong, right = wrong + original[i2], right + original[i2]
+                else:
+                    continue
+            pairs.append((wrong, right))
+
+        if not pairs:
+            return 0
+        with self._lock:
+            for wrong, right in pairs:
+                entry = self._learned.get(wrong)
+                if entry is None or entry['right'] != right:
+                    entry = {'right': right, 'count': 0}
+                    self._learned[wrong] = entry
+                entry['count'] += 1
+                entry['last_seen'] = time.strftime('%Y-%m-%d %H:%M:%S')
+            self.stats['learned_pairs'] += len(pairs)
+            self._rebuild()
+            self._save()
+        print(f"[混淆词典] 从用户纠正中学习 {len(pairs)} 个混淆对: {', '.join(f'{w}→{r}' for w, r in pairs[:5])}")
+        return len(pairs)
+
+    def _save(self):
+        if not self.learned_path:
+            return
+        try:
+            self.learned_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.learned_path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(self._learned, ensure_ascii=False, indent=1), encoding='utf-8')
+            tmp.replace(self.learned_path)
+        except Exception as e:
+            print(f"[混淆词典] 保存学习记录失败: {e}")
+
+    def get_stats(self) -> Dict:
+        texts = self.stats['texts']
+        return {
+            **self.stats,
+            'seed_entries': len(self._seed),
+            'learned_entries': len(self._learned),
+            'active_entries': len(self._active),
+            'version': self.version,
+            'hit_rate': round(self.stats['hit_texts'] / texts, 3) if texts else 0.0,
+        }
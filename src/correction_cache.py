@@ -0,0 +1,182 @@
+"""
+文本纠错持久化缓存
+按句缓存纠错结果（SQLite），键为 规范化句子 + 引擎及参数。
+- 重复纠错同一条录音、实时文本中重复出现的短句直接命中
+- 长文本按句缓存，局部修改后未改动的句子仍可命中
+- 条目数超过上限时按最近使用时间淘汰（LRU）
+- 命中只更新内存中的使用记录，攒够一批或间隔一段时间后与写入一起提交，
+  避免每次命中都写一次 SD 卡（异常退出时最多丢失最近的使用时间，不影响缓存内容）
+"""
+
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 缓存格式版本（纠错结果结构变化时递增，旧条目自动失效）
+CACHE_VERSION = 1
+
+# 句末标点（按句切分，标点保留在句子末尾）
+_SENTENCE_PATTERN = re.compile(r'[^。！？!?；;\n]*[。！？!?；;\n]+|[^。！？!?；;\n]+$')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def split_sentences(text: str) -> List[str]:
+    """按句末标点切分，各句拼接后与原文完全一致"""
+    sentences = _SENTENCE_PATTERN.findall(text)
+    if "".join(sentences) != text:
+        return [text]
+    return sentences
+
+
+def normalize_sentence(sentence: str) -> str:
+    """规范化句子：去掉首尾空白，合并连续空白"""
+    return _WHITESPACE.sub(' ', sentence.strip())
+
+
+class CorrectionCache:
+    """纠错结果缓存（线程安全）"""
+
+    def __init__(self, db_path, max_entries: int = 20000, touch_flush_batch: int = 256,
+                 touch_flush_interval: float = 60.0):
+        """
+        Args:
+            db_path: SQLite 文件路径（":memory:" 表示仅内存）
+            max_entries: 最大条目数，超出后淘汰最久未使用的 10%
+            touch_flush_batch: 累积多少条命中记录后写入数据库
+            touch_flush_interval: 命中记录最多在内存中保留多久（秒）
+        """
+        self.db_path = str(db_path)
+        self.max_entries = max_entries
+        self.touch_flush_batch = touch_flush_batch
+        self.touch_flush_interval = touch_flush_interval
+        self._lock = threading.Lock()
+        # 未写入的命中记录: key → [最近使用时间, 命中次数]
+        self._touched: Dict[str, List] = {}
+        self._last_flush = time.time()
+        self.hits = 0
+        self.misses = 0
+
+        if self.db_path != ':memory:':
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS correction_cache (
+                key TEXT PRIMARY KEY,
+                corrected TEXT NOT NULL,
+                changes TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON correction_cache(last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM correction_cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(sentence: str, namespace: str) -> str:
+        """缓存键：版本 + 引擎及参数 + 规范化句子"""
+        raw = f"{CACHE_VERSION}\x00{namespace}\x00{normalize_sentence(sentence)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, sentence: str, namespace: str) -> Optional[Dict]:
+        """查询缓存，命中返回 {"corrected": str, "changes": list}"""
+        key = self.make_key(sentence, namespace)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT corrected, changes FROM correction_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            now = time.time()
+            touched = self._touched.get(key)
+            if touched is None:
+                self._touched[key] = [now, 1]
+            else:
+                touched[0] = now
+                touched[1] += 1
+            if (len(self._touched) >= self.touch_flush_batch
+                    or now - self._last_flush >= self.touch_flush_interval):
+                self._flush_touched()
+                self._conn.commit()
+        return {'corrected': row[0], 'changes': json.loads(row[1])}
+
+    def put(self, sentence: str, namespace: str, corrected: str, changes: List[Dict]):
+        """写入缓存（纠错结果对应规范化后的句子）"""
+        key = self.make_key(sentence, namespace)
+        now = time.time()
+        changes_json = json.dumps(changes, ensure_ascii=False)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO correction_cache (key, corrected, changes, last_used) VALUES (?, ?, ?, ?)",
+                (key, corrected, changes_json, now)
+            )
+            if cursor.rowcount > 0:
+                self._count += 1
+            else:
+                self._conn.execute(
+                    "UPDATE correction_cache SET corrected = ?, changes = ?, last_used = ? WHERE key = ?",
+                    (corrected, changes_json, now, key)
+                )
+            # 命中记录随本次写入一起提交
+            self._flush_touched()
+            if self.max_entries > 0 and self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        """把内存中的命中记录写入数据库（调用方持有锁并负责提交）"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE correction_cache SET last_used = MAX(last_used, ?), hit_count = hit_count + ? WHERE key = ?",
+                [(last_used, hits, key) for key, (last_used, hits) in self._touched.items()]
+            )
+            self._touched.clear()
+        self._last_flush = time.time()
+
+    def _evict(self):
+        """淘汰最久未使用的条目，降到上限的 90%"""
+        target = int(self.max_entries * 0.9)
+        cursor = self._conn.execute("""
+            DELETE FROM correction_cache WHERE key IN (
+                SELECT key FROM correction_cache ORDER BY last_used ASC LIMIT ?
+            )
+        """, (self._count - target,))
+        self._count -= max(cursor.rowcount, 0)
+
+    def flush(self):
+        """立即写入内存中的命中记录"""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM correction_cache")
+            self._conn.commit()
+            self._count = 0
+
+    def get_stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'entries': self._count,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,388 @@
+"""
+独立纠错进程
+文本纠错在调用线程（Flask 请求线程、录音处理线程）中同步推理时，个别输入可能占满一个核几十秒且无法取消，
+torch 线程池也会和 ASR、录音抢 CPU。这里把纠错引擎放到子进程中运行：
+- 父进程通过 stdin/stdout 按行收发 JSON 请求/响应（子进程日志输出到 stderr）
+- 单次推理超过超时时间时强制结束子进程并在后台重启，调用方得到异常并回退原文
+- 子进程限制 torch/BLAS 线程数并降低调度优先级
+
+子进程入口: python -m src.corrector_worker（由 ProcessCorrectorEngine 启动，无需手动运行）
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import threading
+import subprocess
+from typing import Dict, List, Optional
+
+from src.text_corrector import BaseCorrectorEngine
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _json_default(obj):
+    """numpy 标量等转换为 Python 原生类型"""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def _encode_result(result):
+    if isinstance(result, tuple):
+        return list(result)
+    return result
+
+
+def _decode_result(result):
+    if isinstance(result, dict) and 'error' in result:
+        return RuntimeError(result['error'])
+    if isinstance(result, list) and len(result) == 2:
+        return tuple(result)
+    return result
+
+
+class ProcessCorrectorEngine(BaseCorrectorEngine):
+    """
+    子进程纠错引擎（对 TextCorrector 表现为普通引擎）
+
+    load() 启动子进程并等待模型加载完成，unload() 结束子进程（内存全部归还系统）
+    """
+
+    RETRY_INTERVAL = 60.0  # 启动失败后多久内不再尝试（秒），期间直接回退原文
+    # 批量请求的超时按文本长度追加：每多少字追加 1 秒（基础超时之外）
+    CHARS_PER_SECOND = 50
+
+    def __init__(self, engine_type: str, model_path: str = None, timeout: float = 15.0,
+                 load_timeout: Optional[float] = None, worker_threads: int = 0, nice: Optional[int] = None,
+                 **engine_kwargs):
+        """
+        Args:
+            engine_type: 子进程中使用的引擎类型
+            model_path: 模型路径
+            timeout: 单次推理的基础超时（秒），批量请求按总字数追加，超时强制结束子进程
+            load_timeout: 子进程启动并加载模型的超时（秒，默认读取配置）
+            worker_threads: 子进程 torch/BLAS 线程数（0 表示不限制）
+            nice: 子进程调度优先级增量（默认读取配置）
+            **engine_kwargs: 传给子进程引擎的参数
+        """
+        from src.config import CORRECTOR_WORKER_LOAD_TIMEOUT, CORRECTOR_WORKER_NICE
+        self.engine_type = engine_type
+        self.model_path = model_path
+        self.timeout = timeout
+        self.load_timeout = load_timeout if load_timeout is not None else CORRECTOR_WORKER_LOAD_TIMEOUT
+        self.worker_threads = worker_threads
+        self.nice = nice if nice is not None else CORRECTOR_WORKER_NICE
+        self.engine_kwargs = engine_kwargs
+
+        self._proc: Optional[subprocess.Popen] = None
+        self._responses: Optional[queue.Queue] = None
+        self._ready = False
+        self._restarting = False
+        self._failed_at = 0.0
+        self._request_id = 0
+        self._lock = threading.Lock()        # 同一时间只有一个请求在子进程中
+        self._start_lock = threading.Lock()
+        self._worker_stats: Dict = {}
+        self.stats = {
+            'requests': 0,
+            'timeouts': 0,
+            'crashes': 0,
+            'restarts': 0,
+            'last_error': None,
+        }
+
+    @property
+    def _is_loaded(self) -> bool:
+        return self._ready and self._proc is not None and self._proc.poll() is None
+
+    # ==================== 进程管理 ====================
+
+    def load(self):
+        """启动子进程并等待模型加载完成"""
+        with self._start_lock:
+            if self._is_loaded:
+                return
+            self._start()
+
+    def _start(self):
+        self._kill()
+        env = os.environ.copy()
+        env['PYTHONUNBUFFERED'] = '1'
+        if self.worker_threads > 0:
+            for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+                env[name] = str(self.worker_threads)
+
+        config = {
+            'engine_type': self.engine_type,
+            'model_path': self.model_path,
+            'engine_kwargs': self.engine_kwargs,
+            'num_threads': self.worker_threads,
+            'nice': self.nice,
+        }
+        print(f"[纠错进程] 启动子进程: engine={self.engine_type}, 线程数={self.worker_threads or '不限'}")
+        start_time = time.time()
+        proc = subprocess.Popen(
+            self._command(),
+            cwd=PROJECT_ROOT, env=env,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding='utf-8', bufsize=1
+        )
+        responses = queue.Queue()
+        threading.Thread(target=self._reader, args=(proc, responses), daemon=True,
+                         name="CorrectorWorkerReader").start()
+        self._proc, self._responses = proc, responses
+
+        try:
+            proc.stdin.write(json.dumps(config, ensure_ascii=False, default=_json_default) + "\n")
+            proc.stdin.flush()
+            message = responses.get(timeout=self.load_timeout)
+        except queue.Empty:
+            message = {'ready': False, 'error': f'加载超时（{self.load_timeout:.0f}s）'}
+        except Exception as e:
+            message = {'ready': False, 'error': str(e)}
+
+        if not message or not message.get('ready'):
+            error = (message or {}).get('error', '子进程退出')
+            print(f"[纠错进程] 启动失败: {error}")
+            self.stats['last_error'] = error
+            self._failed_at = time.time()
+            self._kill()
+            return
+        self._ready = True
+        self._failed_at = 0.0
+        print(f"[纠错进程] 子进程就绪 pid={proc.pid} ({time.time() - start_time:.1f}s)")
+
+    def _command(self) -> List[str]:
+        return [sys.executable, '-m', 'src.corrector_worker']
+
+    @staticmethod
+    def _reader(proc, responses: queue.Queue):
+        """读取子进程响应（进程退出时放入 None）"""
+        try:
+            for line in proc.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    responses.put(json.loads(line))
+                except ValueError:
+                    pass
+        except Exception:
+            pass
+        responses.put(None)
+
+    def _kill(self):
+        """强制结束子进程"""
+        proc, self._proc = self._proc, None
+        self._ready = False
+        if proc is None:
+            return
+        try:
+            proc.kill()
+            proc.wait(timeout=5)
+        except Exception:
+            pass
+
+    def _restart_in_background(self, reason: str):
+        """结束子进程并在后台重启（重启期间的请求直接回退原文，不排队等待）"""
+        self._kill()
+        self.stats['restarts'] += 1
+        self._restarting = True
+        print(f"[纠错进程] {reason}，已结束子进程，后台重启中")
+
+        def restart():
+            try:
+                self.load()
+            finally:
+                self._restarting = False
+
+        threading.Thread(target=restart, daemon=True, name="CorrectorWorkerRestart").start()
+
+    # ==================== 请求 ====================
+
+    def _timeout(self, texts: List[str]) -> float:
+        """一次请求的超时：基础超时 + 按总字数追加（整批共用一个期限，不能按单条的超时算）"""
+        return self.timeout + sum(len(text or '') for text in texts) / self.CHARS_PER_SECOND
+
+    def _request(self, op: str, texts: List[str]) -> List:
+        if not texts:
+            return []
+        if not self._is_loaded:
+            if self._restarting:
+                raise RuntimeError("纠错进程重启中")
+            if time.time() - self._failed_at < self.RETRY_INTERVAL:
+                raise RuntimeError(f"纠错进程不可用: {self.stats['last_error']}")
+            self.load()
+            if not self._is_loaded:
+                raise RuntimeError(f"纠错进程不可用: {self.stats['last_error']}")
+
+        with self._lock:
+            proc, responses = self._proc, self._responses
+            if proc is None or proc.poll() is not None:
+                raise RuntimeError("纠错进程已退出")
+            self._request_id += 1
+            request_id = self._request_id
+            self.stats['requests'] += 1
+
+            try:
+                proc.stdin.write(json.dumps({'id': request_id, 'op': op, 'texts': texts},
+                                            ensure_ascii=False) + "\n")
+                proc.stdin.flush()
+            except Exception as e:
+                self.stats['crashes'] += 1
+                self.stats['last_error'] = str(e)
+                self._restart_in_background("写入请求失败")
+                raise RuntimeError(f"纠错进程通信失败: {e}")
+
+            timeout = self._timeout(texts)
+            deadline = time.time() + timeout
+            while True:
+                remaining = deadline - time.time()
+                try:
+                    message = responses.get(timeout=max(remaining, 0))
+                except queue.Empty:
+                    self.stats['timeouts'] += 1
+                    self.stats['last_error'] = f"超时（{timeout:.0f}s）"
+                    self._restart_in_background(f"纠错超时（{timeout:.0f}s，{len(texts)} 条）")
+                    raise TimeoutError(f"纠错超时（{timeout:.0f}s）")
+                if message is None:
+                    self.stats['crashes'] += 1
+                    self.stats['last_error'] = "子进程异常退出"
+                    self._restart_in_background("子进程异常退出")
+                    raise RuntimeError("纠错进程异常退出")
+                if message.get('id') == request_id:
+                    break
+
+        self._worker_stats = message.get('stats') or self._worker_stats
+        if 'error' in message:
+            raise RuntimeError(message['error'])
+        return [_decode_result(result) for result in message['results']]
+
+    def correct_text(self, text: str):
+        result = self.correct_batch([text])[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def correct_batch(self, texts: List[str]) -> List:
+        return self._request('correct', texts)
+
+    def punctuate_batch(self, texts: List[str]) -> List:
+        return self._request('punctuate', texts)
+
+    def unload(self):
+        """结束子进程"""
+        with self._start_lock:
+            proc = self._proc
+            if proc is not None and proc.poll() is None:
+                try:
+                    proc.stdin.write(json.dumps({'op': 'exit'}) + "\n")
+                    proc.stdin.flush()
+                    proc.wait(timeout=3)
+                except Exception:
+                    pass
+            self._kill()
+
+    def get_rss_mb(self) -> float:
+        """子进程常驻内存（MB），未运行时为 0（模型内存在子进程中，父进程 RSS 反映不出）"""
+        proc = self._proc
+        if proc is None or proc.poll() is not None:
+            return 0.0
+        from src.model_manager import get_process_rss_mb
+        return get_process_rss_mb(proc.pid)
+
+    def get_engine_stats(self) -> Dict:
+        proc = self._proc
+        return {
+            **self._worker_stats,
+            'engine': self._worker_stats.get('engine', self.engine_type),
+            'isolated': True,
+            'worker_pid': proc.pid if proc is not None and proc.poll() is None else None,
+            'worker_loaded': self._is_loaded,
+            'worker_rss_mb': round(self.get_rss_mb(), 1),
+            'worker_timeout': self.timeout,
+            'worker': dict(self.stats),
+        }
+
+
+# ==================== 子进程 ====================
+
+def _limit_threads(num_threads: int, nice: int):
+    if nice:
+        try:
+            os.nice(nice)
+        except Exception:
+            pass
+    if num_threads > 0:
+        try:
+            import importlib.util
+            if importlib.util.find_spec('torch') is not None:
+                import torch
+                torch.set_num_threads(num_threads)
+                torch.set_num_interop_threads(1)
+        except Exception as e:
+            print(f"[纠错进程] 设置 torch 线程数失败: {e}")
+
+
+def worker_main():
+    """子进程主循环：第一行为配置，之后每行一个请求"""
+    # 协议使用原 stdout，引擎的 print 和 C 扩展的输出都转到 stderr
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), 'w', encoding='utf-8', buffering=1)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+
+    def send(message: Dict):
+        channel.write(json.dumps(message, ensure_ascii=False, default=_json_default) + "\n")
+        channel.flush()
+
+    config = json.loads(sys.stdin.readline())
+    _limit_threads(config.get('num_threads', 0), config.get('nice', 0))
+
+    try:
+        from src.text_corrector import create_engine
+        engine = create_engine(config['engine_type'], config.get('model_path'),
+                               **config.get('engine_kwargs', {}))
+        engine.load()
+        if not getattr(engine, '_is_loaded', False):
+            send({'ready': False, 'error': '模型加载失败'})
+            return
+    except Exception as e:
+        send({'ready': False, 'error': str(e)})
+        return
+    send({'ready': True, 'pid': os.getpid()})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        request = json.loads(line)
+        op = request.get('op')
+        if op == 'exit':
+            break
+        response = {'id': request.get('id')}
+        try:
+            if op == 'correct':
+                results = engine.correct_batch(request['texts'])
+            elif op == 'punctuate':
+                results = engine.punctuate_batch(request['texts'])
+            else:
+                raise ValueError(f"未知请求: {op}")
+            response['results'] = [_encode_result(result) for result in results]
+        except Exception as e:
+            response['error'] = str(e)
+        try:
+            response['stats'] = engine.get_engine_stats()
+        except Exception:
+            pass
+        send(response)
+
+    engine.unload()
+
+
+if __name__ == "__main__":
+    worker_main()
@@ -0,0 +1,284 @@
+"""
+流式识别器端点分段
+单遍模式：音频连续送入同一个 OnlineRecognizer 流，以识别器自身的端点检测
+（rule1/rule2/rule3）作为分段边界，替代 Silero VAD + 逐段重新转录
+"""
+
+import queue
+import threading
+import time
+import numpy as np
+from typing import Optional, Callable
+
+from src.asr_confidence import sherpa_result
+
+# 队列中的重置请求标记：(_RESET, threading.Event)
+_RESET = object()
+
+
+class EndpointSegmenter:
+    """基于 sherpa-onnx 流式识别器端点检测的分段器（与 SileroVAD 接口兼容）"""
+
+    # flush 时补齐的尾部静音（秒），保证最后一个字被解码出来
+    TAIL_PADDING_SECONDS = 0.66
+
+    def __init__(
+        self,
+        recognizer,
+        sample_rate: int = 16000,
+        engine_name: str = "sherpa-paraformer-streaming",
+        on_segment_callback: Optional[Callable] = None
+    ):
+        """
+        初始化端点分段器
+
+        Args:
+            recognizer: sherpa_onnx.OnlineRecognizer 实例（需启用 enable_endpoint_detection）
+            sample_rate: 音频采样率
+            engine_name: 引擎名称（写入分段元数据）
+            on_segment_callback: 分段回调函数 callback(audio_segment, metadata)
+                                 metadata 中已包含识别文本 'text'
+        """
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.engine_name = engine_name
+        self.on_segment_callback = on_segment_callback
+
+        # 采集线程只负责入队，解码在独立线程完成，避免阻塞录音；
+        # 识别流只在解码线程中创建、使用和丢弃（flush/reset 也通过队列交给解码线程）
+        self.chunk_queue = queue.Queue()
+        self.worker_thread = None
+        self.is_running = False
+
+        self.stream = None
+        self.segment_index = 0
+        self.total_samples = 0
+        self._reset_segment_state()
+
+        self.stats = {
+            'segments_count': 0,
+            'total_audio_duration': 0.0,
+            'total_decode_time': 0.0,
+            'total_cpu_time': 0.0,
+        }
+
+        print(f"[端点分段] 已初始化（单遍模式，engine={engine_name}）")
+
+    def _reset_segment_state(self):
+        """重置当前分段的累积状态"""
+        self.segment_chunks = []
+        self.segment_decode_time = 0.0
+        self.segment_start_sample = self.total_samples
+
+    def _ensure_worker(self):
+        """按需启动解码线程"""
+        if not self.is_running:
+            self.is_running = True
+            self.worker_thread = threading.Thread(
+                target=self._decode_worker,
+                daemon=True,
+                name="EndpointSegmenterWorker"
+            )
+            self.worker_thread.start()
+
+    def process_chunk(self, audio_chunk: np.ndarray) -> None:
+        """
+        处理音频块（非阻塞，仅入队）
+
+        Args:
+            audio_chunk: 音频数据 (float32, [-1, 1])
+        """
+        if audio_chunk.dtype != np.float32:
+            audio_chunk = audio_chunk.astype(np.float32)
+
+        if audio_chunk.max() > 1.0 or audio_chunk.min() < -1.0:
+            audio_chunk = audio_chunk / 32768.0
+
+        self._ensure_worker()
+        self.chunk_queue.put(audio_chunk)
+
+    def _decode_worker(self):
+        """解码线程：持续解码并在端点处切分"""
+        while self.is_running:
+            try:
+                item = self.chunk_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                if isinstance(item, threading.Event):
+                    # flush 请求：补齐尾部静音，输出最后一段
+                    self._finish_stream()
+                    item.set()
+                    continue
+                if isinstance(item, tuple) and item[0] is _RESET:
+                    self._reset_state()
+                    item[1].set()
+                    continue
+
+                self._accept(item)
+            except Exception as e:
+                print(f"[端点分段错误] 解码失败: {e}")
+                import traceback
+                traceback.print_exc()
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif isinstance(item, tuple):
+                    item[1].set()
+
+    def _accept(self, audio_chunk: np.ndarray):
+        """送入音频并解码，检测端点"""
+        if self.stream is None:
+            self.stream = self.recognizer.create_stream()
+
+        cpu_start = time.thread_time()
+        start_time = time.time()
+
+        self.stream.accept_waveform(self.sample_rate, audio_chunk)
+        self.segment_chunks.append(audio_chunk)
+        self.total_samples += len(audio_chunk)
+
+        while self.recognizer.is_ready(self.stream):
+            self.recognizer.decode_stream(self.stream)
+
+        self.segment_decode_time += time.time() - start_time
+        self.stats['total_cpu_time'] += time.thread_time() - cpu_start
+
+        if self.recognizer.is_endpoint(self.stream):
+            self._emit_segment()
+            self.recognizer.reset(self.stream)
+
+    def _finish_stream(self):
+        """结束当前流：补齐尾部静音后解码剩余音频"""
+        if self.stream is None:
+            return
+
+        cpu_start = time.thread_time()
+        start_time = time.time()
+
+        tail = np.zeros(int(self.TAIL_PADDING_SECONDS * self.sample_rate), dtype=np.float32)
+        self.stream.accept_waveform(self.sample_rate, tail)
+        self.stream.input_finished()
+        while self.recognizer.is_ready(self.stream):
+            self.recognizer.decode_stream(self.stream)
+
+        self.segment_decode_time += time.time() - start_time
+        self.stats['total_cpu_time'] += time.thread_time() - cpu_start
+
+        self._emit_segment()
+
+        # input_finished 后的流不能再接收音频，下次录音重新创建
+        self.stream = None
+
+    def _get_text(self) -> str:
+        """获取当前流的识别文本"""
+        return self._get_result()[0]
+
+    def _get_result(self):
+        """获取当前流的识别文本和置信度"""
+        text, confidence, _ = sherpa_result(self.recognizer, self.stream)
+        return text, confidence
+
+    def _emit_segment(self):
+        """输出一个分段（文本已解码，无需再次转录）"""
+        text, confidence = self._get_result()
+
+        if self.segment_chunks:
+            samples = np.concatenate(self.segment_chunks)
+        else:
+            samples = np.array([], dtype=np.float32)
+
+        duration = len(samples) / self.sample_rate
+        decode_time = self.segment_decode_time
+        start_sample = self.segment_start_sample
+
+        self._reset_segment_state()
+
+        if not text:
+            # 纯静音端点（rule1），丢弃音频，不产生分段
+            return
+
+        self.segment_index += 1
+        self.stats['segments_count'] += 1
+        self.stats['total_audio_duration'] += duration
+        self.stats['total_decode_time'] += decode_time
+
+        print(f"[端点分段] 第 {self.segment_index} 段: "
+              f"start={start_sample/self.sample_rate:.2f}s, duration={duration:.2f}s, "
+              f"decode={decode_time:.2f}s, text={text[:30]}")
+
+        if self.on_segment_callback:
+            metadata = {
+                'segment_index': self.segment_index,
+                'start_time': start_sample / self.sample_rate,
+                'duration': duration,
+                'sample_rate': self.sample_rate,
+                'text': text,
+                'confidence': confidence,
+                'transcribe_time': decode_time,
+                'engine': self.engine_name,
+                'segmenter': 'endpoint'
+            }
+            self.on_segment_callback(samples, metadata)
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """刷新：等待队列解码完成并输出最后一段"""
+        if self.stream is None and self.chunk_queue.empty():
+            return
+
+        done = threading.Event()
+        self.chunk_queue.put(done)
+        if not done.wait(timeout=timeout):
+            print(f"[端点分段警告] flush 超时（{timeout}s）")
+        print(f"[端点分段] flush 完成，共 {self.segment_index} 段")
+
+    def reset(self, timeout: float = 10.0) -> None:
+        """
+        重置分段状态（新录音开始时调用）
+        丢弃未解码的音频；解码线程运行时由它执行重置，不会在解码途中丢弃正在使用的识别流
+        """
+        while not self.chunk_queue.empty():
+            try:
+                item = self.chunk_queue.get_nowait()
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif isinstance(item, tuple):
+                    item[1].set()
+            except queue.Empty:
+                break
+
+        if self.is_running and self.worker_thread is not None and self.worker_thread.is_alive():
+            done = threading.Event()
+            self.chunk_queue.put((_RESET, done))
+            if not done.wait(timeout=timeout):
+                print(f"[端点分段警告] 重置超时（{timeout}s）")
+        else:
+            self._reset_state()
+        print("[端点分段] 已重置")
+
+    def _reset_state(self):
+        self.stream = None
+        self.segment_index = 0
+        self.total_samples = 0
+        self._reset_segment_state()
+
+    def is_speech(self) -> bool:
+        """当前流是否已有未结束的识别文本"""
+        stream = self.stream
+        if stream is None:
+            return False
+        return len(sherpa_result(self.recognizer, stream)[0]) > 0
+
+    def get_stats(self):
+        """获取性能统计"""
+        stats = self.stats.copy()
+        audio = max(stats['total_audio_duration'], 0.001)
+        stats['rtf'] = stats['total_decode_time'] / audio
+        stats['cpu_per_audio_second'] = stats['total_cpu_time'] / audio
+        return stats
+
+    def stop(self):
+        """停止解码线程"""
+        self.is_running = False
+        if self.worker_thread:
+            self.worker_thread.join(timeout=2)
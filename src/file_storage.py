@@ -5,10 +5,43 @@
 
 import os
 import json
-import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
 import src.config as config
+from src.recording_index import RecordingIndex, parse_recording_file, make_snippet, find_audio, AUDIO_SUFFIXES
+from src.stats_aggregator import StatsAggregator
+from src.recording_sidecar import (SIDECAR_SUFFIX, sidecar_path, load_sidecar, write_sidecar,
+                                   correction_record)
+
+# 元数据索引文件：默认放在录音目录旁（recordings → recordings.index.db），
+# 录音目录由同步工具复制，正在写入的 SQLite 文件不能放在里面
+INDEX_SUFFIX = ".index.db"
+# 旧版本放在存储根目录中的索引文件（打开新索引时删除）
+LEGACY_INDEX_FILENAME = ".recordings_index.db"
+# 每日统计汇总文件：与索引一样放在录音目录旁（recordings → recordings.daily_stats.json）
+STATS_SUFFIX = ".daily_stats.json"
+LEGACY_STATS_FILENAME = ".daily_stats.json"
+
+# 录音列表项可选字段（query(fields=...)，cursor 总是返回）
+LIST_FIELDS = ('id', 'date', 'time', 'duration', 'word_count', 'preview', 'file_path', 'has_corrected', 'has_audio')
+
+def state_file_path(base, configured, suffix):
+    """录音目录之外的状态文件：配置了路径时用配置，否则放在录音目录旁（同一上级目录，以录音目录名为前缀）"""
+    return Path(configured) if configured else base.parent / f"{base.name}{suffix}"
+
+
+def remove_legacy_file(base, filename):
+    """删除旧版本放在录音目录里的状态文件（含 SQLite 的 -wal/-shm）"""
+    for name in (filename, f"{filename}-wal", f"{filename}-shm"):
+        try:
+            (base / name).unlink()
+            print(f"[文件存储] 已删除录音目录中的旧状态文件: {name}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[文件存储] 删除旧状态文件失败: {name}, 错误: {e}")
+
 
 class FileStorage:
     """文件存储管理器"""
@@ -16,21 +49,129 @@ class FileStorage:
     def __init__(self):
         # 每次从config读取，而不是缓存路径
         print(f"[文件存储] 初始化存储路径: {config.STORAGE_BASE}")
+        self._base_path = None
+        self._index = None
+        self._index_base = None
+        self._index_lock = threading.Lock()
+        self._stats = None
+        self._stats_base = None
+        self._stats_lock = threading.Lock()
     
     @property
     def base_path(self):
-        """动态获取存储路径"""
+        """动态获取存储路径（只在 STORAGE_BASE 变化后首次访问时创建目录，之后不访问文件系统）"""
         path = Path(config.STORAGE_BASE)
-        path.mkdir(parents=True, exist_ok=True)
+        if path != self._base_path:
+            path.mkdir(parents=True, exist_ok=True)
+            self._base_path = path
         return path
+    
+    @property
+    def index(self):
+        """当前存储路径的元数据索引（存储路径变化时重新打开，首次创建时扫描重建；不可用时为 None）"""
+        if not getattr(config, 'RECORDING_INDEX_ENABLED', True):
+            return None
+        base = self.base_path
+        with self._index_lock:
+            if self._index is None or self._index_base != base:
+                if self._index is not None:
+                    self._index.close()
+                    self._index = None
+                try:
+                    index = RecordingIndex(state_file_path(base, getattr(config, 'RECORDING_INDEX_PATH', ''),
+                                                           INDEX_SUFFIX))
+                    remove_legacy_file(base, LEGACY_INDEX_FILENAME)
+                    if index.created:
+                        index.rebuild(base)
+                except Exception as e:
+                    print(f"[文件存储] 元数据索引不可用，使用目录扫描: {e}")
+                    return None
+                self._index, self._index_base = index, base
+            return self._index
+    
+    @property
+    def stats(self):
+        """当前存储路径的每日统计（存储路径变化时重新加载，汇总文件不存在时从索引/目录重建）"""
+        base = self.base_path
+        with self._stats_lock:
+            if self._stats is None or self._stats_base != base:
+                stats = StatsAggregator(state_file_path(base, getattr(config, 'RECORDING_STATS_PATH', ''), STATS_SUFFIX),
+                                        free_space_interval=getattr(config, 'STATS_FREE_SPACE_INTERVAL', 60))
+                remove_legacy_file(base, LEGACY_STATS_FILENAME)
+                if not stats.loaded:
+                    self._rebuild_stats(stats)
+                self._stats, self._stats_base = stats, base
+            return self._stats
+    
+    def _rebuild_stats(self, stats):
+        """从元数据索引（不可用时扫描目录）重建每日统计"""
+        index = self.index
+        if index is not None:
+            latest = index.query(limit=1, with_content=False)
+            last = {'key': latest[0]['key'], 'preview': latest[0]['preview']} if latest else None
+            stats.rebuild(index.daily_totals(), last)
+            return
+        
+        days = {}
+        last = None
+        for date_dir in sorted(d for d in self.base_path.iterdir() if d.is_dir()):
+            for file_path in sorted(date_dir.glob("*.txt")):
+                if '.corrected' in file_path.stem:
+                    continue
+                try:
+                    row = parse_recording_file(file_path)
+                except Exception as e:
+                    print(f"[文件存储] 解析文件失败: {file_path}, 错误: {e}")
+                    continue
+                day = days.setdefault(row['date'], {'date': row['date'], 'count': 0, 'duration': 0.0, 'words': 0})
+                day['count'] += 1
+                day['duration'] += row['duration']
+                day['words'] += row['word_count']
+                last = {'key': row['key'], 'preview': row['preview']}
+        stats.rebuild(days.values(), last)
+    
+    def rebuild_index(self):
+        """扫描存储目录重建元数据索引和每日统计，返回录音数"""
+        index = self.index
+        count = index.rebuild(self.base_path) if index else 0
+        self._rebuild_stats(self.stats)
+        return count
+    
+    def _index_file(self, file_path):
+        """文件写入后同步索引，返回解析出的录音行（解析失败时为 None）"""
+        try:
+            row = parse_recording_file(file_path)
+        except Exception as e:
+            print(f"[文件存储] 解析文件失败: {file_path}, 错误: {e}")
+            return None
+        index = self.index
+        if index is not None:
+            try:
+                index.upsert(row)
+            except Exception as e:
+                print(f"[文件存储] 更新索引失败: {file_path}, 错误: {e}")
+        return row
+    
+    @staticmethod
+    def _record_stats(stats, old, new):
+        """
+        录音变更后增量更新每日统计
+        stats 须在改动文件之前获取（首次获取时会从现有文件重建，之后再获取会把本次改动重复计入）
+        """
+        try:
+            stats.apply(old, new)
+        except Exception as e:
+            print(f"[文件存储] 更新统计失败: {e}")
         
-    def save(self, recording_id, content, metadata=None):
+    def save(self, recording_id, content, metadata=None, sidecar=None):
         """
         保存录音记录
         recording_id: 格式为 "2026-01-21/15-30"
         content: 转写文本内容
         metadata: 额外元数据（时长、字数等）
+        sidecar: 结构化元数据（recording_sidecar.build_sidecar() 的结果），与文本文件同名保存为 .json
         """
+        stats = self.stats
         date_str, time_str = recording_id.split('/')
         date_dir = self.base_path / date_str
         date_dir.mkdir(parents=True, exist_ok=True)
@@ -58,6 +199,14 @@ class FileStorage:
         # 保存文件
         file_path.write_text(full_content, encoding='utf-8')
         print(f"[文件存储] 已保存: {file_path}")
+        if sidecar is not None:
+            try:
+                write_sidecar(sidecar_path(file_path), sidecar)
+            except Exception as e:
+                print(f"[文件存储] 保存元数据文件失败: {e}")
+        row = self._index_file(file_path)
+        if row is not None:
+            self._record_stats(stats, None, row)
         
         return str(file_path)
     
@@ -78,9 +227,9 @@ class FileStorage:
         # 使用与txt文件相同的命名规则
         audio_path = date_dir / f"{time_str}.wav"
         
-        # 如果文件已存在，添加后缀
+        # 如果文件已存在（包括已压缩为 FLAC 等格式的），添加后缀
         counter = 2
-        while audio_path.exists():
+        while find_audio(date_dir, audio_path.stem) is not None:
             audio_path = date_dir / f"{time_str}_{counter}.wav"
             counter += 1
         
@@ -119,14 +268,80 @@ class FileStorage:
             wf.writeframes(audio_data.tobytes())
         
         print(f"[文件存储] 已保存音频: {audio_path}")
+        if config.WAVEFORM_PEAKS_ENABLED:
+            # 音频已在内存中，顺便计算波形峰值（网页时间线不必下载 WAV）
+            from src.waveform_peaks import compute_peaks, write_peaks, peaks_path
+            try:
+                write_peaks(peaks_path(audio_path), compute_peaks(audio_data, sample_rate))
+            except Exception as e:
+                print(f"[文件存储] 生成波形峰值失败: {audio_path}, 错误: {e}")
+        key = f"{date_str}/{audio_path.stem}"
+        index = self.index
+        if index is not None:
+            index.update(key, audio_path=str(audio_path))
+        
+        # AUDIO_STORAGE_CODEC=flac：后台无损压缩，完成后替换 WAV
+        from src.audio_codec import get_audio_compressor
+        compressor = get_audio_compressor()
+        if compressor is not None:
+            compressor.request(audio_path, on_done=lambda flac_path: self._audio_replaced(key, flac_path))
         return str(audio_path)
     
-    def save_corrected(self, recording_id, corrected_text, changes):
+    def _audio_replaced(self, key, audio_path):
+        """原始 WAV 已替换为压缩文件：更新索引，峰值文件标记为最新（由原始采样计算，无需重新计算）"""
+        from src.waveform_peaks import peaks_path
+        index = self.index
+        if index is not None:
+            index.update(key, audio_path=str(audio_path))
+        peaks = peaks_path(audio_path)
+        if peaks.exists():
+            os.utime(peaks)
+    
+    def load_audio(self, recording_id):
+        """
+        读取录音音频（WAV、FLAC 或压缩归档，统一解码）
+        recording_id: 格式为 "2026-01-21/15-30"
+        
+        返回: (int16 采样数组, 采样率)，没有音频文件时返回 None
+        """
+        from src.audio_codec import read_audio
+        date_str, time_str = recording_id.split('/')
+        audio_path = find_audio(self.base_path / date_str, time_str)
+        if audio_path is None:
+            return None
+        return read_audio(audio_path)
+    
+    def compress_audio(self, compressor):
+        """
+        把已有的 WAV 录音压缩为 FLAC（同步，命令行批量处理用）
+        compressor: audio_codec.AudioCompressor
+        
+        返回: {"total", "compressed", "failed", "input_bytes", "output_bytes"}
+        """
+        result = {'total': 0, 'compressed': 0, 'failed': 0, 'input_bytes': 0, 'output_bytes': 0}
+        if not self.base_path.exists():
+            return result
+        for wav_path in sorted(self.base_path.glob("*/*.wav")):
+            result['total'] += 1
+            input_bytes = wav_path.stat().st_size
+            flac_path = compressor.compress(wav_path)
+            if flac_path is None:
+                result['failed'] += 1
+                continue
+            self._audio_replaced(f"{wav_path.parent.name}/{wav_path.stem}", flac_path)
+            result['compressed'] += 1
+            result['input_bytes'] += input_bytes
+            result['output_bytes'] += flac_path.stat().st_size
+        print(f"[文件存储] 音频压缩完成: {result}")
+        return result
+    
+    def save_corrected(self, recording_id, corrected_text, changes, correction=None):
         """
         保存纠正后的文本
         recording_id: 格式为 "2026-01-21/15-30"
         corrected_text: 纠正后的文本
         changes: 修改详情
+        correction: 纠错记录（recording_sidecar.correction_record()，默认记为手动纠正），追加到 .json 元数据
         """
         date_str, time_str = recording_id.split('/')
         date_dir = self.base_path / date_str
@@ -148,6 +363,15 @@ class FileStorage:
         # 保存文件
         corrected_path.write_text(full_content, encoding='utf-8')
         print(f"[文件存储] 已保存纠正文本: {corrected_path}")
+        self._update_sidecar(date_dir / f"{time_str}.txt", lambda data: data['corrections'].append(
+            correction or correction_record(changes, source="manual")))
+        index = self.index
+        if index is not None:
+            fields = {'corrected_content': corrected_text.strip(), 'corrected_path': str(corrected_path)}
+            state = self._file_state(date_dir, time_str)
+            if state is not None:
+                fields['mtime'] = state[0]
+            index.update(recording_id, **fields)
         return str(corrected_path)
     
     def get_corrected(self, recording_id):
@@ -155,6 +379,12 @@ class FileStorage:
         获取纠正后的文本
         recording_id: 格式为 "2026-01-21/15-30"
         """
+        index = self.index
+        if index is not None:
+            row = index.get(recording_id)
+            if row is not None:
+                return row['corrected_content']
+        
         date_str, time_str = recording_id.split('/')
         date_dir = self.base_path / date_str
         corrected_path = date_dir / f"{time_str}.corrected.txt"
@@ -173,11 +403,12 @@ class FileStorage:
             print(f"[文件存储] 读取纠正文本失败: {e}")
             return None
     
-    def update_transcription(self, recording_id, new_text):
+    def update_transcription(self, recording_id, new_text, segments=None, asr=None):
         """
         更新录音的转写文本（重新识别后使用）
         recording_id: 格式为 "2026-01-21/15-30"
         new_text: 新的转写文本
+        segments: 新的分段时间线（recording_sidecar.build_segment()），asr: 识别引擎信息；写入 .json 元数据
         """
         date_str, time_str = recording_id.split('/')
         date_dir = self.base_path / date_str
@@ -186,10 +417,12 @@ class FileStorage:
         if not file_path.exists():
             print(f"[文件存储] 录音文件不存在: {file_path}")
             return False
+        stats = self.stats
         
         try:
             # 读取现有文件获取元数据
             content = file_path.read_text(encoding='utf-8')
+            old_row = parse_recording_file(file_path)
             
             # 提取头部元数据（保留原有的录音时间等信息）
             header_end = content.find('---\n')
@@ -215,37 +448,122 @@ class FileStorage:
                 corrected_path.unlink()
                 print(f"[文件存储] 已删除旧的纠正文本: {corrected_path}")
             
+            def retranscribed(data):
+                data['segments'] = list(segments) if segments is not None else [{'index': 0, 'text': new_text}]
+                if asr is not None:
+                    data['asr'] = asr
+                data['retranscribed_at'] = datetime.now().isoformat(timespec='seconds')
+            self._update_sidecar(file_path, retranscribed)
+            
+            row = self._index_file(file_path)
+            if row is not None:
+                self._record_stats(stats, old_row, row)
             return True
         except Exception as e:
             print(f"[文件存储] 更新转写文本失败: {e}")
             return False
 
-    def query(self, date=None, limit=20):
+    def query(self, date=None, limit=20, before=None, date_from=None, date_to=None,
+              has_correction=None, fields=None):
         """
-        查询录音列表
+        查询录音列表（按录音时间倒序，不含全文）
         date: 日期过滤（格式：2026-01-21）
         limit: 返回数量限制
+        before: 游标，上一页最后一条的 cursor 字段，返回其后的录音
+        date_from / date_to: 日期范围（含）
+        has_correction: True/False 按是否有纠正文本过滤，None 不过滤
+        fields: 只返回这些字段（见 LIST_FIELDS，None 返回全部）
+        
+        每项包含 cursor 字段（用作下一页的 before），全文通过 get() 获取
         """
-        recordings = []
+        index = self.index
+        if index is not None:
+            rows = index.query(date=date, limit=limit, before=before, date_from=date_from,
+                               date_to=date_to, has_correction=has_correction, with_content=False)
+            recordings = [self._to_list_item(row) for row in rows]
+        else:
+            recordings = self._scan_query(date, limit, before, date_from, date_to, has_correction)
         
+        if fields:
+            recordings = [{k: item[k] for k in ('cursor', *fields) if k in item} for item in recordings]
+        return recordings
+    
+    def _scan_query(self, date, limit, before, date_from, date_to, has_correction):
+        """无索引时逐目录扫描（按日期倒序，凑够数量即停止）"""
         if date:
-            # 查询指定日期
-            date_dir = self.base_path / date
-            if date_dir.exists():
-                recordings.extend(self._scan_directory(date_dir, date))
+            date_dirs = [self.base_path / date]
         else:
-            # 查询所有日期
-            for date_dir in sorted(self.base_path.iterdir(), reverse=True):
-                if date_dir.is_dir():
-                    recordings.extend(self._scan_directory(date_dir, date_dir.name))
-                    if len(recordings) >= limit:
-                        break
+            date_dirs = sorted((d for d in self.base_path.iterdir() if d.is_dir()), reverse=True)
+        
+        before_key = None
+        if before:
+            before_date, _, before_stem = before.partition('/')
+            before_key = (before_date, before_stem.split('_')[0].replace('-', ':'), before)
+        
+        recordings = []
+        for date_dir in date_dirs:
+            if not date_dir.exists():
+                continue
+            if (date_from and date_dir.name < date_from) or (date_to and date_dir.name > date_to):
+                continue
+            if before_key and date_dir.name > before_key[0]:
+                continue
+            items = self._scan_directory(date_dir, date_dir.name)
+            if has_correction is not None:
+                items = [item for item in items if item['has_corrected'] == has_correction]
+            if before_key:
+                items = [item for item in items if (item['date'], item['time'], item['cursor']) < before_key]
+            recordings.extend(items)
+            if len(recordings) >= limit:
+                break
         
         # 按时间倒序排序
-        recordings.sort(key=lambda x: x['date'] + ' ' + x['time'], reverse=True)
+        recordings.sort(key=lambda x: (x['date'], x['time'], x['cursor']), reverse=True)
         
         return recordings[:limit]
         
+    def search(self, query, date_from=None, date_to=None, has_correction=None, limit=20, offset=0):
+        """
+        全文检索录音（原始文本和纠正文本）
+        query: 关键词，空格分隔的多个词须同时出现
+        date_from / date_to: 日期范围（含）
+        has_correction: True/False 按是否有纠正文本过滤，None 不过滤
+        
+        返回: {"total": int, "results": [列表项 + "snippet"（HTML，命中词以 <mark> 标出）+ "score"]}
+        """
+        index = self.index
+        if index is None:
+            raise RuntimeError("元数据索引不可用，无法检索")
+        found = index.search(query, date_from=date_from, date_to=date_to,
+                             has_correction=has_correction, limit=limit, offset=offset)
+        results = []
+        for row in found['rows']:
+            item = self._to_list_item(row)
+            # 摘要优先取纠正文本，纠正文本中没有命中时用原始文本
+            text = row['corrected_content'] or row['content']
+            if row['corrected_content'] and not any(t.lower() in text.lower() for t in query.split()):
+                text = row['content']
+            item['snippet'] = make_snippet(text, query)
+            item['score'] = round(-row['score'], 3) if row['score'] else 0.0
+            results.append(item)
+        return {'total': found['total'], 'results': results}
+    
+    @staticmethod
+    def _to_list_item(row):
+        """索引行 → 列表项（字段与目录扫描结果一致）"""
+        return {
+            'id': row['id'],
+            'cursor': row['key'],
+            'date': row['date'],
+            'time': row['time'],
+            'duration': row['duration'],
+            'word_count': row['word_count'],
+            'preview': row['preview'],
+            'file_path': row['file_path'],
+            'has_corrected': bool(row['has_corrected']) if 'has_corrected' in row else row['corrected_content'] is not None,
+            'has_audio': row['audio_path'] is not None,
+        }
+    
     def _scan_directory(self, directory, date_str):
         """扫描目录中的录音文件"""
         recordings = []
@@ -274,26 +592,26 @@ class FileStorage:
                     elif line.startswith('文字长度:'):
                         word_count = int(line.split(':')[1].replace('字', '').strip())
                 
-                # 提取内容预览（前50字）和完整文本
+                # 提取内容预览（前50字，列表不返回完整文本）
                 content_start = content.find('---\n') + 4
                 content_end = content.rfind('\n---')
                 if content_start > 3 and content_end > content_start:
                     text_content = content[content_start:content_end].strip()
                     preview = text_content[:50] + '...' if len(text_content) > 50 else text_content
-                    full_text = text_content  # 完整文本
                 else:
                     preview = "无内容"
-                    full_text = ""
                 
                 recordings.append({
                     'id': f"{date_str}/{time_str}",
+                    'cursor': f"{date_str}/{filename}",
                     'date': date_str,
                     'time': time_str.replace('-', ':'),
                     'duration': duration,
                     'word_count': word_count,
                     'preview': preview,
-                    'full_text': full_text,  # 添加完整文本
-                    'file_path': str(file_path)
+                    'file_path': str(file_path),
+                    'has_corrected': (directory / f"{filename}.corrected.txt").exists(),
+                    'has_audio': find_audio(directory, filename) is not None,
                 })
                 
             except Exception as e:
@@ -312,6 +630,32 @@ class FileStorage:
         - corrected_content: 纠错后文本（来自 .corrected.txt 文件，如果存在）
         - content: 向后兼容字段，优先返回纠错后文本
         """
+        index = self.index
+        if index is not None:
+            row = index.get(recording_id)
+            if row is not None and not Path(row['file_path']).exists():
+                # 文件已在外部删除：同步索引和每日统计
+                self.sync_recording(row['key'])
+                return None
+            if row is None:
+                # 不在索引中（如外部拷入的文件）：读取文件并补入索引和每日统计
+                if self.sync_recording(recording_id) is None:
+                    return None
+                row = index.get(recording_id)
+            if row is not None:
+                corrected_text = row['corrected_content']
+                return {
+                    'id': row['id'],
+                    'date': row['date'],
+                    'time': row['time'],
+                    'duration': row['duration'],
+                    'word_count': len(row['content']),
+                    'original_content': row['content'],
+                    'corrected_content': corrected_text,
+                    'content': corrected_text if corrected_text else row['content'],
+                    'audio_path': row['audio_path']
+                }
+        
         date_str, time_str = recording_id.split('/')
         date_dir = self.base_path / date_str
         
@@ -348,10 +692,8 @@ class FileStorage:
                     print(f"[文件存储] 读取纠错文件失败: {corrected_file}, 错误: {e}")
             
             # 查找对应的音频文件
-            audio_path = None
-            audio_file = date_dir / f"{time_str}.wav"
-            if audio_file.exists():
-                audio_path = str(audio_file)
+            audio_file = find_audio(date_dir, time_str)
+            audio_path = str(audio_file) if audio_file is not None else None
             
             # 返回结果
             return {
@@ -386,8 +728,23 @@ class FileStorage:
                 break
         
         if file_path.exists():
-            file_path.unlink()
+            stats = self.stats
+            key = f"{date_str}/{file_path.stem}"
+            index = self.index
+            old_row = index.get(key) if index is not None else None
+            if old_row is None:
+                try:
+                    old_row = parse_recording_file(file_path)
+                except Exception as e:
+                    print(f"[文件存储] 解析文件失败: {file_path}, 错误: {e}")
+            # 同名的纠错文本、元数据、音频、波形峰值、试听文件一并删除
+            for path in date_dir.glob(f"{file_path.stem}.*"):
+                path.unlink(missing_ok=True)
             print(f"[文件存储] 已删除: {file_path}")
+            if index is not None:
+                index.delete(key)
+            if old_row is not None:
+                self._record_stats(stats, old_row, None)
             
             # 如果目录为空，删除日期目录
             if not any(date_dir.iterdir()):
@@ -399,27 +756,263 @@ class FileStorage:
             print(f"[文件存储] 文件不存在: {recording_id}")
             return False
         
-    def get_today_count(self):
-        """获取今日录音数量"""
-        today = datetime.now().strftime("%Y-%m-%d")
-        date_dir = self.base_path / today
+    def get_sidecar(self, recording_id):
+        """
+        读取录音的结构化元数据（分段时间线、引擎、纠错记录）
+        recording_id: 格式为 "2026-01-21/15-30"
         
-        if date_dir.exists():
-            return len(list(date_dir.glob("*.txt")))
-        return 0
+        返回: dict，没有 .json 元数据（旧录音）时返回 None
+        """
+        date_str, time_str = recording_id.split('/')
+        return load_sidecar(self.base_path / date_str / f"{time_str}{SIDECAR_SUFFIX}")
+    
+    def _update_sidecar(self, text_path, update):
+        """读取 → 修改 → 写回 .json 元数据（文件不存在时跳过）"""
+        path = sidecar_path(text_path)
+        data = load_sidecar(path)
+        if data is None:
+            return
+        try:
+            update(data)
+            write_sidecar(path, data)
+        except Exception as e:
+            print(f"[文件存储] 更新元数据文件失败: {path}, 错误: {e}")
         
-    def get_storage_info(self):
-        """获取存储信息"""
+    def _audio_files(self, date_dir, stem):
+        """录音的音频及其派生文件（原始/归档音频、试听文件、波形峰值）"""
+        names = {f"{stem}{suffix}" for suffix in AUDIO_SUFFIXES} | {f"{stem}.peaks"}
+        return [path for path in date_dir.glob(f"{stem}.*")
+                if path.name in names or path.name.startswith(f"{stem}.preview.")]
+    
+    def delete_audio(self, recording_id):
+        """
+        只删除录音的音频（保留转写文本、纠错文本和元数据）
+        recording_id: 格式为 "2026-01-21/15-30"
+        
+        返回: 释放的字节数
+        """
+        date_str, time_str = recording_id.split('/')
+        date_dir = self.base_path / date_str
+        freed = 0
+        for path in self._audio_files(date_dir, time_str):
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                freed += size
+            except FileNotFoundError:
+                pass
+        index = self.index
+        if index is not None:
+            index.update(recording_id, audio_path=None)
+        if freed:
+            print(f"[文件存储] 已删除音频: {recording_id} ({freed / 1024 / 1024:.1f}MB)")
+        return freed
+    
+    def archive_audio(self, recording_id, encoder):
+        """
+        把原始 WAV/FLAC 压缩为归档音频（15-30.wav → 15-30.opus）并删除原文件
+        recording_id: 格式为 "2026-01-21/15-30"
+        encoder: 试听编码器（AudioPreviewEncoder，同步编码）
+        
+        返回: 节省的字节数，没有原始音频或编码失败时返回 None
+        """
+        from src.waveform_peaks import ensure_peaks
+        date_str, time_str = recording_id.split('/')
+        source_path = find_audio(self.base_path / date_str, time_str)
+        if source_path is None or source_path.suffix not in ('.wav', '.flac'):
+            return None
+        # 删除原始音频前先算好波形峰值，归档后仍可绘制时间线
+        ensure_peaks(source_path)
+        encoded = encoder.encode(source_path)
+        if encoded is None:
+            return None
+        source_size = source_path.stat().st_size
+        archive_path = source_path.with_suffix(f".{encoder.fmt}")
+        os.replace(encoded, archive_path)
+        source_path.unlink()
+        self._audio_replaced(recording_id, archive_path)
+        saved = source_size - archive_path.stat().st_size
+        print(f"[文件存储] 已归档音频: {archive_path.name} (节省 {saved / 1024 / 1024:.1f}MB)")
+        return saved
+    
+    def get_peaks(self, recording_id, zoom=None, width=None, start=None, end=None):
+        """
+        读取录音波形峰值（一级），峰值文件缺失或比音频旧时先重新计算
+        recording_id: 格式为 "2026-01-21/15-30"
+        zoom/width/start/end: 见 waveform_peaks.read_peaks
+        
+        返回: dict，没有音频文件时返回 None
+        """
+        from src.waveform_peaks import ensure_peaks, read_peaks, peaks_path
+        date_str, time_str = recording_id.split('/')
+        audio_path = find_audio(self.base_path / date_str, time_str)
+        if audio_path is None:
+            return None
         try:
-            total, used, free = shutil.disk_usage(self.base_path)
-            return {
-                'total_gb': total / (1024**3),
-                'used_gb': used / (1024**3),
-                'free_gb': free / (1024**3)
-            }
-        except:
+            path = ensure_peaks(audio_path)
+        except Exception as e:
+            # 无法解码（如没有 ffmpeg 时的压缩归档）：使用归档前由 WAV 计算的峰值
+            print(f"[文件存储] 重新计算波形峰值失败: {audio_path}, 错误: {e}")
+            path = peaks_path(audio_path)
+        return read_peaks(path, zoom=zoom, width=width, start=start, end=end)
+    
+    def backfill_peaks(self, force=False):
+        """
+        为缺少（或过期）波形峰值的录音补算峰值文件
+        force: 全部重新计算
+        
+        返回: {"total", "generated", "failed"}
+        """
+        from src.waveform_peaks import ensure_peaks, peaks_path
+        from src.audio_preview import is_fresh
+        result = {'total': 0, 'generated': 0, 'failed': 0}
+        if not self.base_path.exists():
+            return result
+        audio_paths = [path for suffix in ('.wav', '.flac') for path in self.base_path.glob(f"*/*{suffix}")]
+        for wav_path in sorted(audio_paths):
+            result['total'] += 1
+            if not force and is_fresh(wav_path, peaks_path(wav_path)):
+                continue
+            try:
+                ensure_peaks(wav_path, force=True)
+                result['generated'] += 1
+            except Exception as e:
+                result['failed'] += 1
+                print(f"[文件存储] 生成波形峰值失败: {wav_path}, 错误: {e}")
+        print(f"[文件存储] 波形峰值补算完成: {result}")
+        return result
+        
+    # ==================== 外部变更同步 ====================
+    
+    @staticmethod
+    def _file_state(date_dir, stem, mtimes=None):
+        """
+        录音在磁盘上的状态 (mtime, 有无纠错文本, 音频文件名)，与 _row_state() 对比判断索引是否过期
+        mtimes: 日期目录的 {文件名: mtime}（批量检查时一次 scandir 得到，避免逐个 stat）
+        
+        返回: 文本文件不存在时为 None
+        """
+        names = [f"{stem}.txt", f"{stem}.corrected.txt"] + [f"{stem}{suffix}" for suffix in AUDIO_SUFFIXES]
+        if mtimes is None:
+            mtimes = {}
+            for name in names:
+                try:
+                    mtimes[name] = (date_dir / name).stat().st_mtime
+                except OSError:
+                    pass
+        if names[0] not in mtimes:
+            return None
+        corrected = mtimes.get(names[1])
+        audio = next((name for name in names[2:] if name in mtimes), None)
+        return (max(mtimes[names[0]], corrected or 0), corrected is not None, audio)
+    
+    @staticmethod
+    def _row_state(row):
+        """索引行记录的状态，格式同 _file_state()"""
+        return (row['mtime'], row['corrected_path'] is not None,
+                Path(row['audio_path']).name if row['audio_path'] else None)
+    
+    def sync_recording(self, key):
+        """
+        按磁盘文件同步一条录音的索引和每日统计（同步工具在程序之外新增、修改、删除文件后调用）
+        只比较 mtime 和文件是否存在，与索引一致时不读取文件
+        key: 索引键，格式为 "2026-01-21/15-30"（同一分钟的第二条为 "15-30_2"）
+        
+        返回: "added" / "updated" / "removed"，无需更新（或索引不可用）时返回 None
+        """
+        index = self.index
+        if index is None:
+            return None
+        date_str, stem = key.split('/')
+        date_dir = self.base_path / date_str
+        stats = self.stats
+        old_row = index.get(key)
+        state = self._file_state(date_dir, stem)
+        if state is None:
+            if old_row is None:
+                return None
+            index.delete(key)
+            self._record_stats(stats, old_row, None)
+            print(f"[文件存储] 同步: 录音已在外部删除 {key}")
+            return "removed"
+        if old_row is not None and self._row_state(old_row) == state:
+            return None
+        row = self._index_file(date_dir / f"{stem}.txt")
+        if row is None:
+            return None
+        self._record_stats(stats, old_row, row)
+        print(f"[文件存储] 同步: 录音{'已更新' if old_row is not None else '已新增'} {key}")
+        return "updated" if old_row is not None else "added"
+    
+    def reconcile(self, date=None):
+        """
+        一致性检查：对比索引与磁盘，只重新解析有差异的录音
+        每个日期目录一次 scandir，只比较 mtime 和文件是否存在，不读取文件内容
+        date: 只检查某一天（如 "2026-01-21"），默认全部
+        
+        返回: {"checked", "added", "updated", "removed"}
+        """
+        result = {'checked': 0, 'added': 0, 'updated': 0, 'removed': 0}
+        index = self.index
+        if index is None:
+            # 没有索引时查询直接扫描目录，只需重建统计
+            self._rebuild_stats(self.stats)
+            return result
+        
+        if date is not None:
+            date_dirs = [self.base_path / date]
+        else:
+            date_dirs = [d for d in self.base_path.iterdir() if d.is_dir() and not d.name.startswith('.')]
+        states = {}
+        for date_dir in date_dirs:
+            try:
+                with os.scandir(date_dir) as entries:
+                    mtimes = {entry.name: entry.stat().st_mtime for entry in entries if entry.is_file()}
+            except OSError:
+                continue
+            for name in mtimes:
+                if name.endswith('.txt') and '.corrected' not in name:
+                    stem = name[:-len('.txt')]
+                    states[f"{date_dir.name}/{stem}"] = self._file_state(date_dir, stem, mtimes)
+        rows = {row['key']: self._row_state(row) for row in index.file_states(date)}
+        
+        keys = set(states) | set(rows)
+        result['checked'] = len(keys)
+        for key in sorted(keys):
+            if states.get(key) != rows.get(key):
+                action = self.sync_recording(key)
+                if action:
+                    result[action] += 1
+        return result
+    
+    def get_today_count(self):
+        """获取今日录音数量（读取内存中的每日统计）"""
+        return self.stats.get_day()['count']
+    
+    def get_today_stats(self):
+        """今日统计 {"date", "count", "duration", "words", "last_transcript"}（不读取文件）"""
+        stats = self.stats
+        return {**stats.get_day(), 'last_transcript': stats.last_transcript}
+        
+    def get_storage_info(self):
+        """获取存储信息（磁盘空间按 STATS_FREE_SPACE_INTERVAL 间隔采样）"""
+        usage = self.stats.disk_usage(self.base_path)
+        if usage is None:
             return {'total_gb': 0, 'used_gb': 0, 'free_gb': 0}
+        total, used, free = usage
+        return {
+            'total_gb': total / (1024**3),
+            'used_gb': used / (1024**3),
+            'free_gb': free / (1024**3)
+        }
         
     def cleanup(self):
         """清理资源"""
         print("[文件存储] 清理资源")
+        with self._index_lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+        with self._stats_lock:
+            self._stats = None
+        self._base_path = None
@@ -0,0 +1,243 @@
+"""
+增量文本纠错
+录音过程中逐段纠错实时转录结果（带上文窗口），维护纠错后的累积文本。
+停止录音时只需等待最后几段纠错完成，结束耗时与录音总长度无关。
+"""
+
+import time
+import queue
+import difflib
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+def map_offset(original: str, corrected: str, offset: int) -> int:
+    """
+    将原文中的位置映射到纠错后文本中的位置
+
+    跨越 offset 的修改归属到 offset 之前（即上文），保证上文与本段切分后拼接不重复、不遗漏。
+    """
+    if offset >= len(original):
+        return len(corrected)
+    matcher = difflib.SequenceMatcher(None, original, corrected, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if i1 <= offset < i2:
+            if tag == 'equal':
+                return j1 + (offset - i1)
+            return j1 if offset == i1 else j2
+        if tag == 'insert' and i1 == offset:
+            # 恰好在 offset 处插入的内容（如补标点）归属本段
+            return j1
+    return len(corrected)
+
+
+class IncrementalCorrector:
+    """
+    增量纠错器
+
+    - add_segment(): 由实时转录回调调用，立即返回
+    - 后台线程按顺序纠错：输入 = 上文（已纠错文本末尾 context_chars 字）+ 本段原文，
+      取纠错结果中本段对应部分
+    - finish(): 停止录音时调用，等待剩余分段纠错完成，返回完整纠错结果
+    """
+
+    def __init__(self, text_corrector, context_chars: int = 20,
+                 on_update: Optional[Callable[[int, str, str], None]] = None):
+        """
+        Args:
+            text_corrector: TextCorrector 实例（需提供 correct(text, confidence=None) -> Dict）
+            context_chars: 上文窗口长度（字）
+            on_update: 单段纠错完成回调 on_update(segment_index, corrected_segment, corrected_full_text)
+        """
+        self.text_corrector = text_corrector
+        self.context_chars = context_chars
+        self.on_update = on_update
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._current = None  # 正在纠错的分段
+        self._segments: List[Dict] = []
+        self._corrected_text = ""
+        self._raw_length = 0  # 已纠错分段的原文总长度
+        self._holding = False  # 是否持有纠错模型（录音期间不被模型管理器卸载）
+        self.stats = {
+            'segments': 0,
+            'corrected_segments': 0,
+            'correct_time_ms': 0,
+        }
+
+    @property
+    def corrected_text(self) -> str:
+        with self._lock:
+            return self._corrected_text
+
+    def start(self):
+        """开始新一次录音的增量纠错"""
+        self._queue = queue.Queue()
+        self._segments = []
+        self._corrected_text = ""
+        self._raw_length = 0
+        self.stats = {'segments': 0, 'corrected_segments': 0, 'correct_time_ms': 0}
+        self._hold_model()
+        self._thread = threading.Thread(target=self._worker, daemon=True, name="IncrementalCorrector")
+        self._thread.start()
+
+    def _hold_model(self):
+        hold = getattr(self.text_corrector, 'hold_model', None)
+        if hold is not None and not self._holding:
+            hold()
+            self._holding = True
+
+    def _release_model(self):
+        if self._holding:
+            self._holding = False
+            self.text_corrector.release_model()
+
+    def add_segment(self, text: str, segment_index: int = 0, confidence: Optional[float] = None):
+        """提交一段实时转录文本（confidence 为 ASR 识别置信度，高置信度分段只补标点）"""
+        if not text:
+            return
+        self.stats['segments'] += 1
+        self._queue.put((segment_index, text, confidence))
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            self._current = item
+            try:
+                self._correct_segment(*item)
+            except Exception as e:
+                print(f"[增量纠错] 第 {item[0]} 段纠错失败，保留原文: {e}")
+                self._append(item[0], item[1], item[1], [], 0)
+            finally:
+                self._current = None
+                self._queue.task_done()
+
+    def _correct_segment(self, segment_index: int, text: str, confidence: Optional[float] = None):
+        context = self.corrected_text[-self.context_chars:] if self.context_chars > 0 else ""
+        source = context + text
+        if confidence is None:
+            result = self.text_corrector.correct(source)
+        else:
+            result = self.text_corrector.correct(source, confidence=confidence)
+
+        corrected_source = result.get('corrected', source) if result.get('success') else source
+        if not corrected_source:
+            corrected_source = source
+
+        # 上文只用于提供语境，取出本段对应的纠错结果
+        start = map_offset(source, corrected_source, len(context))
+        corrected = corrected_source[start:]
+
+        changes = []
+        for change in result.get('changes') or []:
+            position = change.get('position')
+            if isinstance(position, int) and position >= len(context):
+                changes.append(dict(change, position=position - len(context)))
+
+        self._append(segment_index, text, corrected, changes, result.get('time_ms', 0))
+
+    def _append(self, segment_index: int, raw: str, corrected: str, changes: List[Dict], time_ms: int):
+        with self._lock:
+            # 变更位置换算为在完整原文中的位置（与 TextCorrector.correct()/correct_segments() 一致，
+            # 不受前面各段补标点等插入的影响）
+            offset = self._raw_length
+            for change in changes:
+                change['position'] += offset
+            self._segments.append({
+                'segment_index': segment_index,
+                'raw': raw,
+                'corrected': corrected,
+                'offset': offset,
+                'changes': changes,
+                'time_ms': time_ms,
+            })
+            self._corrected_text += corrected
+            self._raw_length += len(raw)
+            self._current = None
+            full_text = self._corrected_text
+        self.stats['corrected_segments'] += 1
+        self.stats['correct_time_ms'] += time_ms
+
+        if self.on_update:
+            try:
+                self.on_update(segment_index, corrected, full_text)
+            except Exception as e:
+                print(f"[增量纠错] 更新回调异常: {e}")
+
+    def finish(self, timeout: float = 60.0) -> Dict:
+        """
+        等待剩余分段纠错完成并返回结果
+
+        Returns:
+            {
+                "corrected": str,        # 纠错后的完整文本
+                "original": str,         # 原始完整文本
+                "changed": bool,
+                "changes": List[Dict],   # 位置基于原始完整文本
+                "pending_at_stop": int,  # 停止时尚未纠错的分段数
+                "finish_ms": int,        # 停止后等待的耗时
+                "time_ms": int,          # 累计纠错耗时
+            }
+        """
+        start_time = time.time()
+        pending = self._queue.qsize()
+        self._queue.put(None)
+        timed_out = False
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            timed_out = self._thread.is_alive()
+            if timed_out:
+                print(f"[增量纠错] 等待超时（{timeout}s），未完成的分段使用原文")
+            self._thread = None
+        self._release_model()
+
+        with self._lock:
+            segments = list(self._segments)
+            corrected = self._corrected_text
+            current = self._current if timed_out else None
+
+        # 超时未处理的分段按原文追加
+        done = len(segments)
+        remaining = [current[1]] if current else []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                remaining.append(item[1])
+        corrected += "".join(remaining)
+        if timed_out:
+            self._queue.put(None)  # 让仍在纠错的后台线程处理完当前段后退出
+
+        original = "".join(seg['raw'] for seg in segments) + "".join(remaining)
+        changes = [change for seg in segments for change in seg['changes']]
+        finish_ms = int((time.time() - start_time) * 1000)
+        print(f"[增量纠错] 完成: {done} 段，停止时待纠错 {pending} 段，收尾耗时 {finish_ms}ms")
+
+        return {
+            'corrected': corrected,
+            'original': original,
+            'changed': corrected != original,
+            'changes': changes,
+            'pending_at_stop': pending,
+            'finish_ms': finish_ms,
+            'time_ms': self.stats['correct_time_ms'],
+        }
+
+    def cancel(self):
+        """取消（录音取消时调用），丢弃未处理的分段"""
+        while True:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+            except queue.Empty:
+                break
+        self._queue.put(None)
+        self._thread = None
+        self._release_model()
@@ -0,0 +1,116 @@
+"""
+微批处理队列
+把多个线程并发提交的单条请求在短时间窗口内合并为一批，一次送入模型推理，
+再把结果分发回各自的调用方。用于文本纠错：并发的网页请求和实时分段
+不再逐条串行推理，而是共享一次批量前向计算。
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+
+class MicroBatcher:
+    """
+    微批处理器
+
+    - submit(item) 立即返回 Future
+    - 后台线程取到第一条请求后，最多再等待 max_wait_ms 毫秒或凑满 max_batch_size 条，
+      调用 batch_fn(items) → results（与 items 一一对应）
+    - batch_fn 抛出异常时，该批所有 Future 都设置为该异常
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 16, max_wait_ms: float = 20.0, name: str = "MicroBatcher"):
+        """
+        Args:
+            batch_fn: 批量处理函数
+            max_batch_size: 单批最大条数
+            max_wait_ms: 收到第一条请求后最长等待时间（毫秒）
+            name: 后台线程名
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._running = True
+        self._thread = threading.Thread(target=self._worker, daemon=True, name=name)
+        self._thread.start()
+
+        self.stats = {
+            'batches': 0,
+            'items': 0,
+            'max_batch': 0,
+            'batch_time_ms': 0,
+        }
+
+    def submit(self, item: Any) -> Future:
+        """提交一条请求"""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def submit_many(self, items: List[Any]) -> List[Future]:
+        """提交多条请求（可与其他线程的请求合并到同一批）"""
+        return [self.submit(item) for item in items]
+
+    def _collect(self) -> List:
+        """取一批请求：阻塞等待第一条，之后在窗口期内尽量凑满"""
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._running = False
+                break
+            batch.append(item)
+        return batch
+
+    def _worker(self):
+        while self._running:
+            batch = self._collect()
+            if not batch:
+                break
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+
+            start = time.time()
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"批处理结果数量不匹配: {len(results)} != {len(items)}")
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.stats['batches'] += 1
+            self.stats['items'] += len(items)
+            self.stats['max_batch'] = max(self.stats['max_batch'], len(items))
+            self.stats['batch_time_ms'] += int((time.time() - start) * 1000)
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join(timeout=2.0)
+
+    def get_stats(self) -> Dict:
+        batches = self.stats['batches']
+        return {
+            **self.stats,
+            'avg_batch_size': round(self.stats['items'] / batches, 2) if batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': int(self.max_wait * 1000),
+            'pending': self._queue.qsize(),
+        }
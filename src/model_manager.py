@@ -0,0 +1,379 @@
+"""
+模型内存管理
+ASR、文本纠错、声纹等模型共用一块 2~4GB 内存，这里统一登记各模型的常驻大小和最近使用时间：
+- 系统内存使用率达到高水位（/proc/meminfo）时，按优先级从低到高、最久未使用优先卸载，
+  直到降到低水位以下（两条水位线之间不动作，避免在阈值附近反复卸载/加载）
+- 后台检查不卸载刚加载或刚使用过的模型（min_resident_seconds），也不卸载被持有的模型
+  （如录音期间增量纠错持有纠错模型，见 hold()/release()）
+- 空闲超过一定时间的模型可主动卸载
+- 再次使用时按需重新加载并预热
+- 开始录音前预留内存，避免录音过程中发生交换
+"""
+
+import gc
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def read_meminfo() -> Dict[str, int]:
+    """读取 /proc/meminfo（单位 kB）"""
+    meminfo = {}
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2:
+                    meminfo[parts[0].rstrip(':')] = int(parts[1])
+    except Exception:
+        pass
+    return meminfo
+
+
+def get_memory_usage() -> Dict:
+    """系统内存使用情况 {"total_mb", "available_mb", "usage"}（usage 为 0~1）"""
+    meminfo = read_meminfo()
+    total = meminfo.get('MemTotal', 0)
+    available = meminfo.get('MemAvailable', meminfo.get('MemFree', 0))
+    return {
+        'total_mb': round(total / 1024, 1),
+        'available_mb': round(available / 1024, 1),
+        'usage': round((total - available) / total, 3) if total > 0 else 0.0,
+    }
+
+
+def get_process_rss_mb(pid: Optional[int] = None) -> float:
+    """进程常驻内存（MB），pid 为 None 时为当前进程；进程不存在时为 0"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except Exception:
+        pass
+    if psutil is not None:   # 没有 /proc 的系统
+        try:
+            process = psutil.Process(pid) if pid else psutil.Process()
+            return process.memory_info().rss / (1024 * 1024)
+        except Exception:
+            pass
+    return 0.0
+
+
+class ManagedModel:
+    """登记的模型"""
+
+    def __init__(self, name: str, load_fn: Callable, unload_fn: Callable, is_loaded_fn: Callable[[], bool],
+                 priority: int = 0, pinned: bool = False, warmup_fn: Optional[Callable] = None,
+                 size_hint_mb: float = 0.0, rss_fn: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.load_fn = load_fn
+        self.unload_fn = unload_fn
+        self.is_loaded_fn = is_loaded_fn
+        self.priority = priority
+        self.pinned = pinned
+        self.warmup_fn = warmup_fn
+        self.size_mb = size_hint_mb
+        self.rss_fn = rss_fn
+        self.last_used = time.time()
+        self.in_use = 0
+        self.loads = 0
+        self.evictions = 0
+        self.last_load_seconds = None
+        self.lock = threading.RLock()
+
+    def rss_mb(self) -> float:
+        """计量模型内存的进程常驻内存：模型在子进程中时为子进程（rss_fn），否则为当前进程"""
+        if self.rss_fn is not None:
+            try:
+                return float(self.rss_fn() or 0.0)
+            except Exception:
+                return 0.0
+        return get_process_rss_mb()
+
+    @property
+    def loaded(self) -> bool:
+        try:
+            return bool(self.is_loaded_fn())
+        except Exception:
+            return False
+
+
+class ModelManager:
+    """
+    模型内存管理器
+
+    用法:
+        manager.register('corrector', load_fn, unload_fn, is_loaded_fn, priority=1)
+        with manager.use('corrector'):   # 未加载时先加载并预热，使用期间不会被卸载
+            corrector.correct(text)
+    """
+
+    def __init__(self, memory_threshold: float = 0.8, idle_unload_seconds: float = 0,
+                 check_interval: float = 5.0, memory_low_threshold: Optional[float] = None,
+                 min_resident_seconds: float = 0.0):
+        """
+        Args:
+            memory_threshold: 内存使用率高水位（0~1），达到时卸载低优先级模型
+            idle_unload_seconds: 模型空闲多久后卸载（0 表示只在内存紧张时卸载）
+            check_interval: 后台检查间隔（秒）
+            memory_low_threshold: 内存使用率低水位，卸载到低于此值为止（默认比高水位低 0.1）
+            min_resident_seconds: 后台检查时，加载或使用后至少保留多久才可卸载（秒）
+        """
+        self.memory_threshold = memory_threshold
+        if memory_low_threshold is None:
+            memory_low_threshold = max(memory_threshold - 0.1, 0.0)
+        self.memory_low_threshold = min(memory_low_threshold, memory_threshold)
+        self.min_resident_seconds = min_resident_seconds
+        self.idle_unload_seconds = idle_unload_seconds
+        self.check_interval = check_interval
+
+        self._models: Dict[str, ManagedModel] = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self.stats = {
+            'pressure_events': 0,
+            'evictions': 0,
+            'reloads': 0,
+            'last_eviction': None,
+        }
+
+    # ==================== 登记 ====================
+
+    def register(self, name: str, load_fn: Callable, unload_fn: Callable, is_loaded_fn: Callable[[], bool],
+                 priority: int = 0, pinned: bool = False, warmup_fn: Optional[Callable] = None,
+                 size_hint_mb: float = 0.0, rss_fn: Optional[Callable[[], float]] = None) -> ManagedModel:
+        """
+        登记模型
+
+        Args:
+            priority: 优先级，数值越小越先被卸载
+            pinned: 常驻模型（只统计，不卸载）
+            warmup_fn: 重新加载后的预热函数
+            size_hint_mb: 预估大小（首次实际加载后以测得的常驻内存增量为准）
+            rss_fn: 模型在独立子进程中运行时，返回该子进程常驻内存（MB）的函数（未运行时为 0）
+        """
+        model = ManagedModel(name, load_fn, unload_fn, is_loaded_fn, priority=priority, pinned=pinned,
+                             warmup_fn=warmup_fn, size_hint_mb=size_hint_mb, rss_fn=rss_fn)
+        with self._lock:
+            self._models[name] = model
+        print(f"[模型管理] 登记 {name}（优先级 {priority}{', 常驻' if pinned else ''}）")
+        return model
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._models.pop(name, None)
+
+    # ==================== 使用 / 加载 ====================
+
+    def touch(self, name: str):
+        """标记模型刚被使用"""
+        model = self._models.get(name)
+        if model:
+            model.last_used = time.time()
+
+    @contextmanager
+    def use(self, name: str):
+        """使用模型：按需加载，使用期间不会被卸载"""
+        model = self._models.get(name)
+        if model is None:
+            yield
+            return
+        with model.lock:
+            model.in_use += 1
+        try:
+            self.ensure_loaded(name)
+            yield
+        finally:
+            with model.lock:
+                model.in_use -= 1
+                model.last_used = time.time()
+
+    def hold(self, name: str):
+        """
+        持有模型（不加载）：持有期间不会被卸载，用于跨多次调用的长时间使用（如整个录音期间的增量纠错）
+        与 release() 成对调用
+        """
+        model = self._models.get(name)
+        if model is not None:
+            with model.lock:
+                model.in_use += 1
+
+    def release(self, name: str):
+        """释放 hold() 的持有"""
+        model = self._models.get(name)
+        if model is not None:
+            with model.lock:
+                model.in_use = max(model.in_use - 1, 0)
+                model.last_used = time.time()
+
+    def ensure_loaded(self, name: str) -> bool:
+        """确保模型已加载（加载前先按需腾出内存，加载后预热）"""
+        model = self._models.get(name)
+        if model is None:
+            return False
+        with model.lock:
+            if model.loaded:
+                return True
+            if model.size_mb:
+                self.ensure_headroom(model.size_mb, exclude=name)
+
+            start_time = time.time()
+            rss_before = model.rss_mb()
+            try:
+                model.load_fn()
+            except Exception as e:
+                print(f"[模型管理] {name} 加载失败: {e}")
+                return False
+            if model.warmup_fn:
+                try:
+                    model.warmup_fn()
+                except Exception as e:   # 预热失败不影响已加载的模型
+                    print(f"[模型管理] {name} 预热失败: {e}")
+
+            model.last_load_seconds = round(time.time() - start_time, 2)
+            grown = model.rss_mb() - rss_before
+            if grown > 1:
+                model.size_mb = round(grown, 1)
+            if model.loads > 0 or model.evictions > 0:
+                self.stats['reloads'] += 1
+            model.loads += 1
+            model.last_used = time.time()
+            print(f"[模型管理] {name} 已加载（{model.last_load_seconds}s, 约 {model.size_mb:.0f}MB）")
+            return True
+
+    # ==================== 卸载 ====================
+
+    def unload(self, name: str, reason: str = "手动") -> bool:
+        """卸载模型（常驻或使用中的模型不卸载）"""
+        model = self._models.get(name)
+        if model is None or model.pinned:
+            return False
+        if not model.lock.acquire(blocking=False):
+            return False
+        try:
+            if model.in_use > 0 or not model.loaded:
+                return False
+            rss_before = model.rss_mb()
+            try:
+                model.unload_fn()
+            except Exception as e:
+                print(f"[模型管理] {name} 卸载失败: {e}")
+                return False
+            gc.collect()
+            freed = rss_before - model.rss_mb()
+            model.evictions += 1
+            self.stats['evictions'] += 1
+            self.stats['last_eviction'] = {
+                'model': name,
+                'reason': reason,
+                'freed_mb': round(max(freed, 0), 1),
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            print(f"[模型管理] 卸载 {name}（{reason}，释放约 {max(freed, 0):.0f}MB）")
+            return True
+        finally:
+            model.lock.release()
+
+    def _eviction_candidates(self, exclude: Optional[str] = None):
+        """可卸载的模型：优先级低、最久未使用的在前"""
+        with self._lock:
+            models = list(self._models.values())
+        candidates = [m for m in models
+                      if not m.pinned and m.in_use == 0 and m.name != exclude and m.loaded]
+        return sorted(candidates, key=lambda m: (m.priority, m.last_used))
+
+    def ensure_headroom(self, required_mb: float = 0.0, exclude: Optional[str] = None,
+                        min_idle_seconds: float = 0.0) -> bool:
+        """
+        腾出内存：使用率达到高水位或可用内存少于 required_mb 时卸载模型，
+        直到使用率低于低水位且可用内存不少于 required_mb
+
+        Args:
+            min_idle_seconds: 只卸载至少空闲这么久的模型
+
+        Returns:
+            使用率是否低于高水位且可用内存不少于 required_mb
+        """
+        def satisfied(threshold):
+            memory = get_memory_usage()
+            if memory['total_mb'] <= 0:
+                return True
+            return memory['usage'] < threshold and memory['available_mb'] >= required_mb
+
+        if satisfied(self.memory_threshold):
+            return True
+        self.stats['pressure_events'] += 1
+        now = time.time()
+        for model in self._eviction_candidates(exclude):
+            if now - model.last_used < min_idle_seconds:
+                continue
+            self.unload(model.name, reason="内存紧张")
+            if satisfied(self.memory_low_threshold):
+                return True
+        return satisfied(self.memory_threshold)
+
+    def check(self):
+        """检查一次：内存紧张时卸载，空闲超时的模型卸载（刚加载或刚使用过的模型保留）"""
+        self.ensure_headroom(min_idle_seconds=self.min_resident_seconds)
+        if self.idle_unload_seconds > 0:
+            now = time.time()
+            for model in self._eviction_candidates():
+                if now - model.last_used > max(self.idle_unload_seconds, self.min_resident_seconds):
+                    self.unload(model.name, reason=f"空闲超过 {self.idle_unload_seconds:.0f}s")
+
+    # ==================== 后台监控 ====================
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._monitor, daemon=True, name="ModelManager")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _monitor(self):
+        while self._running:
+            try:
+                self.check()
+            except Exception as e:
+                print(f"[模型管理] 检查异常: {e}")
+            time.sleep(self.check_interval)
+
+    def get_status(self) -> Dict:
+        """内存和各模型驻留情况"""
+        now = time.time()
+        with self._lock:
+            models = list(self._models.values())
+        return {
+            'memory': get_memory_usage(),
+            'process_rss_mb': round(get_process_rss_mb(), 1),
+            'memory_threshold': self.memory_threshold,
+            'memory_low_threshold': self.memory_low_threshold,
+            'min_resident_seconds': self.min_resident_seconds,
+            'idle_unload_seconds': self.idle_unload_seconds,
+            'models': {
+                m.name: {
+                    'loaded': m.loaded,
+                    'size_mb': m.size_mb,
+                    'priority': m.priority,
+                    'pinned': m.pinned,
+                    'in_use': m.in_use,
+                    'idle_seconds': round(now - m.last_used, 1),
+                    'loads': m.loads,
+                    'evictions': m.evictions,
+                    'last_load_seconds': m.last_load_seconds,
+                }
+                for m in models
+            },
+            **self.stats,
+        }
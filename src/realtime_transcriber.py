@@ -142,8 +142,9 @@ class RealtimeTranscriber:
                 
                 # 音频质量检查
                 import numpy as np
+                rms = None
                 if isinstance(audio_segment, np.ndarray):
-                    rms = np.sqrt(np.mean(audio_segment ** 2))
+                    rms = float(np.sqrt(np.mean(audio_segment ** 2)))
                     if rms < 0.001:
                         print(f"[实时转录] 分段 #{segment_idx} 音量过低 (RMS={rms:.4f})，跳过")
                         continue
@@ -153,17 +154,25 @@ class RealtimeTranscriber:
                 print(f"[实时转录] 开始转录分段 #{segment_idx}（排队: {queue_delay:.2f}秒）")
                 
                 try:
-                    # 调用ASR引擎转录
-                    result = self.asr_engine.transcribe_stream(audio_segment)
-                    transcribe_time = time.time() - start_time
-                    
-                    # 提取文本
-                    if result and 'text' in result:
-                        text = result['text'].strip()
-                    elif isinstance(result, str):
-                        text = result.strip()
+                    confidence = None
+                    if 'text' in metadata:
+                        # 单遍端点模式：分段时已由流式识别器解码，跳过重复转录
+                        text = metadata['text'].strip()
+                        transcribe_time = metadata.get('transcribe_time', 0)
+                        confidence = metadata.get('confidence')
                     else:
-                        text = ""
+                        # 调用ASR引擎转录（结果中带识别置信度）
+                        result = self.asr_engine.transcribe(audio_segment)
+                        transcribe_time = time.time() - start_time
+                        
+                        # 提取文本
+                        if isinstance(result, dict):
+                            text = (result.get('text') or '').strip()
+                            confidence = result.get('confidence')
+                        elif isinstance(result, str):
+                            text = result.strip()
+                        else:
+                            text = ""
                     
                     # 更新统计
                     self.stats['segments_count'] += 1
@@ -181,8 +190,10 @@ class RealtimeTranscriber:
                             'segment_index': segment_idx,
                             'transcribe_time': transcribe_time,
                             'queue_delay': queue_delay,
+                            'rms': rms,
                             'total_segments': self.stats['segments_count'],
-                            **metadata  # 合并原始元数据
+                            **metadata,  # 合并原始元数据
+                            'confidence': confidence
                         }
                         
                         # 调用用户回调
@@ -0,0 +1,473 @@
+"""
+录音元数据索引
+录音仍以文本文件保存（按日期分目录），这里用 SQLite 维护一份元数据索引，
+列表/详情/计数直接查索引，不再逐个读取并解析文件头：
+- FileStorage 每次保存、更新、删除时同步写入索引
+- 首次使用（索引为空）或执行 deploy/storage_tool.py rebuild 时全量扫描重建
+- 同步工具在程序之外改动的文件由目录监听（storage_watcher）增量同步
+
+全文检索（FTS5）：
+中文没有空格分词，写入前把连续汉字切成重叠的二元组（"今天天气" → "今天 天天 天气 气"，
+每段末字另记一个单字），查询词按同样方式切分后作为短语匹配，单字查询用前缀匹配。
+原始文本和纠正文本都参与检索，结果按 bm25 排序，摘要高亮在原文上计算。
+SQLite 未编译 FTS5 时退化为 LIKE 扫描。
+"""
+
+import re
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 索引结构版本（结构变化时递增，旧索引自动重建）
+INDEX_VERSION = 2
+
+PREVIEW_CHARS = 50
+# 录音音频扩展名（按优先级：原始 WAV、无损压缩的 FLAC，之后是存储维护压缩后的归档）
+AUDIO_SUFFIXES = ('.wav', '.flac', '.opus', '.mp3')
+
+_COLUMNS = ('key', 'id', 'date', 'time', 'duration', 'word_count', 'preview', 'content',
+            'corrected_content', 'file_path', 'corrected_path', 'audio_path', 'saved_at', 'mtime')
+
+
+_CJK_RUN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_TOKEN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9A-Za-z\u00c0-\u024f]+')
+
+
+def cjk_tokens(text: Optional[str]) -> str:
+    """检索分词：汉字切为重叠二元组（每段末字另记单字），字母数字按词小写"""
+    if not text:
+        return ""
+    tokens = []
+    for match in _TOKEN.finditer(text):
+        run = match.group()
+        if _CJK_RUN.fullmatch(run):
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run.lower())
+    return " ".join(tokens)
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    查询串 → FTS5 MATCH 表达式
+
+    查询按文字切成段（连续汉字、连续字母数字，空格和标点处也断开），每段一个子句，子句之间为 AND：
+    多字汉字段: 二元组短语（要求相邻）；单字: 前缀匹配（以该字开头的二元组或段末单字）；字母数字: 小写词。
+    段与段之间不要求相邻——索引中每段汉字末尾另有单字词条，跨段的短语（如 "今天3点"）永远无法匹配
+    """
+    clauses = []
+    for match in _TOKEN.finditer(query):
+        run = match.group()
+        if not _CJK_RUN.fullmatch(run):
+            clauses.append(f'"{run.lower()}"')
+        elif len(run) == 1:
+            clauses.append(f'"{run}"*')
+        else:
+            clauses.append('"' + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+    clauses = list(dict.fromkeys(clauses))
+    return " AND ".join(clauses) if clauses else None
+
+
+def make_snippet(text: str, query: str, context: int = 30,
+                 open_tag: str = "<mark>", close_tag: str = "</mark>") -> str:
+    """截取第一个命中词附近的文本并高亮所有命中词（输出前已做 HTML 转义）"""
+    import html
+    if not text:
+        return ""
+    terms = sorted({t for t in query.split() if t}, key=len, reverse=True)
+    lowered = text.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [p for p in positions if p >= 0]
+    first = min(positions) if positions else 0
+    start = max(0, first - context)
+    end = min(len(text), first + context * 2)
+    window = text[start:end]
+
+    if terms:
+        pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+        pieces = []
+        last = 0
+        for match in pattern.finditer(window):
+            pieces.append(html.escape(window[last:match.start()]))
+            pieces.append(open_tag + html.escape(match.group()) + close_tag)
+            last = match.end()
+        pieces.append(html.escape(window[last:]))
+        snippet = "".join(pieces)
+    else:
+        snippet = html.escape(window)
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(text) else "")
+
+
+def extract_body(content: str) -> Optional[str]:
+    """取出文件头 "---" 与文件尾 "---" 之间的正文（没有分隔符时返回 None）"""
+    content_start = content.find('---\n') + 4
+    content_end = content.rfind('\n---')
+    if content_start > 3 and content_end > content_start:
+        return content[content_start:content_end].strip()
+    return None
+
+
+def make_preview(text: str) -> str:
+    if not text:
+        return "无内容"
+    return text[:PREVIEW_CHARS] + '...' if len(text) > PREVIEW_CHARS else text
+
+
+def find_audio(date_dir: Path, stem: str) -> Optional[Path]:
+    """录音的音频文件：原始 WAV、FLAC，或存储维护压缩后的归档（15-30.opus）"""
+    for suffix in AUDIO_SUFFIXES:
+        path = date_dir / f"{stem}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def parse_recording_file(file_path: Path) -> Dict:
+    """解析录音文本文件（文件名格式：15-30.txt 或 15-30_2.txt），返回索引行"""
+    file_path = Path(file_path)
+    date_dir = file_path.parent
+    date_str = date_dir.name
+    time_str = file_path.stem.split('_')[0]
+    content = file_path.read_text(encoding='utf-8')
+
+    duration = 0.0
+    word_count = len(content)
+    saved_at = None
+    for line in content.split('\n'):
+        if line.startswith('录音时长:'):
+            duration = float(line.split(':')[1].replace('秒', '').strip())
+        elif line.startswith('文字长度:'):
+            word_count = int(line.split(':')[1].replace('字', '').strip())
+        elif line.startswith('保存时间:') or line.startswith('更新时间:'):
+            saved_at = line.split(':', 1)[1].strip()
+
+    body = extract_body(content)
+    text = body if body is not None else ""
+
+    corrected_content = None
+    corrected_path = date_dir / f"{file_path.stem}.corrected.txt"
+    if corrected_path.exists():
+        corrected_body = extract_body(corrected_path.read_text(encoding='utf-8'))
+        corrected_content = corrected_body
+    audio_path = find_audio(date_dir, file_path.stem)
+    # 文本或纠错文本任一更新都会改变 mtime（目录监听/一致性检查据此判断索引是否过期）
+    mtime = file_path.stat().st_mtime
+    if corrected_path.exists():
+        mtime = max(mtime, corrected_path.stat().st_mtime)
+
+    return {
+        'key': f"{date_str}/{file_path.stem}",
+        'id': f"{date_str}/{time_str}",
+        'date': date_str,
+        'time': time_str.replace('-', ':'),
+        'duration': duration,
+        'word_count': word_count,
+        'preview': make_preview(text) if body is not None else "无内容",
+        'content': text,
+        'corrected_content': corrected_content,
+        'file_path': str(file_path),
+        'corrected_path': str(corrected_path) if corrected_content is not None else None,
+        'audio_path': str(audio_path) if audio_path is not None else None,
+        'saved_at': saved_at,
+        'mtime': mtime,
+    }
+
+
+class RecordingIndex:
+    """录音元数据索引（线程安全）"""
+
+    def __init__(self, db_path):
+        """
+        Args:
+            db_path: SQLite 文件路径（":memory:" 表示仅内存）
+        """
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+
+        if self.db_path != ':memory:':
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function("cjk_tokens", 1, cjk_tokens, deterministic=True)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        self.created = version != INDEX_VERSION
+        if self.created:
+            self._conn.execute("DROP TABLE IF EXISTS recordings_fts")
+            self._conn.execute("DROP TABLE IF EXISTS recordings")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS recordings (
+                key TEXT PRIMARY KEY,
+                id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                time TEXT NOT NULL,
+                duration REAL NOT NULL DEFAULT 0,
+                word_count INTEGER NOT NULL DEFAULT 0,
+                preview TEXT NOT NULL DEFAULT '',
+                content TEXT NOT NULL DEFAULT '',
+                corrected_content TEXT,
+                file_path TEXT NOT NULL,
+                corrected_path TEXT,
+                audio_path TEXT,
+                saved_at TEXT,
+                mtime REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_recordings_date_time ON recordings(date, time)")
+
+        # 全文检索表（rowid 与 recordings 一致，存放分词后的文本）
+        try:
+            self._conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS recordings_fts
+                USING fts5(original, corrected, tokenize='unicode61')
+            """)
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            print(f"[录音索引] SQLite 不支持 FTS5，检索使用 LIKE 扫描: {e}")
+            self.fts_enabled = False
+
+        self._conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self._conn.commit()
+
+    def _sync_fts(self, key: str = None):
+        """按 recordings 表同步检索表（key 为 None 时全量），调用方持有锁"""
+        if not self.fts_enabled:
+            return
+        if key is None:
+            self._conn.execute("DELETE FROM recordings_fts")
+            self._conn.execute(
+                "INSERT INTO recordings_fts (rowid, original, corrected) "
+                "SELECT rowid, cjk_tokens(content), cjk_tokens(corrected_content) FROM recordings"
+            )
+            return
+        self._conn.execute(
+            "INSERT INTO recordings_fts (rowid, original, corrected) "
+            "SELECT rowid, cjk_tokens(content), cjk_tokens(corrected_content) FROM recordings WHERE key = ?",
+            (key,)
+        )
+
+    def _delete_fts(self, key: str):
+        if not self.fts_enabled:
+            return
+        self._conn.execute(
+            "DELETE FROM recordings_fts WHERE rowid IN (SELECT rowid FROM recordings WHERE key = ?)", (key,)
+        )
+
+    # ==================== 写入 ====================
+
+    def upsert(self, row: Dict):
+        values = [row.get(column) for column in _COLUMNS]
+        with self._lock:
+            self._delete_fts(row['key'])
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO recordings ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                values
+            )
+            self._sync_fts(row['key'])
+            self._conn.commit()
+
+    def update(self, key: str, **fields) -> bool:
+        """更新部分字段，返回记录是否存在"""
+        fields = {k: v for k, v in fields.items() if k in _COLUMNS and k != 'key'}
+        if not fields:
+            return False
+        text_changed = 'content' in fields or 'corrected_content' in fields
+        with self._lock:
+            if text_changed:
+                self._delete_fts(key)
+            cursor = self._conn.execute(
+                f"UPDATE recordings SET {', '.join(f'{k} = ?' for k in fields)} WHERE key = ?",
+                [*fields.values(), key]
+            )
+            if text_changed:
+                self._sync_fts(key)
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def delete(self, key: str):
+        with self._lock:
+            self._delete_fts(key)
+            self._conn.execute("DELETE FROM recordings WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def upsert_many(self, rows: List[Dict]):
+        """批量写入（单个事务）"""
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO recordings ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                [[row.get(column) for column in _COLUMNS] for row in rows]
+            )
+            self._sync_fts()
+            self._conn.commit()
+
+    def rebuild(self, base_path) -> int:
+        """扫描存储目录全量重建索引，返回录音数"""
+        start_time = time.time()
+        rows = []
+        for date_dir in sorted(Path(base_path).iterdir()):
+            if not date_dir.is_dir():
+                continue
+            for file_path in date_dir.glob("*.txt"):
+                if '.corrected' in file_path.stem:
+                    continue
+                try:
+                    rows.append(parse_recording_file(file_path))
+                except Exception as e:
+                    print(f"[录音索引] 解析文件失败: {file_path}, 错误: {e}")
+
+        with self._lock:
+            self._conn.execute("DELETE FROM recordings")
+        self.upsert_many(rows)
+        print(f"[录音索引] 重建完成: {len(rows)} 条录音 ({time.time() - start_time:.2f}s)")
+        return len(rows)
+
+    # ==================== 查询 ====================
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM recordings WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def query(self, date: Optional[str] = None, limit: int = 20, before: Optional[str] = None,
+              date_from: Optional[str] = None, date_to: Optional[str] = None,
+              has_correction: Optional[bool] = None, with_content: bool = True) -> List[Dict]:
+        """
+        按录音时间倒序
+
+        Args:
+            before: 游标（上一页最后一条的 key），只返回排在它之后的录音；游标不存在时返回空列表
+            date_from / date_to / has_correction: 同 search()
+            with_content: False 时不读取全文列（列表页用），行中以 has_corrected 代替 corrected_content
+        """
+        columns = "*" if with_content else ", ".join(
+            [c for c in _COLUMNS if c not in ('content', 'corrected_content')]
+            + ["corrected_content IS NOT NULL AS has_corrected"])
+        filters, params = self._filters(date_from=date_from, date_to=date_to, has_correction=has_correction)
+        if date:
+            filters.append("date = ?")
+            params.append(date)
+        with self._lock:
+            if before:
+                cursor = self._conn.execute("SELECT date, time FROM recordings WHERE key = ?", (before,)).fetchone()
+                if cursor is None:
+                    return []
+                filters.append("(date, time, key) < (?, ?, ?)")
+                params.extend([cursor['date'], cursor['time'], before])
+            sql = f"SELECT {columns} FROM recordings"
+            if filters:
+                sql += " WHERE " + " AND ".join(filters)
+            sql += " ORDER BY date DESC, time DESC, key DESC LIMIT ?"
+            rows = self._conn.execute(sql, params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _filters(date_from: Optional[str] = None, date_to: Optional[str] = None,
+                 has_correction: Optional[bool] = None, prefix: str = ""):
+        filters = []
+        params: List = []
+        if date_from:
+            filters.append(f"{prefix}date >= ?")
+            params.append(date_from)
+        if date_to:
+            filters.append(f"{prefix}date <= ?")
+            params.append(date_to)
+        if has_correction is not None:
+            filters.append(f"{prefix}corrected_content IS NOT NULL" if has_correction
+                           else f"{prefix}corrected_content IS NULL")
+        return filters, params
+
+    def search(self, query: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+               has_correction: Optional[bool] = None, limit: int = 20, offset: int = 0) -> Dict:
+        """
+        全文检索
+
+        Args:
+            query: 关键词（空格分隔的多个词须同时出现）
+            date_from / date_to: 日期范围（含，格式 2026-01-21）
+            has_correction: True 只查有纠正文本的录音，False 只查没有的
+        
+        Returns:
+            {"total": int, "rows": [索引行 + "score"]}，按相关度排序
+        """
+        filters, params = self._filters(date_from=date_from, date_to=date_to,
+                                        has_correction=has_correction, prefix="r.")
+
+        if self.fts_enabled:
+            match = build_match_query(query)
+            if match is None:
+                return {'total': 0, 'rows': []}
+            where = " AND ".join(["recordings_fts MATCH ?"] + filters)
+            source = "recordings_fts JOIN recordings r ON r.rowid = recordings_fts.rowid"
+            score = "bm25(recordings_fts)"
+            params = [match] + params
+        else:
+            terms = query.split()
+            if not terms:
+                return {'total': 0, 'rows': []}
+            for term in terms:
+                filters.append("(r.content LIKE ? OR COALESCE(r.corrected_content, '') LIKE ?)")
+                params.extend([f"%{term}%", f"%{term}%"])
+            where = " AND ".join(filters)
+            source = "recordings r"
+            score = "0"
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM {source} WHERE {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT r.*, {score} AS score FROM {source} WHERE {where} "
+                f"ORDER BY score, r.date DESC, r.time DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return {'total': total, 'rows': [dict(row) for row in rows]}
+
+    def count(self, date: Optional[str] = None) -> int:
+        with self._lock:
+            if date:
+                return self._conn.execute("SELECT COUNT(*) FROM recordings WHERE date = ?", (date,)).fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM recordings").fetchone()[0]
+
+    def daily_totals(self) -> List[Dict]:
+        """按天汇总 {"date", "count", "duration", "words"}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, COUNT(*) AS count, COALESCE(SUM(duration), 0) AS duration, "
+                "COALESCE(SUM(word_count), 0) AS words FROM recordings GROUP BY date"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def file_states(self, date: Optional[str] = None) -> List[Dict]:
+        """各录音的文件状态 {"key", "mtime", "corrected_path", "audio_path"}（一致性检查用，不读取全文列）"""
+        sql = "SELECT key, mtime, corrected_path, audio_path FROM recordings"
+        with self._lock:
+            if date:
+                rows = self._conn.execute(sql + " WHERE date = ?", (date,)).fetchall()
+            else:
+                rows = self._conn.execute(sql).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(duration), 0), COUNT(DISTINCT date), "
+                "SUM(corrected_content IS NOT NULL), SUM(audio_path IS NOT NULL) FROM recordings"
+            ).fetchone()
+        return {
+            'db_path': self.db_path,
+            'recordings': row[0],
+            'total_duration': round(row[1], 1),
+            'days': row[2],
+            'corrected': row[3] or 0,
+            'with_audio': row[4] or 0,
+            'fts_enabled': self.fts_enabled,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
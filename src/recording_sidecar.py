@@ -0,0 +1,162 @@
+"""
+录音结构化元数据（JSON 附属文件）
+文本文件 15-30.txt 面向人阅读，机器读取的元数据另存为同名 15-30.json：
+- 识别分段时间线：每段的起始时间、时长、文本、置信度、音量、转写耗时
+- 产生结果的引擎和模型（识别、纠错）
+- 纠错记录（每次纠错的引擎、修改详情、耗时）
+
+读取方直接解析 JSON，不再从文本文件头按字符串查找；分段起始时间可用于音频定位和按段重新处理。
+结构变化时递增 SIDECAR_VERSION，读取时兼容旧版本缺失的字段。
+"""
+
+import os
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+SIDECAR_VERSION = 1
+SIDECAR_SUFFIX = ".json"
+
+# 分段元数据中保存的字段（来自 VAD/端点分段器和实时转录器的回调元数据）
+_SEGMENT_FIELDS = {
+    'start_time': 'start',
+    'start': 'start',
+    'end': 'end',
+    'duration': 'duration',
+    'confidence': 'confidence',
+    'rms': 'rms',
+    'transcribe_time': 'transcribe_time',
+    'queue_delay': 'queue_delay',
+    'engine': 'engine',
+    'segmenter': 'segmenter',
+}
+
+
+def sidecar_path(text_path) -> Path:
+    """文本文件对应的附属文件路径（15-30_2.txt → 15-30_2.json）"""
+    text_path = Path(text_path)
+    return text_path.with_name(text_path.stem + SIDECAR_SUFFIX)
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _number(value):
+    if value is None:
+        return None
+    try:
+        return round(float(value), 4)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_segment(text: str, metadata: Optional[Dict] = None, index: Optional[int] = None) -> Dict:
+    """
+    由分段文本和分段元数据构造时间线条目
+
+    Args:
+        text: 分段识别文本
+        metadata: 分段元数据（start_time/start, end, duration, confidence, rms, transcribe_time 等）
+        index: 分段序号（默认取 metadata['segment_index']）
+    """
+    metadata = metadata or {}
+    segment = {'index': index if index is not None else metadata.get('segment_index'), 'text': text}
+    for source, target in _SEGMENT_FIELDS.items():
+        if target in segment or metadata.get(source) is None:
+            continue
+        value = metadata[source]
+        segment[target] = value if isinstance(value, str) else _number(value)
+    if segment.get('duration') is None and segment.get('end') is not None and segment.get('start') is not None:
+        segment['duration'] = _number(segment['end'] - segment['start'])
+    return segment
+
+
+def build_sidecar(recording_id: str, duration: float = 0, segments: Iterable[Dict] = (),
+                  asr: Optional[Dict] = None, mode: Optional[str] = None, sample_rate: int = 16000) -> Dict:
+    """
+    新录音的附属文件内容
+
+    Args:
+        recording_id: 录音 ID
+        duration: 录音时长（秒）
+        segments: build_segment() 生成的分段
+        asr: 识别引擎信息（ASR 引擎 get_info() 的结果）
+        mode: 转写方式（"realtime" 实时分段 / "full" 整段转写）
+    """
+    now = _now()
+    segments = [dict(segment, index=i if segment.get('index') is None else segment['index'])
+                for i, segment in enumerate(segments)]
+    return {
+        'version': SIDECAR_VERSION,
+        'id': recording_id,
+        'created_at': now,
+        'updated_at': now,
+        'duration': _number(duration) or 0,
+        'sample_rate': sample_rate,
+        'mode': mode,
+        'asr': asr or {},
+        'segments': segments,
+        'corrections': [],
+    }
+
+
+def load_sidecar(path) -> Optional[Dict]:
+    """读取附属文件（不存在或无法解析时返回 None）"""
+    try:
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get('version'), int):
+        return None
+    data.setdefault('segments', [])
+    data.setdefault('corrections', [])
+    data.setdefault('asr', {})
+    return data
+
+
+def write_sidecar(path, data: Dict):
+    """写入附属文件（先写临时文件再替换）"""
+    path = Path(path)
+    data['updated_at'] = _now()
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def correction_record(changes, engine: Optional[Dict] = None, time_ms: Optional[int] = None,
+                      source: str = "auto", **extra) -> Dict:
+    """
+    纠错记录
+
+    Args:
+        changes: 修改详情
+        engine: 纠错引擎信息 {"engine", "model_path"}
+        time_ms: 纠错耗时
+        source: "auto" 自动纠错 / "manual" 网页手动保存
+    """
+    record = {'at': _now(), 'source': source, 'engine': engine or {}, 'changes': changes}
+    if time_ms is not None:
+        record['time_ms'] = time_ms
+    record.update(extra)
+    return record
+
+
+def segment_at(sidecar: Dict, seconds: float) -> Optional[Dict]:
+    """时间点所在（或之前最近）的分段，用于音频定位"""
+    found = None
+    for segment in timeline(sidecar):
+        start = segment.get('start')
+        if start is None:
+            continue
+        if start > seconds:
+            break
+        found = segment
+    return found
+
+
+def timeline(sidecar: Dict) -> List[Dict]:
+    """分段时间线（按起始时间排序，缺少起始时间的分段排在最后）"""
+    return sorted(sidecar.get('segments', []),
+                  key=lambda s: (s.get('start') is None, s.get('start') or 0, s.get('index') or 0))
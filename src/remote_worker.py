@@ -0,0 +1,553 @@
+"""
+局域网算力卸载
+把 ASR 转录和文本纠错发送到局域网内的工作节点（如闲置的台式机），
+节点超时或不可用时透明回退到设备本地引擎。
+
+协议（HTTP + JSON，标准库实现，工作节点与设备使用相同的引擎接口）:
+- GET  /health          → {"success": true, "capabilities": {"asr": bool, "asr_engine": str, "correct": bool}, "busy": int}
+- POST /asr/transcribe  → 请求体为 float32 小端 PCM，X-Sample-Rate 头指定采样率（非 16kHz 时节点重采样，无效值返回 400）；返回 engine.transcribe() 结果
+- POST /correct         → 请求体 {"text": "...", "confidence": float 或 null}；返回 TextCorrector.correct() 结果
+- POST /correct/batch   → 请求体 {"texts": [...], "confidences": [...] 或 null}；返回 {"success": true, "results": [...]}
+- POST /correct/segments → 请求体 {"segments": [{"text", "confidence"}, ...]}；返回 TextCorrector.correct_segments() 结果
+设置共享令牌时，所有请求需带 X-Offload-Token 头，否则返回 401。
+工作节点默认只监听本机；对局域网开放时应同时设置令牌。
+
+工作节点启动: python deploy/offload_worker.py --host 0.0.0.0 --port 8765 --token <令牌>
+"""
+
+import hmac
+import json
+import time
+import threading
+import urllib.request
+import urllib.error
+import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, List, Optional
+
+from src.asr_base import BaseASREngine
+
+
+TOKEN_HEADER = 'X-Offload-Token'
+
+# 请求体大小上限：转录为 float32 PCM（16kHz 下 256MB 约 70 分钟），纠错为 JSON 文本
+MAX_AUDIO_BODY_BYTES = 256 * 1024 * 1024
+MAX_JSON_BODY_BYTES = 1024 * 1024
+
+# ASR 引擎的输入采样率
+ASR_SAMPLE_RATE = 16000
+
+
+def resample_audio(audio: np.ndarray, sample_rate: int, target_rate: int = ASR_SAMPLE_RATE) -> np.ndarray:
+    """线性插值重采样（语音转录足够，不依赖 scipy）"""
+    if sample_rate == target_rate or len(audio) == 0:
+        return audio
+    length = max(int(round(len(audio) * target_rate / sample_rate)), 1)
+    positions = np.arange(length) * (sample_rate / target_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+# ==================== 工作节点（服务端） ====================
+
+class WorkerServer:
+    """算力工作节点，对外提供 ASR 和纠错服务"""
+
+    def __init__(self, asr_engine: Optional[BaseASREngine] = None, text_corrector=None,
+                 host: str = '127.0.0.1', port: int = 8765, token: Optional[str] = None):
+        """
+        Args:
+            asr_engine: 本节点的 ASR 引擎（None 表示不提供转录）
+            text_corrector: 本节点的文本纠错器（None 表示不提供纠错）
+            host: 监听地址（默认只监听本机，局域网使用时设为 0.0.0.0 并设置 token）
+            port: 监听端口（0 表示随机端口）
+            token: 共享令牌（None 表示不校验）
+        """
+        self.asr_engine = asr_engine
+        self.text_corrector = text_corrector
+        self.token = token or None
+        # 推理是 CPU 密集型，同类任务串行执行，避免多请求争抢导致整体变慢
+        self._asr_lock = threading.Lock()
+        self._correct_lock = threading.Lock()
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+        self._thread = None
+
+        if self.token is None and host not in ('127.0.0.1', 'localhost', '::1'):
+            print(f"[算力节点] 警告: 监听 {host} 且未设置令牌，局域网内任何设备都可以调用")
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+
+    @property
+    def busy(self) -> int:
+        with self._busy_lock:
+            return self._busy
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        if host in ('0.0.0.0', ''):
+            host = '127.0.0.1'
+        return f"http://{host}:{port}"
+
+    def capabilities(self) -> Dict:
+        return {
+            'asr': self.asr_engine is not None,
+            'asr_engine': getattr(self.asr_engine, 'name', None),
+            'correct': self.text_corrector is not None,
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # 请求日志由 print 统一输出
+
+            def _send_json(self, data: Dict, status: int = 200):
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_body(self, max_bytes: int) -> Optional[bytes]:
+                """读取请求体；长度无效或超过上限时返回错误并关闭连接，返回 None"""
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > max_bytes:
+                    self.close_connection = True
+                    self._send_json({'success': False, 'error': f'请求体长度无效或超过 {max_bytes} 字节'}, 413)
+                    return None
+                return self.rfile.read(length) if length > 0 else b''
+
+            def _authorized(self) -> bool:
+                if server.token is None:
+                    return True
+                if hmac.compare_digest(self.headers.get(TOKEN_HEADER, '').encode('utf-8'),
+                                       server.token.encode('utf-8')):
+                    return True
+                self.close_connection = True
+                self._send_json({'success': False, 'error': '令牌无效'}, 401)
+                return False
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                if self.path == '/health':
+                    self._send_json({
+                        'success': True,
+                        'capabilities': server.capabilities(),
+                        'busy': server.busy,
+                    })
+                else:
+                    self._send_json({'success': False, 'error': '未知路径'}, 404)
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                with server._busy_lock:
+                    server._busy += 1
+                try:
+                    if self.path == '/asr/transcribe':
+                        self._handle_transcribe()
+                    elif self.path in ('/correct', '/correct/batch', '/correct/segments'):
+                        self._handle_correct()
+                    else:
+                        self._send_json({'success': False, 'error': '未知路径'}, 404)
+                except Exception as e:
+                    print(f"[算力节点错误] {self.path}: {e}")
+                    self._send_json({'success': False, 'error': str(e)}, 500)
+                finally:
+                    with server._busy_lock:
+                        server._busy -= 1
+
+            def _handle_transcribe(self):
+                if server.asr_engine is None:
+                    self._send_json({'success': False, 'error': '本节点未提供ASR'}, 503)
+                    return
+                try:
+                    sample_rate = int(self.headers.get('X-Sample-Rate') or ASR_SAMPLE_RATE)
+                except ValueError:
+                    sample_rate = 0
+                if sample_rate <= 0:
+                    self._send_json({'success': False, 'error': '无效的采样率'}, 400)
+                    return
+                body = self._read_body(MAX_AUDIO_BODY_BYTES)
+                if body is None:
+                    return
+                audio = resample_audio(np.frombuffer(body, dtype='<f4'), sample_rate)
+                with server._asr_lock:
+                    result = server.asr_engine.transcribe(audio)
+                self._send_json(dict(result, success=True))
+
+            def _handle_correct(self):
+                if server.text_corrector is None:
+                    self._send_json({'success': False, 'error': '本节点未提供纠错'}, 503)
+                    return
+                body = self._read_body(MAX_JSON_BODY_BYTES)
+                if body is None:
+                    return
+                data = json.loads(body or b'{}')
+                corrector = server.text_corrector
+                with server._correct_lock:
+                    if self.path == '/correct/batch':
+                        result = {'success': True,
+                                  'results': corrector.correct_batch(data.get('texts') or [], data.get('confidences'))}
+                    elif self.path == '/correct/segments':
+                        result = corrector.correct_segments(data.get('segments') or [])
+                    else:
+                        result = corrector.correct(data.get('text', ''), confidence=data.get('confidence'))
+                self._send_json(result)
+
+        return Handler
+
+    def start(self):
+        """后台线程启动服务"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True, name="OffloadWorker")
+        self._thread.start()
+        print(f"[算力节点] 已启动: {self.url}, 能力: {self.capabilities()}")
+
+    def serve_forever(self):
+        """前台运行服务（命令行使用）"""
+        print(f"[算力节点] 已启动: {self.url}, 能力: {self.capabilities()}")
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+
+# ==================== 客户端 ====================
+
+class RemoteWorkerClient:
+    """工作节点 HTTP 客户端"""
+
+    def __init__(self, url: str, token: Optional[str] = None):
+        self.url = url.rstrip('/')
+        self.token = token or None
+
+    def _request(self, path: str, body: bytes = None, headers: Dict = None, timeout: float = 5.0) -> Dict:
+        headers = dict(headers or {})
+        if self.token:
+            headers[TOKEN_HEADER] = self.token
+        req = urllib.request.Request(self.url + path, data=body, headers=headers,
+                                     method='POST' if body is not None else 'GET')
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                return json.loads(resp.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            try:
+                detail = json.loads(e.read().decode('utf-8')).get('error')
+            except Exception:
+                detail = None
+            raise RuntimeError(detail or f"HTTP {e.code}")
+
+    def health(self, timeout: float = 2.0) -> Dict:
+        return self._request('/health', timeout=timeout)
+
+    def transcribe(self, audio: np.ndarray, sample_rate: int = 16000, timeout: float = 30.0) -> Dict:
+        body = np.asarray(audio, dtype='<f4').tobytes()
+        headers = {'Content-Type': 'application/octet-stream', 'X-Sample-Rate': str(sample_rate)}
+        result = self._request('/asr/transcribe', body, headers, timeout)
+        if not result.get('success'):
+            raise RuntimeError(result.get('error', '转录失败'))
+        return result
+
+    def _post_json(self, path: str, data: Dict, timeout: float) -> Dict:
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        headers = {'Content-Type': 'application/json; charset=utf-8'}
+        return self._request(path, body, headers, timeout)
+
+    def correct(self, text: str, confidence: Optional[float] = None, timeout: float = 15.0) -> Dict:
+        return self._post_json('/correct', {'text': text, 'confidence': confidence}, timeout)
+
+    def correct_batch(self, texts: List[str], confidences: Optional[List[Optional[float]]] = None,
+                      timeout: float = 15.0) -> List[Dict]:
+        result = self._post_json('/correct/batch', {'texts': texts, 'confidences': confidences}, timeout)
+        results = result.get('results')
+        if not result.get('success') or not isinstance(results, list) or len(results) != len(texts):
+            raise RuntimeError(result.get('error', '批量纠错失败'))
+        return results
+
+    def correct_segments(self, segments: List[Dict], timeout: float = 15.0) -> Dict:
+        segments = [{'text': s.get('text') or '', 'confidence': s.get('confidence')} for s in segments]
+        return self._post_json('/correct/segments', {'segments': segments}, timeout)
+
+
+# ==================== 调度器 ====================
+
+class WorkerNode:
+    """单个工作节点的健康状态和延迟统计"""
+
+    # 延迟指数滑动平均系数
+    EWMA_ALPHA = 0.3
+    # 连续失败后的退避时间（秒），指数增长，上限 MAX_BACKOFF
+    BASE_BACKOFF = 5.0
+    MAX_BACKOFF = 300.0
+
+    def __init__(self, url: str, token: Optional[str] = None):
+        self.client = RemoteWorkerClient(url, token=token)
+        self.url = self.client.url
+        self.capabilities: Dict = {}
+        self.healthy = False
+        self.latency_ms: Optional[float] = None  # 往返延迟 EWMA
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.backoff_until = 0.0
+        self.last_error: Optional[str] = None
+
+    def available(self, capability: str) -> bool:
+        return self.healthy and time.time() >= self.backoff_until and bool(self.capabilities.get(capability))
+
+    def record_success(self, latency_ms: float):
+        self.requests += 1
+        self.consecutive_failures = 0
+        self.healthy = True
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms = self.EWMA_ALPHA * latency_ms + (1 - self.EWMA_ALPHA) * self.latency_ms
+
+    def record_failure(self, error: str):
+        self.requests += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        backoff = min(self.BASE_BACKOFF * (2 ** (self.consecutive_failures - 1)), self.MAX_BACKOFF)
+        self.backoff_until = time.time() + backoff
+
+    def to_dict(self) -> Dict:
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'capabilities': self.capabilities,
+            'latency_ms': round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            'requests': self.requests,
+            'failures': self.failures,
+            'backoff_seconds': max(0, round(self.backoff_until - time.time(), 1)),
+            'last_error': self.last_error,
+        }
+
+
+class WorkerScheduler:
+    """
+    工作节点调度器
+    - 选择可用节点中延迟最低的一个
+    - 请求失败/超时后节点进入指数退避，任务回退到本地执行
+    - 后台定期健康检查，节点恢复后自动重新启用
+    """
+
+    def __init__(self, worker_urls: List[str], timeout: float = 5.0,
+                 timeout_per_second: float = 0.5, health_interval: float = 30.0, token: Optional[str] = None):
+        """
+        Args:
+            worker_urls: 工作节点地址列表
+            timeout: 基础超时（秒）
+            timeout_per_second: 转录任务每秒音频追加的超时（秒）
+            health_interval: 健康检查间隔（秒），0 表示不启动后台检查
+            token: 工作节点的共享令牌
+        """
+        self.nodes = [WorkerNode(url, token=token) for url in worker_urls]
+        self.timeout = timeout
+        self.timeout_per_second = timeout_per_second
+        self.health_interval = health_interval
+        self.stats = {'remote': 0, 'local': 0, 'fallback': 0}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+        self.check_health()
+        if health_interval > 0:
+            threading.Thread(target=self._health_loop, daemon=True, name="OffloadHealth").start()
+
+    def check_health(self):
+        """检查所有节点"""
+        for node in self.nodes:
+            try:
+                start = time.time()
+                info = node.client.health(timeout=min(self.timeout, 2.0))
+                node.capabilities = info.get('capabilities', {})
+                if not node.healthy:
+                    print(f"[算力卸载] 节点可用: {node.url} {node.capabilities}")
+                node.healthy = True
+                node.consecutive_failures = 0
+                node.backoff_until = 0.0
+                if node.latency_ms is None:
+                    node.latency_ms = (time.time() - start) * 1000
+            except Exception as e:
+                if node.healthy:
+                    print(f"[算力卸载] 节点不可用: {node.url} ({e})")
+                node.healthy = False
+                node.last_error = str(e)
+
+    def _health_loop(self):
+        while not self._stop_event.wait(self.health_interval):
+            self.check_health()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def pick_node(self, capability: str) -> Optional[WorkerNode]:
+        """选择延迟最低的可用节点"""
+        candidates = [n for n in self.nodes if n.available(capability)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda n: n.latency_ms if n.latency_ms is not None else float('inf'))
+
+    def run(self, capability: str, remote_fn: Callable, local_fn: Callable, timeout: float = None):
+        """
+        执行任务：优先远程节点，失败或超时回退本地
+
+        Args:
+            capability: 'asr' 或 'correct'
+            remote_fn: remote_fn(client, timeout) → 结果
+            local_fn: local_fn() → 结果
+            timeout: 本次任务超时（秒），默认使用基础超时
+        """
+        node = self.pick_node(capability)
+        if node is None:
+            with self._lock:
+                self.stats['local'] += 1
+            return local_fn()
+
+        start = time.time()
+        try:
+            result = remote_fn(node.client, timeout or self.timeout)
+            node.record_success((time.time() - start) * 1000)
+            with self._lock:
+                self.stats['remote'] += 1
+            return result
+        except Exception as e:
+            node.record_failure(str(e))
+            print(f"[算力卸载] {node.url} {capability} 失败，回退本地: {e}")
+            with self._lock:
+                self.stats['fallback'] += 1
+            return local_fn()
+
+    def get_status(self) -> Dict:
+        return {
+            'nodes': [n.to_dict() for n in self.nodes],
+            **self.stats,
+        }
+
+
+# ==================== 透明卸载包装 ====================
+
+class OffloadTextCorrector:
+    """文本纠错器包装：优先远程节点纠错，失败回退本地纠错器"""
+
+    # 纠错超时按文本长度追加：每多少字追加 1 秒（基础超时之外）
+    CHARS_PER_SECOND = 50
+
+    def __init__(self, local_corrector, scheduler: WorkerScheduler):
+        self.local = local_corrector
+        self.scheduler = scheduler
+
+    def _timeout(self, texts: List[str]) -> float:
+        return self.scheduler.timeout + sum(len(text or '') for text in texts) / self.CHARS_PER_SECOND
+
+    def correct(self, text: str, confidence: Optional[float] = None) -> Dict:
+        return self.scheduler.run(
+            'correct',
+            lambda client, timeout: client.correct(text, confidence=confidence, timeout=timeout),
+            lambda: self.local.correct(text, confidence=confidence),
+            timeout=self._timeout([text])
+        )
+
+    def correct_batch(self, texts: List[str], confidences: Optional[List[Optional[float]]] = None) -> List[Dict]:
+        if not texts:
+            return []
+        return self.scheduler.run(
+            'correct',
+            lambda client, timeout: client.correct_batch(texts, confidences, timeout=timeout),
+            lambda: self.local.correct_batch(texts, confidences),
+            timeout=self._timeout(texts)
+        )
+
+    def correct_segments(self, segments: List[Dict]) -> Dict:
+        return self.scheduler.run(
+            'correct',
+            lambda client, timeout: client.correct_segments(segments, timeout=timeout),
+            lambda: self.local.correct_segments(segments),
+            timeout=self._timeout([segment.get('text') for segment in segments])
+        )
+
+    def warmup(self):
+        self.local.warmup()
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.local.get_stats())
+        stats['offload'] = self.scheduler.get_status()
+        return stats
+
+    def __getattr__(self, item):
+        if item.startswith('_'):
+            raise AttributeError(item)
+        return getattr(self.local, item)
+
+
+class OffloadASREngine(BaseASREngine):
+    """
+    ASR 引擎包装：转录任务优先发往工作节点，超时/失败时使用本地引擎
+    （引擎特有能力、热切换等通过 __getattr__ 透传给本地引擎）
+    """
+
+    name = "offload"
+
+    def __init__(self, local_engine, scheduler: WorkerScheduler, offload_asr: bool = True,
+                 offload_correct: bool = True, sample_rate: int = 16000):
+        self.local = local_engine
+        self.scheduler = scheduler
+        self.offload_asr = offload_asr
+        self.offload_correct = offload_correct
+        self.sample_rate = sample_rate
+
+    @property
+    def text_corrector(self):
+        corrector = self.local.text_corrector
+        if corrector is None or not self.offload_correct:
+            return corrector
+        return OffloadTextCorrector(corrector, self.scheduler)
+
+    def transcribe(self, audio_data) -> Dict:
+        if not self.offload_asr:
+            return self.local.transcribe(audio_data)
+        audio = self._to_float32(audio_data)
+        timeout = self.scheduler.timeout + self.scheduler.timeout_per_second * len(audio) / self.sample_rate
+        return self.scheduler.run(
+            'asr',
+            lambda client, t: client.transcribe(audio, self.sample_rate, timeout=t),
+            lambda: self.local.transcribe(audio),
+            timeout=timeout
+        )
+
+    def transcribe_stream(self, audio_data, callback=None, **kwargs) -> str:
+        if not self.offload_asr or self.scheduler.pick_node('asr') is None:
+            return self.local.transcribe_stream(audio_data, callback=callback, **kwargs)
+        return super().transcribe_stream(audio_data, callback=callback, **kwargs)
+
+    def transcribe_file(self, audio_path):
+        if not self.offload_asr or self.scheduler.pick_node('asr') is None:
+            return self.local.transcribe_file(audio_path)
+        return super().transcribe_file(audio_path)
+
+    def get_stats(self) -> Dict:
+        stats = dict(self.local.get_stats() or {})
+        stats['offload'] = self.scheduler.get_status()
+        return stats
+
+    def get_info(self) -> Dict:
+        return self.local.get_info()
+
+    def unload(self):
+        self.local.unload()
+
+    def __getattr__(self, item):
+        if item.startswith('_') or item == 'local':
+            raise AttributeError(item)
+        return getattr(self.local, item)
@@ -0,0 +1,138 @@
+"""
+每日录音统计
+主循环每 5 秒刷新仪表盘、/api/status 每次请求都要今日录音数和剩余空间，原先每次都重新查询存储并统计磁盘。
+这里在内存中维护按天汇总（次数、时长、字数），由 FileStorage 在保存/更新/删除时增量更新，
+汇总以紧凑 JSON 写到录音目录旁（不被同步工具复制），重启后直接加载；剩余空间按间隔采样缓存。
+稳定状态下读取统计不产生任何文件 I/O。
+"""
+
+import os
+import json
+import time
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+STATS_VERSION = 1
+
+
+class StatsAggregator:
+    """按天汇总的录音统计（线程安全）"""
+
+    def __init__(self, path, free_space_interval: float = 60.0):
+        """
+        Args:
+            path: 汇总文件路径
+            free_space_interval: 剩余空间采样间隔（秒）
+        """
+        self.path = Path(path)
+        self.free_space_interval = free_space_interval
+        self._lock = threading.Lock()
+        self._days: Dict[str, list] = {}     # 日期 → [次数, 时长(秒), 字数]
+        self._last: Optional[Dict] = None    # 最近一次保存的录音 {"key", "preview"}
+        self._disk_usage = None
+        self._disk_sampled_at = 0.0
+        self.loaded = self._load()
+
+    def _load(self) -> bool:
+        """加载汇总文件，文件不存在或版本不符时返回 False（需要调用 rebuild）"""
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return False
+        if not isinstance(data, dict) or data.get('v') != STATS_VERSION:
+            return False
+        self._days = {date: list(values) for date, values in data.get('days', {}).items()}
+        self._last = data.get('last')
+        return True
+
+    def _save(self):
+        """写回汇总文件（先写临时文件再替换），调用方持有锁"""
+        data = {'v': STATS_VERSION, 'days': self._days, 'last': self._last}
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[统计] 写入汇总文件失败: {e}")
+
+    # ==================== 更新 ====================
+
+    def rebuild(self, rows: Iterable[Dict], last: Optional[Dict] = None):
+        """
+        全量重建
+
+        Args:
+            rows: 每天的汇总 {"date", "count", "duration", "words"}
+            last: 最近一条录音 {"key", "preview"}
+        """
+        days = {}
+        for row in rows:
+            days[row['date']] = [int(row['count']), round(float(row['duration'] or 0), 1), int(row['words'] or 0)]
+        with self._lock:
+            self._days = days
+            self._last = last
+            self._save()
+        self.loaded = True
+
+    def apply(self, old: Optional[Dict] = None, new: Optional[Dict] = None):
+        """
+        按一次变更增量更新：old 为变更前的录音行（新增时为 None），new 为变更后的（删除时为 None）
+
+        行字段与录音索引一致（key, date, duration, word_count, preview）
+        """
+        with self._lock:
+            if old is not None:
+                self._add(old, -1)
+            if new is not None:
+                self._add(new, 1)
+                if old is None or (self._last and self._last.get('key') == new['key']):
+                    self._last = {'key': new['key'], 'preview': new.get('preview', '')}
+            elif old is not None and self._last and self._last.get('key') == old['key']:
+                self._last = None
+            self._save()
+
+    def _add(self, row: Dict, sign: int):
+        values = self._days.setdefault(row['date'], [0, 0.0, 0])
+        values[0] += sign
+        values[1] = round(values[1] + sign * float(row.get('duration') or 0), 1)
+        values[2] += sign * int(row.get('word_count') or 0)
+        if values[0] <= 0:
+            del self._days[row['date']]
+
+    # ==================== 查询 ====================
+
+    def get_day(self, date: Optional[str] = None) -> Dict:
+        """某天的汇总（默认今天）"""
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            count, duration, words = self._days.get(date, (0, 0.0, 0))
+        return {'date': date, 'count': count, 'duration': duration, 'words': words}
+
+    def get_days(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> list:
+        """日期范围内每天的汇总（按日期升序，只含有录音的日期）"""
+        with self._lock:
+            items = sorted(self._days.items())
+        return [
+            {'date': date, 'count': count, 'duration': duration, 'words': words}
+            for date, (count, duration, words) in items
+            if (not date_from or date >= date_from) and (not date_to or date <= date_to)
+        ]
+
+    @property
+    def last_transcript(self) -> str:
+        with self._lock:
+            return self._last.get('preview', '') if self._last else ''
+
+    def disk_usage(self, path) -> Optional[tuple]:
+        """剩余空间（按间隔采样，期间返回缓存值）"""
+        now = time.monotonic()
+        if self._disk_usage is None or now - self._disk_sampled_at >= self.free_space_interval:
+            try:
+                self._disk_usage = shutil.disk_usage(path)
+            except OSError:
+                self._disk_usage = None
+            self._disk_sampled_at = now
+        return self._disk_usage
@@ -0,0 +1,367 @@
+"""
+录音存储维护
+SD 卡上录音音频（WAV 约 115MB/小时）持续累积，原先只在剩余空间不足时显示告警，最终会写满。
+这里由后台线程按策略定期维护，转写文本（.txt/.corrected.txt/.json）始终保留，只处理音频：
+- 压缩：超过 N 天的 WAV/FLAC 用 ffmpeg 压缩为归档音频（15-30.opus，约为 WAV 的 1/10）
+- 配额：音频总量超过配额时从最早的录音开始删除音频；
+  启用 free_space_cleanup 时，剩余空间低于最低值也删除（删光全部音频也不够时不删除，避免白白丢数据）
+- 清理：没有音频的派生文件（峰值、试听）、残留的临时文件、空日期目录；
+  缺少 .txt 的音频和转写文本不删除（可能是同步工具还没传完，其余文件先到）
+- 每处理一个文件暂停片刻限制 I/O；录音/转写期间不运行，进行中的一轮在下一个文件前中止
+
+开始录音和保存音频前调用 ensure_free() 检查本次写入所需空间（只按所需大小判断，不含最低剩余空间），
+启用 free_space_cleanup 时才会为此删除最早的录音音频。
+"""
+
+import re
+import time
+import shutil
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.recording_index import AUDIO_SUFFIXES
+
+_DATE_DIR = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+# 转写文本（永久保留）
+_TRANSCRIPT_SUFFIXES = ('.txt', '.corrected.txt', '.json')
+
+
+class StorageMaintenance:
+    """录音存储维护（后台线程）"""
+
+    def __init__(self, storage, compress_after_days: int = 0, audio_quota_gb: float = 0,
+                 min_free_gb: float = 1.0, free_space_cleanup: bool = False, orphan_grace: float = 3600,
+                 io_pause: float = 0.05, interval: float = 3600, is_busy: Optional[Callable[[], bool]] = None,
+                 encoder=None):
+        """
+        Args:
+            storage: FileStorage
+            compress_after_days: 超过多少天的 WAV/FLAC 压缩归档（0 表示不压缩）
+            audio_quota_gb: 音频总量配额（0 表示不限制）
+            min_free_gb: 最低剩余空间（后台维护的目标，只在 free_space_cleanup 时据此删除音频）
+            free_space_cleanup: 剩余空间不足时是否删除最早的录音音频（默认只按配额删除）
+            orphan_grace: 孤立文件至少多久未变动才清理（秒，按 mtime 和 ctime 中较新的算，
+                          同步工具会保留源文件的 mtime，刚同步来的文件 ctime 仍是新的）
+            io_pause: 每处理一个文件后暂停（秒）
+            interval: 后台维护间隔（秒）
+            is_busy: 返回 True 时（录音/转写中）暂停维护
+            encoder: 压缩编码器（AudioPreviewEncoder），None 或不可用时不压缩
+        """
+        self.storage = storage
+        self.compress_after_days = compress_after_days
+        self.audio_quota_bytes = int(audio_quota_gb * 1024 ** 3)
+        self.min_free_bytes = int(min_free_gb * 1024 ** 3)
+        self.free_space_cleanup = free_space_cleanup
+        self.orphan_grace = orphan_grace
+        self.io_pause = io_pause
+        self.interval = interval
+        self.is_busy = is_busy or (lambda: False)
+        self.encoder = encoder
+
+        self._lock = threading.Lock()        # 单个录音的文件操作
+        self._run_lock = threading.Lock()    # 同时只运行一轮
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+        self.last_report: Optional[Dict] = None
+        self.stats = {
+            'runs': 0,
+            'reclaimed_bytes': 0,
+            'compressed': 0,
+            'audio_deleted': 0,
+            'orphans_removed': 0,
+            'emergency_cleanups': 0,
+        }
+
+    # ==================== 后台线程 ====================
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="StorageMaintenance")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def trigger(self):
+        """立即开始一轮维护（后台线程执行）"""
+        self._wake.set()
+
+    def _loop(self):
+        while self._running:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if not self._running:
+                return
+            if self.is_busy():
+                continue
+            try:
+                self.run()
+            except Exception as e:
+                print(f"[存储维护] 维护异常: {e}")
+
+    # ==================== 维护 ====================
+
+    def run(self, dry_run: bool = False) -> Dict:
+        """
+        执行一轮维护
+
+        Args:
+            dry_run: 只统计将要处理的文件，不修改
+
+        Returns:
+            {"reclaimed_bytes", "compressed", "audio_deleted", "orphans_removed", "dirs_removed",
+             "audio_bytes", "free_bytes", "interrupted", "dry_run", "elapsed"}
+        """
+        if not self._run_lock.acquire(blocking=False):
+            return {'success': False, 'message': '维护正在进行中'}
+        start_time = time.time()
+        report = {'reclaimed_bytes': 0, 'compressed': 0, 'audio_deleted': 0, 'orphans_removed': 0,
+                  'dirs_removed': 0, 'interrupted': False, 'dry_run': dry_run, 'errors': []}
+        try:
+            groups = self._scan()
+            self._remove_orphans(groups, report, dry_run)
+            if self.compress_after_days > 0 and self.encoder is not None and self.encoder.available:
+                self._compress_old(groups, report, dry_run)
+            self._enforce_quota(groups, report, dry_run)
+            if not dry_run:
+                self._remove_empty_dirs(report)
+        finally:
+            self._run_lock.release()
+
+        report['audio_bytes'] = sum(self._audio_bytes(group) for group in groups)
+        report['free_bytes'] = self._free_bytes()
+        report['elapsed'] = round(time.time() - start_time, 2)
+        report['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        if not dry_run:
+            self.last_report = report
+            self.stats['runs'] += 1
+            self.stats['reclaimed_bytes'] += report['reclaimed_bytes']
+            self.stats['compressed'] += report['compressed']
+            self.stats['audio_deleted'] += report['audio_deleted']
+            self.stats['orphans_removed'] += report['orphans_removed']
+        print(f"[存储维护] {'预览' if dry_run else '完成'}: 释放 {report['reclaimed_bytes'] / 1024 / 1024:.1f}MB, "
+              f"压缩 {report['compressed']}, 删除音频 {report['audio_deleted']}, "
+              f"清理孤立文件 {report['orphans_removed']}{' (已中止)' if report['interrupted'] else ''}")
+        return report
+
+    def ensure_free(self, bytes_needed: int = 0) -> bool:
+        """
+        确保剩余空间能放下 bytes_needed（最低剩余空间只用于后台维护，不影响能否开始录音）
+        空间不足且启用 free_space_cleanup 时，从最早的录音开始删除音频，刚好够用即停；
+        删光全部音频也不够时不删除任何文件
+
+        Returns:
+            空间是否足够
+        """
+        free = self._free_bytes()
+        if free is None or free >= bytes_needed:
+            return True
+        if not self.free_space_cleanup:
+            print(f"[存储维护] 剩余空间 {free / 1024 / 1024:.0f}MB 不足 {bytes_needed / 1024 / 1024:.0f}MB")
+            return False
+        groups = [group for group in self._scan() if group['audio']]
+        reclaimable = sum(self._audio_bytes(group) for group in groups)
+        if free + reclaimable < bytes_needed:
+            print(f"[存储维护] 剩余空间 {free / 1024 / 1024:.0f}MB，删除全部音频"
+                  f"（{reclaimable / 1024 / 1024:.0f}MB）也不足 {bytes_needed / 1024 / 1024:.0f}MB，不删除")
+            return False
+        print(f"[存储维护] 剩余空间 {free / 1024 / 1024:.0f}MB 不足 {bytes_needed / 1024 / 1024:.0f}MB，"
+              f"删除最早的录音音频")
+        self.stats['emergency_cleanups'] += 1
+        for group in groups:
+            with self._lock:
+                freed = self.storage.delete_audio(group['key'])
+            group['audio'] = []
+            self.stats['reclaimed_bytes'] += freed
+            self.stats['audio_deleted'] += 1
+            free = self._free_bytes()
+            if free is None or free >= bytes_needed:
+                return True
+        return False
+
+    # ==================== 内部方法 ====================
+
+    def _scan(self) -> List[Dict]:
+        """按录音分组的文件列表（最早的在前）"""
+        base_path = self.storage.base_path
+        groups: Dict[str, Dict] = {}
+        if not base_path.exists():
+            return []
+        for date_dir in sorted(base_path.iterdir()):
+            if not date_dir.is_dir() or not _DATE_DIR.match(date_dir.name):
+                continue
+            for path in sorted(date_dir.iterdir()):
+                if not path.is_file():
+                    continue
+                stem, _, rest = path.name.partition('.')
+                key = f"{date_dir.name}/{stem}"
+                group = groups.setdefault(key, {'key': key, 'date': date_dir.name, 'dir': date_dir, 'stem': stem,
+                                                'transcripts': [], 'audio': [], 'derived': [], 'temp': []})
+                suffix = f".{rest}"
+                if suffix.endswith('.tmp'):
+                    group['temp'].append(path)
+                elif suffix in _TRANSCRIPT_SUFFIXES:
+                    group['transcripts'].append(path)
+                elif suffix in AUDIO_SUFFIXES:
+                    group['audio'].append(path)
+                else:
+                    group['derived'].append(path)   # .peaks / .preview.*
+        return sorted(groups.values(), key=lambda g: g['key'])
+
+    @staticmethod
+    def _size(path: Path) -> int:
+        try:
+            return path.stat().st_size
+        except OSError:
+            return 0
+
+    def _audio_bytes(self, group: Dict) -> int:
+        return sum(self._size(path) for path in group['audio'] + group['derived'])
+
+    def _free_bytes(self) -> Optional[int]:
+        try:
+            return shutil.disk_usage(self.storage.base_path).free
+        except OSError:
+            return None
+
+    def _should_stop(self, report: Dict) -> bool:
+        """每处理一个文件后暂停；录音开始或服务停止时中止本轮"""
+        if self.io_pause:
+            time.sleep(self.io_pause)
+        if self.is_busy():
+            report['interrupted'] = True
+        return report['interrupted']
+
+    def _is_stale(self, path: Path) -> bool:
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        return time.time() - max(stat.st_mtime, stat.st_ctime) >= self.orphan_grace
+
+    def _unlink(self, path: Path, report: Dict, dry_run: bool):
+        size = self._size(path)
+        if not dry_run:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                return
+            except OSError as e:
+                report['errors'].append(f"{path.name}: {e}")
+                return
+        report['reclaimed_bytes'] += size
+        report['orphans_removed'] += 1
+
+    def _remove_orphans(self, groups: List[Dict], report: Dict, dry_run: bool):
+        """删除没有音频的派生文件、残留的临时文件（转写文本和音频从不作为孤立文件删除）"""
+        for group in groups:
+            orphans = list(group['temp'])
+            if not group['audio']:
+                orphans += group['derived']
+            orphans = [path for path in orphans if self._is_stale(path)]
+            if not orphans:
+                continue
+            with self._lock:
+                for path in orphans:
+                    self._unlink(path, report, dry_run)
+                    for kind in ('derived', 'temp'):
+                        if path in group[kind]:
+                            group[kind].remove(path)
+            if self._should_stop(report):
+                return
+
+    def _compress_old(self, groups: List[Dict], report: Dict, dry_run: bool):
+        """超过 compress_after_days 天的 WAV/FLAC 压缩归档"""
+        today = date.today()
+        for group in groups:
+            if report['interrupted']:
+                return
+            source = next((path for path in group['audio'] if path.suffix in ('.wav', '.flac')), None)
+            if source is None:
+                continue
+            try:
+                age = (today - date.fromisoformat(group['date'])).days
+            except ValueError:
+                continue
+            if age < self.compress_after_days:
+                # 分组按日期排序，之后的都更新
+                return
+            if dry_run:
+                report['compressed'] += 1
+                continue
+            with self._lock:
+                saved = self.storage.archive_audio(group['key'], self.encoder)
+            if saved is None:
+                report['errors'].append(f"{group['key']}: 压缩失败")
+            else:
+                report['reclaimed_bytes'] += saved
+                report['compressed'] += 1
+                group['audio'] = [source.with_suffix(f".{self.encoder.fmt}")]
+                group['derived'] = [path for path in group['derived'] if path.exists()]
+            self._should_stop(report)
+
+    def _enforce_quota(self, groups: List[Dict], report: Dict, dry_run: bool):
+        """
+        音频总量超过配额时从最早的录音开始删除音频
+        启用 free_space_cleanup 时剩余空间低于最低值也删除；空间主要被音频以外的数据占用、
+        删光音频也达不到最低值时，不为剩余空间删除（只记入报告）
+        """
+        total = sum(self._audio_bytes(group) for group in groups)
+        free = self._free_bytes()
+        check_space = self.free_space_cleanup and free is not None and free < self.min_free_bytes
+        if check_space and free + total < self.min_free_bytes:
+            report['low_space_unreachable'] = True
+            print(f"[存储维护] 剩余空间 {free / 1024 / 1024:.0f}MB，删除全部音频"
+                  f"（{total / 1024 / 1024:.0f}MB）也达不到 {self.min_free_bytes / 1024 / 1024:.0f}MB，不删除")
+            check_space = False
+        for group in groups:
+            if report['interrupted']:
+                return
+            over_quota = self.audio_quota_bytes and total > self.audio_quota_bytes
+            low_space = check_space and free < self.min_free_bytes
+            if not over_quota and not low_space:
+                return
+            size = self._audio_bytes(group)
+            if not size:
+                continue
+            if not dry_run:
+                with self._lock:
+                    size = self.storage.delete_audio(group['key'])
+                group['audio'], group['derived'] = [], []
+            total -= size
+            if free is not None:
+                free += size
+            report['reclaimed_bytes'] += size
+            report['audio_deleted'] += 1
+            self._should_stop(report)
+
+    def _remove_empty_dirs(self, report: Dict):
+        base_path = self.storage.base_path
+        if not base_path.exists():
+            return
+        for date_dir in base_path.iterdir():
+            if date_dir.is_dir() and _DATE_DIR.match(date_dir.name):
+                try:
+                    date_dir.rmdir()   # 非空时抛出 OSError
+                    report['dirs_removed'] += 1
+                except OSError:
+                    pass
+
+    def get_status(self) -> Dict:
+        return {
+            'compress_after_days': self.compress_after_days,
+            'audio_quota_gb': round(self.audio_quota_bytes / 1024 ** 3, 2),
+            'min_free_gb': round(self.min_free_bytes / 1024 ** 3, 2),
+            'free_space_cleanup': self.free_space_cleanup,
+            'interval': self.interval,
+            'compression_available': bool(self.encoder is not None and self.encoder.available),
+            'running': self._run_lock.locked(),
+            'stats': dict(self.stats),
+            'last_report': self.last_report,
+        }
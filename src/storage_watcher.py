@@ -0,0 +1,252 @@
+"""
+录音目录监听
+部署时用 Resilio Sync 同步录音目录，文件会在程序之外出现、修改和消失。
+这里监听目录变更（watchdog，Linux 下基于 inotify），按录音增量更新元数据索引和每日统计：
+- 同一条录音的文本、纠错文本、音频等文件的事件合并处理：最后一个事件之后 debounce 秒才同步
+  （同步工具分块写入大文件时不会反复解析），持续写入时最多推迟 max_delay 秒
+- 同步时先比较 mtime 和文件是否存在（FileStorage.sync_recording），与索引一致时不读文件，
+  程序自己保存的文件触发的事件因此没有额外开销
+- 启动时和每隔 check_interval 秒做一次一致性检查（FileStorage.reconcile，只 stat 不读内容），
+  补上漏掉的事件（程序未运行期间的变更、inotify 队列溢出）
+未安装 watchdog 或无法监听时，退化为每 poll_interval 秒做一次一致性检查。
+"""
+
+import re
+import time
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+# 日期目录名（2026-01-21）
+_DATE_DIR = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+# 写入中的临时文件：程序自己的 .tmp，Resilio Sync 的 .!sync
+IGNORED_SUFFIXES = ('.tmp', '.!sync')
+
+
+class _EventHandler(FileSystemEventHandler):
+    """watchdog 事件回调（在 watchdog 线程中执行，只入队）"""
+
+    def __init__(self, watcher: 'StorageWatcher'):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ('opened', 'closed_no_write'):
+            return
+        self.watcher.notify(event.src_path)
+        dest_path = getattr(event, 'dest_path', None)
+        if dest_path:
+            self.watcher.notify(dest_path)
+
+
+class StorageWatcher:
+    """录音目录监听（后台线程，去抖后增量同步索引和统计）"""
+
+    def __init__(self, storage, debounce: float = 2.0, check_interval: float = 900.0,
+                 poll_interval: float = 60.0, max_delay: Optional[float] = None, use_watchdog: bool = True):
+        """
+        Args:
+            storage: FileStorage
+            debounce: 一条录音最后一个事件之后多久同步（秒）
+            check_interval: 一致性检查间隔（秒），<=0 时只在启动时检查
+            poll_interval: 无法监听目录时的检查间隔（秒）
+            max_delay: 持续有事件时最多推迟多久同步（秒），默认 debounce 的 10 倍
+            use_watchdog: False 时不监听事件，只做定期检查
+        """
+        self.storage = storage
+        self.debounce = debounce
+        self.check_interval = check_interval
+        self.poll_interval = poll_interval
+        self.max_delay = max_delay if max_delay is not None else debounce * 10
+        self.use_watchdog = use_watchdog and WATCHDOG_AVAILABLE
+
+        self._base: Optional[Path] = None
+        # (日期, 文件名主干) → [首个事件时间, 最后事件时间]；主干为 None 表示整个日期目录
+        self._pending: Dict[Tuple[str, Optional[str]], List[float]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        self.stats = {
+            'events': 0,
+            'ignored': 0,
+            'added': 0,
+            'updated': 0,
+            'removed': 0,
+            'checks': 0,
+            'check_fixes': 0,
+            'last_check': None,
+            'last_error': None,
+        }
+
+    @property
+    def backend(self) -> str:
+        """事件来源：watchdog 的监听实现（Linux 下为 InotifyObserver），或 polling"""
+        return type(self._observer).__name__ if self._observer is not None else 'polling'
+
+    # ==================== 生命周期 ====================
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._base = Path(self.storage.base_path).absolute()
+        self._stop_event.clear()
+        if self.use_watchdog:
+            try:
+                observer = Observer()
+                observer.schedule(_EventHandler(self), str(self._base), recursive=True)
+                observer.start()
+                self._observer = observer
+            except Exception as e:   # 如超过 inotify 监听数量上限
+                print(f"[目录监听] 无法监听目录变更，改为每 {self.poll_interval:.0f} 秒检查: {e}")
+        elif not WATCHDOG_AVAILABLE:
+            print(f"[目录监听] 未安装 watchdog，改为每 {self.poll_interval:.0f} 秒检查（pip install watchdog）")
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="StorageWatcher")
+        self._thread.start()
+        print(f"[目录监听] 已启动: {self._base} ({self.backend})")
+
+    def stop(self):
+        self._stop_event.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=5)
+            except Exception as e:
+                print(f"[目录监听] 停止监听失败: {e}")
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    # ==================== 事件 ====================
+
+    def _resolve(self, path) -> Optional[Tuple[str, Optional[str]]]:
+        """事件路径 → (日期, 文件名主干)；日期目录本身主干为 None；与录音无关的文件返回 None"""
+        if self._base is None:
+            self._base = Path(self.storage.base_path).absolute()
+        try:
+            parts = Path(path).absolute().relative_to(self._base).parts
+        except ValueError:
+            return None
+        # 只关心 日期目录/文件，忽略根目录下的索引、统计文件和同步工具的隐藏目录
+        if not 1 <= len(parts) <= 2 or not _DATE_DIR.match(parts[0]):
+            return None
+        if len(parts) == 1:
+            return parts[0], None
+        name = parts[1]
+        if name.startswith('.') or name.endswith(IGNORED_SUFFIXES):
+            return None
+        return parts[0], name.split('.', 1)[0]
+
+    def notify(self, path):
+        """记录一个文件变更（在事件线程中调用，只入队不做 IO）"""
+        target = self._resolve(path)
+        with self._lock:
+            self.stats['events'] += 1
+            if target is None:
+                self.stats['ignored'] += 1
+                return
+            now = time.monotonic()
+            entry = self._pending.get(target)
+            if entry is None:
+                self._pending[target] = [now, now]
+            else:
+                entry[1] = now
+        self._wakeup.set()
+
+    def _take_due(self, now: float) -> Tuple[list, float]:
+        """取出已到期的待同步项，返回 (到期项, 距下一项到期的秒数)"""
+        due, wait = [], float('inf')
+        with self._lock:
+            for target, (first, last) in list(self._pending.items()):
+                ready = min(last + self.debounce, first + self.max_delay)
+                if ready <= now:
+                    due.append(target)
+                    del self._pending[target]
+                else:
+                    wait = min(wait, ready - now)
+        return due, wait
+
+    def flush(self):
+        """立即同步所有待处理的变更（不等去抖，测试和命令行使用）"""
+        due, _ = self._take_due(float('inf'))
+        self._sync(due)
+
+    def _sync(self, targets):
+        # 先处理整个日期目录（目录被删除或移入），其余按录音逐条同步
+        for date_str, stem in sorted(targets, key=lambda target: (target[1] is not None, target)):
+            try:
+                if stem is None:
+                    result = self.storage.reconcile(date=date_str)
+                    for action in ('added', 'updated', 'removed'):
+                        self.stats[action] += result[action]
+                else:
+                    action = self.storage.sync_recording(f"{date_str}/{stem}")
+                    if action:
+                        self.stats[action] += 1
+            except Exception as e:
+                self.stats['last_error'] = str(e)
+                print(f"[目录监听] 同步失败: {date_str}/{stem or ''}, 错误: {e}")
+
+    # ==================== 一致性检查 ====================
+
+    def check(self) -> Optional[Dict]:
+        """一致性检查：修正事件遗漏造成的索引与磁盘差异，返回 FileStorage.reconcile() 的结果"""
+        start_time = time.time()
+        try:
+            result = self.storage.reconcile()
+        except Exception as e:
+            self.stats['last_error'] = str(e)
+            print(f"[目录监听] 一致性检查失败: {e}")
+            return None
+        fixes = result['added'] + result['updated'] + result['removed']
+        self.stats['checks'] += 1
+        self.stats['check_fixes'] += fixes
+        self.stats['last_check'] = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'seconds': round(time.time() - start_time, 3),
+            **result,
+        }
+        if fixes:
+            print(f"[目录监听] 一致性检查修正 {fixes} 条录音: {result}")
+        return result
+
+    def _loop(self):
+        interval = self.check_interval if self._observer is not None else self.poll_interval
+        next_check = time.monotonic()   # 启动时先检查一次（程序未运行期间的变更）
+        while not self._stop_event.is_set():
+            self._wakeup.clear()
+            now = time.monotonic()
+            if now >= next_check:
+                self.check()
+                next_check = time.monotonic() + interval if interval > 0 else float('inf')
+                continue
+            due, wait = self._take_due(now)
+            if due:
+                self._sync(due)
+                continue
+            self._wakeup.wait(min(wait, next_check - now, 3600))
+
+    def get_status(self) -> Dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'running': self._thread is not None,
+            'backend': self.backend,
+            'path': str(self._base) if self._base else None,
+            'debounce': self.debounce,
+            'check_interval': self.check_interval if self._observer is not None else self.poll_interval,
+            'pending': pending,
+            **self.stats,
+        }
@@ -0,0 +1,123 @@
+"""
+长文本分块
+纠错模型单次输入有长度上限（macro-correct 的 max_len），超出部分不会被纠错。
+这里把长文本按标点/停顿切成不超过上限的窗口，每个窗口带一段上文重叠提供语境；
+各窗口可合并为一批并行推理，结果再拼接回整段，修改位置换算回原文坐标。
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+# 切分点：句末标点 > 停顿标点/空白（分隔符保留在前一单元末尾）
+_SENTENCE_END = re.compile(r'[^。！？!?；;\n]*[。！？!?；;\n]+|[^。！？!?；;\n]+$')
+_PAUSE = re.compile(r'[^，,、：:\s]*[，,、：:\s]+|[^，,、：:\s]+$')
+
+
+def _split(text: str, pattern) -> List[str]:
+    parts = pattern.findall(text)
+    if "".join(parts) != text:
+        return [text]
+    return parts
+
+
+def split_units(text: str, max_chars: int) -> List[str]:
+    """
+    切分为不超过 max_chars 的单元：优先按句，超长句再按停顿，仍超长则硬切
+
+    各单元拼接后与原文完全一致。
+    """
+    units = []
+    for sentence in _split(text, _SENTENCE_END):
+        if len(sentence) <= max_chars:
+            units.append(sentence)
+            continue
+        for piece in _split(sentence, _PAUSE):
+            for i in range(0, len(piece), max_chars):
+                units.append(piece[i:i + max_chars])
+    return units
+
+
+def chunk_text(text: str, max_chars: int, overlap: int = 16) -> List[Dict]:
+    """
+    把文本切成模型可处理的窗口
+
+    Args:
+        text: 原文
+        max_chars: 单个窗口最大字数（含上文重叠）
+        overlap: 上文重叠字数
+
+    Returns:
+        [{"start": int, "end": int, "context_start": int, "source": str}, ...]
+        窗口负责纠错 text[start:end]，送入模型的是 source = text[context_start:end]
+    """
+    if len(text) <= max_chars:
+        return [{'start': 0, 'end': len(text), 'context_start': 0, 'source': text}]
+
+    overlap = max(0, min(overlap, max_chars // 4))
+    body_limit = max_chars - overlap
+
+    chunks = []
+    start = 0
+    end = 0
+    for unit in split_units(text, body_limit):
+        if end > start and end - start + len(unit) > body_limit:
+            chunks.append((start, end))
+            start = end
+        end += len(unit)
+    if end > start:
+        chunks.append((start, end))
+
+    result = []
+    for start, end in chunks:
+        context_start = max(0, start - overlap)
+        result.append({
+            'start': start,
+            'end': end,
+            'context_start': context_start,
+            'source': text[context_start:end],
+        })
+    return result
+
+
+def merge_chunks(text: str, chunks: List[Dict], outputs: List[Optional[Tuple[str, List]]]):
+    """
+    拼接各窗口的纠错结果
+
+    Args:
+        text: 原文
+        chunks: chunk_text() 的结果
+        outputs: 各窗口的 (corrected, errors) 或 None（None 表示该窗口保留原文）
+            errors 格式: [[old, new, position, confidence], ...]，position 相对窗口 source
+
+    Returns:
+        (corrected_text, errors)，errors 中的位置换算为原文坐标；上文重叠区内的修改
+        归属前一个窗口，这里丢弃
+    """
+    from src.incremental_corrector import map_offset
+
+    if len(chunks) == 1 and chunks[0]['context_start'] == 0:
+        output = outputs[0]
+        return output if output else (text, [])
+
+    corrected_parts = []
+    errors = []
+    for chunk, output in zip(chunks, outputs):
+        source = chunk['source']
+        context_len = chunk['start'] - chunk['context_start']
+        if not output:
+            corrected_parts.append(source[context_len:])
+            continue
+
+        corrected, chunk_errors = output
+        corrected = corrected or source
+        corrected_parts.append(corrected[map_offset(source, corrected, context_len):])
+
+        for error in chunk_errors or []:
+            if len(error) >= 3 and isinstance(error[2], int):
+                if error[2] < context_len:
+                    continue
+                error = list(error)
+                error[2] += chunk['start'] - context_len
+            errors.append(error)
+
+    return "".join(corrected_parts), errors
@@ -1,13 +1,16 @@
 """文本纠错引擎
-支持两种模式:
+支持三种模式:
 - macro-correct: 快速专业的标点和拼写纠错(推荐,速度快5倍)
+- onnx: 导出为 ONNX int8 的 MacBERT 纠错模型(不依赖 PyTorch,加载快、内存小)
 - llama-cpp: 基于 Qwen2.5-0.5B 的通用纠错(备选)
 """
 
 import os
+import json
 import time
 import logging
-from typing import Dict, Optional, List
+import threading
+from typing import Callable, Dict, Optional, List
 from abc import ABC, abstractmethod
 
 logger = logging.getLogger(__name__)
@@ -26,6 +29,14 @@ class BaseCorrectorEngine(ABC):
         """纠错文本"""
         pass
     
+    def correct_batch(self, texts: List[str]) -> List:
+        """批量纠错（默认逐条调用，支持批量推理的引擎应覆盖）"""
+        return [self.correct_text(text) for text in texts]
+    
+    def punctuate_batch(self, texts: List[str]) -> List:
+        """只补标点、不改字（高置信度识别结果使用）；不支持的引擎返回 None（保留原文）"""
+        return [None] * len(texts)
+    
     @abstractmethod
     def unload(self):
         """卸载模型"""
@@ -55,7 +66,15 @@ class MacroCorrectEngine(BaseCorrectorEngine):
     - CSC_PUNCT: 标点符号补全 (例: 句末加问号、感叹号)
     """
     
-    def __init__(self):
+    def __init__(self, chunk_overlap: Optional[int] = None):
+        """
+        Args:
+            chunk_overlap: 长文本分块时的上文重叠字数（默认读取配置）
+        """
+        if chunk_overlap is None:
+            from src.config import TEXT_CORRECTION_CHUNK_OVERLAP
+            chunk_overlap = TEXT_CORRECTION_CHUNK_OVERLAP
+        self.chunk_overlap = chunk_overlap
         self._corrector = None
         self._punct_corrector = None
         self._is_loaded = False
@@ -66,7 +85,7 @@ class MacroCorrectEngine(BaseCorrectorEngine):
         self._correct_params = {
             "threshold": 0.55,      # token阈值过滤，降低可减少误报
             "batch_size": 32,       # 批大小
-            "max_len": 256,         # 最大长度，超过部分不参与纠错
+            "max_len": 256,         # 最大长度，更长的文本先分块（见 correct_batch）
             "rounded": 4,           # 保留置信度4位小数
             "flag_confusion": True, # 使用默认混淆词典
             "flag_prob": True,      # 返回纠错token处的概率
@@ -114,66 +133,114 @@ class MacroCorrectEngine(BaseCorrectorEngine):
             (corrected_text, errors) 或 None
             errors 格式: [[old_char, new_char, position, confidence], ...]
         """
+        return self.correct_batch([text])[0]
+    
+    def correct_batch(self, texts: List[str]) -> List[Optional[tuple]]:
+        """批量纠错：超过 max_len 的文本先分块（带上文重叠），所有分块合并为一批推理
+        
+        Returns:
+            与 texts 一一对应的 (corrected_text, errors) 或 None
+        """
+        return self._run_chunked(texts, spelling=True)
+    
+    def punctuate_batch(self, texts: List[str]) -> List[Optional[tuple]]:
+        """只运行标点模型"""
+        if not self._is_loaded:
+            self.load()
+        if self._punct_corrector is None:
+            return [None] * len(texts)
+        return self._run_chunked(texts, spelling=False)
+    
+    def _run_chunked(self, texts: List[str], spelling: bool) -> List[Optional[tuple]]:
         if not self._is_loaded:
             self.load()
         
         if not self._is_loaded or self._corrector is None:
             logger.debug("[macro-correct] 模型未加载,跳过纠错")
-            return None
+            return [None] * len(texts)
+        
+        if not texts:
+            return []
+        
+        from src.text_chunker import chunk_text, merge_chunks
+        
+        # 模型输入含 [CLS]/[SEP] 两个特殊 token
+        max_chars = max(self._correct_params["max_len"] - 2, 16)
+        chunked = [chunk_text(text, max_chars, self.chunk_overlap) for text in texts]
+        sources = [chunk['source'] for chunks in chunked for chunk in chunks]
+        if len(sources) > len(texts):
+            logger.debug(f"[macro-correct] 长文本分块: {len(texts)} 条 → {len(sources)} 块")
+        
+        outputs = self._correct_windows(sources, spelling=spelling)
+        self._correction_count += len(texts)
         
+        results = []
+        index = 0
+        for text, chunks in zip(texts, chunked):
+            chunk_outputs = outputs[index:index + len(chunks)]
+            index += len(chunks)
+            if all(output is None for output in chunk_outputs):
+                results.append(None)
+            else:
+                results.append(merge_chunks(text, chunks, chunk_outputs))
+        return results
+    
+    def _correct_windows(self, texts: List[str], spelling: bool = True) -> List[Optional[tuple]]:
+        """错别字模型和标点模型各做一次批量推理（每条文本不超过 max_len）
+        
+        Args:
+            spelling: False 时跳过错别字模型，只补标点
+        """
         try:
-            logger.debug(f"[macro-correct] 开始推理,输入长度: {len(text)} 字符")
+            logger.debug(f"[macro-correct] 开始推理,批大小: {len(texts)}, 总长度: {sum(len(t) for t in texts)} 字符")
             start_time = time.time()
             
-            all_errors = []
-            
-            # 步骤1: 纠正错别字（使用配置参数）
-            results = self._corrector([text], **self._correct_params)
-            
-            if not results or len(results) == 0:
-                logger.warning("[macro-correct] 错别字纠正返回空")
-                return None
-            
-            result = results[0]
-            corrected_text = result.get('target', text)
-            token_errors = result.get('errors', [])
-            all_errors.extend(token_errors)
+            if spelling:
+                # 步骤1: 纠正错别字（使用配置参数）
+                results = self._corrector(list(texts), **self._correct_params)
+                
+                if not results or len(results) != len(texts):
+                    logger.warning("[macro-correct] 错别字纠正返回空")
+                    return [None] * len(texts)
+                
+                corrected_texts = [result.get('target', text) for result, text in zip(results, texts)]
+                all_errors = [list(result.get('errors', [])) for result in results]
+            else:
+                corrected_texts = list(texts)
+                all_errors = [[] for _ in texts]
+            token_error_count = sum(len(errors) for errors in all_errors)
             
-            logger.debug(f"[macro-correct] 错别字纠正: 发现 {len(token_errors)} 处")
+            logger.debug(f"[macro-correct] 错别字纠正: 发现 {token_error_count} 处")
             
             # 步骤2: 添加标点符号（在已纠正错别字的文本上）
             if self._punct_corrector:
-                punct_results = self._punct_corrector.func_csc_punct_batch([corrected_text])
+                punct_results = self._punct_corrector.func_csc_punct_batch(corrected_texts)
                 
-                if punct_results and len(punct_results) > 0:
-                    punct_result = punct_results[0]
-                    final_text = punct_result.get('target', corrected_text)
-                    punct_errors = punct_result.get('errors', [])
-                    
-                    # 合并标点错误（需要调整位置，因为标点是在已纠错文本上添加的）
-                    all_errors.extend(punct_errors)
-                    
-                    logger.debug(f"[macro-correct] 标点补全: 添加 {len(punct_errors)} 处")
-                    corrected_text = final_text
+                if punct_results and len(punct_results) == len(corrected_texts):
+                    for i, punct_result in enumerate(punct_results):
+                        # 合并标点错误（标点是在已纠错文本上添加的）
+                        all_errors[i].extend(punct_result.get('errors', []))
+                        corrected_texts[i] = punct_result.get('target', corrected_texts[i])
                 else:
                     logger.debug("[macro-correct] 标点补全返回空，保持原纠错结果")
             
             inference_time = time.time() - start_time
-            logger.info(f"[macro-correct] 推理完成,耗时: {inference_time:.2f}秒,"
-                       f"总修改: {len(all_errors)} 处 (错别字:{len(token_errors)}, 标点:{len(all_errors)-len(token_errors)})")
+            total_errors = sum(len(errors) for errors in all_errors)
+            logger.info(f"[macro-correct] 推理完成,批大小: {len(texts)}, 耗时: {inference_time:.2f}秒,"
+                       f"总修改: {total_errors} 处 (错别字:{token_error_count}, 标点:{total_errors - token_error_count})")
             
-            self._correction_count += 1
-            return (corrected_text, all_errors)
+            return list(zip(corrected_texts, all_errors))
                 
         except Exception as e:
             logger.error(f"[macro-correct] 推理失败: {e}", exc_info=True)
-            return None
+            return [None] * len(texts)
     
     def unload(self):
         """卸载模型"""
         if self._corrector is not None:
             logger.info(f"[macro-correct] 卸载模型,已处理 {self._correction_count} 次纠错")
             self._corrector = None
+            self._punct_corrector = None
             self._is_loaded = False
             self._load_time = None
     
@@ -200,8 +267,29 @@ class LlamaCppEngine(BaseCorrectorEngine):
     限制:
     - 速度慢: 8秒/条
     - 通用模型: 非专门针对纠错任务
+    
+    优化:
+    - 固定的指令前缀只在加载时计算一次，保存模型状态（KV 缓存），
+      每次请求恢复该状态后只需计算用户文本部分
+    - 逐 token 流式生成：遇到结束符/停止词/输出异常变长时提前结束，超过 timeout 放弃
     """
     
+    # 固定指令前缀（计算一次后缓存）
+    PROMPT_PREFIX = """你是一个语音识别文本纠错助手。任务:
+1. 修正错别字和同音字错误
+2. 补全缺失的标点符号(句号、逗号、问号、感叹号等)
+3. 保持原意不变,不要添加、删减或重组内容
+4. 直接输出纠正后的文本,不要添加任何解释
+
+原始文本:
+"""
+    # 可变部分
+    PROMPT_SUFFIX = """{text}
+
+纠正后的文本:
+"""
+    STOP_SEQUENCES = ["原始文本:", "\n\n"]
+    
     def __init__(self, model_path: str, max_tokens: int = 512, 
                  temperature: float = 0.3, timeout: int = 15):
         self.model_path = model_path
@@ -213,11 +301,16 @@ class LlamaCppEngine(BaseCorrectorEngine):
         self._is_loaded = False
         self._load_time = None
         self._correction_count = 0
+        self._timeout_count = 0
+        self._prefix_state = None
+        self._prefix_tokens = 0
+        self._prefix_time = None
+        self._lock = threading.Lock()
         
         logger.info(f"[llama-cpp] 初始化引擎: model={model_path}")
     
     def load(self):
-        """加载 llama-cpp 模型"""
+        """加载 llama-cpp 模型，并预先计算指令前缀"""
         if self._is_loaded:
             return
         
@@ -245,13 +338,43 @@ class LlamaCppEngine(BaseCorrectorEngine):
             
             logger.info(f"[llama-cpp] 模型加载完成,耗时: {self._load_time:.2f}秒")
             
+            self._cache_prefix()
+            
         except ImportError:
             logger.warning("[llama-cpp] llama-cpp-python 未安装")
         except Exception as e:
             logger.error(f"[llama-cpp] 模型加载失败: {e}", exc_info=True)
     
+    def _cache_prefix(self):
+        """计算指令前缀并保存模型状态（失败时每次请求完整计算提示词）"""
+        try:
+            start_time = time.time()
+            tokens = self._model.tokenize(self.PROMPT_PREFIX.encode('utf-8'))
+            self._model.reset()
+            self._model.eval(tokens)
+            self._prefix_state = self._model.save_state()
+            self._prefix_tokens = len(tokens)
+            self._prefix_time = time.time() - start_time
+            logger.info(f"[llama-cpp] 指令前缀已缓存: {len(tokens)} tokens, 耗时 {self._prefix_time:.2f}秒")
+        except Exception as e:
+            self._prefix_state = None
+            logger.warning(f"[llama-cpp] 指令前缀缓存失败,每次完整计算提示词: {e}")
+    
     def correct_text(self, text: str) -> Optional[str]:
         """使用 llama-cpp 纠错文本"""
+        return self.correct_text_stream(text)
+    
+    def correct_text_stream(self, text: str, on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        流式纠错
+        
+        Args:
+            text: 待纠正的文本
+            on_token: 每生成一段文本时回调 on_token(piece)
+        
+        Returns:
+            纠正后的文本；超时或失败时返回 None（调用方使用原文）
+        """
         if not self._is_loaded:
             self.load()
         
@@ -260,34 +383,20 @@ class LlamaCppEngine(BaseCorrectorEngine):
             return None
         
         try:
-            prompt = f"""你是一个语音识别文本纠错助手。任务:
-1. 修正错别字和同音字错误
-2. 补全缺失的标点符号(句号、逗号、问号、感叹号等)
-3. 保持原意不变,不要添加、删减或重组内容
-4. 直接输出纠正后的文本,不要添加任何解释
-
-原始文本:
-{text}
-
-纠正后的文本:
-"""
-            
             logger.debug(f"[llama-cpp] 开始推理,输入长度: {len(text)} 字符")
             start_time = time.time()
             
-            output = self._model(
-                prompt,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=0.95,
-                repeat_penalty=1.1,
-                stop=["原始文本:", "\n\n"],
-                echo=False
-            )
+            with self._lock:
+                corrected_text, reason = self._generate(text, start_time, on_token)
             
             inference_time = time.time() - start_time
             
-            corrected_text = output['choices'][0]['text'].strip()
+            if reason == "timeout":
+                self._timeout_count += 1
+                logger.warning(f"[llama-cpp] 推理超时({self.timeout}秒),使用原文")
+                return None
+            
+            corrected_text = corrected_text.strip()
             
             # 清理前缀
             prefixes = ["纠正后的文本:", "纠正后:", "纠正后的文本:", "纠正后:"]
@@ -303,7 +412,7 @@ class LlamaCppEngine(BaseCorrectorEngine):
                 if lines:
                     corrected_text = lines[0].strip()
             
-            logger.info(f"[llama-cpp] 推理完成,耗时: {inference_time:.2f}秒")
+            logger.info(f"[llama-cpp] 推理完成,耗时: {inference_time:.2f}秒,结束原因: {reason}")
             
             self._correction_count += 1
             return corrected_text
@@ -312,11 +421,81 @@ class LlamaCppEngine(BaseCorrectorEngine):
             logger.error(f"[llama-cpp] 推理失败: {e}", exc_info=True)
             return None
     
+    def _generate(self, text: str, start_time: float, on_token=None):
+        """
+        逐 token 生成
+        
+        Returns:
+            (生成的文本, 结束原因: eos/stop/max_tokens/too_long/timeout)
+        """
+        suffix = self.PROMPT_SUFFIX.format(text=text)
+        if self._prefix_state is not None:
+            # 恢复指令前缀的状态，只计算可变部分
+            self._model.load_state(self._prefix_state)
+            tokens = self._model.tokenize(suffix.encode('utf-8'), add_bos=False)
+            reset = False
+        else:
+            tokens = self._model.tokenize((self.PROMPT_PREFIX + suffix).encode('utf-8'))
+            reset = True
+        
+        eos = self._model.token_eos()
+        # 纠错结果长度应与原文相近，明显过长说明模型开始自由发挥
+        max_chars = len(text) * 2 + 16
+        output = b""
+        emitted = 0
+        reason = "max_tokens"
+        
+        for i, token in enumerate(self._model.generate(
+                tokens, top_k=40, top_p=0.95, temp=self.temperature,
+                repeat_penalty=1.1, reset=reset)):
+            if time.time() - start_time > self.timeout:
+                reason = "timeout"
+                break
+            if token == eos:
+                reason = "eos"
+                break
+            
+            output += self._model.detokenize([token])
+            decoded = output.decode('utf-8', errors='ignore')
+            
+            stop_at = min((decoded.find(s) for s in self.STOP_SEQUENCES if s in decoded), default=-1)
+            if stop_at >= 0:
+                decoded = decoded[:stop_at]
+                reason = "stop"
+            
+            if on_token:
+                # 末尾可能是停止词的开头时先不输出
+                safe = len(decoded) if reason == "stop" else len(decoded) - self._partial_stop(decoded)
+                if safe > emitted:
+                    on_token(decoded[emitted:safe])
+                    emitted = safe
+            
+            if reason == "stop":
+                return decoded, reason
+            if len(decoded) > max_chars:
+                reason = "too_long"
+                break
+            if i + 1 >= self.max_tokens:
+                break
+        
+        return output.decode('utf-8', errors='ignore'), reason
+    
+    def _partial_stop(self, text: str) -> int:
+        """text 末尾与某个停止词开头重合的最大长度"""
+        longest = 0
+        for stop in self.STOP_SEQUENCES:
+            for n in range(min(len(stop) - 1, len(text)), 0, -1):
+                if text.endswith(stop[:n]):
+                    longest = max(longest, n)
+                    break
+        return longest
+    
     def unload(self):
         """卸载模型"""
         if self._model is not None:
             logger.info(f"[llama-cpp] 卸载模型,已处理 {self._correction_count} 次纠错")
             self._model = None
+            self._prefix_state = None
             self._is_loaded = False
             self._load_time = None
     
@@ -327,59 +506,719 @@ class LlamaCppEngine(BaseCorrectorEngine):
             "is_loaded": self._is_loaded,
             "load_time_seconds": self._load_time,
             "correction_count": self._correction_count,
+            "timeout_count": self._timeout_count,
+            "timeout_seconds": self.timeout,
+            "prefix_cached": self._prefix_state is not None,
+            "prefix_tokens": self._prefix_tokens,
+            "prefix_time_seconds": self._prefix_time,
+        }
+
+
+class OnnxCorrectEngine(BaseCorrectorEngine):
+    """
+    ONNX 引擎(轻量)
+    
+    运行由 deploy/export_onnx_corrector.py 导出并 int8 量化的 MacBERT 纠错模型
+    （与 macro-correct 同一模型），推理使用 sherpa-onnx 已依赖的 onnxruntime。
+    
+    优势:
+    - 不依赖 PyTorch/transformers: 加载快、常驻内存小
+    - int8 量化: CPU 推理更快
+    
+    模型目录:
+    - csc.int8.onnx: 错别字纠正模型（输出每个字的词表 logits）
+    - vocab.txt: 词表
+    - punct.int8.onnx + punct_labels.json: 标点模型（可选，输出每个字之后应补的标点）
+    """
+    
+    def __init__(self, model_dir: str, threshold: float = 0.55, max_len: int = 256,
+                 num_threads: int = 2, chunk_overlap: Optional[int] = None):
+        self.model_dir = model_dir
+        self.threshold = threshold
+        self.max_len = max_len
+        self.num_threads = num_threads
+        if chunk_overlap is None:
+            from src.config import TEXT_CORRECTION_CHUNK_OVERLAP
+            chunk_overlap = TEXT_CORRECTION_CHUNK_OVERLAP
+        self.chunk_overlap = chunk_overlap
+        
+        self._csc_session = None
+        self._punct_session = None
+        self._punct_labels = []
+        self._vocab = {}
+        self._id_to_token = []
+        self._is_loaded = False
+        self._load_time = None
+        self._correction_count = 0
+        
+        logger.info(f"[onnx] 初始化引擎: model_dir={model_dir}")
+    
+    def load(self):
+        """加载 ONNX 模型"""
+        if self._is_loaded:
+            return
+        
+        csc_path = os.path.join(self.model_dir, "csc.int8.onnx")
+        vocab_path = os.path.join(self.model_dir, "vocab.txt")
+        if not os.path.exists(csc_path) or not os.path.exists(vocab_path):
+            logger.warning(f"[onnx] 模型文件不存在: {csc_path}")
+            logger.warning("[onnx] 导出命令: python deploy/export_onnx_corrector.py")
+            return
+        
+        try:
+            start_time = time.time()
+            logger.info(f"[onnx] 开始加载模型: {self.model_dir}")
+            
+            import onnxruntime as ort
+            
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = self.num_threads
+            options.inter_op_num_threads = 1
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            
+            with open(vocab_path, 'r', encoding='utf-8') as f:
+                self._id_to_token = [line.rstrip('\n') for line in f]
+            self._vocab = {token: i for i, token in enumerate(self._id_to_token)}
+            
+            self._csc_session = ort.InferenceSession(csc_path, options, providers=["CPUExecutionProvider"])
+            
+            punct_path = os.path.join(self.model_dir, "punct.int8.onnx")
+            labels_path = os.path.join(self.model_dir, "punct_labels.json")
+            if os.path.exists(punct_path) and os.path.exists(labels_path):
+                with open(labels_path, 'r', encoding='utf-8') as f:
+                    self._punct_labels = json.load(f)
+                self._punct_session = ort.InferenceSession(punct_path, options, providers=["CPUExecutionProvider"])
+            else:
+                logger.info("[onnx] 未找到标点模型,仅纠正错别字")
+            
+            self._is_loaded = True
+            self._load_time = time.time() - start_time
+            
+            logger.info(f"[onnx] 模型加载完成,耗时: {self._load_time:.2f}秒")
+            
+        except ImportError:
+            logger.warning("[onnx] onnxruntime 未安装")
+        except Exception as e:
+            logger.error(f"[onnx] 模型加载失败: {e}", exc_info=True)
+    
+    def _encode(self, texts: List[str]):
+        """按字编码（每个字对应一个 token，位置与原文一一对应）"""
+        import numpy as np
+        
+        unk = self._vocab.get("[UNK]", 100)
+        cls_id = self._vocab.get("[CLS]", 101)
+        sep_id = self._vocab.get("[SEP]", 102)
+        length = max(len(text) for text in texts) + 2
+        input_ids = np.zeros((len(texts), length), dtype=np.int64)
+        attention_mask = np.zeros((len(texts), length), dtype=np.int64)
+        for row, text in enumerate(texts):
+            ids = [cls_id] + [self._vocab.get(ch, self._vocab.get(ch.lower(), unk)) for ch in text] + [sep_id]
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        return {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.zeros_like(input_ids),
+        }
+    
+    @staticmethod
+    def _softmax_max(logits):
+        """返回 (argmax, 最大概率)"""
+        import numpy as np
+        
+        shifted = logits - logits.max(axis=-1, keepdims=True)
+        probs = np.exp(shifted)
+        probs /= probs.sum(axis=-1, keepdims=True)
+        return probs.argmax(axis=-1), probs.max(axis=-1)
+    
+    @staticmethod
+    def _is_chinese(ch: str) -> bool:
+        return '\u4e00' <= ch <= '\u9fff'
+    
+    def _correct_spelling(self, texts: List[str]):
+        """错别字纠正：只替换汉字，且置信度不低于阈值"""
+        inputs = self._encode(texts)
+        logits = self._csc_session.run(None, inputs)[0]
+        pred_ids, pred_probs = self._softmax_max(logits)
+        
+        results = []
+        for row, text in enumerate(texts):
+            chars = list(text)
+            errors = []
+            for i, ch in enumerate(text):
+                if not self._is_chinese(ch):
+                    continue
+                token = self._id_to_token[pred_ids[row, i + 1]]
+                prob = float(pred_probs[row, i + 1])
+                if token != ch and len(token) == 1 and self._is_chinese(token) and prob >= self.threshold:
+                    chars[i] = token
+                    errors.append([ch, token, i, round(prob, 4)])
+            results.append(("".join(chars), errors))
+        return results
+    
+    def _add_punctuation(self, texts: List[str]):
+        """标点补全：在模型预测的位置之后插入标点（已有标点处不重复添加）"""
+        inputs = self._encode(texts)
+        logits = self._punct_session.run(None, inputs)[0]
+        pred_ids, pred_probs = self._softmax_max(logits)
+        
+        results = []
+        for row, text in enumerate(texts):
+            out = []
+            errors = []
+            for i, ch in enumerate(text):
+                out.append(ch)
+                label = self._punct_labels[pred_ids[row, i + 1]]
+                punct = label.split('-')[-1] if label != 'O' else ''
+                next_ch = text[i + 1] if i + 1 < len(text) else ''
+                if punct and len(punct) == 1 and not self._is_punct(ch) and not self._is_punct(next_ch):
+                    errors.append(['', punct, len(out), round(float(pred_probs[row, i + 1]), 4)])
+                    out.append(punct)
+            results.append(("".join(out), errors))
+        return results
+    
+    @staticmethod
+    def _is_punct(ch: str) -> bool:
+        return bool(ch) and ch in "，。！？、；：,.!?;:"
+    
+    def correct_text(self, text: str) -> Optional[tuple]:
+        """使用 ONNX 模型纠错文本
+        
+        Returns:
+            (corrected_text, errors) 或 None
+        """
+        return self.correct_batch([text])[0]
+    
+    def correct_batch(self, texts: List[str]) -> List[Optional[tuple]]:
+        """批量纠错（超过 max_len 的文本先分块，见 text_chunker）"""
+        return self._run_chunked(texts, spelling=True)
+    
+    def punctuate_batch(self, texts: List[str]) -> List[Optional[tuple]]:
+        """只运行标点模型"""
+        if not self._is_loaded:
+            self.load()
+        if self._punct_session is None:
+            return [None] * len(texts)
+        return self._run_chunked(texts, spelling=False)
+    
+    def _run_chunked(self, texts: List[str], spelling: bool) -> List[Optional[tuple]]:
+        if not self._is_loaded:
+            self.load()
+        
+        if not self._is_loaded or self._csc_session is None:
+            logger.debug("[onnx] 模型未加载,跳过纠错")
+            return [None] * len(texts)
+        
+        if not texts:
+            return []
+        
+        from src.text_chunker import chunk_text, merge_chunks
+        
+        try:
+            start_time = time.time()
+            chunked = [chunk_text(text, self.max_len - 2, self.chunk_overlap) for text in texts]
+            sources = [chunk['source'] for chunks in chunked for chunk in chunks]
+            non_empty = [i for i, source in enumerate(sources) if source]
+            outputs = [(source, []) for source in sources]
+            
+            if non_empty:
+                if spelling:
+                    spelled = self._correct_spelling([sources[i] for i in non_empty])
+                else:
+                    spelled = [(sources[i], []) for i in non_empty]
+                if self._punct_session is not None:
+                    punctuated = self._add_punctuation([text for text, _ in spelled])
+                    spelled = [(punct_text, errors + punct_errors)
+                               for (_, errors), (punct_text, punct_errors) in zip(spelled, punctuated)]
+                for i, output in zip(non_empty, spelled):
+                    outputs[i] = output
+            
+            results = []
+            index = 0
+            for text, chunks in zip(texts, chunked):
+                results.append(merge_chunks(text, chunks, outputs[index:index + len(chunks)]))
+                index += len(chunks)
+            
+            inference_time = time.time() - start_time
+            logger.info(f"[onnx] 推理完成,批大小: {len(texts)}, 耗时: {inference_time:.2f}秒")
+            self._correction_count += len(texts)
+            return results
+        
+        except Exception as e:
+            logger.error(f"[onnx] 推理失败: {e}", exc_info=True)
+            return [None] * len(texts)
+    
+    def unload(self):
+        """卸载模型"""
+        if self._csc_session is not None:
+            logger.info(f"[onnx] 卸载模型,已处理 {self._correction_count} 次纠错")
+            self._csc_session = None
+            self._punct_session = None
+            self._is_loaded = False
+            self._load_time = None
+    
+    def get_engine_stats(self) -> Dict:
+        """获取引擎统计信息"""
+        return {
+            "engine": "onnx",
+            "is_loaded": self._is_loaded,
+            "load_time_seconds": self._load_time,
+            "correction_count": self._correction_count,
+            "punctuation": self._punct_session is not None,
         }
 
 
+def create_engine(engine_type: str, model_path: str = None, **kwargs) -> BaseCorrectorEngine:
+    """按类型创建纠错引擎（不加载模型）"""
+    if engine_type == "macro-correct":
+        return MacroCorrectEngine()
+    if engine_type == "llama-cpp":
+        if not model_path:
+            raise ValueError("llama-cpp 引擎需要提供 model_path")
+        return LlamaCppEngine(model_path, **kwargs)
+    if engine_type == "onnx":
+        if not model_path:
+            raise ValueError("onnx 引擎需要提供 model_path（模型目录）")
+        return OnnxCorrectEngine(model_path, **kwargs)
+    raise ValueError(f"不支持的引擎类型: {engine_type}")
+
+
 class TextCorrector:
     """
     文本纠错器统一接口
     
     支持多种引擎:
     - macro-correct: 快速专业(推荐)
+    - onnx: ONNX int8 量化的 MacBERT(不依赖 PyTorch)
     - llama-cpp: 通用轻量(备选)
     
     特性:
     - 懒加载: 首次使用时才加载模型
     - 自动降级: 失败时返回原文
     - 统一接口: 对外屏蔽引擎差异
+    - 按句缓存: 传入 cache 时按句查询/写入持久化缓存
+    - 置信度门控: 识别置信度不低于 confidence_threshold 的文本只补标点，不送错别字模型
+    - 进程隔离: isolated=True 时引擎在可强制结束的子进程中推理，不会卡住调用线程
     """
     
     def __init__(self, 
                  engine_type: str = "macro-correct",
                  model_path: str = None,
+                 cache=None,
+                 confusion_dict=None,
+                 batch_wait_ms: float = 0,
+                 max_batch_size: int = 16,
+                 confidence_threshold: Optional[float] = None,
+                 isolated: bool = False,
+                 worker_timeout: float = 15.0,
+                 worker_threads: int = 0,
                  **kwargs):
         """
         初始化文本纠错器
         
         Args:
-            engine_type: 引擎类型 ("macro-correct" 或 "llama-cpp")
-            model_path: 模型路径 (llama-cpp 需要)
+            engine_type: 引擎类型 ("macro-correct"、"onnx" 或 "llama-cpp")
+            model_path: 模型路径 (llama-cpp 为 GGUF 文件, onnx 为模型目录)
+            cache: CorrectionCache 实例（None 表示不缓存）
+            confusion_dict: ConfusionDict 实例，模型前的词典快速纠错（None 表示不使用）
+            batch_wait_ms: 微批等待窗口（毫秒），>0 时并发请求合并为一批推理
+            max_batch_size: 单批最大条数
+            confidence_threshold: ASR 置信度门限（None 表示不按置信度分流）
+            isolated: 在独立子进程中运行引擎（超时强制结束并重启，调用方得到原文）
+            worker_timeout: 独立进程模式下单次推理的超时（秒）
+            worker_threads: 独立进程的 torch/BLAS 线程数（0 表示不限制）
             **kwargs: 其他引擎参数
         """
         self.engine_type = engine_type
+        self.model_path = model_path
         self._engine: Optional[BaseCorrectorEngine] = None
+        self.cache = cache
+        self.confusion_dict = confusion_dict
+        self._dict_stats = {'model_texts': 0, 'model_time_ms': 0, 'model_skipped': 0, 'time_saved_ms': 0}
+        self.confidence_threshold = confidence_threshold
+        self._gate_stats = {'gated_texts': 0, 'model_texts': 0, 'unknown_confidence': 0}
+        # 缓存命名空间：引擎和参数不同的结果互不复用（混淆词典版本见 _cache_namespace）
+        self._engine_namespace = json.dumps(
+            {"engine": engine_type, "model_path": model_path, **kwargs},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
         
-        # 根据类型创建引擎
-        if engine_type == "macro-correct":
-            self._engine = MacroCorrectEngine()
-        elif engine_type == "llama-cpp":
-            if not model_path:
-                raise ValueError("llama-cpp 引擎需要提供 model_path")
-            self._engine = LlamaCppEngine(model_path, **kwargs)
+        # 根据类型创建引擎（独立进程模式下，引擎在子进程中创建）
+        if isolated:
+            from src.corrector_worker import ProcessCorrectorEngine
+            self._engine = ProcessCorrectorEngine(
+                engine_type, model_path,
+                timeout=worker_timeout,
+                worker_threads=worker_threads,
+                **kwargs
+            )
         else:
-            raise ValueError(f"不支持的引擎类型: {engine_type}")
+            self._engine = create_engine(engine_type, model_path, **kwargs)
+        
+        # 微批处理：并发请求合并后一次送入引擎
+        self._batcher = None
+        if batch_wait_ms > 0:
+            from src.micro_batcher import MicroBatcher
+            self._batcher = MicroBatcher(
+                self._engine_batch,
+                max_batch_size=max_batch_size,
+                max_wait_ms=batch_wait_ms,
+                name="CorrectorBatcher"
+            )
+        
+        # 模型内存管理器（见 attach_model_manager）
+        self._model_manager = None
+        self._model_name = None
+        
+        logger.info(f"[文本纠错] 初始化: engine={engine_type}, 微批等待={batch_wait_ms}ms"
+                    f"{', 独立进程' if isolated else ''}")
+    
+    @property
+    def is_loaded(self) -> bool:
+        return bool(self._engine and getattr(self._engine, '_is_loaded', False))
+    
+    def load(self):
+        """加载模型"""
+        if self._engine:
+            self._engine.load()
+    
+    def warmup(self):
+        """预热：加载后先推理一条短文本，避免首次纠错变慢"""
+        if self._engine:
+            self._engine.correct_batch(["预热"])
+    
+    def get_model_rss_mb(self) -> Optional[float]:
+        """引擎在独立进程中运行时返回该进程的常驻内存（MB），与主进程共用内存时返回 None"""
+        get_rss = getattr(self._engine, 'get_rss_mb', None)
+        return get_rss() if get_rss is not None else None
+    
+    def attach_model_manager(self, manager, name: str = "corrector"):
+        """由模型管理器统一管理：推理前按需加载，空闲/内存紧张时可被卸载"""
+        self._model_manager = manager
+        self._model_name = name
+    
+    def hold_model(self):
+        """持有模型（如整个录音期间），持有期间模型管理器不会卸载它；与 release_model() 成对调用"""
+        if self._model_manager is not None:
+            self._model_manager.hold(self._model_name)
+    
+    def release_model(self):
+        if self._model_manager is not None:
+            self._model_manager.release(self._model_name)
+    
+    def correct(self, text: str, confidence: Optional[float] = None) -> Dict:
+        """
+        纠正文本中的错误（启用缓存时按句查询缓存，只对未命中的句子调用模型）
+        
+        Args:
+            text: 待纠正的文本
+            confidence: ASR 识别置信度（0~1，None 表示未知）
+        
+        Returns:
+            同 _correct_uncached()，启用缓存时另含:
+            "from_cache": bool,      # 是否全部来自缓存
+            "cache_hits": int        # 命中缓存的句子数
+            置信度门控生效时另含:
+            "punctuation_only": True # 只补了标点
+        """
+        return self.correct_batch([text], [confidence])[0]
+    
+    def correct_batch(self, texts: List[str], confidences: Optional[List[Optional[float]]] = None) -> List[Dict]:
+        """
+        批量纠错：所有文本中未命中缓存的句子合并为一批送入引擎
+        
+        Args:
+            texts: 待纠正的文本列表
+            confidences: 与 texts 对应的 ASR 置信度（None 表示未知）
+        
+        Returns:
+            与 texts 一一对应的结果（格式同 correct()）
+        """
+        if confidences is None or self.confidence_threshold is None:
+            return self._correct_batch(texts)
+        
+        # 高置信度文本只补标点，其余走完整纠错
+        gated = []
+        full = []
+        for i, confidence in enumerate(confidences):
+            if confidence is None:
+                self._gate_stats['unknown_confidence'] += 1
+                full.append(i)
+            elif confidence >= self.confidence_threshold:
+                gated.append(i)
+            else:
+                full.append(i)
+        self._gate_stats['gated_texts'] += len(gated)
+        self._gate_stats['model_texts'] += len(full)
+        
+        results: List[Optional[Dict]] = [None] * len(texts)
+        if gated:
+            for i, result in zip(gated, self._correct_batch([texts[i] for i in gated], punctuate=True)):
+                results[i] = result
+        if full:
+            for i, result in zip(full, self._correct_batch([texts[i] for i in full])):
+                results[i] = result
+        return results
+    
+    def correct_segments(self, segments: List[Dict]) -> Dict:
+        """
+        按识别分段纠错后拼接（每段按自身置信度决定是否调用模型）
+        
+        Args:
+            segments: [{"text": str, "confidence": float 或 None}, ...]
+        
+        Returns:
+            格式同 correct()，changes 的位置基于拼接后的原文
+        """
+        start_time = time.time()
+        texts = [segment.get('text') or '' for segment in segments]
+        results = self.correct_batch(texts, [segment.get('confidence') for segment in segments])
+        
+        changes = []
+        offset = 0
+        for text, result in zip(texts, results):
+            for change in result.get('changes') or []:
+                if isinstance(change.get('position'), int):
+                    change = dict(change, position=change['position'] + offset)
+                changes.append(change)
+            offset += len(text)
+        
+        original = "".join(texts)
+        corrected = "".join(result['corrected'] for result in results)
+        errors = [result['error'] for result in results if result.get('error')]
+        merged = {
+            "success": all(result['success'] for result in results) if results else True,
+            "original": original,
+            "corrected": corrected,
+            "changed": corrected != original,
+            "changes": changes,
+            "time_ms": int((time.time() - start_time) * 1000),
+            "engine": self.engine_type,
+            "punctuation_only_segments": sum(1 for result in results if result.get('punctuation_only')),
+        }
+        if errors:
+            merged["error"] = errors[0]
+        return merged
+    
+    @property
+    def _cache_namespace(self) -> str:
+        """缓存命名空间：引擎及参数 + 混淆词典版本（学习到新词条后，已缓存的句子重新纠错）"""
+        if self.confusion_dict is None:
+            return self._engine_namespace
+        return f"{self._engine_namespace}#dict:{self.confusion_dict.version}"
+    
+    def _correct_batch(self, texts: List[str], punctuate: bool = False) -> List[Dict]:
+        """
+        按句查缓存、词典、微批推理（punctuate=True 时只补标点，结果缓存在独立的命名空间中）
+        """
+        results = self._correct_batch_inner(texts, punctuate)
+        if punctuate:
+            for result in results:
+                result["punctuation_only"] = True
+        return results
+    
+    def _correct_batch_inner(self, texts: List[str], punctuate: bool) -> List[Dict]:
+        start_time = time.time()
+        
+        if self.cache is None:
+            engine_results = self._run_engine_batch(texts, punctuate)
+            elapsed_ms = int((time.time() - start_time) * 1000)
+            results = []
+            for text, engine_result in zip(texts, engine_results):
+                # 引擎没有独立的标点模型时 engine_result 为 None：保留原文
+                result, _ = self._correct_uncached(text, engine_result)
+                result["time_ms"] = elapsed_ms
+                results.append(result)
+            return results
+        
+        from src.correction_cache import split_sentences
+        
+        # 1. 按句切分并查缓存
+        plans = []
+        misses = {}
+        namespace = self._cache_namespace + ("#punct" if punctuate else "")
+        for text in texts:
+            parts = []
+            offset = 0
+            for sentence in split_sentences(text) if text else []:
+                core = sentence.strip()
+                if not core:
+                    parts.append(sentence)
+                else:
+                    # 保留首尾空白，只纠错/缓存句子主体
+                    lead = sentence[:len(sentence) - len(sentence.lstrip())]
+                    tail = sentence[len(lead) + len(core):]
+                    cached = self.cache.get(core, namespace)
+                    if cached is None:
+                        misses[core] = None
+                    parts.append((lead, core, tail, offset, cached))
+                offset += len(sentence)
+            plans.append(parts)
+        
+        # 2. 未命中的句子一次批量纠错并写入缓存
+        miss_list = list(misses)
+        fresh = {}
+        for core, engine_result in zip(miss_list, self._run_engine_batch(miss_list, punctuate)):
+            result, cacheable = self._correct_uncached(core, engine_result)
+            if cacheable:
+                self.cache.put(core, namespace, result['corrected'], result['changes'])
+            fresh[core] = result
+        
+        # 3. 拼装每条文本的结果
+        elapsed_ms = int((time.time() - start_time) * 1000)
+        return [self._assemble(text, parts, fresh, elapsed_ms) for text, parts in zip(texts, plans)]
+    
+    def _assemble(self, text: str, parts: List, fresh: Dict, elapsed_ms: int) -> Dict:
+        """按句结果拼装为整段结果"""
+        corrected_parts = []
+        changes = []
+        cache_hits = 0
+        sentence_count = 0
+        error = None
+        
+        for part in parts:
+            if isinstance(part, str):
+                corrected_parts.append(part)
+                continue
+            
+            lead, core, tail, offset, cached = part
+            sentence_count += 1
+            if cached is not None:
+                cache_hits += 1
+                corrected, sentence_changes = cached['corrected'], cached['changes']
+            else:
+                result = fresh[core]
+                corrected, sentence_changes = result['corrected'], result['changes']
+                if result.get('error'):
+                    error = result['error']
+            
+            # 变更位置换算为在整段原文中的位置
+            base = offset + len(lead)
+            for change in sentence_changes:
+                change = dict(change)
+                if isinstance(change.get('position'), int):
+                    change['position'] += base
+                changes.append(change)
+            
+            corrected_parts.append(lead + corrected + tail)
+        
+        corrected_text = "".join(corrected_parts)
+        result = {
+            "success": error is None,
+            "original": text,
+            "corrected": corrected_text,
+            "changed": corrected_text != text,
+            "changes": changes,
+            "time_ms": elapsed_ms,
+            "engine": self.engine_type,
+            "from_cache": cache_hits > 0 and cache_hits == sentence_count,
+            "cache_hits": cache_hits,
+        }
+        if error:
+            result["error"] = error
+        return result
+    
+    def _run_engine_batch(self, texts: List[str], punctuate: bool = False) -> List:
+        """
+        批量纠错：先用混淆词典替换已知错误，词典能完全确定的文本不再调用模型
+        
+        单条失败时对应位置为异常对象
+        """
+        if self.confusion_dict is None or not texts:
+            return self._run_model_batch(texts, punctuate)
         
-        logger.info(f"[文本纠错] 初始化: engine={engine_type}")
+        applied = [self.confusion_dict.apply(text) for text in texts]
+        need_model = [i for i, (_, _, confident) in enumerate(applied) if not confident]
+        skipped = len(texts) - len(need_model)
+        if skipped and not punctuate:
+            self._dict_stats['model_skipped'] += skipped
+            self._dict_stats['time_saved_ms'] += int(skipped * self._avg_model_ms())
+        
+        model_results = self._run_model_batch([applied[i][0] for i in need_model], punctuate)
+        
+        results = [(corrected, changes) for corrected, changes, _ in applied]
+        for i, engine_result in zip(need_model, model_results):
+            corrected, dict_changes, _ = applied[i]
+            if isinstance(engine_result, tuple) and len(engine_result) == 2:
+                # 词典替换是等长的，模型结果的位置与原文一致
+                results[i] = (engine_result[0], dict_changes + list(engine_result[1] or []))
+            elif isinstance(engine_result, str) and engine_result:
+                results[i] = engine_result
+            elif not dict_changes:
+                results[i] = engine_result
+            else:
+                # 模型未返回或失败：保留词典替换，带上模型的错误（不写入缓存，下次重新调用模型）
+                error = engine_result if isinstance(engine_result, Exception) else None
+                results[i] = (corrected, dict_changes, error)
+        return results
     
-    def correct(self, text: str) -> Dict:
+    def _avg_model_ms(self) -> float:
+        texts = self._dict_stats['model_texts']
+        return self._dict_stats['model_time_ms'] / texts if texts else 0.0
+    
+    def _run_model_batch(self, texts: List[str], punctuate: bool = False) -> List:
+        """调用引擎批量纠错；单条失败时对应位置为异常对象"""
+        if not texts:
+            return []
+        
+        start_time = time.time()
+        results = self._run_model_batch_inner(texts, punctuate)
+        if not punctuate:   # 词典节省耗时按完整纠错的平均耗时估算
+            self._dict_stats['model_texts'] += len(texts)
+            self._dict_stats['model_time_ms'] += int((time.time() - start_time) * 1000)
+        return results
+    
+    def _run_model_batch_inner(self, texts: List[str], punctuate: bool) -> List:
+        if self._batcher is not None:
+            # 与其他线程的并发请求合并为同一批
+            results = []
+            for future in self._batcher.submit_many([(punctuate, text) for text in texts]):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+            return results
+        
+        try:
+            return self._engine_correct_batch(texts, punctuate)
+        except Exception as e:
+            return [e] * len(texts)
+    
+    def _engine_batch(self, requests: List[tuple]) -> List:
+        """微批处理回调：requests 为 (punctuate, text)，纠错和只补标点各合并为一次推理"""
+        results: List = [None] * len(requests)
+        for punctuate in (False, True):
+            indices = [i for i, (mode, _) in enumerate(requests) if mode == punctuate]
+            if not indices:
+                continue
+            try:
+                batch_results = self._engine_correct_batch([requests[i][1] for i in indices], punctuate)
+            except Exception as e:
+                batch_results = [e] * len(indices)
+            for i, result in zip(indices, batch_results):
+                results[i] = result
+        return results
+    
+    def _engine_correct_batch(self, texts: List[str], punctuate: bool = False) -> List:
+        """引擎批量推理（受模型管理器管理时，推理期间模型不会被卸载）"""
+        run = self._engine.punctuate_batch if punctuate else self._engine.correct_batch
+        if self._model_manager is None:
+            return run(texts)
+        with self._model_manager.use(self._model_name):
+            return run(texts)
+    
+    def _correct_uncached(self, text: str, engine_result):
         """
-        纠正文本中的错误
+        把引擎输出整理为统一的纠错结果
         
         Args:
             text: 待纠正的文本
+            engine_result: 引擎对该文本的输出（None 表示引擎未返回，异常对象表示推理失败，
+                           (corrected, errors, 异常或 None) 表示模型未返回结果、只有词典替换）
         
         Returns:
-            {
+            (result, cacheable)
+            result: {
                 "success": bool,           # 是否成功
                 "original": str,           # 原始文本
                 "corrected": str,          # 纠正后的文本
@@ -389,8 +1228,10 @@ class TextCorrector:
                 "engine": str,             # 使用的引擎
                 "error": str (optional)    # 错误信息
             }
+            cacheable: 引擎正常返回了结果（模型未加载/出错时为 False，不写入缓存）
         """
         start_time = time.time()
+        cacheable = False
         
         result = {
             "success": False,
@@ -402,12 +1243,19 @@ class TextCorrector:
             "engine": self.engine_type,
         }
         
+        dict_only = isinstance(engine_result, tuple) and len(engine_result) == 3
+        model_error = None
+        if dict_only:
+            corrected_text, errors, model_error = engine_result
+            engine_result = (corrected_text, errors)
+        
         try:
-            # 调用引擎纠错
-            engine_result = self._engine.correct_text(text)
+            if isinstance(engine_result, Exception):
+                raise engine_result
             
             # 处理结果
             if engine_result:
+                cacheable = True
                 # macro-correct 返回 (corrected_text, errors) 元组
                 if isinstance(engine_result, tuple) and len(engine_result) == 2:
                     corrected_text, errors = engine_result
@@ -448,6 +1296,13 @@ class TextCorrector:
                 result["success"] = True
                 result["corrected"] = text
                 logger.debug("[文本纠错] 引擎返回空,使用原文")
+            
+            if dict_only:
+                cacheable = False
+                if model_error is not None:
+                    logger.error(f"[文本纠错] 模型失败，只应用词典替换: {model_error}")
+                    result["success"] = False
+                    result["error"] = str(model_error)
         
         except Exception as e:
             logger.error(f"[文本纠错] 处理失败: {e}", exc_info=True)
@@ -457,7 +1312,7 @@ class TextCorrector:
             elapsed = time.time() - start_time
             result["time_ms"] = int(elapsed * 1000)
         
-        return result
+        return result, cacheable
     
     def _detect_changes(self, original: str, corrected: str) -> List[Dict]:
         """
@@ -502,9 +1357,28 @@ class TextCorrector:
     
     def get_stats(self) -> Dict:
         """获取统计信息"""
-        if self._engine:
-            return self._engine.get_engine_stats()
-        return {}
+        stats = self._engine.get_engine_stats() if self._engine else {}
+        if self.cache is not None:
+            stats["cache"] = self.cache.get_stats()
+        if self._batcher is not None:
+            stats["batcher"] = self._batcher.get_stats()
+        if self.confusion_dict is not None:
+            stats["confusion_dict"] = {**self.confusion_dict.get_stats(), **self._dict_stats}
+        if self.confidence_threshold is not None:
+            gated = self._gate_stats['gated_texts']
+            total = gated + self._gate_stats['model_texts']
+            stats["confidence_gate"] = {
+                **self._gate_stats,
+                'threshold': self.confidence_threshold,
+                'avoided_ratio': round(gated / total, 3) if total else 0.0,
+            }
+        return stats
+    
+    def learn(self, original: str, corrected: str) -> int:
+        """从用户保存的纠正文本中学习混淆词对"""
+        if self.confusion_dict is None:
+            return 0
+        return self.confusion_dict.learn(original, corrected)
 
 
 # 全局单例
@@ -540,6 +1414,54 @@ def get_text_corrector(engine_type: str = None, **kwargs) -> TextCorrector:
                 logger.error("[文本纠错] llama-cpp 引擎需要设置 TEXT_CORRECTOR_MODEL_PATH")
                 raise ValueError("llama-cpp 需要设置 TEXT_CORRECTOR_MODEL_PATH")
             params["model_path"] = model_path
+            
+            from src.config import TEXT_CORRECTION_MAX_TOKENS, TEXT_CORRECTION_TEMPERATURE, TEXT_CORRECTION_TIMEOUT
+            params["max_tokens"] = TEXT_CORRECTION_MAX_TOKENS
+            params["temperature"] = TEXT_CORRECTION_TEMPERATURE
+            params["timeout"] = TEXT_CORRECTION_TIMEOUT
+        
+        # onnx 需要导出的模型目录
+        if engine_type == "onnx":
+            from src.config import ONNX_CORRECTOR_MODEL_DIR, ONNX_CORRECTOR_NUM_THREADS
+            params["model_path"] = os.getenv("TEXT_CORRECTOR_MODEL_PATH") or ONNX_CORRECTOR_MODEL_DIR
+            params["num_threads"] = ONNX_CORRECTOR_NUM_THREADS
+        
+        # 按句持久化缓存
+        from src.config import CORRECTION_CACHE_ENABLED, CORRECTION_CACHE_PATH, CORRECTION_CACHE_MAX_ENTRIES
+        if CORRECTION_CACHE_ENABLED and "cache" not in kwargs:
+            try:
+                from src.correction_cache import CorrectionCache
+                params["cache"] = CorrectionCache(CORRECTION_CACHE_PATH, max_entries=CORRECTION_CACHE_MAX_ENTRIES)
+            except Exception as e:
+                logger.warning(f"[文本纠错] 纠错缓存初始化失败,不使用缓存: {e}")
+        
+        # 混淆词典快速纠错
+        from src.config import (CONFUSION_DICT_ENABLED, CONFUSION_DICT_SEED_PATH, CONFUSION_DICT_LEARNED_PATH,
+                                CONFUSION_DICT_MIN_COUNT, CONFUSION_DICT_SKIP_CONFIDENCE)
+        if CONFUSION_DICT_ENABLED and "confusion_dict" not in kwargs:
+            try:
+                from src.confusion_dict import ConfusionDict
+                params["confusion_dict"] = ConfusionDict(
+                    CONFUSION_DICT_SEED_PATH, CONFUSION_DICT_LEARNED_PATH,
+                    min_count=CONFUSION_DICT_MIN_COUNT, skip_confidence=CONFUSION_DICT_SKIP_CONFIDENCE
+                )
+            except Exception as e:
+                logger.warning(f"[文本纠错] 混淆词典初始化失败,不使用词典: {e}")
+        
+        from src.config import TEXT_CORRECTION_BATCH_WAIT_MS, TEXT_CORRECTION_MAX_BATCH
+        params["batch_wait_ms"] = TEXT_CORRECTION_BATCH_WAIT_MS
+        params["max_batch_size"] = TEXT_CORRECTION_MAX_BATCH
+        
+        from src.config import ASR_CONFIDENCE_GATE_ENABLED, ASR_CONFIDENCE_THRESHOLD
+        if ASR_CONFIDENCE_GATE_ENABLED:
+            params["confidence_threshold"] = ASR_CONFIDENCE_THRESHOLD
+        
+        # 独立纠错进程
+        from src.config import CORRECTOR_WORKER_ENABLED, CORRECTOR_WORKER_TIMEOUT, CORRECTOR_NUM_THREADS
+        if CORRECTOR_WORKER_ENABLED:
+            params["isolated"] = True
+            params["worker_timeout"] = CORRECTOR_WORKER_TIMEOUT
+            params["worker_threads"] = CORRECTOR_NUM_THREADS
         
         params.update(kwargs)
         _corrector_instance = TextCorrector(**params)
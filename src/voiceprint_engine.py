@@ -6,15 +6,16 @@
 import os
 import numpy as np
 import pickle
+import importlib
+import importlib.util
 from pathlib import Path
 
-# 尝试导入音频处理库
-try:
-    import librosa
-    LIBROSA_AVAILABLE = True
-    print("[声纹] 使用 librosa 特征提取")
-except ImportError:
-    LIBROSA_AVAILABLE = False
+# 检查音频处理库（librosa 及其依赖占用内存较多，首次使用声纹功能时才导入）
+LIBROSA_AVAILABLE = importlib.util.find_spec("librosa") is not None
+librosa = None
+if LIBROSA_AVAILABLE:
+    print("[声纹] 使用 librosa 特征提取（按需加载）")
+else:
     print("[声纹警告] librosa 未安装，声纹识别功能不可用")
     print("[声纹警告] 安装方法: pip install librosa")
 
@@ -28,6 +29,7 @@ class VoiceprintEngine:
         """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
+        self.on_use = None  # 使用回调（模型管理器记录最近使用时间）
         
         if LIBROSA_AVAILABLE:
             self.available = True
@@ -38,6 +40,26 @@ class VoiceprintEngine:
         # 加载已注册的声纹
         self.voiceprints = self._load_voiceprints()
     
+    @property
+    def is_loaded(self):
+        return librosa is not None
+    
+    def load(self):
+        """导入 librosa"""
+        global librosa
+        if LIBROSA_AVAILABLE and librosa is None:
+            librosa = importlib.import_module("librosa")
+            print("[声纹] librosa 已加载")
+    
+    def unload(self):
+        """
+        释放本模块持有的 librosa 引用
+        导入后 librosa、numba、scipy 仍留在 sys.modules 中（移除会破坏其他模块的后续导入），
+        内存不会因此减少，所以声纹在模型管理器中登记为常驻
+        """
+        global librosa
+        librosa = None
+    
     def _extract_features(self, audio_data, sample_rate=16000):
         """
         提取音频特征（MFCC + 统计特征）
@@ -47,6 +69,11 @@ class VoiceprintEngine:
             return None
         
         try:
+            self.load()
+            if self.on_use:
+                self.on_use()
+            lib = librosa  # 持有引用，特征提取期间被卸载也不受影响
+            
             # 归一化音频
             if isinstance(audio_data, list):
                 audio_np = np.array(audio_data, dtype=np.float32)
@@ -57,7 +84,7 @@ class VoiceprintEngine:
                 audio_np = audio_np / 32768.0
             
             # 提取MFCC特征（梅尔频率倒谱系数）
-            mfccs = librosa.feature.mfcc(
+            mfccs = lib.feature.mfcc(
                 y=audio_np,
                 sr=sample_rate,
                 n_mfcc=20,  # 20个MFCC系数
@@ -70,7 +97,7 @@ class VoiceprintEngine:
             mfcc_std = np.std(mfccs, axis=1)
             
             # 提取音高特征
-            pitches, magnitudes = librosa.piptrack(
+            pitches, magnitudes = lib.piptrack(
                 y=audio_np,
                 sr=sample_rate,
                 n_fft=2048,
@@ -80,7 +107,7 @@ class VoiceprintEngine:
             pitch_std = np.std(pitches[pitches > 0]) if np.any(pitches > 0) else 0
             
             # 提取谱质心（音色特征）
-            spectral_centroids = librosa.feature.spectral_centroid(
+            spectral_centroids = lib.feature.spectral_centroid(
                 y=audio_np,
                 sr=sample_rate
             )
@@ -289,6 +316,7 @@ class VoiceprintEngine:
         """获取声纹引擎状态"""
         return {
             "available": self.available,
+            "loaded": self.is_loaded,
             "registered_count": len(self.voiceprints),
             "data_dir": str(self.data_dir)
         }
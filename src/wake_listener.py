@@ -0,0 +1,311 @@
+"""
+免按键唤醒监听
+空闲时以低功耗方式持续监听麦克风，检测到唤醒词（sherpa-onnx 关键词检测）
+或持续说话（Silero VAD）时触发录音，并把触发前的音频（预录缓冲）交给录音器，
+不丢失唤醒词和第一句话。
+
+只运行单线程的小模型（KWS 约 3M 参数 / Silero VAD），不运行完整 ASR。
+"""
+
+import time
+import threading
+import numpy as np
+from collections import deque
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    import sherpa_onnx
+    HAS_SHERPA = True
+except ImportError:
+    HAS_SHERPA = False
+
+try:
+    import sounddevice as sd
+    REAL_AUDIO = True
+except ImportError:
+    REAL_AUDIO = False
+
+
+# ==================== 触发检测器 ====================
+
+class VadTriggerDetector:
+    """持续说话触发：连续检测到语音超过 min_speech_duration 秒时触发"""
+
+    name = "vad"
+
+    def __init__(self, model_path: str = "models/sherpa/silero_vad.onnx", sample_rate: int = 16000,
+                 threshold: float = 0.6, min_speech_duration: float = 1.0):
+        if not HAS_SHERPA:
+            raise ImportError("sherpa-onnx 未安装")
+        if not Path(model_path).exists():
+            raise FileNotFoundError(f"VAD 模型不存在: {model_path}")
+
+        self.sample_rate = sample_rate
+        self.min_speech_duration = min_speech_duration
+
+        config = sherpa_onnx.VadModelConfig()
+        config.silero_vad.model = str(Path(model_path).absolute())
+        config.silero_vad.threshold = threshold
+        config.silero_vad.min_speech_duration = 0.25
+        config.silero_vad.window_size = 512
+        config.sample_rate = sample_rate
+        config.num_threads = 1
+        config.provider = "cpu"
+        self.vad = sherpa_onnx.VoiceActivityDetector(config, buffer_size_in_seconds=5)
+        self.speech_run = 0.0
+
+    def accept(self, samples: np.ndarray) -> Optional[str]:
+        """送入 float32 音频，触发时返回触发原因"""
+        self.vad.accept_waveform(samples)
+        # 监听阶段不需要分段结果，及时丢弃避免缓冲增长
+        while not self.vad.empty():
+            self.vad.pop()
+
+        if self.vad.is_speech_detected():
+            self.speech_run += len(samples) / self.sample_rate
+        else:
+            self.speech_run = 0.0
+
+        if self.speech_run >= self.min_speech_duration:
+            return "speech"
+        return None
+
+    def reset(self):
+        self.vad.reset()
+        self.speech_run = 0.0
+
+
+class KeywordTriggerDetector:
+    """唤醒词触发：sherpa-onnx 流式关键词检测"""
+
+    name = "kws"
+
+    def __init__(self, model_dir: str, keywords_file: Optional[str] = None, sample_rate: int = 16000,
+                 keywords_threshold: float = 0.25, keywords_score: float = 1.0):
+        if not HAS_SHERPA:
+            raise ImportError("sherpa-onnx 未安装")
+
+        model_dir = Path(model_dir)
+
+        def find(prefix):
+            for pattern in (f"{prefix}*.int8.onnx", f"{prefix}*.onnx"):
+                matches = sorted(model_dir.glob(pattern))
+                if matches:
+                    return str(matches[0])
+            raise FileNotFoundError(f"KWS 模型文件不存在: {model_dir}/{prefix}*.onnx")
+
+        keywords_file = keywords_file or str(model_dir / "keywords.txt")
+        if not Path(keywords_file).exists():
+            raise FileNotFoundError(f"唤醒词文件不存在: {keywords_file}")
+
+        self.sample_rate = sample_rate
+        self.spotter = sherpa_onnx.KeywordSpotter(
+            tokens=str(model_dir / "tokens.txt"),
+            encoder=find("encoder"),
+            decoder=find("decoder"),
+            joiner=find("joiner"),
+            num_threads=1,
+            keywords_file=keywords_file,
+            keywords_score=keywords_score,
+            keywords_threshold=keywords_threshold,
+            provider="cpu",
+        )
+        self.stream = self.spotter.create_stream()
+
+    def accept(self, samples: np.ndarray) -> Optional[str]:
+        self.stream.accept_waveform(self.sample_rate, samples)
+        while self.spotter.is_ready(self.stream):
+            self.spotter.decode_stream(self.stream)
+            keyword = self.spotter.get_result(self.stream)
+            if keyword:
+                self.spotter.reset_stream(self.stream)
+                return f"keyword:{keyword}"
+        return None
+
+    def reset(self):
+        self.stream = self.spotter.create_stream()
+
+
+# ==================== 唤醒监听器 ====================
+
+class WakeListener:
+    """
+    唤醒监听器
+
+    - can_listen() 返回 False 时（录音/处理中）释放麦克风并暂停
+    - 预录缓冲保留最近 preroll_seconds 秒音频，触发时一并交给 on_trigger(preroll, reason)
+    - 统计监听线程 CPU 占用，用于评估 24 小时待机的功耗
+    """
+
+    CHUNK_SECONDS = 0.1
+
+    def __init__(self, detector, on_trigger: Callable[[np.ndarray, str], None],
+                 sample_rate: int = 16000, preroll_seconds: float = 2.0,
+                 can_listen: Optional[Callable[[], bool]] = None, cooldown: float = 2.0):
+        """
+        Args:
+            detector: 触发检测器（VadTriggerDetector / KeywordTriggerDetector）
+            on_trigger: 触发回调 on_trigger(preroll_int16, reason)
+            sample_rate: 采样率
+            preroll_seconds: 预录缓冲时长（秒）
+            can_listen: 是否允许监听（None 表示始终允许）
+            cooldown: 恢复监听后忽略触发的时长（秒），避免录音结束的尾音再次触发
+        """
+        self.detector = detector
+        self.on_trigger = on_trigger
+        self.sample_rate = sample_rate
+        self.can_listen = can_listen
+        self.cooldown = cooldown
+
+        chunk_samples = int(sample_rate * self.CHUNK_SECONDS)
+        self._preroll = deque(maxlen=max(1, int(preroll_seconds * sample_rate / chunk_samples)))
+        self._running = False
+        self._thread = None
+        self._resume_time = 0.0
+
+        self.stats = {
+            'triggers': 0,
+            'last_trigger': None,
+            'last_reason': None,
+            'listen_seconds': 0.0,
+            'cpu_seconds': 0.0,
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self):
+        """启动后台监听"""
+        if self._running:
+            return
+        if not REAL_AUDIO:
+            print("[唤醒监听] 警告: sounddevice 未安装，无法监听")
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._listen_loop, daemon=True, name="WakeListener")
+        self._thread.start()
+        print(f"[唤醒监听] 已启动（模式: {self.detector.name}）")
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        print("[唤醒监听] 已停止")
+
+    def feed(self, chunk: np.ndarray):
+        """
+        处理一块 int16 音频，触发时返回 (预录音频, 触发原因)，否则返回 None
+
+        预录缓冲在检测前追加，保证触发块本身包含在预录音频中。
+        """
+        self._preroll.append(chunk)
+        reason = self.detector.accept(chunk.astype(np.float32) / 32768.0)
+        if reason is None:
+            return None
+        if time.time() < self._resume_time:
+            self.detector.reset()  # 冷却期内的触发直接丢弃
+            return None
+
+        preroll = np.concatenate(list(self._preroll))
+        self._preroll.clear()
+        self.detector.reset()
+
+        self.stats['triggers'] += 1
+        self.stats['last_trigger'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.stats['last_reason'] = reason
+        print(f"[唤醒监听] 触发录音: {reason}（预录 {len(preroll) / self.sample_rate:.1f}s）")
+        return preroll, reason
+
+    def _listening_allowed(self) -> bool:
+        return self.can_listen is None or self.can_listen()
+
+    def _listen_loop(self):
+        """监听线程：允许时打开麦克风，暂停时释放麦克风给录音器"""
+        device_rate, step = self._pick_device_rate()
+        chunk_samples = int(device_rate * self.CHUNK_SECONDS)
+
+        while self._running:
+            if not self._listening_allowed():
+                time.sleep(0.2)
+                continue
+
+            self.detector.reset()
+            self._preroll.clear()
+            self._resume_time = time.time() + self.cooldown
+
+            triggered = None
+            try:
+                with sd.InputStream(samplerate=device_rate, channels=1, dtype='int16',
+                                    blocksize=chunk_samples) as stream:
+                    wall_start = time.time()
+                    cpu_start = time.thread_time()
+                    try:
+                        while self._running and self._listening_allowed() and triggered is None:
+                            audio_chunk, _ = stream.read(chunk_samples)
+                            triggered = self.feed(audio_chunk[::step].flatten())
+                    finally:
+                        self.stats['listen_seconds'] += time.time() - wall_start
+                        self.stats['cpu_seconds'] += time.thread_time() - cpu_start
+            except Exception as e:
+                print(f"[唤醒监听] 错误: {e}")
+                time.sleep(5)
+                continue
+
+            # 先关闭输入流释放麦克风，再通知录音器打开
+            if triggered is not None:
+                try:
+                    self.on_trigger(*triggered)
+                except Exception as e:
+                    print(f"[唤醒监听] 触发回调异常: {e}")
+
+    def _pick_device_rate(self):
+        """选择设备采样率，不支持 16kHz 时用 48kHz 隔点降采样"""
+        try:
+            sd.check_input_settings(channels=1, dtype='int16', samplerate=self.sample_rate)
+            return self.sample_rate, 1
+        except Exception:
+            return self.sample_rate * 3, 3
+
+    def get_stats(self) -> dict:
+        """监听统计（cpu_percent 为单核占用百分比）"""
+        listen = self.stats['listen_seconds']
+        cpu_percent = self.stats['cpu_seconds'] / listen * 100 if listen > 0 else 0.0
+        return {
+            'running': self._running,
+            'mode': self.detector.name,
+            **self.stats,
+            'listen_seconds': round(listen, 1),
+            'cpu_seconds': round(self.stats['cpu_seconds'], 2),
+            'cpu_percent': round(cpu_percent, 2),
+        }
+
+
+def create_wake_listener(on_trigger: Callable, can_listen: Optional[Callable] = None) -> WakeListener:
+    """按配置创建唤醒监听器"""
+    from src.config import (HANDSFREE_MODE, HANDSFREE_KWS_MODEL_DIR, HANDSFREE_KEYWORDS_FILE,
+                            HANDSFREE_VAD_THRESHOLD, HANDSFREE_MIN_SPEECH_DURATION,
+                            HANDSFREE_PREROLL_SECONDS, SAMPLE_RATE)
+
+    if HANDSFREE_MODE == 'kws':
+        detector = KeywordTriggerDetector(
+            model_dir=HANDSFREE_KWS_MODEL_DIR,
+            keywords_file=HANDSFREE_KEYWORDS_FILE or None,
+            sample_rate=SAMPLE_RATE
+        )
+    else:
+        detector = VadTriggerDetector(
+            sample_rate=SAMPLE_RATE,
+            threshold=HANDSFREE_VAD_THRESHOLD,
+            min_speech_duration=HANDSFREE_MIN_SPEECH_DURATION
+        )
+
+    return WakeListener(
+        detector,
+        on_trigger=on_trigger,
+        sample_rate=SAMPLE_RATE,
+        preroll_seconds=HANDSFREE_PREROLL_SECONDS,
+        can_listen=can_listen
+    )
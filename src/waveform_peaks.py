@@ -0,0 +1,233 @@
+"""
+录音波形峰值（多分辨率 min/max）
+网页时间线绘制波形原先只能下载整个 WAV（约 115MB/小时）再在浏览器里解码。
+这里在保存音频时预先计算多级峰值，与 WAV 同目录保存为 15-30.peaks：
+- 第 0 级每 256 个采样取一对 min/max（16kHz 下 16ms），之后每级合并 4 倍，直到不超过 512 对
+- 对音频只遍历一次：按块读入，块内 reshape 后用 NumPy 求 min/max 得到第 0 级，更粗的级别由第 0 级逐级合并
+- 读取时只 seek 到所需级别和时间范围，一小时录音的总览只有约 1000 对（4KB）
+
+文件格式（小端）: 头部 "LCPK" + 版本、级数、采样率、第 0 级每对采样数、级间倍数、总采样数，
+之后按从细到粗依次存放各级 int16 [min, max] 数组。WAV 比峰值文件新时视为过期，重新计算。
+"""
+
+import os
+import wave
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.audio_preview import is_fresh
+
+PEAKS_SUFFIX = ".peaks"
+PEAKS_MAGIC = b"LCPK"
+PEAKS_VERSION = 1
+_HEADER = struct.Struct("<4sHHIIIQ")
+
+DEFAULT_SAMPLES_PER_PEAK = 256
+DEFAULT_FACTOR = 4
+MIN_LEVEL_PEAKS = 512
+MAX_LEVELS = 12
+
+
+def peaks_path(wav_path) -> Path:
+    """WAV 对应的峰值文件路径（15-30.wav → 15-30.peaks）"""
+    wav_path = Path(wav_path)
+    return wav_path.with_name(wav_path.stem + PEAKS_SUFFIX)
+
+
+class PeaksBuilder:
+    """流式计算多级峰值：依次 feed() 音频块，最后 finish()"""
+
+    def __init__(self, sample_rate: int = 16000, samples_per_peak: int = DEFAULT_SAMPLES_PER_PEAK,
+                 factor: int = DEFAULT_FACTOR):
+        self.sample_rate = sample_rate
+        self.samples_per_peak = samples_per_peak
+        self.factor = factor
+        self.total_samples = 0
+        self._mins: List[np.ndarray] = []
+        self._maxs: List[np.ndarray] = []
+        self._tail = np.empty(0, dtype=np.int16)
+
+    def feed(self, samples: np.ndarray):
+        """追加一块 int16 单声道采样"""
+        samples = np.asarray(samples, dtype=np.int16).ravel()
+        if not len(samples):
+            return
+        self.total_samples += len(samples)
+        if len(self._tail):
+            samples = np.concatenate([self._tail, samples])
+        usable = len(samples) - len(samples) % self.samples_per_peak
+        if usable:
+            blocks = samples[:usable].reshape(-1, self.samples_per_peak)
+            self._mins.append(blocks.min(axis=1))
+            self._maxs.append(blocks.max(axis=1))
+        # 不足一对的尾部留到下一块（拷贝，避免引用调用方的大数组）
+        self._tail = samples[usable:].copy()
+
+    def finish(self) -> Dict:
+        """
+        返回峰值 {"sample_rate", "samples_per_peak", "factor", "total_samples", "levels"}
+
+        levels 从细到粗，每级为 shape (n, 2) 的 int16 数组（列为 min, max）
+        """
+        mins, maxs = list(self._mins), list(self._maxs)
+        if len(self._tail):
+            mins.append(self._tail.min(keepdims=True))
+            maxs.append(self._tail.max(keepdims=True))
+        level_min = np.concatenate(mins) if mins else np.empty(0, dtype=np.int16)
+        level_max = np.concatenate(maxs) if maxs else np.empty(0, dtype=np.int16)
+
+        levels = [np.column_stack([level_min, level_max])]
+        while len(level_min) > MIN_LEVEL_PEAKS and len(levels) < MAX_LEVELS:
+            pad = -len(level_min) % self.factor
+            if pad:
+                # 末尾补边界值，不影响最后一组的 min/max
+                level_min = np.concatenate([level_min, np.repeat(level_min[-1:], pad)])
+                level_max = np.concatenate([level_max, np.repeat(level_max[-1:], pad)])
+            level_min = level_min.reshape(-1, self.factor).min(axis=1)
+            level_max = level_max.reshape(-1, self.factor).max(axis=1)
+            levels.append(np.column_stack([level_min, level_max]))
+
+        return {
+            'sample_rate': self.sample_rate,
+            'samples_per_peak': self.samples_per_peak,
+            'factor': self.factor,
+            'total_samples': self.total_samples,
+            'levels': levels,
+        }
+
+
+def compute_peaks(samples: np.ndarray, sample_rate: int = 16000, **kwargs) -> Dict:
+    """由内存中的 int16 采样计算峰值"""
+    builder = PeaksBuilder(sample_rate, **kwargs)
+    builder.feed(samples)
+    return builder.finish()
+
+
+def _wav_chunks(wf: wave.Wave_read, chunk_frames: int) -> Iterable[np.ndarray]:
+    channels = wf.getnchannels()
+    while True:
+        data = wf.readframes(chunk_frames)
+        if not data:
+            return
+        samples = np.frombuffer(data, dtype='<i2')
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+        yield samples
+
+
+def compute_peaks_from_wav(wav_path, chunk_frames: int = 1 << 20, **kwargs) -> Dict:
+    """按块流式读取 16bit WAV 计算峰值（内存占用与录音长度无关）"""
+    with wave.open(str(wav_path), 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"只支持 16bit WAV: {wav_path}")
+        builder = PeaksBuilder(wf.getframerate(), **kwargs)
+        for chunk in _wav_chunks(wf, chunk_frames):
+            builder.feed(chunk)
+    return builder.finish()
+
+
+def write_peaks(path, peaks: Dict):
+    """写入峰值文件（先写临时文件再替换）"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    header = _HEADER.pack(PEAKS_MAGIC, PEAKS_VERSION, len(peaks['levels']), peaks['sample_rate'],
+                          peaks['samples_per_peak'], peaks['factor'], peaks['total_samples'])
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for level in peaks['levels']:
+            f.write(np.ascontiguousarray(level, dtype='<i2').tobytes())
+    os.replace(tmp_path, path)
+
+
+def ensure_peaks(audio_path, force: bool = False) -> Optional[Path]:
+    """峰值文件不存在或比音频旧时重新计算，返回峰值文件路径（WAV 流式读取，其他格式先解码）"""
+    path = peaks_path(audio_path)
+    if force or not is_fresh(audio_path, path):
+        if Path(audio_path).suffix == '.wav':
+            peaks = compute_peaks_from_wav(audio_path)
+        else:
+            from src.audio_codec import read_audio
+            samples, sample_rate = read_audio(audio_path)
+            peaks = compute_peaks(samples, sample_rate)
+        write_peaks(path, peaks)
+    return path
+
+
+def _read_header(f) -> Optional[Dict]:
+    data = f.read(_HEADER.size)
+    if len(data) != _HEADER.size:
+        return None
+    magic, version, levels, sample_rate, samples_per_peak, factor, total = _HEADER.unpack(data)
+    if magic != PEAKS_MAGIC or version != PEAKS_VERSION or not levels or not samples_per_peak:
+        return None
+    counts = []
+    count = -(-total // samples_per_peak)
+    for _ in range(levels):
+        counts.append(count)
+        count = -(-count // factor)
+    return {'sample_rate': sample_rate, 'samples_per_peak': samples_per_peak, 'factor': factor,
+            'total_samples': total, 'counts': counts}
+
+
+def read_peaks(path, zoom: Optional[int] = None, width: Optional[int] = None,
+               start: Optional[float] = None, end: Optional[float] = None) -> Optional[Dict]:
+    """
+    读取一级峰值（只读取所需级别和时间范围）
+
+    Args:
+        zoom: 级别，0 为最粗的总览，数值越大越细；默认按 width 选择
+        width: 目标对数（如画布像素宽度），选择时间范围内不少于该对数的最粗级别
+        start, end: 时间范围（秒），默认整段
+
+    Returns:
+        {"zoom", "levels", "sample_rate", "samples_per_peak", "duration", "start", "peaks"}，
+        peaks 为 shape (n, 2) 的 int16 数组；文件不存在或格式不符时返回 None
+    """
+    try:
+        f = open(path, 'rb')
+    except OSError:
+        return None
+    with f:
+        header = _read_header(f)
+        if header is None:
+            return None
+        counts = header['counts']
+        levels = len(counts)
+        duration = header['total_samples'] / header['sample_rate'] if header['sample_rate'] else 0.0
+        start = min(max(start or 0.0, 0.0), duration)
+        end = duration if end is None else min(max(end, start), duration)
+
+        if zoom is None:
+            zoom = 0
+            if width:
+                # 从最粗开始找第一个在时间范围内对数足够的级别，都不够时用最细一级
+                zoom = levels - 1
+                for candidate in range(levels):
+                    level = levels - 1 - candidate
+                    seconds_per_peak = header['samples_per_peak'] * header['factor'] ** level / header['sample_rate']
+                    if (end - start) / seconds_per_peak >= width:
+                        zoom = candidate
+                        break
+        zoom = min(max(int(zoom), 0), levels - 1)
+        level = levels - 1 - zoom
+
+        samples_per_peak = header['samples_per_peak'] * header['factor'] ** level
+        first = min(int(start * header['sample_rate'] // samples_per_peak), counts[level])
+        last = min(-(-int(end * header['sample_rate']) // samples_per_peak), counts[level])
+        offset = _HEADER.size + sum(counts[:level]) * 4 + first * 4
+        f.seek(offset)
+        data = f.read(max(last - first, 0) * 4)
+        peaks = np.frombuffer(data, dtype='<i2').reshape(-1, 2)
+
+    return {
+        'zoom': zoom,
+        'levels': levels,
+        'sample_rate': header['sample_rate'],
+        'samples_per_peak': samples_per_peak,
+        'duration': round(duration, 3),
+        'start': round(first * samples_per_peak / header['sample_rate'], 3) if header['sample_rate'] else 0.0,
+        'peaks': peaks,
+    }
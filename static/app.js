@@ -213,7 +213,7 @@ async function cancelRecording() {
 async function refreshRecordings() {
     console.log('[刷新] 录音列表');
     try {
-        const result = await apiCall('/recordings?limit=10');
+        const result = await apiCall('/recordings?limit=10&fields=id,date,time,duration,word_count,preview,has_corrected');
         displayRecordings(result.recordings || []);
     } catch (error) {
         console.error('[刷新失败]', error);
@@ -231,7 +231,6 @@ function displayRecordings(recordings) {
     container.innerHTML = recordings.map(rec => {
         const hasCorrectedText = rec.text_corrected && rec.text_corrected !== rec.text_original;
         const displayText = hasCorrectedText ? rec.text_corrected : (rec.preview || '');
-        const fullText = rec.full_text || rec.preview || '';
         
         return `
         <div class="recording-item" id="rec-${rec.id}">
@@ -242,9 +241,9 @@ function displayRecordings(recordings) {
                     ${hasCorrectedText ? '<span class="correction-badge">已纠错</span>' : ''}
                 </div>
                 <div class="recording-text">${displayText}</div>
-                <details class="recording-full-text">
+                <details class="recording-full-text" ontoggle="loadFullText(this, '${rec.id}')">
                     <summary>展开查看完整转写</summary>
-                    <div class="full-text-content">${fullText}</div>
+                    <div class="full-text-content">加载中...</div>
                 </details>
                 ${hasCorrectedText ? `<details class="recording-original"><summary>查看原始文本</summary><div class="original-text">${rec.text_original || rec.preview}</div></details>` : ''}
                 <div id="correction-result-${rec.id}" class="correction-result" style="display:none;"></div>
@@ -282,6 +281,23 @@ function displayRecordings(recordings) {
     }).join('');
 }
 
+// 展开时才请求详情（列表接口不返回全文）
+async function loadFullText(details, recordingId) {
+    if (!details.open || details.dataset.loaded) {
+        return;
+    }
+    details.dataset.loaded = '1';
+    const container = details.querySelector('.full-text-content');
+    try {
+        const result = await apiCall(`/recordings/${recordingId}`);
+        container.textContent = result.recording.original_content || result.recording.content || '';
+    } catch (error) {
+        delete details.dataset.loaded;
+        container.textContent = '加载失败';
+        console.error('[加载全文失败]', error);
+    }
+}
+
 async function playRecording(recordingId) {
     console.log('[播放录音]', recordingId);
     
@@ -295,15 +311,80 @@ async function playRecording(recordingId) {
         document.body.appendChild(audioPlayer);
     }
     
-    // 设置音频源并播放
+    // 设置音频源并播放（默认取压缩试听版本，浏览器不支持该格式时改用原始 WAV）
     const audioUrl = `${API_BASE}/recordings/${recordingId}/audio`;
+    audioPlayer.preload = 'metadata';
+    audioPlayer.onerror = () => {
+        if (!audioPlayer.src.includes('format=original')) {
+            console.warn('[播放] 试听格式不可用，改用原始音频');
+            audioPlayer.src = `${audioUrl}?format=original`;
+            audioPlayer.play().catch(err => console.error('[播放失败]', err));
+        }
+    };
     audioPlayer.src = audioUrl;
+    loadWaveform(recordingId, audioPlayer);
     audioPlayer.play().catch(err => {
+        if (err.name === 'NotSupportedError' && !audioPlayer.src.includes('format=original')) {
+            return;  // 由 onerror 回退到原始音频
+        }
         console.error('[播放失败]', err);
         showModal('播放失败', '无法播放音频文件，可能该录音没有保存音频数据');
     });
 }
 
+// 播放器上方的波形时间线（预先计算的峰值，一小时录音只需几 KB），点击跳转
+async function loadWaveform(recordingId, audioPlayer) {
+    let canvas = document.getElementById('global-waveform');
+    if (!canvas) {
+        canvas = document.createElement('canvas');
+        canvas.id = 'global-waveform';
+        canvas.width = 600;
+        canvas.height = 60;
+        canvas.style.cssText = 'position:fixed;bottom:80px;left:50%;transform:translateX(-50%);z-index:1000;width:600px;max-width:90vw;height:60px;background:#000;border:2px solid #00ff00;cursor:pointer;';
+        document.body.appendChild(canvas);
+    }
+    canvas.style.display = 'none';
+    canvas.dataset.recording = recordingId;
+
+    let data;
+    try {
+        const response = await fetch(`${API_BASE}/recordings/${recordingId}/peaks?width=${canvas.width}`);
+        data = await response.json();
+        // 加载期间已切换到其他录音
+        if (!data.success || canvas.dataset.recording !== recordingId) return;
+    } catch (error) {
+        console.warn('[波形] 加载失败', error);
+        return;
+    }
+
+    const ctx = canvas.getContext('2d');
+    const count = data.peaks.length / 2;
+    const draw = () => {
+        const progress = data.duration ? audioPlayer.currentTime / data.duration : 0;
+        const mid = canvas.height / 2;
+        ctx.clearRect(0, 0, canvas.width, canvas.height);
+        for (let x = 0; x < canvas.width; x++) {
+            // 多对峰值落在同一像素时取其中的最小/最大值
+            const from = Math.floor(x * count / canvas.width);
+            const to = Math.max(from + 1, Math.floor((x + 1) * count / canvas.width));
+            let min = 0, max = 0;
+            for (let i = from; i < to && i < count; i++) {
+                min = Math.min(min, data.peaks[2 * i]);
+                max = Math.max(max, data.peaks[2 * i + 1]);
+            }
+            ctx.fillStyle = x / canvas.width < progress ? '#00ff00' : '#006600';
+            ctx.fillRect(x, mid - max / 32768 * mid, 1, Math.max(1, (max - min) / 32768 * mid));
+        }
+    };
+    canvas.onclick = (event) => {
+        const rect = canvas.getBoundingClientRect();
+        audioPlayer.currentTime = (event.clientX - rect.left) / rect.width * data.duration;
+    };
+    audioPlayer.ontimeupdate = draw;
+    canvas.style.display = 'block';
+    draw();
+}
+
 async function viewRecording(recordingId) {
     console.log('[查看录音]', recordingId);
     try {
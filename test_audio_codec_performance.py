@@ -0,0 +1,94 @@
+"""
+录音音频压缩性能: WAV vs FLAC（无损）
+
+生成一段 N 分钟的合成语音信号（带包络的谐波 + 停顿 + 底噪，接近实际录音的可压缩性），
+对每个可用的编码后端（soundfile / ffmpeg）和压缩级别统计:
+- 压缩率（FLAC 大小 / WAV 大小）
+- 编码、解码速度（相对实时的倍数，树莓派上关注这两项）
+- 解码结果与原始采样是否一致
+
+用法:
+    python test_audio_codec_performance.py [--minutes 10] [--levels 0,5,8]
+"""
+
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+
+from src.audio_codec import SOUNDFILE_AVAILABLE, encode_flac, read_audio
+
+
+def synth_speech(seconds: int, sample_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """合成语音：0.2~0.6 秒的音节（基频 100~250Hz 的谐波）+ 句间停顿 + 底噪"""
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 30, seconds * sample_rate)
+    pos = 0
+    while pos < len(audio):
+        length = int(rng.uniform(0.2, 0.6) * sample_rate)
+        t = np.arange(length) / sample_rate
+        f0 = rng.uniform(100, 250)
+        syllable = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 8))
+        envelope = np.sin(np.pi * np.arange(length) / length) ** 2
+        end = min(pos + length, len(audio))
+        audio[pos:end] += (syllable * envelope * rng.uniform(1500, 6000))[:end - pos]
+        pos = end + int(rng.choice([0.05, 0.1, 0.8]) * sample_rate)
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def main():
+    args = sys.argv[1:]
+    minutes = int(args[args.index('--minutes') + 1]) if '--minutes' in args else 10
+    levels = [int(x) for x in args[args.index('--levels') + 1].split(',')] if '--levels' in args else [0, 5, 8]
+
+    backends = (['soundfile'] if SOUNDFILE_AVAILABLE else []) + (['ffmpeg'] if shutil.which('ffmpeg') else [])
+    print("=" * 60)
+    print(f"录音音频压缩: {minutes} 分钟合成语音, 后端: {', '.join(backends) or '无'}")
+    print("=" * 60)
+    if not backends:
+        print("未安装 soundfile 或 ffmpeg，无法测试 FLAC（pip install soundfile）")
+        return
+
+    base = Path(tempfile.mkdtemp(prefix="lifecoach_codec_bench_"))
+    try:
+        import wave
+        audio = synth_speech(minutes * 60)
+        wav_path = base / "input.wav"
+        with wave.open(str(wav_path), 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(audio.tobytes())
+        wav_size = wav_path.stat().st_size
+        seconds = len(audio) / 16000
+
+        start = time.perf_counter()
+        read_audio(wav_path)
+        wav_read = time.perf_counter() - start
+        print(f"WAV: {wav_size / 1024 / 1024:.1f}MB, 读取 {seconds / wav_read:.0f}x 实时")
+
+        print(f"{'后端':<12}{'级别':>6}{'大小(MB)':>10}{'压缩率':>8}{'编码(x实时)':>14}{'解码(x实时)':>14}{'一致':>6}")
+        for backend in backends:
+            for level in levels:
+                flac_path = base / f"{backend}_{level}.flac"
+                start = time.perf_counter()
+                encode_flac(wav_path, flac_path, level, backend=backend)
+                encode_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                decoded, _ = read_audio(flac_path)
+                decode_seconds = time.perf_counter() - start
+                size = flac_path.stat().st_size
+                print(f"{backend:<12}{level:>6}{size / 1024 / 1024:>10.1f}{size / wav_size:>8.2f}"
+                      f"{seconds / encode_seconds:>14.0f}{seconds / decode_seconds:>14.0f}"
+                      f"{'是' if np.array_equal(decoded, audio) else '否':>6}")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
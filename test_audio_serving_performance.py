@@ -0,0 +1,98 @@
+"""
+录音音频接口性能: 整文件传输 vs Range 请求 vs 压缩试听版本
+
+在临时目录生成一段 N 分钟的 16kHz WAV，通过 Flask 测试客户端请求音频接口（不含网络传输），
+统计响应字节数和服务端耗时，并按给定带宽估算 Wi-Fi 下的传输时间。
+
+对比项:
+- 整个 WAV（浏览器不支持 Range 时）
+- Range 请求开头 64KB（浏览器 preload=metadata / 开始播放）和中间定位
+- 压缩试听版本（需要安装 ffmpeg）：编码耗时、文件大小
+
+用法:
+    python test_audio_serving_performance.py [--minutes 60] [--mbps 20]
+"""
+
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import src.config as config
+
+
+def measure(client, url, headers=None, repeat=3):
+    times = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers or {})
+        size = len(response.data)
+        times.append(time.perf_counter() - start)
+    return sum(times) / len(times) * 1000, size, response.headers.get('X-Audio-Variant')
+
+
+def main():
+    args = sys.argv[1:]
+    minutes = int(args[args.index('--minutes') + 1]) if '--minutes' in args else 60
+    mbps = float(args[args.index('--mbps') + 1]) if '--mbps' in args else 20.0
+
+    root = Path(tempfile.mkdtemp(prefix="lifecoach_audio_bench_"))
+    base = root / "recordings"   # 索引、统计文件在录音目录旁
+    try:
+        config.STORAGE_BASE = str(base)
+        from src.file_storage import FileStorage
+        import src.api_server as api_server
+        from src.audio_preview import get_preview_encoder
+
+        storage = FileStorage()
+        recording_id = "2026-01-21/15-30"
+        storage.save(recording_id, "性能测试")
+        rng = np.random.default_rng(0)
+        audio = (rng.standard_normal(16000 * 60 * minutes) * 3000).astype(np.int16)
+        wav_path = Path(storage.save_audio(recording_id, audio))
+        wav_size = wav_path.stat().st_size
+
+        class Manager:
+            pass
+        manager = Manager()
+        manager.storage = storage
+        api_server.app_manager = manager
+        client = api_server.app.test_client()
+        url = f"/api/recordings/{recording_id}/audio"
+
+        print("=" * 60)
+        print(f"录音音频接口: {minutes} 分钟 WAV ({wav_size / 1024 / 1024:.1f}MB), 估算带宽 {mbps:.0f}Mbps")
+        print("=" * 60)
+        rows = [
+            ('整个 WAV', measure(client, url + "?format=original")),
+            ('Range 开头 64KB', measure(client, url + "?format=original", {'Range': 'bytes=0-65535'})),
+            ('Range 中间 64KB', measure(client, url + "?format=original",
+                                        {'Range': f'bytes={wav_size // 2}-{wav_size // 2 + 65535}'})),
+        ]
+
+        encoder = get_preview_encoder()
+        if encoder is not None and encoder.available:
+            start = time.time()
+            encoder.get(wav_path)
+            encoder.wait()
+            print(f"试听版本编码 ({encoder.fmt} {encoder.bitrate}): {time.time() - start:.1f}s")
+            rows.append(('整个试听版本', measure(client, url)))
+        else:
+            print("未安装 ffmpeg，跳过试听版本")
+
+        print(f"{'请求':<18}{'字节':>14}{'服务端(ms)':>12}{'传输估算(s)':>14}")
+        for name, (elapsed, size, variant) in rows:
+            transfer = size * 8 / (mbps * 1_000_000)
+            print(f"{name:<18}{size:>14,}{elapsed:>12.1f}{transfer:>14.2f}  [{variant}]")
+        storage.cleanup()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
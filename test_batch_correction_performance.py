@@ -0,0 +1,146 @@
+"""
+文本纠错批处理性能对比
+逐条串行纠错 vs 一次批量纠错 vs 多线程并发提交（微批合并）
+
+对比指标:
+- 总耗时 / 平均每条耗时
+- 吞吐（条/秒）
+- 并发模式下的实际批次数和平均批大小
+
+用法:
+    python test_batch_correction_performance.py [文本文件] [--count N] [--threads N]
+    （未指定文本文件时使用内置示例句子；每行一条）
+"""
+
+import os
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config import TEXT_CORRECTION_BATCH_WAIT_MS, TEXT_CORRECTION_MAX_BATCH
+
+TEXT_CORRECTION_ENGINE = os.getenv("TEXT_CORRECTOR_ENGINE", "macro-correct")
+
+SAMPLE_TEXTS = [
+    "今天天汽很好我们去公园散步",
+    "这个方案的可行性需要进一部论证",
+    "他说明天上午开会讨论项目进度",
+    "我们应该坚持锻练身体保持健康",
+    "请把会议记要发给所有参会人员",
+    "周末一起去图书馆看书吧",
+    "这件事情的影响非常深远",
+    "老师布置的做业今天必须完成",
+]
+
+
+def load_texts(args):
+    """加载测试文本"""
+    count = 32
+    if '--count' in args:
+        count = int(args[args.index('--count') + 1])
+    files = [a for a in args if not a.startswith('--') and Path(a).is_file()]
+    if files:
+        lines = [line.strip() for line in Path(files[0]).read_text(encoding='utf-8').splitlines()]
+        texts = [line for line in lines if line]
+    else:
+        texts = SAMPLE_TEXTS
+    return [texts[i % len(texts)] for i in range(count)]
+
+
+def run_sequential(corrector, texts):
+    start = time.time()
+    results = [corrector.correct(text) for text in texts]
+    return time.time() - start, results
+
+
+def run_batch(corrector, texts):
+    start = time.time()
+    results = corrector.correct_batch(texts)
+    return time.time() - start, results
+
+
+def run_concurrent(corrector, texts, num_threads):
+    """多线程各自调用 correct()，由微批处理器合并"""
+    results = [None] * len(texts)
+    lock = threading.Lock()
+    next_index = [0]
+
+    def worker():
+        while True:
+            with lock:
+                i = next_index[0]
+                next_index[0] += 1
+            if i >= len(texts):
+                return
+            results[i] = corrector.correct(texts[i])
+
+    start = time.time()
+    threads = [threading.Thread(target=worker) for _ in range(num_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.time() - start, results
+
+
+def print_report(name, elapsed, count):
+    print(f"\n[{name}]")
+    print(f"  总耗时: {elapsed:.2f}s")
+    print(f"  平均每条: {elapsed / count * 1000:.1f}ms")
+    print(f"  吞吐: {count / elapsed:.1f} 条/秒")
+
+
+def main():
+    args = sys.argv[1:]
+    num_threads = 8
+    if '--threads' in args:
+        num_threads = int(args[args.index('--threads') + 1])
+
+    from src.text_corrector import TextCorrector
+
+    texts = load_texts(args)
+
+    # 不使用缓存，避免重复句子命中缓存影响对比
+    sequential_corrector = TextCorrector(engine_type=TEXT_CORRECTION_ENGINE, cache=None)
+    batch_wait_ms = TEXT_CORRECTION_BATCH_WAIT_MS if TEXT_CORRECTION_BATCH_WAIT_MS > 0 else 20
+    batched_corrector = TextCorrector(engine_type=TEXT_CORRECTION_ENGINE, cache=None,
+                                      batch_wait_ms=batch_wait_ms,
+                                      max_batch_size=TEXT_CORRECTION_MAX_BATCH)
+    # 两个纠错器共用同一引擎实例，只加载一次模型
+    batched_corrector._engine = sequential_corrector._engine
+
+    print("=" * 60)
+    print("文本纠错批处理对比: 逐条 vs 批量 vs 并发微批")
+    print("=" * 60)
+    print(f"引擎: {TEXT_CORRECTION_ENGINE}, 文本: {len(texts)} 条, 并发线程: {num_threads}, "
+          f"微批窗口: {batch_wait_ms}ms, 最大批: {TEXT_CORRECTION_MAX_BATCH}")
+
+    # 预热（加载模型）
+    sequential_corrector.correct(texts[0])
+
+    elapsed, sequential_results = run_sequential(sequential_corrector, texts)
+    print_report("逐条串行", elapsed, len(texts))
+    baseline = elapsed
+
+    elapsed, batch_results = run_batch(sequential_corrector, texts)
+    print_report("一次批量", elapsed, len(texts))
+    print(f"  加速: {baseline / max(elapsed, 1e-6):.2f}x")
+
+    elapsed, concurrent_results = run_concurrent(batched_corrector, texts, num_threads)
+    print_report(f"{num_threads} 线程并发 + 微批", elapsed, len(texts))
+    print(f"  加速: {baseline / max(elapsed, 1e-6):.2f}x")
+    stats = batched_corrector.get_stats().get('batcher', {})
+    print(f"  批次数: {stats.get('batches', 0)}, 平均批大小: {stats.get('avg_batch_size', 0)}")
+
+    mismatched = sum(1 for a, b in zip(sequential_results, batch_results)
+                     if a['corrected'] != b['corrected'])
+    mismatched += sum(1 for a, b in zip(sequential_results, concurrent_results)
+                      if a['corrected'] != b['corrected'])
+    print(f"\n结果一致性: {'一致' if mismatched == 0 else f'{mismatched} 条不一致'}")
+
+
+if __name__ == "__main__":
+    main()
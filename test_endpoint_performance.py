@@ -0,0 +1,166 @@
+"""
+实时分段模式性能对比
+Silero VAD + 逐段转录（当前默认） vs 流式识别器端点单遍分段（REALTIME_SEGMENTER=endpoint）
+
+对比指标:
+- CPU 时间（进程 CPU 时间 / 音频时长）
+- 分段延迟（分段音频送入完毕 → 拿到文本）
+- 识别文本
+
+用法:
+    python test_endpoint_performance.py [音频文件.wav] [--realtime]
+    （未指定音频时使用 Paraformer 模型目录下的 test_wavs/0.wav）
+"""
+
+import sys
+import time
+import wave
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config import (SHERPA_MODEL_DIR, SHERPA_USE_INT8, SHERPA_NUM_THREADS,
+                        SHERPA_RULE1_MIN_TRAILING_SILENCE, SHERPA_RULE2_MIN_TRAILING_SILENCE,
+                        SHERPA_RULE3_MIN_UTTERANCE_LENGTH, REALTIME_MIN_SILENCE_DURATION,
+                        REALTIME_MIN_SPEECH_DURATION, REALTIME_VAD_THRESHOLD,
+                        REALTIME_MAX_SEGMENT_DURATION, REALTIME_MAX_SPEECH_DURATION,
+                        REALTIME_SPEECH_PAD_MS)
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 0.1  # 与录音线程一致：100ms 每块
+
+
+def load_audio(audio_file):
+    """加载 16kHz 单声道 WAV 为 float32"""
+    with wave.open(str(audio_file), 'rb') as wf:
+        if wf.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"需要 {SAMPLE_RATE}Hz 音频，实际 {wf.getframerate()}Hz")
+        frames = wf.readframes(wf.getnframes())
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def iter_chunks(audio, realtime=False):
+    """按 100ms 切块，可选按真实时间节奏送入"""
+    chunk_samples = int(SAMPLE_RATE * CHUNK_SECONDS)
+    for i in range(0, len(audio), chunk_samples):
+        yield audio[i:i + chunk_samples]
+        if realtime:
+            time.sleep(CHUNK_SECONDS)
+
+
+def run_silero_mode(engine, audio, realtime=False):
+    """当前默认路径：Silero VAD 分段 + 每段重新转录（含前后填充）"""
+    from src.vad_silero import SileroVAD
+
+    results = []
+
+    def on_segment(samples, metadata):
+        ready_time = time.time()
+        text = engine.transcribe(samples)['text']
+        results.append({
+            'text': text,
+            'latency': time.time() - ready_time,
+            'audio_seconds': len(samples) / SAMPLE_RATE
+        })
+
+    vad = SileroVAD(
+        sample_rate=SAMPLE_RATE,
+        min_silence_duration=REALTIME_MIN_SILENCE_DURATION,
+        min_speech_duration=REALTIME_MIN_SPEECH_DURATION,
+        threshold=REALTIME_VAD_THRESHOLD,
+        max_segment_duration=REALTIME_MAX_SEGMENT_DURATION,
+        max_speech_duration=REALTIME_MAX_SPEECH_DURATION,
+        speech_pad_ms=REALTIME_SPEECH_PAD_MS,
+        on_segment_callback=on_segment
+    )
+
+    cpu_start = time.process_time()
+    wall_start = time.time()
+    for chunk in iter_chunks(audio, realtime):
+        vad.process_chunk(chunk)
+    vad.flush()
+    return results, time.process_time() - cpu_start, time.time() - wall_start
+
+
+def run_endpoint_mode(engine, audio, realtime=False):
+    """单遍模式：流式识别器端点检测直接分段"""
+    results = []
+    last_feed = {'time': time.time()}
+
+    def on_segment(samples, metadata):
+        results.append({
+            'text': metadata['text'],
+            'latency': time.time() - last_feed['time'],
+            'audio_seconds': len(samples) / SAMPLE_RATE
+        })
+
+    segmenter = engine.create_endpoint_segmenter()
+    segmenter.on_segment_callback = on_segment
+
+    cpu_start = time.process_time()
+    wall_start = time.time()
+    for chunk in iter_chunks(audio, realtime):
+        last_feed['time'] = time.time()
+        segmenter.process_chunk(chunk)
+    last_feed['time'] = time.time()
+    segmenter.flush()
+    segmenter.stop()
+    return results, time.process_time() - cpu_start, time.time() - wall_start
+
+
+def print_report(name, results, cpu_time, wall_time, audio_duration):
+    """输出单个模式的统计"""
+    latencies = [r['latency'] for r in results] or [0]
+    decoded_seconds = sum(r['audio_seconds'] for r in results)
+    print(f"\n[{name}]")
+    print(f"  分段数: {len(results)}")
+    print(f"  CPU 时间: {cpu_time:.2f}s (每秒音频 {cpu_time / audio_duration:.3f}s)")
+    print(f"  墙钟时间: {wall_time:.2f}s")
+    print(f"  解码音频总长: {decoded_seconds:.1f}s (原始 {audio_duration:.1f}s, 重叠 {max(0, decoded_seconds - audio_duration):.1f}s)")
+    print(f"  分段延迟: 平均 {np.mean(latencies):.3f}s, 最大 {np.max(latencies):.3f}s")
+    print(f"  文本: {''.join(r['text'] for r in results)}")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    realtime = '--realtime' in sys.argv
+
+    audio_file = Path(args[0]) if args else Path(SHERPA_MODEL_DIR) / "test_wavs" / "0.wav"
+    if not audio_file.exists():
+        print(f"✗ 音频文件不存在: {audio_file}")
+        return
+
+    from src.asr_sherpa import SherpaASREngine
+    engine = SherpaASREngine(
+        model_dir=SHERPA_MODEL_DIR,
+        use_int8=SHERPA_USE_INT8,
+        num_threads=SHERPA_NUM_THREADS,
+        rule1_min_trailing_silence=SHERPA_RULE1_MIN_TRAILING_SILENCE,
+        rule2_min_trailing_silence=SHERPA_RULE2_MIN_TRAILING_SILENCE,
+        rule3_min_utterance_length=SHERPA_RULE3_MIN_UTTERANCE_LENGTH
+    )
+
+    audio = load_audio(audio_file)
+    audio_duration = len(audio) / SAMPLE_RATE
+
+    print("=" * 60)
+    print("实时分段模式对比: Silero + 逐段转录 vs 端点单遍")
+    print("=" * 60)
+    print(f"音频: {audio_file} ({audio_duration:.1f}s), 实时节奏: {'是' if realtime else '否'}")
+
+    # 预热
+    engine.transcribe(audio[:SAMPLE_RATE])
+
+    silero = run_silero_mode(engine, audio, realtime)
+    print_report("Silero VAD + 逐段转录", *silero, audio_duration)
+
+    endpoint = run_endpoint_mode(engine, audio, realtime)
+    print_report("端点单遍分段", *endpoint, audio_duration)
+
+    saved = 1 - endpoint[1] / max(silero[1], 1e-6)
+    print(f"\nCPU 节省: {saved * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
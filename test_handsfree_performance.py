@@ -0,0 +1,77 @@
+"""
+免按键唤醒监听 CPU 开销测试
+在音频文件上测量触发检测器（Silero VAD / KWS）每秒音频的 CPU 时间，
+用于估算 24 小时待机监听的 CPU 占用（不需要麦克风）。
+
+用法:
+    python test_handsfree_performance.py [音频文件.wav] [--mode vad|kws]
+    （未指定音频时使用 Paraformer 模型目录下的 test_wavs/0.wav）
+"""
+
+import sys
+import time
+import wave
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config import (SHERPA_MODEL_DIR, SAMPLE_RATE, HANDSFREE_KWS_MODEL_DIR, HANDSFREE_KEYWORDS_FILE,
+                        HANDSFREE_VAD_THRESHOLD, HANDSFREE_MIN_SPEECH_DURATION)
+from src.wake_listener import VadTriggerDetector, KeywordTriggerDetector
+
+CHUNK_SECONDS = 0.1
+REPEAT = 10  # 重复多遍，拉长测量时间
+
+
+def load_audio(audio_file):
+    """加载 16kHz 单声道 WAV 为 int16"""
+    with wave.open(str(audio_file), 'rb') as wf:
+        if wf.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"需要 {SAMPLE_RATE}Hz 音频，实际 {wf.getframerate()}Hz")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    mode = sys.argv[sys.argv.index('--mode') + 1] if '--mode' in sys.argv else 'vad'
+    args = [a for a in args if a != mode]
+
+    audio_file = Path(args[0]) if args else Path(SHERPA_MODEL_DIR) / "test_wavs" / "0.wav"
+    if not audio_file.exists():
+        print(f"✗ 音频文件不存在: {audio_file}")
+        return
+
+    if mode == 'kws':
+        detector = KeywordTriggerDetector(HANDSFREE_KWS_MODEL_DIR, HANDSFREE_KEYWORDS_FILE or None, SAMPLE_RATE)
+    else:
+        detector = VadTriggerDetector(sample_rate=SAMPLE_RATE, threshold=HANDSFREE_VAD_THRESHOLD,
+                                      min_speech_duration=HANDSFREE_MIN_SPEECH_DURATION)
+
+    audio = load_audio(audio_file)
+    chunk_samples = int(SAMPLE_RATE * CHUNK_SECONDS)
+    audio_seconds = len(audio) / SAMPLE_RATE * REPEAT
+
+    print("=" * 60)
+    print(f"免按键唤醒监听 CPU 开销（模式: {mode}）")
+    print("=" * 60)
+    print(f"音频: {audio_file} × {REPEAT} ({audio_seconds:.1f}s)")
+
+    triggers = 0
+    cpu_start = time.process_time()
+    for _ in range(REPEAT):
+        for i in range(0, len(audio), chunk_samples):
+            chunk = audio[i:i + chunk_samples].astype(np.float32) / 32768.0
+            if detector.accept(chunk):
+                triggers += 1
+                detector.reset()
+    cpu_time = time.process_time() - cpu_start
+
+    print(f"\n触发次数: {triggers}")
+    print(f"CPU 时间: {cpu_time:.3f}s（每秒音频 {cpu_time / audio_seconds * 1000:.2f}ms）")
+    print(f"待机单核占用: {cpu_time / audio_seconds * 100:.2f}%")
+    print(f"24 小时 CPU 时间: {cpu_time / audio_seconds * 86400 / 60:.1f} 分钟")
+
+
+if __name__ == "__main__":
+    main()
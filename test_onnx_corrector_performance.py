@@ -0,0 +1,133 @@
+"""
+文本纠错引擎对比: macro-correct（PyTorch） vs ONNX int8
+
+对比指标:
+- 加载耗时
+- 常驻内存增量（进程 RSS）
+- 平均每条纠错耗时
+- 准确率（句子级：纠错结果与参考答案完全一致的比例，忽略标点）
+
+每个引擎在独立子进程中运行，内存统计互不影响。
+
+用法:
+    python test_onnx_corrector_performance.py [评测文件.tsv] [--engines macro-correct,onnx]
+    （评测文件每行: 原句<TAB>参考答案；未指定时使用内置样例）
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+SAMPLE_PAIRS = [
+    ("今天天汽很好我们去公园散步", "今天天气很好我们去公园散步"),
+    ("这个方案的可行性需要进一部论证", "这个方案的可行性需要进一步论证"),
+    ("我们应该坚持锻练身体保持健康", "我们应该坚持锻炼身体保持健康"),
+    ("请把会议记要发给所有参会人员", "请把会议纪要发给所有参会人员"),
+    ("老师布置的做业今天必须完成", "老师布置的作业今天必须完成"),
+    ("他说明天上午开会讨论项目进度", "他说明天上午开会讨论项目进度"),
+    ("周末一起去图书馆看书吧", "周末一起去图书馆看书吧"),
+    ("这件事情的影响非常深远", "这件事情的影响非常深远"),
+]
+
+_PUNCT = re.compile(r'[，。！？、；：,.!?;:\s]')
+
+
+def load_pairs(args):
+    files = [a for a in args if not a.startswith('--') and Path(a).is_file()]
+    if not files:
+        return SAMPLE_PAIRS
+    pairs = []
+    for line in Path(files[0]).read_text(encoding='utf-8').splitlines():
+        parts = line.split('\t')
+        if len(parts) >= 2:
+            pairs.append((parts[0].strip(), parts[1].strip()))
+    return pairs
+
+
+def run_engine(engine_type, pairs):
+    """子进程内运行：加载引擎并逐条纠错"""
+    from src.model_manager import get_process_rss_mb
+    from src.text_corrector import TextCorrector
+
+    model_path = None
+    if engine_type == "onnx":
+        from src.config import ONNX_CORRECTOR_MODEL_DIR
+        model_path = ONNX_CORRECTOR_MODEL_DIR
+
+    rss_before = get_process_rss_mb()
+    corrector = TextCorrector(engine_type=engine_type, model_path=model_path, cache=None)
+    start = time.time()
+    corrector.load()
+    load_seconds = time.time() - start
+    if not corrector.is_loaded:
+        return {"engine": engine_type, "error": "模型加载失败"}
+
+    corrector.correct(pairs[0][0])  # 预热
+
+    correct = 0
+    times = []
+    for source, target in pairs:
+        start = time.time()
+        result = corrector.correct(source)
+        times.append(time.time() - start)
+        if _PUNCT.sub('', result['corrected']) == _PUNCT.sub('', target):
+            correct += 1
+
+    return {
+        "engine": engine_type,
+        "load_seconds": round(load_seconds, 2),
+        "rss_mb": round(get_process_rss_mb() - rss_before, 1),
+        "avg_ms": round(sum(times) / len(times) * 1000, 1),
+        "accuracy": round(correct / len(pairs), 3),
+    }
+
+
+def main():
+    args = sys.argv[1:]
+
+    # 子进程模式
+    if '--child' in args:
+        engine_type = args[args.index('--child') + 1]
+        pairs = json.loads(sys.stdin.read())
+        print("RESULT " + json.dumps(run_engine(engine_type, pairs), ensure_ascii=False))
+        return
+
+    engines = ["macro-correct", "onnx"]
+    if '--engines' in args:
+        engines = args[args.index('--engines') + 1].split(',')
+    pairs = load_pairs(args)
+
+    print("=" * 60)
+    print("文本纠错引擎对比: " + " vs ".join(engines))
+    print("=" * 60)
+    print(f"评测句子: {len(pairs)} 条")
+
+    results = []
+    for engine_type in engines:
+        proc = subprocess.run(
+            [sys.executable, __file__, '--child', engine_type],
+            input=json.dumps(pairs, ensure_ascii=False),
+            capture_output=True, text=True, env=os.environ.copy()
+        )
+        line = next((l for l in proc.stdout.splitlines() if l.startswith("RESULT ")), None)
+        if line is None:
+            print(f"\n[{engine_type}] 运行失败:\n{proc.stderr[-500:]}")
+            continue
+        results.append(json.loads(line[len("RESULT "):]))
+
+    print(f"\n{'引擎':<16}{'加载(s)':>10}{'内存(MB)':>12}{'每条(ms)':>12}{'准确率':>10}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['engine']:<16}  {r['error']}")
+            continue
+        print(f"{r['engine']:<16}{r['load_seconds']:>10}{r['rss_mb']:>12}{r['avg_ms']:>12}{r['accuracy']:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+录音全文检索性能: FTS5 二元组索引 vs LIKE 扫描
+
+在临时 SQLite 索引中批量写入 N 条合成录音（不生成文本文件），对同一组关键词
+分别走 FTS5 检索和 LIKE 扫描（SQLite 不支持 FTS5 时的回退路径），统计延迟分位数。
+
+对比指标:
+- 不同关键词（常见词 / 罕见词 / 单字 / 多词）的 p50、p95 延迟
+- 建索引耗时、索引文件大小
+
+用法:
+    python test_search_performance.py [--sizes 10000,100000] [--repeat 20]
+"""
+
+import sys
+import time
+import random
+import shutil
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.recording_index import RecordingIndex, make_preview
+
+PER_DAY = 20
+SENTENCES = [
+    "今天上午和团队讨论了下个季度的产品规划",
+    "重点是提升语音识别的准确率和响应速度",
+    "下午去医院做了体检，医生建议多运动",
+    "晚上和家人一起吃饭，聊了孩子的学习情况",
+    "明天要准备周会的材料，还要回复客户邮件",
+    "最近睡眠不太好，想早点休息",
+    "读完了一本关于时间管理的书，收获很多",
+    "和朋友约了周末去爬山，天气预报说是晴天",
+]
+# 罕见话题（约 1% 的录音出现），用于测试低命中率关键词
+RARE_SENTENCES = ["试了一次冥想，感觉心里平静了不少", "报名了下个月的马拉松比赛"]
+QUERIES = ["产品规划", "体检", "山", "客户 邮件", "冥想", "马拉松", "不存在的关键词"]
+
+
+def generate_rows(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    start_day = date.today() - timedelta(days=count // PER_DAY)
+    rows = []
+    for i in range(count):
+        day = (start_day + timedelta(days=i // PER_DAY)).isoformat()
+        time_str = f"{8 + (i % PER_DAY) // 2:02d}-{(i % 2) * 30:02d}"
+        sentences = rng.sample(SENTENCES, 4)
+        if rng.random() < 0.01:
+            sentences.append(rng.choice(RARE_SENTENCES))
+        text = "。".join(sentences) + "。"
+        rows.append({
+            'key': f"{day}/{time_str}", 'id': f"{day}/{time_str}", 'date': day,
+            'time': time_str.replace('-', ':'), 'duration': 60 + i % 300, 'word_count': len(text),
+            'preview': make_preview(text), 'content': text,
+            'corrected_content': text if i % 3 == 0 else None,
+            'file_path': f"{day}/{time_str}.txt", 'saved_at': f"{day} 12:00:00",
+        })
+    return rows
+
+
+def percentiles(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return times[len(times) // 2], times[min(len(times) - 1, int(len(times) * 0.95))]
+
+
+def benchmark(count, repeat):
+    base = Path(tempfile.mkdtemp(prefix="lifecoach_search_bench_"))
+    try:
+        index = RecordingIndex(base / "index.db")
+        if not index.fts_enabled:
+            print("SQLite 不支持 FTS5，无法对比")
+            return
+        rows = generate_rows(count)
+        start = time.time()
+        index.upsert_many(rows)
+        build_seconds = time.time() - start
+        index_mb = sum(p.stat().st_size for p in base.glob("index.db*")) / 1024 / 1024
+        print(f"\n{count} 条录音, 建索引: {build_seconds:.2f}s, 索引文件: {index_mb:.1f}MB")
+
+        print(f"{'关键词':<14}{'命中':>8}{'FTS p50':>10}{'p95':>8}{'LIKE p50':>10}{'p95':>8}{'加速':>8}")
+        for query in QUERIES:
+            index.fts_enabled = True
+            total = index.search(query, limit=20)['total']
+            fts = percentiles(lambda: index.search(query, limit=20), repeat)
+            index.fts_enabled = False
+            like = percentiles(lambda: index.search(query, limit=20), repeat)
+            speedup = like[0] / fts[0] if fts[0] > 0 else float('inf')
+            print(f"{query:<14}{total:>8}{fts[0]:>10.2f}{fts[1]:>8.2f}{like[0]:>10.2f}{like[1]:>8.2f}{speedup:>7.0f}x")
+        index.fts_enabled = True
+        index.close()
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def main():
+    args = sys.argv[1:]
+    sizes = [10000, 100000]
+    if '--sizes' in args:
+        sizes = [int(s) for s in args[args.index('--sizes') + 1].split(',')]
+    repeat = 20
+    if '--repeat' in args:
+        repeat = int(args[args.index('--repeat') + 1])
+
+    print("=" * 60)
+    print("录音全文检索性能: FTS5 二元组 vs LIKE 扫描")
+    print("=" * 60)
+    for count in sizes:
+        benchmark(count, repeat)
+
+
+if __name__ == "__main__":
+    main()
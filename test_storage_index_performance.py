@@ -0,0 +1,148 @@
+"""
+录音存储查询性能对比: 目录扫描 vs SQLite 元数据索引
+
+在临时目录生成 N 条录音（每天 20 条），分别用目录扫描（RECORDING_INDEX_ENABLED=false 的旧路径）
+和元数据索引执行相同的查询。
+
+对比指标:
+- 列表查询（最近 20 条 / 最近 1000 条 / 指定日期）
+- 单条详情 get()
+- 今日计数
+- 索引全量重建耗时、索引文件大小
+- 列表响应大小（含全文的旧格式 / 默认字段 / fields 裁剪）和深翻页延迟（游标 vs 取前 N 条再截取）
+
+用法:
+    python test_storage_index_performance.py [--sizes 10000,100000] [--repeat 5]
+"""
+
+import sys
+import json
+import time
+import shutil
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import src.config as config
+
+PER_DAY = 20
+SAMPLE_TEXT = "今天上午和团队讨论了下个季度的产品规划，重点是提升语音识别的准确率和响应速度。" * 4
+
+
+def generate_tree(base: Path, count: int):
+    """按 FileStorage.save 的文件格式生成录音文件"""
+    start_day = date.today() - timedelta(days=count // PER_DAY)
+    for i in range(count):
+        day = start_day + timedelta(days=i // PER_DAY)
+        time_str = f"{8 + (i % PER_DAY) // 2:02d}-{(i % 2) * 30:02d}"
+        date_dir = base / day.isoformat()
+        date_dir.mkdir(parents=True, exist_ok=True)
+        text = f"第{i}条。" + SAMPLE_TEXT
+        (date_dir / f"{time_str}.txt").write_text(
+            f"=== Life Coach 对话记录 ===\n"
+            f"录音时间: {day.isoformat()} {time_str.replace('-', ':')}\n"
+            f"录音时长: {60 + i % 300}秒\n"
+            f"文字长度: {len(text)}字\n"
+            f"---\n{text}\n---\n保存时间: {day.isoformat()} 12:00:00\n",
+            encoding='utf-8'
+        )
+    return start_day
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sum(times) / len(times) * 1000
+
+
+def run_queries(storage, sample_date, sample_id, repeat):
+    return {
+        'query(20)': measure(lambda: storage.query(limit=20), repeat),
+        'query(1000)': measure(lambda: storage.query(limit=1000), repeat),
+        'query(date)': measure(lambda: storage.query(date=sample_date, limit=100), repeat),
+        'get(id)': measure(lambda: storage.get(sample_id), repeat),
+        'today_count': measure(storage.get_today_count, repeat),
+    }
+
+
+def run_pagination(storage, count, repeat):
+    """列表响应大小、深翻页延迟（仅索引路径）"""
+    page = 100
+    legacy = [dict(storage._to_list_item(row), full_text=row['content'])
+              for row in storage.index.query(limit=page)]
+    sizes = {
+        '旧格式(含全文)': legacy,
+        '默认字段': storage.query(limit=page),
+        'fields=id,preview,duration': storage.query(limit=page, fields=['id', 'preview', 'duration']),
+    }
+    print(f"\n列表响应大小（{page} 条）:")
+    for name, items in sizes.items():
+        print(f"  {name:<28}{len(json.dumps(items, ensure_ascii=False).encode('utf-8')) / 1024:>8.1f}KB")
+
+    depth = count // 2
+    cursor = storage.query(limit=depth)[-1]['cursor']
+    keyset = measure(lambda: storage.query(limit=20, before=cursor), repeat)
+    sliced = measure(lambda: storage.query(limit=depth + 20)[depth:], repeat)
+    print(f"第 {depth} 条之后的一页: 游标 {keyset:.2f}ms, 取前 {depth + 20} 条再截取 {sliced:.2f}ms")
+
+
+def benchmark(count, repeat):
+    from src.file_storage import FileStorage
+
+    root = Path(tempfile.mkdtemp(prefix="lifecoach_index_bench_"))
+    base = root / "recordings"   # 索引、统计文件在录音目录旁
+    try:
+        print(f"\n生成 {count} 条录音...", end=" ", flush=True)
+        start = time.time()
+        start_day = generate_tree(base, count)
+        print(f"{time.time() - start:.1f}s")
+
+        config.STORAGE_BASE = str(base)
+        sample_date = (start_day + timedelta(days=count // PER_DAY // 2)).isoformat()
+        sample_id = f"{sample_date}/10-00"
+
+        config.RECORDING_INDEX_ENABLED = False
+        scan = run_queries(FileStorage(), sample_date, sample_id, repeat)
+
+        config.RECORDING_INDEX_ENABLED = True
+        storage = FileStorage()
+        start = time.time()
+        storage.index  # 首次打开时全量重建
+        rebuild_seconds = time.time() - start
+        indexed = run_queries(storage, sample_date, sample_id, repeat)
+        index_mb = sum(p.stat().st_size for p in root.glob(Path(storage.index.db_path).name + '*')) / 1024 / 1024
+
+        print(f"索引重建: {rebuild_seconds:.2f}s, 索引文件: {index_mb:.1f}MB")
+        print(f"{'操作':<16}{'目录扫描(ms)':>14}{'索引(ms)':>12}{'加速':>10}")
+        for name in scan:
+            speedup = scan[name] / indexed[name] if indexed[name] > 0 else float('inf')
+            print(f"{name:<16}{scan[name]:>14.2f}{indexed[name]:>12.3f}{speedup:>9.0f}x")
+        run_pagination(storage, count, repeat)
+        storage.cleanup()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    args = sys.argv[1:]
+    sizes = [10000, 100000]
+    if '--sizes' in args:
+        sizes = [int(s) for s in args[args.index('--sizes') + 1].split(',')]
+    repeat = 5
+    if '--repeat' in args:
+        repeat = int(args[args.index('--repeat') + 1])
+
+    print("=" * 60)
+    print("录音存储查询性能: 目录扫描 vs SQLite 元数据索引")
+    print("=" * 60)
+    for count in sizes:
+        benchmark(count, repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+录音目录同步性能: 全量重建索引 vs 一致性检查 vs 单条增量同步
+
+在临时目录生成 N 天 × M 条录音，统计:
+- 全量重建（rebuild_index，读取并解析所有文件）
+- 无变化时的一致性检查（reconcile，每个日期目录一次 scandir，只比较 mtime）
+- 外部新增 / 修改 / 删除一条录音后的增量同步（sync_recording）
+
+用法:
+    python test_storage_watcher_performance.py [--days 365] [--per-day 10]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import src.config as config
+
+
+def main():
+    args = sys.argv[1:]
+    days = int(args[args.index('--days') + 1]) if '--days' in args else 365
+    per_day = int(args[args.index('--per-day') + 1]) if '--per-day' in args else 10
+
+    root = Path(tempfile.mkdtemp(prefix="lifecoach_watch_bench_"))
+    base = root / "recordings"   # 索引、统计文件在录音目录旁
+    try:
+        config.STORAGE_BASE = str(base)
+        from src.file_storage import FileStorage
+
+        content = "今天和团队讨论了下个季度的计划，重点是把录音转写的延迟降下来。" * 20
+        for day in range(days):
+            date_dir = base / time.strftime("%Y-%m-%d", time.gmtime(1700000000 + day * 86400))
+            date_dir.mkdir(parents=True)
+            for i in range(per_day):
+                (date_dir / f"{8 + i:02d}-00.txt").write_text(
+                    f"=== Life Coach 对话记录 ===\n录音时长: 60秒\n文字长度: {len(content)}字\n---\n"
+                    f"{content}\n---\n保存时间: 2026-01-21 16:00:00\n", encoding='utf-8')
+
+        storage = FileStorage()
+        total = days * per_day
+        print("=" * 60)
+        print(f"录音目录同步: {days} 天 × {per_day} 条 = {total} 条录音")
+        print("=" * 60)
+
+        start = time.perf_counter()
+        storage.rebuild_index()
+        rebuild = time.perf_counter() - start
+        print(f"{'全量重建索引':<24}{rebuild * 1000:>10.0f}ms")
+
+        times = []
+        for _ in range(5):
+            start = time.perf_counter()
+            result = storage.reconcile()
+            times.append(time.perf_counter() - start)
+        assert result['added'] + result['updated'] + result['removed'] == 0, result
+        check = sorted(times)[len(times) // 2]
+        print(f"{'一致性检查（无变化）':<24}{check * 1000:>10.0f}ms  ({rebuild / check:.1f}x)")
+
+        date_dir = next(d for d in sorted(base.iterdir()) if d.is_dir())
+        new_path = date_dir / "23-00.txt"
+        shutil.copy(date_dir / "08-00.txt", new_path)
+        for name, action in (('外部新增一条', lambda: None),
+                             ('外部修改一条', lambda: os.utime(new_path, (time.time(), time.time() + 5))),
+                             ('外部删除一条', new_path.unlink)):
+            action()
+            start = time.perf_counter()
+            storage.sync_recording(f"{date_dir.name}/23-00")
+            print(f"{name:<24}{(time.perf_counter() - start) * 1000:>10.2f}ms")
+        storage.cleanup()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
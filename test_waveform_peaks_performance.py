@@ -0,0 +1,82 @@
+"""
+波形峰值性能: 预计算多级峰值 vs 下载整个 WAV 在浏览器中计算
+
+在临时目录生成一段 N 分钟的 16kHz WAV，统计:
+- 峰值计算耗时（保存音频时内存计算 / 补算时流式读取 WAV）、峰值文件大小
+- 按画布宽度读取一级峰值的耗时和响应大小（JSON / 二进制），对比整个 WAV 的大小
+
+用法:
+    python test_waveform_peaks_performance.py [--minutes 60] [--width 1000]
+"""
+
+import sys
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import numpy as np
+import src.config as config
+
+
+def main():
+    args = sys.argv[1:]
+    minutes = int(args[args.index('--minutes') + 1]) if '--minutes' in args else 60
+    width = int(args[args.index('--width') + 1]) if '--width' in args else 1000
+
+    root = Path(tempfile.mkdtemp(prefix="lifecoach_peaks_bench_"))
+    base = root / "recordings"   # 索引、统计文件在录音目录旁
+    try:
+        config.STORAGE_BASE = str(base)
+        from src.file_storage import FileStorage
+        from src.waveform_peaks import compute_peaks, compute_peaks_from_wav, peaks_path
+        import src.api_server as api_server
+
+        storage = FileStorage()
+        recording_id = "2026-01-21/15-30"
+        storage.save(recording_id, "性能测试")
+        rng = np.random.default_rng(0)
+        audio = (rng.standard_normal(16000 * 60 * minutes) * 3000).astype(np.int16)
+        wav_path = Path(storage.save_audio(recording_id, audio))
+        wav_size = wav_path.stat().st_size
+
+        print("=" * 60)
+        print(f"波形峰值: {minutes} 分钟 WAV ({wav_size / 1024 / 1024:.1f}MB)")
+        print("=" * 60)
+
+        start = time.perf_counter()
+        peaks = compute_peaks(audio)
+        print(f"内存计算: {(time.perf_counter() - start) * 1000:.0f}ms, {len(peaks['levels'])} 级, "
+              f"各级对数 {[len(level) for level in peaks['levels']]}")
+        start = time.perf_counter()
+        compute_peaks_from_wav(wav_path)
+        print(f"流式读取 WAV 计算: {(time.perf_counter() - start) * 1000:.0f}ms")
+        print(f"峰值文件: {peaks_path(wav_path).stat().st_size / 1024:.0f}KB")
+
+        class Manager:
+            def get_recording_peaks(self, recording_id, **kwargs):
+                return {"success": True, "id": recording_id, **storage.get_peaks(recording_id, **kwargs)}
+        api_server.app_manager = Manager()
+        client = api_server.app.test_client()
+        url = f"/api/recordings/{recording_id}/peaks?width={width}"
+
+        print(f"{'请求':<24}{'字节':>12}{'耗时(ms)':>10}")
+        for name, target in (('整段总览 JSON', url), ('整段总览 二进制', url + "&format=binary"),
+                             ('放大 60 秒 JSON', url + "&start=600&end=660")):
+            times = []
+            for _ in range(20):
+                start = time.perf_counter()
+                response = client.get(target)
+                times.append((time.perf_counter() - start) * 1000)
+            times.sort()
+            print(f"{name:<24}{len(response.data):>12,}{times[len(times) // 2]:>10.2f}")
+        print(f"{'整个 WAV':<24}{wav_size:>12,}")
+        storage.cleanup()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ import unittest
 import sys
 import os
 import time
+import threading
 import json
 from pathlib import Path
 
@@ -146,7 +147,7 @@ class TestFileStorage(unittest.TestCase):
     def setUp(self):
         # 使用临时测试目录
         import tempfile
-        self.test_storage_path = Path(tempfile.mkdtemp(prefix="lifecoach_test_"))
+        self.test_storage_path = Path(tempfile.mkdtemp(prefix="lifecoach_test_")) / "recordings"
         
         # 临时修改存储路径
         import src.config as config_module
@@ -162,8 +163,7 @@ class TestFileStorage(unittest.TestCase):
         
         # 清理测试文件
         import shutil
-        if self.test_storage_path.exists():
-            shutil.rmtree(self.test_storage_path)
+        shutil.rmtree(self.test_storage_path.parent, ignore_errors=True)
     
     def test_save_and_query(self):
         """测试保存和查询"""
@@ -220,6 +220,2104 @@ class TestFileStorage(unittest.TestCase):
         self.assertEqual(count, 3)
 
 
+class TestASRTuner(unittest.TestCase):
+    """测试ASR调优配置选择"""
+    
+    def _result(self, engine, rtf, **params):
+        return {'engine': engine, 'params': params, 'ok': True, 'rtf': rtf, 'peak_rss_mb': 300}
+    
+    def test_select_sherpa_prefers_fewer_threads(self):
+        """RTF相近时选择线程更少的配置"""
+        from src.asr_tuner import select_profile
+        results = [
+            self._result('sherpa', 0.30, num_threads=1, use_int8=True),
+            self._result('sherpa', 0.12, num_threads=2, use_int8=True),
+            self._result('sherpa', 0.11, num_threads=4, use_int8=True),
+        ]
+        profile = select_profile(results, max_rtf=0.5)
+        self.assertEqual(profile['selected']['sherpa']['num_threads'], 2)
+    
+    def test_select_whisper_largest_passing_model(self):
+        """选择RTF达标的最大模型"""
+        from src.asr_tuner import select_profile
+        results = [
+            self._result('whisper', 0.2, model_size='tiny', beam_size=5, compute_type='int8'),
+            self._result('whisper', 0.4, model_size='base', beam_size=3, compute_type='int8'),
+            self._result('whisper', 1.3, model_size='small', beam_size=1, compute_type='int8'),
+        ]
+        profile = select_profile(results, max_rtf=0.5)
+        self.assertEqual(profile['selected']['whisper']['model_size'], 'base')
+        self.assertEqual(profile['tier'], '轻量版')
+    
+    def test_select_skips_failed_and_over_budget(self):
+        """跳过失败和超出内存预算的配置"""
+        from src.asr_tuner import select_profile
+        big = self._result('whisper', 0.3, model_size='small', beam_size=5, compute_type='int8')
+        big['peak_rss_mb'] = 2000
+        results = [
+            big,
+            {'engine': 'whisper', 'params': {'model_size': 'base'}, 'ok': False, 'error': 'oom'},
+            self._result('whisper', 0.1, model_size='tiny', beam_size=1, compute_type='int8'),
+        ]
+        profile = select_profile(results, max_rtf=0.5, mem_budget_mb=1000)
+        self.assertEqual(profile['selected']['whisper']['model_size'], 'tiny')
+    
+    def test_profile_roundtrip_and_version(self):
+        """配置文件读写一致，版本不符时忽略；启动配置使用同一个读取函数"""
+        import tempfile
+        import src.config as config
+        from src.asr_tuner import PROFILE_VERSION, save_profile, load_profile
+        self.assertIs(config._load_asr_profile, load_profile)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'asr_profile.json'
+            self.assertIsNone(load_profile(path))
+            save_profile({'version': PROFILE_VERSION, 'selected': {}}, path)
+            self.assertEqual(load_profile(path)['version'], PROFILE_VERSION)
+            save_profile({'version': PROFILE_VERSION + 1, 'selected': {}}, path)
+            self.assertIsNone(load_profile(path))
+
+
+class TestASREngineManager(unittest.TestCase):
+    """测试ASR引擎热切换"""
+    
+    def setUp(self):
+        from src.asr_base import BaseASREngine
+        from src.asr_registry import register_asr_engine, _ENGINE_REGISTRY
+        self.saved_registry = dict(_ENGINE_REGISTRY)
+        self.release = threading.Event()
+        self.release.set()
+        started = self.started = threading.Event()
+        release = self.release
+        
+        class FakeEngine(BaseASREngine):
+            def __init__(self, name):
+                self.name = name
+                self.text_corrector = None
+                self.unloaded = False
+            
+            def transcribe(self, audio_data):
+                started.set()
+                release.wait(5)
+                if self.unloaded:
+                    raise RuntimeError('引擎已卸载')
+                return {'text': self.name, 'engine': self.name}
+            
+            def unload(self):
+                self.unloaded = True
+        
+        self.created = []
+        
+        def factory(name):
+            engine = FakeEngine(name)
+            self.created.append(engine)
+            return engine
+        
+        for name in ('fake_a', 'fake_b'):
+            register_asr_engine(name, lambda n=name: factory(n))
+    
+    def tearDown(self):
+        from src.asr_registry import _ENGINE_REGISTRY
+        _ENGINE_REGISTRY.clear()
+        _ENGINE_REGISTRY.update(self.saved_registry)
+    
+    def test_switch_unloads_old_engine(self):
+        """切换后委托给新引擎，关闭热备时卸载旧引擎"""
+        from src.asr_registry import ASREngineManager
+        manager = ASREngineManager('fake_a', warm_standby=False)
+        switched = []
+        manager.add_switch_listener(lambda old, new, engine: switched.append((old, new)))
+        
+        result = manager.switch('fake_b', wait=True)
+        self.assertTrue(result['success'])
+        self.assertEqual(manager.transcribe_stream([]), 'fake_b')
+        self.assertTrue(self.created[0].unloaded)
+        self.assertEqual(switched, [('fake_a', 'fake_b')])
+    
+    def test_unload_waits_for_in_flight_transcribe(self):
+        """切换时旧引擎上仍在执行的转录完成后才卸载"""
+        from src.asr_registry import ASREngineManager
+        manager = ASREngineManager('fake_a', warm_standby=False)
+        self.release.clear()
+        results = []
+        worker = threading.Thread(target=lambda: results.append(manager.transcribe([])))
+        worker.start()
+        self.assertTrue(self.started.wait(2))
+        
+        manager.switch('fake_b')
+        deadline = time.time() + 2
+        while manager.active_name != 'fake_b' and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(manager.active_name, 'fake_b')
+        time.sleep(0.05)
+        self.assertFalse(self.created[0].unloaded)
+        
+        self.release.set()
+        worker.join(2)
+        self.assertEqual(results[0]['text'], 'fake_a')
+        deadline = time.time() + 2
+        while not self.created[0].unloaded and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(self.created[0].unloaded)
+    
+    def test_warm_standby_reuses_engine(self):
+        """热备模式切回时不重新加载"""
+        from src.asr_registry import ASREngineManager
+        manager = ASREngineManager('fake_a', warm_standby=True)
+        manager.switch('fake_b', wait=True)
+        manager.switch('fake_a', wait=True)
+        self.assertEqual(len(self.created), 2)
+        self.assertIs(manager.active, self.created[0])
+        self.assertEqual(manager.get_status()['standby'], ['fake_b'])
+    
+    def test_switch_unknown_engine(self):
+        """未注册的引擎返回错误"""
+        from src.asr_registry import ASREngineManager
+        manager = ASREngineManager('fake_a')
+        result = manager.switch('nope')
+        self.assertFalse(result['success'])
+
+
+class TestRemoteWorker(unittest.TestCase):
+    """测试局域网算力卸载（本地工作节点模拟远程机器）"""
+    
+    def setUp(self):
+        from src.asr_base import BaseASREngine
+        from src.remote_worker import WorkerServer
+        
+        class FakeEngine(BaseASREngine):
+            def __init__(self, name, delay=0.0):
+                self.name = name
+                self.delay = delay
+                self.text_corrector = None
+            
+            def transcribe(self, audio_data):
+                time.sleep(self.delay)
+                return {'text': f"{self.name}:{len(audio_data)}", 'engine': self.name}
+        
+        class FakeCorrector:
+            def __init__(self):
+                self.confidences = []
+            def correct(self, text, confidence=None):
+                self.confidences.append(confidence)
+                return {'success': True, 'original': text, 'corrected': text + '。', 'changed': True}
+            def correct_batch(self, texts, confidences=None):
+                return [self.correct(text, c) for text, c in zip(texts, confidences or [None] * len(texts))]
+            def correct_segments(self, segments):
+                results = self.correct_batch([s['text'] for s in segments], [s['confidence'] for s in segments])
+                return {'success': True, 'corrected': ''.join(r['corrected'] for r in results), 'changed': True}
+        
+        self.FakeEngine = FakeEngine
+        self.local = FakeEngine('local')
+        self.server = WorkerServer(asr_engine=FakeEngine('remote'), text_corrector=FakeCorrector(),
+                                   host='127.0.0.1', port=0)
+        self.server.start()
+        self.server_running = True
+    
+    def tearDown(self):
+        if self.server_running:
+            self.server.stop()
+    
+    def test_offload_to_worker(self):
+        """可用节点时转录和纠错发往工作节点"""
+        import numpy as np
+        from src.remote_worker import WorkerScheduler, OffloadASREngine
+        scheduler = WorkerScheduler([self.server.url], health_interval=0)
+        engine = OffloadASREngine(self.local, scheduler)
+        
+        self.assertEqual(engine.transcribe_stream(np.zeros(1600, dtype=np.float32)), 'remote:1600')
+        self.assertIsNone(engine.text_corrector)  # 本地未启用纠错时不纠错
+        
+        from src.remote_worker import OffloadTextCorrector
+        corrector = OffloadTextCorrector(self.server.text_corrector, scheduler)
+        self.assertEqual(corrector.correct('你好', confidence=0.9)['corrected'], '你好。')
+        self.assertEqual(self.server.text_corrector.confidences, [0.9])  # 置信度随请求发送
+        
+        # 批量纠错和按分段纠错也发往工作节点
+        local = self.server.text_corrector.__class__()
+        corrector = OffloadTextCorrector(local, scheduler)
+        results = corrector.correct_batch(['甲', '乙'], [0.5, None])
+        self.assertEqual([r['corrected'] for r in results], ['甲。', '乙。'])
+        result = corrector.correct_segments([{'text': '丙', 'confidence': 0.8, 'start': 0}])
+        self.assertEqual(result['corrected'], '丙。')
+        self.assertEqual(self.server.text_corrector.confidences[1:], [0.5, None, 0.8])
+        self.assertEqual(local.confidences, [])
+        
+        node = scheduler.get_status()['nodes'][0]
+        self.assertTrue(node['healthy'])
+        self.assertIsNotNone(node['latency_ms'])
+        self.assertEqual(scheduler.stats['remote'], 4)
+    
+    def test_fallback_on_timeout_and_down(self):
+        """节点超时或下线时回退本地引擎"""
+        import numpy as np
+        from src.remote_worker import WorkerScheduler, OffloadASREngine
+        self.server.asr_engine.delay = 1.0
+        scheduler = WorkerScheduler([self.server.url], timeout=0.2, timeout_per_second=0, health_interval=0)
+        engine = OffloadASREngine(self.local, scheduler)
+        
+        result = engine.transcribe(np.zeros(1600, dtype=np.float32))
+        self.assertEqual(result['text'], 'local:1600')
+        self.assertEqual(scheduler.stats['fallback'], 1)
+        # 失败后进入退避，不再发往该节点
+        self.assertIsNone(scheduler.pick_node('asr'))
+        
+        self.server.stop()
+        self.server_running = False
+        scheduler.check_health()
+        self.assertFalse(scheduler.get_status()['nodes'][0]['healthy'])
+        self.assertEqual(engine.transcribe_stream(np.zeros(800, dtype=np.float32)), 'local:800')
+    
+    def test_token_and_body_limit(self):
+        """设置令牌时拒绝未带令牌的请求；超过上限的请求体不读取"""
+        import numpy as np
+        import urllib.error
+        import urllib.request
+        from src.remote_worker import WorkerServer, WorkerScheduler, RemoteWorkerClient
+        server = WorkerServer(asr_engine=self.FakeEngine('remote'), port=0, token='secret')
+        server.start()
+        try:
+            scheduler = WorkerScheduler([server.url], health_interval=0)
+            self.assertFalse(scheduler.get_status()['nodes'][0]['healthy'])
+            scheduler = WorkerScheduler([server.url], health_interval=0, token='secret')
+            self.assertTrue(scheduler.get_status()['nodes'][0]['healthy'])
+            
+            req = urllib.request.Request(server.url + '/asr/transcribe', data=b'', method='POST',
+                                         headers={'X-Offload-Token': 'secret', 'Content-Length': str(1 << 40)})
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                urllib.request.urlopen(req, timeout=5)
+            self.assertEqual(ctx.exception.code, 413)
+            
+            client = RemoteWorkerClient(server.url, token='secret')
+            self.assertEqual(client.transcribe(np.zeros(160, dtype=np.float32))['text'], 'remote:160')
+        finally:
+            server.stop()
+    
+    def test_transcribe_sample_rate(self):
+        """非 16kHz 的音频在节点上重采样，无效采样率返回 400"""
+        import numpy as np
+        import urllib.error
+        import urllib.request
+        from src.remote_worker import WorkerServer, RemoteWorkerClient
+        server = WorkerServer(asr_engine=self.FakeEngine('remote'), port=0)
+        server.start()
+        try:
+            client = RemoteWorkerClient(server.url)
+            self.assertEqual(client.transcribe(np.zeros(480, dtype=np.float32), 48000)['text'], 'remote:160')
+            self.assertEqual(client.transcribe(np.zeros(80, dtype=np.float32), 8000)['text'], 'remote:160')
+            
+            req = urllib.request.Request(server.url + '/asr/transcribe', data=b'\0' * 16, method='POST',
+                                         headers={'X-Sample-Rate': 'abc'})
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                urllib.request.urlopen(req, timeout=5)
+            self.assertEqual(ctx.exception.code, 400)
+        finally:
+            server.stop()
+
+
+class TestWakeListener(unittest.TestCase):
+    """测试免按键唤醒的预录缓冲"""
+    
+    def test_trigger_includes_preroll(self):
+        """触发时返回包含触发块在内的预录音频"""
+        import numpy as np
+        from src.wake_listener import WakeListener
+        
+        class FakeDetector:
+            name = 'fake'
+            def accept(self, samples):
+                return 'speech' if samples.max() > 0.5 else None
+            def reset(self):
+                pass
+        
+        listener = WakeListener(FakeDetector(), on_trigger=None, preroll_seconds=0.3, cooldown=0)
+        silence = np.zeros(1600, dtype=np.int16)
+        speech = np.full(1600, 20000, dtype=np.int16)
+        for _ in range(5):
+            self.assertIsNone(listener.feed(silence))
+        
+        preroll, reason = listener.feed(speech)
+        self.assertEqual(reason, 'speech')
+        self.assertEqual(len(preroll), 1600 * 3)  # 保留最近 0.3 秒
+        self.assertTrue((preroll[-1600:] == speech).all())
+        self.assertEqual(listener.get_stats()['triggers'], 1)
+
+
+class TestIncrementalCorrector(unittest.TestCase):
+    """测试录音过程中的增量纠错"""
+    
+    class FakeCorrector:
+        """把"在见"纠正为"再见"，并在句末补句号"""
+        def __init__(self):
+            self.inputs = []
+        
+        def correct(self, text):
+            self.inputs.append(text)
+            corrected = text.replace('在见', '再见')
+            changes = [{'position': text.index('在见'), 'original': '在', 'corrected': '再'}] if '在见' in text else []
+            if not corrected.endswith('。'):
+                corrected += '。'
+            return {'success': True, 'corrected': corrected, 'changes': changes, 'time_ms': 1}
+    
+    def test_segments_corrected_with_context(self):
+        """逐段纠错，上文参与纠错但不重复输出"""
+        from src.incremental_corrector import IncrementalCorrector
+        corrector = self.FakeCorrector()
+        updates = []
+        inc = IncrementalCorrector(corrector, context_chars=4,
+                                   on_update=lambda i, seg, full: updates.append(full))
+        inc.start()
+        inc.add_segment('今天天气很好', 1)
+        inc.add_segment('我们明天在见', 2)
+        result = inc.finish()
+        
+        self.assertEqual(result['corrected'], '今天天气很好。我们明天再见。')
+        self.assertEqual(result['original'], '今天天气很好我们明天在见')
+        self.assertTrue(result['changed'])
+        self.assertEqual(corrector.inputs[1], '气很好。我们明天在见')
+        self.assertEqual(updates[-1], result['corrected'])
+        # 变更位置基于原文（与 correct()/correct_segments() 一致），不受前面补的标点影响
+        self.assertEqual([c['position'] for c in result['changes']], [10])
+        self.assertEqual(result['original'][10], '在')
+    
+    def test_cancel_stops_worker_and_releases_model(self):
+        """取消后后台线程退出，录音期间对纠错模型的持有被释放（只释放一次）"""
+        from src.incremental_corrector import IncrementalCorrector
+        corrector = self.FakeCorrector()
+        corrector.held = 0
+        corrector.hold_model = lambda: setattr(corrector, 'held', corrector.held + 1)
+        corrector.release_model = lambda: setattr(corrector, 'held', corrector.held - 1)
+        inc = IncrementalCorrector(corrector)
+        inc.start()
+        self.assertEqual(corrector.held, 1)
+        thread = inc._thread
+        inc.cancel()
+        inc.cancel()
+        thread.join(2)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(corrector.held, 0)
+    
+    def test_map_offset(self):
+        """上文与本段边界的插入内容归属本段"""
+        from src.incremental_corrector import map_offset
+        self.assertEqual(map_offset('你好世界', '你好，世界', 2), 2)
+        self.assertEqual(map_offset('你好世界', '您好世界', 2), 2)
+        self.assertEqual(map_offset('ab', 'abc', 2), 3)
+
+
+class TestCorrectionCache(unittest.TestCase):
+    """测试按句纠错缓存"""
+    
+    def setUp(self):
+        from src.text_corrector import TextCorrector, BaseCorrectorEngine
+        from src.correction_cache import CorrectionCache
+        
+        class FakeEngine(BaseCorrectorEngine):
+            def __init__(self):
+                self.calls = []
+            def load(self):
+                pass
+            def correct_text(self, text):
+                self.calls.append(text)
+                return text.replace('天汽', '天气')
+            def unload(self):
+                pass
+            def get_engine_stats(self):
+                return {'engine': 'fake'}
+        
+        self.cache = CorrectionCache(':memory:', max_entries=10)
+        self.corrector = TextCorrector(cache=self.cache)
+        self.engine = FakeEngine()
+        self.corrector._engine = self.engine
+    
+    def test_sentence_level_hits(self):
+        """长文本按句缓存，局部修改后其他句子仍命中"""
+        first = self.corrector.correct('今天天汽很好。我们去公园。')
+        self.assertEqual(first['corrected'], '今天天气很好。我们去公园。')
+        self.assertFalse(first['from_cache'])
+        self.assertEqual(len(self.engine.calls), 2)
+        
+        second = self.corrector.correct('今天天汽很好。 我们去公园吧！')
+        self.assertEqual(second['corrected'], '今天天气很好。 我们去公园吧！')
+        self.assertEqual(second['cache_hits'], 1)
+        self.assertEqual(self.engine.calls[-1], '我们去公园吧！')
+        
+        third = self.corrector.correct('今天天汽很好。')
+        self.assertTrue(third['from_cache'])
+        stats = self.corrector.get_stats()['cache']
+        self.assertEqual(stats['hits'], 2)
+        self.assertGreater(stats['hit_rate'], 0)
+    
+    def test_lru_eviction(self):
+        """超过上限时淘汰最久未使用的条目"""
+        for i in range(12):
+            self.cache.put(f"句子{i}", 'ns', f"句子{i}。", [])
+            time.sleep(0.001)
+        self.assertLessEqual(self.cache.get_stats()['entries'], 10)
+        self.assertIsNone(self.cache.get('句子0', 'ns'))
+        self.assertIsNotNone(self.cache.get('句子11', 'ns'))
+    
+    def test_hits_deferred(self):
+        """命中不逐条写库，攒批后写入使用时间和命中次数；重复写入同一句不重复计数"""
+        from src.correction_cache import CorrectionCache
+        cache = CorrectionCache(':memory:', touch_flush_batch=3, touch_flush_interval=3600)
+        for i in range(3):
+            cache.put(f"句子{i}", 'ns', f"句子{i}。", [])
+        cache.put("句子0", 'ns', "句子0！", [])
+        self.assertEqual(cache.get_stats()['entries'], 3)
+        
+        changes = cache._conn.total_changes
+        cache.get('句子0', 'ns')
+        cache.get('句子0', 'ns')
+        cache.get('句子1', 'ns')
+        self.assertEqual(cache._conn.total_changes, changes)   # 未写库
+        self.assertEqual(cache.get('句子2', 'ns')['corrected'], '句子2。')   # 第 3 条记录，触发写入
+        hit_counts = dict(cache._conn.execute("SELECT corrected, hit_count FROM correction_cache"))
+        self.assertEqual(hit_counts, {'句子0！': 2, '句子1。': 1, '句子2。': 1})
+        cache.close()
+    
+    def test_split_sentences_roundtrip(self):
+        """切分后拼接与原文一致"""
+        from src.correction_cache import split_sentences
+        text = '。开头标点，然后一句。第二句？\n没有结尾'
+        self.assertEqual(''.join(split_sentences(text)), text)
+
+
+class TestMicroBatcher(unittest.TestCase):
+    """测试纠错微批处理"""
+    
+    def test_concurrent_submits_coalesce(self):
+        """并发提交的请求合并为少量批次，结果按序返回"""
+        from src.micro_batcher import MicroBatcher
+        
+        batch_sizes = []
+        def batch_fn(items):
+            batch_sizes.append(len(items))
+            time.sleep(0.01)
+            return [item * 2 for item in items]
+        
+        batcher = MicroBatcher(batch_fn, max_batch_size=8, max_wait_ms=50)
+        results = {}
+        def worker(i):
+            results[i] = batcher.submit(i).result(timeout=2)
+        
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        batcher.stop()
+        
+        self.assertEqual(results, {i: i * 2 for i in range(16)})
+        self.assertLess(len(batch_sizes), 16)
+        self.assertLessEqual(max(batch_sizes), 8)
+        self.assertEqual(batcher.get_stats()['items'], 16)
+    
+    def test_exception_propagates(self):
+        """批处理异常传递给该批所有调用方"""
+        from src.micro_batcher import MicroBatcher
+        
+        def batch_fn(items):
+            raise RuntimeError("推理失败")
+        
+        batcher = MicroBatcher(batch_fn, max_wait_ms=5)
+        future = batcher.submit('x')
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=2)
+        batcher.stop()
+    
+    def test_text_corrector_batch(self):
+        """TextCorrector.correct_batch 一次引擎调用处理多条文本"""
+        from src.text_corrector import TextCorrector, BaseCorrectorEngine
+        
+        class FakeEngine(BaseCorrectorEngine):
+            def __init__(self):
+                self.batches = []
+            def load(self):
+                pass
+            def correct_text(self, text):
+                return self.correct_batch([text])[0]
+            def correct_batch(self, texts):
+                self.batches.append(list(texts))
+                return [text.replace('天汽', '天气') for text in texts]
+            def unload(self):
+                pass
+            def get_engine_stats(self):
+                return {'engine': 'fake'}
+        
+        corrector = TextCorrector(batch_wait_ms=20)
+        engine = FakeEngine()
+        corrector._engine = engine
+        
+        results = corrector.correct_batch(['今天天汽很好', '明天', '天汽预报'])
+        self.assertEqual([r['corrected'] for r in results], ['今天天气很好', '明天', '天气预报'])
+        self.assertEqual(len(engine.batches), 1)
+        self.assertTrue(results[0]['changed'])
+        self.assertFalse(results[1]['changed'])
+        self.assertEqual(corrector.get_stats()['batcher']['batches'], 1)
+
+
+class TestTextChunker(unittest.TestCase):
+    """测试长文本分块纠错"""
+    
+    def test_chunks_cover_text(self):
+        """分块覆盖全文，每块不超过上限，优先在标点处切分"""
+        from src.text_chunker import chunk_text
+        text = '今天天气很好，我们去公园散步。' * 30
+        chunks = chunk_text(text, max_chars=64, overlap=8)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(text[c['start']:c['end']] for c in chunks), text)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk['source']), 64)
+            self.assertIn(text[chunk['end'] - 1], '，。')
+        self.assertEqual(chunks[1]['start'] - chunks[1]['context_start'], 8)
+    
+    def test_merge_remaps_positions(self):
+        """合并结果覆盖超出 max_len 的部分，修改位置换算回原文"""
+        from src.text_chunker import chunk_text, merge_chunks
+        text = '今天天汽很好我们去公园散步' * 40
+        chunks = chunk_text(text, max_chars=100, overlap=16)
+        outputs = []
+        for chunk in chunks:
+            source = chunk['source']
+            errors = [['汽', '气', i + 1, 0.9] for i in range(len(source) - 1) if source[i:i + 2] == '天汽']
+            outputs.append((source.replace('天汽', '天气'), errors))
+        
+        corrected, errors = merge_chunks(text, chunks, outputs)
+        self.assertEqual(corrected, text.replace('天汽', '天气'))
+        self.assertEqual(len(errors), 40)
+        self.assertTrue(all(text[e[2]] == '汽' for e in errors))
+    
+    def test_short_text_single_chunk(self):
+        """短文本不分块"""
+        from src.text_chunker import chunk_text
+        self.assertEqual(len(chunk_text('短文本', max_chars=254)), 1)
+
+
+class TestModelManager(unittest.TestCase):
+    """测试模型内存管理"""
+    
+    def setUp(self):
+        from src.model_manager import ModelManager
+        self.events = []
+        self.loaded = {'asr': True, 'corrector': True, 'voiceprint': True}
+        self.manager = ModelManager(memory_threshold=0.0)
+        for name, priority in (('corrector', 2), ('voiceprint', 1)):
+            self.manager.register(
+                name,
+                load_fn=lambda n=name: (self.events.append(('load', n)), self.loaded.__setitem__(n, True)),
+                unload_fn=lambda n=name: (self.events.append(('unload', n)), self.loaded.__setitem__(n, False)),
+                is_loaded_fn=lambda n=name: self.loaded[n],
+                warmup_fn=lambda n=name: self.events.append(('warmup', n)),
+                priority=priority
+            )
+        self.manager.register('asr', lambda: None, lambda: self.events.append(('unload', 'asr')),
+                              lambda: True, pinned=True)
+    
+    def test_pressure_evicts_low_priority_first(self):
+        """内存紧张时按优先级卸载，常驻模型不卸载"""
+        self.manager.ensure_headroom()
+        self.assertEqual(self.events, [('unload', 'voiceprint'), ('unload', 'corrector')])
+        status = self.manager.get_status()
+        self.assertFalse(status['models']['corrector']['loaded'])
+        self.assertTrue(status['models']['asr']['loaded'])
+        self.assertEqual(status['evictions'], 2)
+    
+    def test_use_reloads_and_protects(self):
+        """使用时按需加载并预热，使用期间不会被卸载"""
+        self.manager.unload('corrector')
+        with self.manager.use('corrector'):
+            self.assertTrue(self.loaded['corrector'])
+            self.manager.ensure_headroom()
+            self.assertTrue(self.loaded['corrector'])
+        self.assertIn(('warmup', 'corrector'), self.events)
+        self.assertEqual(self.manager.get_status()['reloads'], 1)
+    
+    def test_child_process_size_and_warmup_failure(self):
+        """模型在子进程中时按子进程内存计量大小和释放量；预热失败不算加载失败"""
+        from src.model_manager import ModelManager
+        manager = ModelManager(memory_threshold=1.0)
+        child = {'rss': 0.0}
+        
+        def warmup():
+            raise AttributeError('预热失败')
+        
+        manager.register('worker', load_fn=lambda: child.__setitem__('rss', 800.0),
+                         unload_fn=lambda: child.__setitem__('rss', 0.0),
+                         is_loaded_fn=lambda: child['rss'] > 0, warmup_fn=warmup,
+                         size_hint_mb=1400, rss_fn=lambda: child['rss'])
+        self.assertTrue(manager.ensure_loaded('worker'))
+        status = manager.get_status()['models']['worker']
+        self.assertEqual((status['loads'], status['size_mb']), (1, 800.0))
+        
+        self.assertTrue(manager.unload('worker'))
+        self.assertEqual(manager.get_status()['last_eviction']['freed_mb'], 800.0)
+    
+    def test_watermarks_and_min_residency(self):
+        """达到高水位才卸载、卸载到低水位为止；后台检查不卸载刚使用过或被持有的模型"""
+        from unittest.mock import patch
+        from src.model_manager import ModelManager
+        manager = ModelManager(memory_threshold=0.8, memory_low_threshold=0.6, min_resident_seconds=60)
+        manager._models = self.manager._models
+        usage = {'value': 0.75}
+        fake_memory = lambda: {'total_mb': 4096, 'available_mb': 1024, 'usage': usage['value']}
+        
+        def unload(name, reason=""):
+            self.events.append(('unload', name))
+            usage['value'] -= 0.15
+            return True
+        
+        with patch('src.model_manager.get_memory_usage', fake_memory), patch.object(manager, 'unload', unload):
+            manager.check()  # 高低水位之间不动作
+            self.assertEqual(self.events, [])
+            
+            usage['value'] = 0.85
+            manager.check()  # 刚加载/使用过，不卸载
+            self.assertEqual(self.events, [])
+            
+            for model in manager._models.values():
+                model.last_used -= 120
+            manager.hold('corrector')
+            manager.check()  # 被持有的纠错模型保留
+            self.assertEqual(self.events, [('unload', 'voiceprint')])
+            
+            manager.release('corrector')
+            manager._models['corrector'].last_used -= 120
+            usage['value'] = 0.85
+            self.events.clear()
+            manager.check()  # 一次降到低水位以下
+            self.assertEqual(self.events, [('unload', 'voiceprint'), ('unload', 'corrector')])
+            self.assertLess(usage['value'], 0.6)
+
+
+class TestOnnxCorrectEngine(unittest.TestCase):
+    """测试 ONNX 纠错引擎的解码逻辑（使用模拟推理会话）"""
+    
+    def test_spelling_correction(self):
+        """按字解码，只替换置信度达到阈值的汉字"""
+        import numpy as np
+        from src.text_corrector import OnnxCorrectEngine
+        
+        tokens = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '天', '汽', '气', '很', '好']
+        
+        class FakeSession:
+            def run(self, output_names, inputs):
+                ids = inputs['input_ids'].copy()
+                ids[ids == tokens.index('汽')] = tokens.index('气')
+                return [np.eye(len(tokens))[ids] * 10]
+        
+        engine = OnnxCorrectEngine('unused', chunk_overlap=4)
+        engine._id_to_token = tokens
+        engine._vocab = {t: i for i, t in enumerate(tokens)}
+        engine._csc_session = FakeSession()
+        engine._is_loaded = True
+        
+        corrected, errors = engine.correct_text('天汽很好')
+        self.assertEqual(corrected, '天气很好')
+        self.assertEqual(errors[0][:3], ['汽', '气', 1])
+        
+        engine.threshold = 1.0
+        self.assertEqual(engine.correct_text('天汽很好')[0], '天汽很好')
+
+
+class TestLlamaCppPrefixCache(unittest.TestCase):
+    """测试 llama-cpp 引擎的前缀状态复用与流式提前结束（使用模拟模型）"""
+    
+    def _make_engine(self, reply, delay=0.0, timeout=15):
+        from src.text_corrector import LlamaCppEngine
+        
+        class FakeLlama:
+            def __init__(self):
+                self.evaluated = []
+                self.restored = 0
+            def tokenize(self, data, add_bos=True):
+                return list(data.decode('utf-8'))
+            def reset(self):
+                pass
+            def eval(self, tokens):
+                self.evaluated.append(len(tokens))
+            def save_state(self):
+                return 'prefix-state'
+            def load_state(self, state):
+                self.restored += 1
+            def token_eos(self):
+                return '<eos>'
+            def detokenize(self, tokens):
+                return ''.join(tokens).encode('utf-8')
+            def generate(self, tokens, **kwargs):
+                self.evaluated.append(len(tokens))
+                for ch in list(reply) + ['<eos>']:
+                    time.sleep(delay)
+                    yield ch
+        
+        engine = LlamaCppEngine('unused.gguf', timeout=timeout)
+        engine._model = FakeLlama()
+        engine._is_loaded = True
+        engine._cache_prefix()
+        return engine
+    
+    def test_prefix_evaluated_once(self):
+        """指令前缀只计算一次，之后每次只计算用户文本部分"""
+        engine = self._make_engine('今天天气很好。')
+        self.assertEqual(engine.correct_text('今天天汽很好'), '今天天气很好。')
+        self.assertEqual(engine.correct_text('今天天汽很好'), '今天天气很好。')
+        model = engine._model
+        self.assertEqual(model.restored, 2)
+        self.assertEqual(model.evaluated[0], len(engine.PROMPT_PREFIX))
+        self.assertTrue(all(n < len(engine.PROMPT_PREFIX) for n in model.evaluated[1:]))
+        self.assertTrue(engine.get_engine_stats()['prefix_cached'])
+    
+    def test_stream_stop_and_timeout(self):
+        """遇到停止词提前结束，超时返回 None"""
+        engine = self._make_engine('好的。\n\n原始文本:后面的内容')
+        pieces = []
+        self.assertEqual(engine.correct_text_stream('好的', on_token=pieces.append), '好的。')
+        self.assertEqual(''.join(pieces), '好的。')
+        
+        slow = self._make_engine('很长很长的输出', delay=0.05, timeout=0.1)
+        self.assertIsNone(slow.correct_text('输入'))
+        self.assertEqual(slow.get_engine_stats()['timeout_count'], 1)
+
+
+class TestConfusionDict(unittest.TestCase):
+    """测试混淆词典快速纠错"""
+    
+    def setUp(self):
+        import tempfile
+        from src.confusion_dict import ConfusionDict
+        self.tmp = tempfile.TemporaryDirectory()
+        seed = Path(self.tmp.name) / 'confusions.txt'
+        seed.write_text('# 注释\n天汽\t天气\n因该\t应该\n', encoding='utf-8')
+        self.learned = Path(self.tmp.name) / 'learned.json'
+        self.dict = ConfusionDict(seed, self.learned, min_count=2)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_aho_corasick_overlapping(self):
+        """多模式匹配包含重叠和后缀模式"""
+        from src.confusion_dict import AhoCorasick
+        matches = AhoCorasick(['he', 'she', 'hers', 'his']).search('ushers')
+        self.assertEqual(sorted(matches), [(1, 'she'), (2, 'he'), (2, 'hers')])
+    
+    def test_apply_and_confident(self):
+        """替换已知错误；有句末标点时可跳过模型"""
+        corrected, changes, confident = self.dict.apply('今天天汽很好，我们因该出去。')
+        self.assertEqual(corrected, '今天天气很好，我们应该出去。')
+        self.assertEqual([c[2] for c in changes], [3, 9])
+        self.assertTrue(confident)
+        self.assertFalse(self.dict.apply('今天天汽很好')[2])
+    
+    def test_learn_from_user_edits(self):
+        """从用户纠正中学习，出现足够次数后启用并持久化"""
+        self.dict.learn('我们去公圆散步', '我们去公园散步')
+        self.assertEqual(self.dict.apply('公圆')[0], '公圆')
+        self.dict.learn('公圆里人很多', '公园里人很多')
+        self.assertEqual(self.dict.apply('公圆')[0], '公园')
+        self.assertTrue(self.learned.exists())
+    
+    def test_text_corrector_skips_model(self):
+        """词典完全确定时不调用模型"""
+        from src.text_corrector import TextCorrector, BaseCorrectorEngine
+        
+        class FakeEngine(BaseCorrectorEngine):
+            def __init__(self):
+                self.calls = []
+            def load(self):
+                pass
+            def correct_text(self, text):
+                self.calls.append(text)
+                return (text, [])
+            def unload(self):
+                pass
+            def get_engine_stats(self):
+                return {'engine': 'fake'}
+        
+        corrector = TextCorrector(confusion_dict=self.dict)
+        engine = FakeEngine()
+        corrector._engine = engine
+        
+        result = corrector.correct('今天天汽很好。')
+        self.assertEqual(result['corrected'], '今天天气很好。')
+        self.assertEqual(engine.calls, [])
+        
+        result = corrector.correct('天汽预报')
+        self.assertEqual(result['corrected'], '天气预报')
+        self.assertEqual(engine.calls, ['天气预报'])
+        self.assertEqual(corrector.get_stats()['confusion_dict']['model_skipped'], 1)
+    
+    def test_model_failure_not_cached(self):
+        """模型失败时返回词典替换结果并带上错误，不写入缓存；模型恢复后重新调用"""
+        from src.correction_cache import CorrectionCache
+        from src.text_corrector import TextCorrector, BaseCorrectorEngine
+        
+        class FlakyEngine(BaseCorrectorEngine):
+            def __init__(self):
+                self.fail = True
+                self.calls = []
+            def load(self):
+                pass
+            def correct_text(self, text):
+                self.calls.append(text)
+                if self.fail:
+                    raise RuntimeError('推理超时')
+                return (text + '。', [])
+            def unload(self):
+                pass
+            def get_engine_stats(self):
+                return {'engine': 'fake'}
+        
+        corrector = TextCorrector(cache=CorrectionCache(':memory:'), confusion_dict=self.dict)
+        engine = FlakyEngine()
+        corrector._engine = engine
+        
+        result = corrector.correct('天汽预报')
+        self.assertEqual(result['corrected'], '天气预报')
+        self.assertFalse(result['success'])
+        self.assertIn('推理超时', result['error'])
+        
+        engine.fail = False
+        result = corrector.correct('天汽预报')
+        self.assertEqual(result['corrected'], '天气预报。')
+        self.assertTrue(result['success'])
+        self.assertFalse(result['from_cache'])
+        self.assertEqual(engine.calls, ['天气预报', '天气预报'])
+    
+    def test_learned_pairs_apply_to_cached_sentences(self):
+        """学习到新词条后，已缓存的句子重新纠错；词条不变时版本不变（重启后缓存仍可命中）"""
+        from src.confusion_dict import ConfusionDict
+        from src.correction_cache import CorrectionCache
+        from src.text_corrector import TextCorrector, BaseCorrectorEngine
+        
+        class FakeEngine(BaseCorrectorEngine):
+            def __init__(self):
+                self.calls = []
+            def load(self):
+                pass
+            def correct_text(self, text):
+                self.calls.append(text)
+                return (text, [])
+            def unload(self):
+                pass
+            def get_engine_stats(self):
+                return {'engine': 'fake'}
+        
+        corrector = TextCorrector(cache=CorrectionCache(':memory:'), confusion_dict=self.dict)
+        engine = FakeEngine()
+        corrector._engine = engine
+        self.assertEqual(corrector.correct('我们去公圆散步')['corrected'], '我们去公圆散步')
+        self.assertTrue(corrector.correct('我们去公圆散步')['from_cache'])
+        self.assertEqual(len(engine.calls), 1)
+        
+        version = self.dict.version
+        self.dict.learn('公圆很大', '公园很大')
+        self.assertEqual(self.dict.version, version)   # 未达到启用次数
+        self.dict.learn('公圆里人很多', '公园里人很多')
+        self.assertNotEqual(self.dict.version, version)
+        result = corrector.correct('我们去公圆散步')
+        self.assertEqual(result['corrected'], '我们去公园散步')
+        self.assertFalse(result['from_cache'])
+        
+        reloaded = ConfusionDict(Path(self.tmp.name) / 'confusions.txt', self.learned, min_count=2)
+        self.assertEqual(reloaded.version, self.dict.version)
+
+
+class TestConfidenceGate(unittest.TestCase):
+    """测试按 ASR 置信度分流纠错"""
+    
+    def setUp(self):
+        from src.text_corrector import TextCorrector, BaseCorrectorEngine
+        
+        class FakeEngine(BaseCorrectorEngine):
+            def __init__(self):
+                self.calls = []
+                self.punct_calls = []
+            def load(self):
+                pass
+            def correct_text(self, text):
+                self.calls.append(text)
+                errors = [['汽', '气', text.index('天汽') + 1, 0.9]] if '天汽' in text else []
+                return (text.replace('天汽', '天气'), errors)
+            def punctuate_batch(self, texts):
+                self.punct_calls.extend(texts)
+                return [(text + '。', []) for text in texts]
+            def unload(self):
+                pass
+            def get_engine_stats(self):
+                return {'engine': 'fake'}
+        
+        self.engine = FakeEngine()
+        self.corrector = TextCorrector(confidence_threshold=0.85)
+        self.corrector._engine = self.engine
+    
+    def test_high_confidence_punctuation_only(self):
+        """高置信度只补标点，低置信度和未知置信度走模型"""
+        results = self.corrector.correct_batch(['天汽很好', '天汽不好', '天汽一般'], [0.95, 0.5, None])
+        self.assertEqual(results[0]['corrected'], '天汽很好。')
+        self.assertTrue(results[0]['punctuation_only'])
+        self.assertEqual(results[1]['corrected'], '天气不好')
+        self.assertEqual(results[2]['corrected'], '天气一般')
+        self.assertEqual(self.engine.calls, ['天汽不好', '天汽一般'])
+        
+        gate = self.corrector.get_stats()['confidence_gate']
+        self.assertEqual(gate['gated_texts'], 1)
+        self.assertEqual(gate['model_texts'], 2)
+        self.assertAlmostEqual(gate['avoided_ratio'], 0.333)
+    
+    def test_correct_segments_offsets(self):
+        """按分段纠错后拼接，变更位置换算到整段"""
+        result = self.corrector.correct_segments([
+            {'text': '今天', 'confidence': 0.99},
+            {'text': '天汽好', 'confidence': 0.3},
+        ])
+        self.assertEqual(result['corrected'], '今天。天气好')
+        self.assertEqual(result['original'], '今天天汽好')
+        self.assertEqual([c['position'] for c in result['changes']], [3])
+        self.assertEqual(result['punctuation_only_segments'], 1)
+    
+    def test_punctuation_uses_cache_dict_and_batcher(self):
+        """只补标点也经过混淆词典、按句缓存（与完整纠错分开）和微批处理"""
+        import tempfile
+        from src.text_corrector import TextCorrector
+        from src.correction_cache import CorrectionCache
+        from src.confusion_dict import ConfusionDict
+        with tempfile.TemporaryDirectory() as tmp:
+            seed = Path(tmp) / 'confusions.txt'
+            seed.write_text('因该\t应该\n', encoding='utf-8')
+            corrector = TextCorrector(cache=CorrectionCache(':memory:'), confidence_threshold=0.85,
+                                      confusion_dict=ConfusionDict(seed, Path(tmp) / 'learned.json'),
+                                      batch_wait_ms=5)
+            corrector._engine = self.engine
+            
+            result = corrector.correct('我因该去', confidence=0.95)
+            self.assertEqual(result['corrected'], '我应该去。')
+            self.assertTrue(result['punctuation_only'])
+            self.assertEqual(self.engine.punct_calls, ['我应该去'])
+            
+            result = corrector.correct('我因该去', confidence=0.95)
+            self.assertEqual(result['corrected'], '我应该去。')
+            self.assertTrue(result['from_cache'] and result['punctuation_only'])
+            self.assertEqual(self.engine.punct_calls, ['我应该去'])
+            
+            # 完整纠错不复用只补标点的缓存
+            self.assertEqual(corrector.correct('我因该去', confidence=0.5)['corrected'], '我应该去')
+            self.assertEqual(self.engine.calls, ['我应该去'])
+            self.assertEqual(corrector.get_stats()['batcher']['items'], 2)
+    
+    def test_asr_confidence_helpers(self):
+        """sherpa token 概率和 whisper 分段打分换算为置信度"""
+        import math
+        from types import SimpleNamespace
+        from src.asr_confidence import sherpa_result, whisper_segment_confidence, combine_confidence
+        
+        recognizer = SimpleNamespace(get_result_all=lambda stream: SimpleNamespace(
+            text=' 你好 ', ys_probs=[math.log(0.9), math.log(0.9)], start_time=1.5))
+        text, confidence, start = sherpa_result(recognizer, None)
+        self.assertEqual((text, start), ('你好', 1.5))
+        self.assertAlmostEqual(confidence, 0.9, places=3)
+        
+        legacy = SimpleNamespace(get_result=lambda stream: '旧接口')
+        self.assertEqual(sherpa_result(legacy, None), ('旧接口', None, None))
+        
+        segment = SimpleNamespace(avg_logprob=math.log(0.8), no_speech_prob=0.5, compression_ratio=1.2)
+        self.assertAlmostEqual(whisper_segment_confidence(segment), 0.4, places=3)
+        segment.compression_ratio = 3.0
+        self.assertAlmostEqual(whisper_segment_confidence(segment), 0.2, places=3)
+        
+        self.assertAlmostEqual(combine_confidence([{'text': 'ab', 'confidence': 1.0},
+                                                  {'text': 'cd', 'confidence': 0.5}]), 0.75)
+        self.assertIsNone(combine_confidence([{'text': 'ab', 'confidence': None}]))
+
+
+class TestCorrectorWorker(unittest.TestCase):
+    """测试独立纠错进程（超时强制结束并重启）"""
+    
+    FAKE_WORKER = (
+        "import sys, json, time\n"
+        "sys.stdin.readline()\n"
+        "print(json.dumps({'ready': True}), flush=True)\n"
+        "for line in sys.stdin:\n"
+        "    req = json.loads(line)\n"
+        "    if 'slow' in req['texts']:\n"
+        "        time.sleep(30)\n"
+        "    if 'batch' in req['texts']:\n"
+        "        time.sleep(1.5)\n"
+        "    print(json.dumps({'id': req['id'], 'results': [[t + '。', []] for t in req['texts']],"
+        " 'stats': {'engine': 'fake'}}), flush=True)\n"
+    )
+    
+    def setUp(self):
+        from src.corrector_worker import ProcessCorrectorEngine
+        script = self.FAKE_WORKER
+        
+        class FakeProcessEngine(ProcessCorrectorEngine):
+            def _command(self):
+                return [sys.executable, '-c', script]
+        
+        self.engine = FakeProcessEngine('fake', timeout=1.0, load_timeout=10, nice=0)
+    
+    def tearDown(self):
+        self.engine.unload()
+    
+    def test_request_response(self):
+        """请求经子进程往返，结果还原为 (文本, 错误) 元组"""
+        self.assertEqual(self.engine.correct_batch(['你好', '再见']), [('你好。', []), ('再见。', [])])
+        stats = self.engine.get_engine_stats()
+        self.assertEqual(stats['engine'], 'fake')
+        self.assertIsNotNone(stats['worker_pid'])
+        self.assertGreater(self.engine.get_rss_mb(), 0)   # 子进程的常驻内存
+        self.engine.unload()
+        self.assertEqual(self.engine.get_rss_mb(), 0)
+    
+    def test_batch_timeout_scales_with_length(self):
+        """批量请求的超时按总字数追加，整批耗时超过单条超时也不会被强制结束"""
+        texts = ['batch', '字' * 50, '字' * 50]
+        self.assertAlmostEqual(self.engine._timeout(texts), 1.0 + 105 / 50)
+        results = self.engine.correct_batch(texts)
+        self.assertEqual(results[0], ('batch。', []))
+        self.assertEqual(self.engine.stats['timeouts'], 0)
+    
+    def test_timeout_kills_and_respawns(self):
+        """超时后结束子进程并在后台重启，调用方回退原文"""
+        from src.text_corrector import TextCorrector
+        corrector = TextCorrector()
+        corrector._engine = self.engine
+        
+        self.engine.load()
+        first_pid = self.engine.get_engine_stats()['worker_pid']
+        start = time.time()
+        result = corrector.correct('slow')
+        self.assertLess(time.time() - start, 5)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['corrected'], 'slow')
+        self.assertEqual(self.engine.stats['timeouts'], 1)
+        
+        for _ in range(100):
+            if self.engine._is_loaded:
+                break
+            time.sleep(0.05)
+        self.assertNotEqual(self.engine.get_engine_stats()['worker_pid'], first_pid)
+        self.assertEqual(corrector.correct('你好')['corrected'], '你好。')
+
+
+class TestRecordingIndex(unittest.TestCase):
+    """测试录音元数据索引"""
+    
+    def setUp(self):
+        import tempfile
+        import src.config as config_module
+        self.test_storage_path = Path(tempfile.mkdtemp(prefix="lifecoach_index_test_")) / "recordings"
+        self.original_path = config_module.STORAGE_BASE
+        config_module.STORAGE_BASE = str(self.test_storage_path)
+        self.storage = FileStorage()
+    
+    def tearDown(self):
+        import shutil
+        import src.config as config_module
+        self.storage.cleanup()
+        config_module.STORAGE_BASE = self.original_path
+        shutil.rmtree(self.test_storage_path.parent, ignore_errors=True)
+    
+    def test_index_maintained_on_writes(self):
+        """保存、纠正、更新、删除同步索引"""
+        import numpy as np
+        self.storage.save("2026-01-21/15-30", "原始文本", {"duration": 12.5})
+        self.storage.save_audio("2026-01-21/15-30", np.zeros(160, dtype=np.int16))
+        self.storage.save_corrected("2026-01-21/15-30", "纠正文本", [])
+        
+        row = self.storage.index.get("2026-01-21/15-30")
+        self.assertEqual(row['duration'], 12.5)
+        self.assertEqual(row['corrected_content'], "纠正文本")
+        self.assertTrue(row['audio_path'].endswith("15-30.wav"))
+        
+        item = self.storage.query()[0]
+        self.assertTrue(item['has_corrected'])
+        self.assertTrue(item['has_audio'])
+        self.assertEqual(self.storage.get("2026-01-21/15-30")['content'], "纠正文本")
+        
+        self.storage.update_transcription("2026-01-21/15-30", "重新识别")
+        detail = self.storage.get("2026-01-21/15-30")
+        self.assertEqual(detail['original_content'], "重新识别")
+        self.assertIsNone(detail['corrected_content'])
+        
+        self.storage.delete("2026-01-21/15-30")
+        self.assertEqual(self.storage.index.count(), 0)
+    
+    def test_rebuild_existing_tree(self):
+        """已有录音目录首次打开时重建，外部新增的文件在 get 时补入索引"""
+        date_dir = self.test_storage_path / "2026-01-20"
+        date_dir.mkdir(parents=True)
+        (date_dir / "09-00.txt").write_text(
+            "=== Life Coach 对话记录 ===\n录音时长: 30秒\n文字长度: 4字\n---\n已有录音\n---\n", encoding='utf-8')
+        
+        storage = FileStorage()
+        self.assertEqual(storage.get_today_count(), 0)
+        self.assertEqual([r['id'] for r in storage.query()], ["2026-01-20/09-00"])
+        
+        (date_dir / "10-00.txt").write_text("=== Life Coach 对话记录 ===\n---\n外部拷入\n---\n", encoding='utf-8')
+        self.assertEqual(storage.get("2026-01-20/10-00")['content'], "外部拷入")
+        self.assertEqual(storage.rebuild_index(), 2)
+        storage.cleanup()
+    
+    def test_index_outside_synced_directory(self):
+        """索引和统计文件在录音目录旁（不被同步），旧版本放在录音目录中的文件删除，可配置路径"""
+        import src.config as config_module
+        legacy = self.test_storage_path / ".recordings_index.db"
+        self.test_storage_path.mkdir(parents=True, exist_ok=True)
+        legacy.write_bytes(b"old")
+        (self.test_storage_path / ".daily_stats.json").write_text("{}", encoding='utf-8')
+        self.storage.save("2026-01-21/09-00", "录音")
+        self.assertEqual(Path(self.storage.index.db_path), self.test_storage_path.parent / "recordings.index.db")
+        self.assertFalse(legacy.exists())
+        self.assertEqual(sorted(p.name for p in self.test_storage_path.iterdir()), ["2026-01-21"])
+        
+        self.storage.cleanup()
+        config_module.RECORDING_INDEX_PATH = str(self.test_storage_path.parent / "custom.db")
+        try:
+            storage = FileStorage()
+            self.assertEqual(storage.index.db_path, config_module.RECORDING_INDEX_PATH)
+            self.assertEqual(storage.index.count(), 1)
+            storage.cleanup()
+        finally:
+            config_module.RECORDING_INDEX_PATH = ''
+    
+    def test_list_pagination(self):
+        """游标分页、过滤和字段裁剪（索引和目录扫描结果一致），列表不含全文"""
+        import src.config as config_module
+        for i, recording_id in enumerate(["2026-01-20/09-00", "2026-01-20/10-00", "2026-01-21/08-00",
+                                          "2026-01-21/08-00", "2026-01-22/07-00"]):
+            self.storage.save(recording_id, f"第{i}段录音内容")
+        self.storage.save_corrected("2026-01-21/08-00", "纠正内容", [])
+        expected = ["2026-01-22/07-00", "2026-01-21/08-00_2", "2026-01-21/08-00",
+                    "2026-01-20/10-00", "2026-01-20/09-00"]
+        
+        for index_enabled in (True, False):
+            config_module.RECORDING_INDEX_ENABLED = index_enabled
+            try:
+                cursors, before = [], None
+                while True:
+                    page = self.storage.query(limit=2, before=before)
+                    self.assertTrue(all('full_text' not in item and 'content' not in item for item in page))
+                    cursors.extend(item['cursor'] for item in page)
+                    if len(page) < 2:
+                        break
+                    before = page[-1]['cursor']
+                self.assertEqual(cursors, expected)
+                
+                filtered = self.storage.query(date_from="2026-01-21", date_to="2026-01-21", has_correction=True)
+                self.assertEqual([item['cursor'] for item in filtered], ["2026-01-21/08-00"])
+                
+                item = self.storage.query(limit=1, fields=['id', 'duration'])[0]
+                self.assertEqual(set(item), {'cursor', 'id', 'duration'})
+            finally:
+                config_module.RECORDING_INDEX_ENABLED = True
+    
+    def test_full_text_search(self):
+        """中文二元组检索：短语、单字、多词、过滤和高亮"""
+        self.storage.save("2026-01-20/09-00", "今天天气很好，我们去公园散步。")
+        self.storage.save("2026-01-21/10-00", "明天讨论项目进度和天汽预报。")
+        self.storage.save_corrected("2026-01-21/10-00", "明天讨论项目进度和天气预报。", [])
+        
+        found = self.storage.search("天气")
+        self.assertEqual(found['total'], 2)
+        self.assertIn("<mark>天气</mark>", found['results'][0]['snippet'])
+        
+        self.assertEqual([r['id'] for r in self.storage.search("公园散步")['results']], ["2026-01-20/09-00"])
+        self.assertEqual(self.storage.search("园天")['total'], 0)
+        self.assertEqual(self.storage.search("汽")['total'], 1)
+        self.assertEqual(self.storage.search("天气 项目")['total'], 1)
+        self.assertEqual(self.storage.search("天气", has_correction=True)['total'], 1)
+        self.assertEqual(self.storage.search("天气", date_to="2026-01-20")['total'], 1)
+        
+        self.storage.update_transcription("2026-01-20/09-00", "下雨了")
+        self.assertEqual(self.storage.search("公园")['total'], 0)
+        self.assertEqual(self.storage.search("下雨")['total'], 1)
+    
+    def test_mixed_script_search(self):
+        """汉字与字母数字、标点混合的查询按段匹配"""
+        from src.recording_index import build_match_query
+        self.storage.save("2026-01-20/09-00", "今天3点钟开会，讨论AI的模型AI部署。你好，世界")
+        self.storage.save("2026-01-21/10-00", "明天下午开会")
+        
+        for query in ("今天3点", "3点", "模型AI", "AI的", "你好，世界", "ai", "3点钟 部署"):
+            self.assertEqual([r['id'] for r in self.storage.search(query)['results']],
+                             ["2026-01-20/09-00"], query)
+        self.assertEqual(self.storage.search("开会")['total'], 2)
+        self.assertEqual(self.storage.search("明天3点")['total'], 0)
+        self.assertEqual(build_match_query("今天3点"), '"今天" AND "3" AND "点"*')
+        self.assertIsNone(build_match_query("，。"))
+
+
+class TestStatsAggregator(unittest.TestCase):
+    """测试每日录音统计"""
+    
+    def setUp(self):
+        import tempfile
+        import src.config as config_module
+        self.test_storage_path = Path(tempfile.mkdtemp(prefix="lifecoach_stats_test_")) / "recordings"
+        self.original_path = config_module.STORAGE_BASE
+        config_module.STORAGE_BASE = str(self.test_storage_path)
+        self.storage = FileStorage()
+    
+    def tearDown(self):
+        import shutil
+        import src.config as config_module
+        self.storage.cleanup()
+        config_module.STORAGE_BASE = self.original_path
+        shutil.rmtree(self.test_storage_path.parent, ignore_errors=True)
+    
+    def test_incremental_updates(self):
+        """保存、更新、删除增量更新统计，汇总文件重新加载后一致"""
+        from datetime import datetime
+        today = datetime.now().strftime("%Y-%m-%d")
+        self.storage.save(f"{today}/09-00", "第一条录音", {"duration": 30})
+        self.storage.save(f"{today}/10-00", "第二条", {"duration": 12.5})
+        self.storage.save("2026-01-20/10-00", "昨天", {"duration": 5})
+        
+        stats = self.storage.get_today_stats()
+        self.assertEqual((stats['count'], stats['duration'], stats['words']), (2, 42.5, 8))
+        self.assertEqual(stats['last_transcript'], "昨天")
+        
+        self.storage.update_transcription(f"{today}/10-00", "重新识别")
+        self.storage.delete(f"{today}/09-00")
+        stats = self.storage.get_today_stats()
+        self.assertEqual((stats['count'], stats['duration']), (1, 12.5))
+        
+        self.storage.cleanup()
+        reloaded = FileStorage()
+        self.assertTrue(reloaded.stats.loaded)
+        self.assertEqual(reloaded.get_today_stats()['count'], 1)
+        self.assertEqual([d['date'] for d in reloaded.stats.get_days()], ["2026-01-20", today])
+        reloaded.cleanup()
+    
+    def test_rebuild_and_no_file_io(self):
+        """汇总文件缺失时从索引/目录重建；读取统计不访问文件，磁盘空间按间隔采样"""
+        from unittest import mock
+        import src.config as config_module
+        self.storage.save("2026-01-21/09-00", "录音", {"duration": 10})
+        self.storage.save("2026-01-21/10-00", "录音", {"duration": 20})
+        
+        for index_enabled in (True, False):
+            config_module.RECORDING_INDEX_ENABLED = index_enabled
+            try:
+                self.storage.cleanup()
+                self.storage.stats.path.unlink()
+                storage = FileStorage()
+                self.assertEqual(storage.stats.get_day("2026-01-21")['count'], 2)
+                self.assertEqual(storage.stats.get_day("2026-01-21")['duration'], 30)
+                storage.cleanup()
+            finally:
+                config_module.RECORDING_INDEX_ENABLED = True
+        
+        self.storage.get_storage_info()
+        with mock.patch('builtins.open', side_effect=AssertionError("file I/O")), \
+             mock.patch('pathlib.Path.read_text', side_effect=AssertionError("file I/O")), \
+             mock.patch('pathlib.Path.mkdir', side_effect=AssertionError("mkdir")), \
+             mock.patch('shutil.disk_usage', side_effect=AssertionError("disk_usage")):
+            for _ in range(3):
+                self.storage.get_today_stats()
+                self.storage.get_today_count()
+                self.storage.get_storage_info()
+
+
+class TestRecordingSidecar(unittest.TestCase):
+    """测试录音结构化元数据（JSON 附属文件）"""
+    
+    def setUp(self):
+        import tempfile
+        import src.config as config_module
+        self.test_storage_path = Path(tempfile.mkdtemp(prefix="lifecoach_sidecar_test_")) / "recordings"
+        self.original_path = config_module.STORAGE_BASE
+        config_module.STORAGE_BASE = str(self.test_storage_path)
+        self.storage = FileStorage()
+    
+    def tearDown(self):
+        import shutil
+        import src.config as config_module
+        self.storage.cleanup()
+        config_module.STORAGE_BASE = self.original_path
+        shutil.rmtree(self.test_storage_path.parent, ignore_errors=True)
+    
+    def test_segment_from_pipeline_metadata(self):
+        """分段回调元数据转换为时间线条目"""
+        from src.recording_sidecar import build_segment
+        segment = build_segment("你好", {'segment_index': 3, 'start_time': 1.23456, 'duration': 2.0,
+                                        'confidence': 0.9, 'rms': 0.05, 'transcribe_time': 0.31,
+                                        'engine': 'sherpa', 'sample_rate': 16000})
+        self.assertEqual(segment, {'index': 3, 'text': "你好", 'start': 1.2346, 'duration': 2.0,
+                                   'confidence': 0.9, 'rms': 0.05, 'transcribe_time': 0.31, 'engine': 'sherpa'})
+        # Whisper 分段只有 start/end
+        self.assertEqual(build_segment("x", {'start': 1.0, 'end': 3.5}, index=0)['duration'], 2.5)
+    
+    def test_sidecar_lifecycle(self):
+        """保存、纠正、重新识别、删除时维护附属文件"""
+        from src.recording_sidecar import build_sidecar, build_segment, correction_record, segment_at
+        segments = [build_segment("第一段", {'start_time': 0.0, 'duration': 2.0}, index=0),
+                    build_segment("第二段", {'start_time': 2.5, 'duration': 1.5}, index=1)]
+        sidecar = build_sidecar("2026-01-21/15-30", duration=4.0, segments=segments,
+                                asr={'engine': 'sherpa', 'model': 'streaming-paraformer'}, mode='realtime')
+        sidecar['corrections'].append(correction_record([{'original': 'a', 'corrected': 'b'}],
+                                                        engine={'engine': 'macro-correct'}, time_ms=12))
+        self.storage.save("2026-01-21/15-30", "第一段第二段", {"duration": 4.0}, sidecar=sidecar)
+        self.storage.save("2026-01-21/15-30", "同一分钟的第二条")
+        
+        data = self.storage.get_sidecar("2026-01-21/15-30")
+        self.assertEqual(data['asr']['model'], 'streaming-paraformer')
+        self.assertEqual([s['text'] for s in data['segments']], ["第一段", "第二段"])
+        self.assertEqual(segment_at(data, 3.0)['index'], 1)
+        self.assertIsNone(self.storage.get_sidecar("2026-01-21/15-30_2"))
+        
+        self.storage.save_corrected("2026-01-21/15-30", "第一段第二段。", "手动修改")
+        data = self.storage.get_sidecar("2026-01-21/15-30")
+        self.assertEqual([c['source'] for c in data['corrections']], ["auto", "manual"])
+        
+        self.storage.update_transcription("2026-01-21/15-30", "重新识别",
+                                          segments=[build_segment("重新识别", {'start': 0.0, 'end': 4.0}, index=0)],
+                                          asr={'engine': 'whisper'})
+        data = self.storage.get_sidecar("2026-01-21/15-30")
+        self.assertEqual(len(data['segments']), 1)
+        self.assertEqual(data['asr'], {'engine': 'whisper'})
+        self.assertIn('retranscribed_at', data)
+        
+        self.storage.delete("2026-01-21/15-30")
+        self.assertFalse((self.test_storage_path / "2026-01-21" / "15-30.json").exists())
+
+
+class TestAudioPreview(unittest.TestCase):
+    """测试音频 Range 请求和试听版本缓存"""
+    
+    def setUp(self):
+        import tempfile
+        import numpy as np
+        import src.config as config_module
+        import src.audio_preview as audio_preview
+        from src.audio_preview import AudioPreviewEncoder
+        self.test_storage_path = Path(tempfile.mkdtemp(prefix="lifecoach_audio_test_")) / "recordings"
+        self.original_path = config_module.STORAGE_BASE
+        config_module.STORAGE_BASE = str(self.test_storage_path)
+        self.storage = FileStorage()
+        self.storage.save("2026-01-21/15-30", "录音")
+        self.wav_path = Path(self.storage.save_audio("2026-01-21/15-30", np.zeros(16000, dtype=np.int16)))
+        
+        class CopyEncoder(AudioPreviewEncoder):
+            """用文件拷贝代替 ffmpeg"""
+            def _command(self, wav_path, output_path):
+                return [sys.executable, '-c', 'import shutil, sys; shutil.copyfile(sys.argv[1], sys.argv[2])',
+                        wav_path, output_path]
+        
+        self.encoder = CopyEncoder('opus', nice=0)
+        self.original_encoder = audio_preview._encoder_instance
+        audio_preview._encoder_instance = self.encoder
+    
+    def tearDown(self):
+        import shutil
+        import src.config as config_module
+        import src.audio_preview as audio_preview
+        audio_preview._encoder_instance = self.original_encoder
+        self.storage.cleanup()
+        config_module.STORAGE_BASE = self.original_path
+        shutil.rmtree(self.test_storage_path.parent, ignore_errors=True)
+    
+    def test_preview_cache(self):
+        """首次请求后台编码，之后命中缓存；WAV 更新后缓存失效"""
+        from src.audio_preview import preview_path
+        self.assertIsNone(self.encoder.get(self.wav_path))
+        self.assertTrue(self.encoder.wait(timeout=30))
+        self.assertEqual(self.encoder.get(self.wav_path), preview_path(self.wav_path))
+        self.assertEqual(self.encoder.stats['encoded'], 1)
+        
+        later = self.wav_path.stat().st_mtime + 10
+        os.utime(self.wav_path, (later, later))
+        self.assertIsNone(self.encoder.get(self.wav_path))
+        self.assertTrue(self.encoder.wait(timeout=30))
+        self.assertEqual(self.encoder.stats['encoded'], 2)
+    
+    def test_range_and_conditional_requests(self):
+        """音频接口支持 Range、ETag 条件请求，并在试听版本就绪后切换"""
+        import src.api_server as api_server
+        
+        class Manager:
+            storage = self.storage
+        original_manager = api_server.app_manager
+        api_server.app_manager = Manager()
+        try:
+            client = api_server.app.test_client()
+            url = "/api/recordings/2026-01-21/15-30/audio"
+            size = self.wav_path.stat().st_size
+            
+            response = client.get(url, headers={'Range': 'bytes=0-99'})
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response.headers['Content-Range'], f"bytes 0-99/{size}")
+            self.assertEqual(len(response.data), 100)
+            self.assertEqual(response.headers['X-Audio-Variant'], 'original')
+            self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+            
+            response = client.get(url, headers={'Range': f'bytes={size}-'})
+            self.assertEqual(response.status_code, 416)
+            
+            self.assertTrue(self.encoder.wait(timeout=30))
+            response = client.get(url)
+            self.assertEqual(response.headers['X-Audio-Variant'], 'preview')
+            self.assertEqual(response.mimetype, 'audio/ogg')
+            etag = response.headers['ETag']
+            self.assertEqual(client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+            
+            response = client.get(url + "?format=original")
+            self.assertEqual(response.headers['X-Audio-Variant'], 'original')
+            self.assertEqual(len(response.data), size)
+        finally:
+            api_server.app_manager = original_manager
+
+
+class TestWaveformPeaks(unittest.TestCase):
+    """测试多分辨率波形峰值"""
+    
+    def setUp(self):
+        import tempfile
+        import numpy as np
+        import src.config as config_module
+        self.test_storage_path = Path(tempfile.mkdtemp(prefix="lifecoach_peaks_test_")) / "recordings"
+        self.original_path = config_module.STORAGE_BASE
+        config_module.STORAGE_BASE = str(self.test_storage_path)
+        self.storage = FileStorage()
+        rng = np.random.default_rng(0)
+        self.audio = (rng.standard_normal(16000 * 70) * 3000).astype(np.int16)
+        self.storage.save("2026-01-21/15-30", "录音")
+        self.wav_path = Path(self.storage.save_audio("2026-01-21/15-30", self.audio))
+    
+    def tearDown(self):
+        import shutil
+        import src.config as config_module
+        self.storage.cleanup()
+        config_module.STORAGE_BASE = self.original_path
+        shutil.rmtree(self.test_storage_path.parent, ignore_errors=True)
+    
+    def test_streaming_matches_direct(self):
+        """分块流式计算与逐对直接计算一致，粗级别由细级别正确合并"""
+        import numpy as np
+        from src.waveform_peaks import compute_peaks, compute_peaks_from_wav
+        direct = compute_peaks(self.audio)
+        streamed = compute_peaks_from_wav(self.wav_path, chunk_frames=1000)
+        self.assertEqual(len(direct['levels']), len(streamed['levels']))
+        for a, b in zip(direct['levels'], streamed['levels']):
+            np.testing.assert_array_equal(a, b)
+        
+        level0 = direct['levels'][0]
+        self.assertEqual(len(level0), -(-len(self.audio) // 256))
+        self.assertEqual(level0[3, 0], self.audio[768:1024].min())
+        self.assertEqual(level0[-1, 1], self.audio[(len(level0) - 1) * 256:].max())
+        level1 = direct['levels'][1]
+        self.assertEqual(level1[5, 1], self.audio[5 * 1024:6 * 1024].max())
+        self.assertLessEqual(len(direct['levels'][-1]), 512)
+    
+    def test_read_levels(self):
+        """保存音频时写入峰值文件，按 zoom/width/时间范围读取"""
+        from src.waveform_peaks import peaks_path
+        self.assertTrue(peaks_path(self.wav_path).exists())
+        
+        overview = self.storage.get_peaks("2026-01-21/15-30")
+        self.assertEqual(overview['zoom'], 0)
+        self.assertLessEqual(len(overview['peaks']), 512)
+        self.assertAlmostEqual(overview['duration'], 70.0)
+        
+        finest = self.storage.get_peaks("2026-01-21/15-30", zoom=overview['levels'] - 1)
+        self.assertEqual(finest['samples_per_peak'], 256)
+        self.assertEqual(finest['peaks'][3, 0], self.audio[768:1024].min())
+        
+        picked = self.storage.get_peaks("2026-01-21/15-30", width=1000)
+        self.assertGreaterEqual(len(picked['peaks']), 1000)
+        self.assertLess(len(picked['peaks']), 4000)
+        
+        window = self.storage.get_peaks("2026-01-21/15-30", zoom=finest['zoom'], start=10, end=11)
+        self.assertEqual(window['start'], 10 * 16000 // 256 * 256 / 16000)
+        self.assertEqual(window['peaks'][0, 1], self.audio[10 * 16000 // 256 * 256:][:256].max())
+        self.assertIsNone(self.storage.get_peaks("2026-01-21/09-00"))
+    
+    def test_backfill_and_stale(self):
+        """缺失或比 WAV 旧的峰值文件会补算"""
+        from src.waveform_peaks import peaks_path
+        path = peaks_path(self.wav_path)
+        path.unlink()
+        result = self.storage.backfill_peaks()
+        self.assertEqual((result['total'], result['generated'], result['failed']), (1, 1, 0))
+        self.assertEqual(self.storage.backfill_peaks()['generated'], 0)
+        
+        path.write_bytes(b"broken")
+        later = self.wav_path.stat().st_mtime + 10
+        os.utime(self.wav_path, (later, later))
+        self.assertIsNotNone(self.storage.get_peaks("2026-01-21/15-30"))
+    
+    def test_api(self):
+        """峰值接口返回 JSON/二进制，支持 ETag 条件请求"""
+        import src.api_server as api_server
+        storage = self.storage
+        
+        class Manager:
+            def get_recording_peaks(self, recording_id, **kwargs):
+                result = storage.get_peaks(recording_id, **kwargs)
+                if result is None:
+                    return {"success": False, "error": {"code": ErrorCode.RECORDING_NOT_FOUND, "message": ""}}
+                return {"success": True, "id": recording_id, **result}
+        original_manager = api_server.app_manager
+        api_server.app_manager = Manager()
+        try:
+            client = api_server.app.test_client()
+            url = "/api/recordings/2026-01-21/15-30/peaks"
+            response = client.get(url + "?width=300")
+            data = response.get_json()
+            self.assertTrue(data['success'])
+            self.assertEqual(len(data['peaks']), 2 * len(storage.get_peaks("2026-01-21/15-30", width=300)['peaks']))
+            self.assertEqual(client.get(url + "?width=300", headers={'If-None-Match': response.headers['ETag']}).status_code, 304)
+            
+            response = client.get(url + "?zoom=0&format=binary")
+            self.assertEqual(response.mimetype, 'application/octet-stream')
+            self.assertEqual(len(response.data), 4 * len(storage.get_peaks("2026-01-21/15-30")['peaks']))
+            self.assertEqual(response.headers['X-Peaks-Zoom'], '0')
+            
+            self.assertEqual(client.get(url + "?zoom=x").status_code, 400)
+            self.assertEqual(client.get("/api/recordings/2026-01-21/09-00/peaks").status_code, 404)
+        finally:
+            api_server.app_manager = original_manager
+
+
+class TestStorageMaintenance(unittest.TestCase):
+    """测试存储维护：孤立文件清理、音频配额、压缩归档、空间预留"""
+    
+    def setUp(self):
+        import tempfile
+        import src.config as config_module
+        self.test_storage_path = Path(tempfile.mkdtemp(prefix="lifecoach_maint_test_")) / "recordings"
+        self.original_path = config_module.STORAGE_BASE
+        config_module.STORAGE_BASE = str(self.test_storage_path)
+        self.storage = FileStorage()
+    
+    def tearDown(self):
+        import shutil
+        import src.config as config_module
+        self.storage.cleanup()
+        config_module.STORAGE_BASE = self.original_path
+        shutil.rmtree(self.test_storage_path.parent, ignore_errors=True)
+    
+    def _save(self, recording_id, seconds=1):
+        import numpy as np
+        self.storage.save(recording_id, "录音内容")
+        return Path(self.storage.save_audio(recording_id, np.ones(16000 * seconds, dtype=np.int16)))
+    
+    def _maintenance(self, **kwargs):
+        from src.storage_maintenance import StorageMaintenance
+        kwargs.setdefault('orphan_grace', 0)
+        kwargs.setdefault('io_pause', 0)
+        kwargs.setdefault('min_free_gb', 0)
+        return StorageMaintenance(self.storage, **kwargs)
+    
+    def test_delete_removes_companion_files(self):
+        """删除录音时一并删除音频、纠错文本、峰值等同名文件"""
+        self._save("2026-01-21/15-30")
+        self.storage.save_corrected("2026-01-21/15-30", "纠错内容", [])
+        self.assertTrue(self.storage.delete("2026-01-21/15-30"))
+        self.assertFalse((self.test_storage_path / "2026-01-21").exists())
+    
+    def test_orphans(self):
+        """只清理没有音频的派生文件、临时文件和空目录，未超过宽限期的文件保留"""
+        self._save("2026-01-22/09-00")
+        self.storage.delete_audio("2026-01-22/09-00")
+        (self.test_storage_path / "2026-01-22" / "09-00.peaks").write_bytes(b"x" * 10)
+        (self.test_storage_path / "2026-01-22" / "09-00.wav.tmp").write_bytes(b"x" * 10)
+        (self.test_storage_path / "2026-01-23").mkdir()
+        
+        report = self._maintenance(orphan_grace=3600).run()
+        self.assertEqual(report['orphans_removed'], 0)
+        self.assertEqual(report['dirs_removed'], 1)
+        self.assertFalse((self.test_storage_path / "2026-01-23").exists())
+        
+        report = self._maintenance().run()
+        self.assertEqual(report['orphans_removed'], 2)   # peaks + tmp
+        self.assertEqual(report['reclaimed_bytes'], 20)
+        self.assertTrue((self.test_storage_path / "2026-01-22" / "09-00.txt").exists())
+    
+    def test_orphans_keep_transcripts_and_synced_files(self):
+        """缺少 .txt 的音频、纠错文本和元数据不删除；同步来的文件保留源 mtime 时按 ctime 计算宽限期"""
+        wav_path = self._save("2026-01-21/15-30")
+        self.storage.save_corrected("2026-01-21/15-30", "纠错内容", [])
+        (self.test_storage_path / "2026-01-21" / "15-30.json").write_text("{}", encoding='utf-8')
+        (self.test_storage_path / "2026-01-21" / "15-30.txt").unlink()   # .txt 还没同步过来
+        peaks = self.test_storage_path / "2026-01-22" / "09-00.peaks"
+        peaks.parent.mkdir()
+        peaks.write_bytes(b"x" * 10)
+        old = time.time() - 86400
+        for path in self.test_storage_path.rglob("*"):
+            if path.is_file():
+                os.utime(path, (old, old))
+        
+        report = self._maintenance(orphan_grace=3600).run()
+        self.assertEqual(report['orphans_removed'], 0)
+        report = self._maintenance().run()
+        self.assertEqual(report['orphans_removed'], 1)   # 只有没有音频的峰值文件
+        self.assertTrue(wav_path.exists())
+        for suffix in (".corrected.txt", ".json", ".peaks"):
+            self.assertTrue((self.test_storage_path / "2026-01-21" / f"15-30{suffix}").exists(), suffix)
+    
+    def test_quota_oldest_first(self):
+        """音频超过配额时从最早的录音开始删除音频，转写文本保留"""
+        for day in ("2026-01-20", "2026-01-21", "2026-01-22"):
+            self._save(f"{day}/10-00", seconds=10)
+        size = (self.test_storage_path / "2026-01-22" / "10-00.wav").stat().st_size
+        
+        preview = self._maintenance(audio_quota_gb=size * 1.5 / 1024 ** 3).run(dry_run=True)
+        self.assertEqual(preview['audio_deleted'], 2)
+        self.assertTrue((self.test_storage_path / "2026-01-20" / "10-00.wav").exists())
+        
+        busy = self._maintenance(audio_quota_gb=size * 1.5 / 1024 ** 3, is_busy=lambda: True).run()
+        self.assertTrue(busy['interrupted'])
+        self.assertEqual(busy['audio_deleted'], 1)
+        
+        report = self._maintenance(audio_quota_gb=size * 1.5 / 1024 ** 3).run()
+        self.assertEqual(report['audio_deleted'], 1)
+        self.assertFalse((self.test_storage_path / "2026-01-21" / "10-00.wav").exists())
+        self.assertTrue((self.test_storage_path / "2026-01-22" / "10-00.wav").exists())
+        recording = self.storage.get("2026-01-20/10-00")
+        self.assertEqual(recording['content'], "录音内容")
+        self.assertIsNone(recording['audio_path'])
+    
+    def test_compress_archive(self):
+        """超过天数的 WAV 压缩归档，归档音频和波形峰值仍可访问"""
+        from src.audio_preview import AudioPreviewEncoder
+        import src.api_server as api_server
+        
+        class CopyEncoder(AudioPreviewEncoder):
+            """用文件拷贝代替 ffmpeg"""
+            def _command(self, wav_path, output_path):
+                return [sys.executable, '-c', 'import shutil, sys; shutil.copyfile(sys.argv[1], sys.argv[2])',
+                        wav_path, output_path]
+        
+        self._save("2020-01-01/10-00")
+        self._save(time.strftime("%Y-%m-%d") + "/10-00")
+        report = self._maintenance(compress_after_days=30, encoder=CopyEncoder('opus', nice=0)).run()
+        self.assertEqual(report['compressed'], 1)
+        date_dir = self.test_storage_path / "2020-01-01"
+        self.assertFalse((date_dir / "10-00.wav").exists())
+        self.assertTrue((date_dir / "10-00.opus").exists())
+        self.assertEqual(self.storage.get("2020-01-01/10-00")['audio_path'], str(date_dir / "10-00.opus"))
+        self.assertIsNotNone(self.storage.get_peaks("2020-01-01/10-00"))
+        
+        class Manager:
+            storage = self.storage
+        original_manager = api_server.app_manager
+        api_server.app_manager = Manager()
+        try:
+            response = api_server.app.test_client().get("/api/recordings/2020-01-01/10-00/audio")
+            self.assertEqual(response.headers['X-Audio-Variant'], 'archive')
+            self.assertEqual(response.mimetype, 'audio/ogg')
+        finally:
+            api_server.app_manager = original_manager
+    
+    def test_ensure_free(self):
+        """启用空间不足清理时删除最早的音频腾出空间，删光也不够时不删除"""
+        for day in ("2026-01-20", "2026-01-21"):
+            self._save(f"{day}/10-00", seconds=10)
+        size = (self.test_storage_path / "2026-01-21" / "10-00.wav").stat().st_size
+        used = lambda: sum(p.stat().st_size for p in self.test_storage_path.rglob("*.wav"))
+        capacity = 2 * size + 1000
+        
+        disabled = self._maintenance()
+        disabled._free_bytes = lambda: capacity - used()
+        self.assertFalse(disabled.ensure_free(size))
+        self.assertEqual(disabled.stats['audio_deleted'], 0)
+        
+        maintenance = self._maintenance(free_space_cleanup=True)
+        maintenance._free_bytes = lambda: capacity - used()
+        self.assertTrue(maintenance.ensure_free(500))
+        self.assertFalse(maintenance.ensure_free(capacity * 2))
+        self.assertEqual(maintenance.stats['audio_deleted'], 0)
+        self.assertTrue(maintenance.ensure_free(size))
+        self.assertFalse((self.test_storage_path / "2026-01-20" / "10-00.wav").exists())
+        self.assertTrue((self.test_storage_path / "2026-01-21" / "10-00.wav").exists())
+        self.assertEqual(maintenance.stats['audio_deleted'], 1)
+    
+    def test_min_free_not_required_to_record(self):
+        """最低剩余空间不影响能否开始录音；删光音频也达不到最低值时后台维护不删除"""
+        for day in ("2026-01-20", "2026-01-21"):
+            self._save(f"{day}/10-00", seconds=10)
+        maintenance = self._maintenance(min_free_gb=1.0, free_space_cleanup=True)
+        maintenance._free_bytes = lambda: int(1.1 * 1024 ** 3)
+        self.assertTrue(maintenance.ensure_free(200 * 1024 * 1024))
+        
+        maintenance._free_bytes = lambda: int(0.5 * 1024 ** 3)   # 空间被音频以外的数据占用
+        report = maintenance.run()
+        self.assertTrue(report['low_space_unreachable'])
+        self.assertEqual(report['audio_deleted'], 0)
+        self.assertEqual(len(list(self.test_storage_path.rglob("*.wav"))), 2)
+
+
+class TestAudioCodec(unittest.TestCase):
+    """测试 FLAC 后台压缩和统一音频解码"""
+    
+    def setUp(self):
+        import tempfile
+        import numpy as np
+        import src.config as config_module
+        import src.audio_codec as audio_codec
+        from src.audio_codec import AudioCompressor
+        self.test_storage_path = Path(tempfile.mkdtemp(prefix="lifecoach_codec_test_")) / "recordings"
+        self.original_path = config_module.STORAGE_BASE
+        self.original_codec = config_module.AUDIO_STORAGE_CODEC
+        config_module.STORAGE_BASE = str(self.test_storage_path)
+        config_module.AUDIO_STORAGE_CODEC = 'flac'
+        self.storage = FileStorage()
+        self.audio = (np.sin(np.arange(16000 * 3) / 20) * 8000).astype(np.int16)
+        
+        class CopyCompressor(AudioCompressor):
+            """用文件拷贝代替 FLAC 编码（解码按文件头识别为 WAV）"""
+            def _encode(self, wav_path, flac_path):
+                data = Path(wav_path).read_bytes()
+                Path(flac_path).write_bytes(data[:len(data) // 2] if self.truncate else data)
+        
+        self.compressor = CopyCompressor(backend='copy', nice=0)
+        self.compressor.truncate = False
+        self.original_compressor = audio_codec._compressor_instance
+        audio_codec._compressor_instance = self.compressor
+    
+    def tearDown(self):
+        import shutil
+        import src.config as config_module
+        import src.audio_codec as audio_codec
+        self.compressor.wait(timeout=30)
+        audio_codec._compressor_instance = self.original_compressor
+        self.storage.cleanup()
+        config_module.STORAGE_BASE = self.original_path
+        config_module.AUDIO_STORAGE_CODEC = self.original_codec
+        shutil.rmtree(self.test_storage_path.parent, ignore_errors=True)
+    
+    def test_background_compress(self):
+        """保存后后台压缩并替换 WAV，读取方透明解码"""
+        import numpy as np
+        import src.api_server as api_server
+        self.storage.save("2026-01-21/15-30", "录音")
+        wav_path = Path(self.storage.save_audio("2026-01-21/15-30", self.audio))
+        self.assertTrue(self.compressor.wait(timeout=30))
+        flac_path = wav_path.with_suffix(".flac")
+        self.assertFalse(wav_path.exists())
+        self.assertTrue(flac_path.exists())
+        self.assertEqual(self.storage.get("2026-01-21/15-30")['audio_path'], str(flac_path))
+        self.assertEqual(self.compressor.get_stats()['compressed'], 1)
+        
+        audio, sample_rate = self.storage.load_audio("2026-01-21/15-30")
+        self.assertEqual(sample_rate, 16000)
+        np.testing.assert_array_equal(audio, self.audio)
+        self.assertEqual(self.storage.get_peaks("2026-01-21/15-30", zoom=1)['peaks'][0, 1],
+                         self.audio[:256].max())
+        
+        # 同一分钟的新录音不覆盖已压缩的音频
+        self.storage.save("2026-01-21/15-30", "第二段")
+        second = Path(self.storage.save_audio("2026-01-21/15-30", self.audio[:16000]))
+        self.assertEqual(second.name, "15-30_2.wav")
+        
+        class Manager:
+            storage = self.storage
+        original_manager = api_server.app_manager
+        api_server.app_manager = Manager()
+        try:
+            response = api_server.app.test_client().get("/api/recordings/2026-01-21/15-30/audio")
+            self.assertEqual(response.mimetype, 'audio/flac')
+            self.assertEqual(response.headers['X-Audio-Variant'], 'original')
+        finally:
+            api_server.app_manager = original_manager
+    
+    def test_failed_verification_keeps_wav(self):
+        """解码校验失败时保留 WAV"""
+        self.compressor.truncate = True
+        self.storage.save("2026-01-21/15-30", "录音")
+        wav_path = Path(self.storage.save_audio("2026-01-21/15-30", self.audio))
+        self.assertTrue(self.compressor.wait(timeout=30))
+        self.assertTrue(wav_path.exists())
+        self.assertFalse(wav_path.with_suffix(".flac").exists())
+        self.assertFalse(wav_path.with_name("15-30.flac.tmp").exists())
+        self.assertEqual(self.compressor.stats['failed'], 1)
+    
+    def test_retranscribe_reads_compressed_audio(self):
+        """重新识别通过统一接口读取压缩后的音频"""
+        import src.api_server as api_server
+        self.storage.save("2026-01-21/15-30", "录音")
+        self.storage.save_audio("2026-01-21/15-30", self.audio)
+        self.assertTrue(self.compressor.wait(timeout=30))
+        received = []
+        
+        class ASR:
+            def transcribe(self, audio_data):
+                received.append(len(audio_data))
+                return {'text': "重新识别的文本"}
+        
+        class Manager:
+            storage = self.storage
+            asr = ASR()
+            def get_asr_info(self):
+                return {}
+        original_manager = api_server.app_manager
+        api_server.app_manager = Manager()
+        try:
+            response = api_server.app.test_client().post("/api/recordings/2026-01-21/15-30/retranscribe")
+            self.assertTrue(response.get_json()['success'])
+            self.assertEqual(received, [len(self.audio)])
+            self.assertEqual(self.storage.get("2026-01-21/15-30")['original_content'], "重新识别的文本")
+        finally:
+            api_server.app_manager = original_manager
+
+
+class TestStorageWatcher(unittest.TestCase):
+    """测试录音目录监听：外部新增/修改/删除的录音增量同步到索引和统计"""
+    
+    def setUp(self):
+        import tempfile
+        import src.config as config_module
+        self.test_storage_path = Path(tempfile.mkdtemp(prefix="lifecoach_watch_test_")) / "recordings"
+        self.original_path = config_module.STORAGE_BASE
+        config_module.STORAGE_BASE = str(self.test_storage_path)
+        self.storage = FileStorage()
+        self.storage.save("2026-01-21/15-30", "本机录音", {'duration': 10})
+    
+    def tearDown(self):
+        import shutil
+        import src.config as config_module
+        self.storage.cleanup()
+        config_module.STORAGE_BASE = self.original_path
+        shutil.rmtree(self.test_storage_path.parent, ignore_errors=True)
+    
+    def _write_external(self, recording_id, content, duration):
+        """模拟同步工具写入的录音文本（与 FileStorage.save 格式相同）"""
+        date_str, time_str = recording_id.split('/')
+        path = self.test_storage_path / date_str / f"{time_str}.txt"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"=== Life Coach 对话记录 ===\n录音时长: {duration}秒\n文字长度: {len(content)}字\n---\n"
+                        f"{content}\n---\n保存时间: 2026-01-21 16:00:00\n", encoding='utf-8')
+        return path
+    
+    def _watcher(self, **kwargs):
+        from src.storage_watcher import StorageWatcher
+        kwargs.setdefault('use_watchdog', False)
+        return StorageWatcher(self.storage, **kwargs)
+    
+    def test_reconcile(self):
+        """一致性检查修正外部新增、修改、删除，与索引一致时不做任何事"""
+        self.assertEqual(self.storage.reconcile()['checked'], 1)
+        self.assertEqual(self.storage.reconcile()['updated'], 0)
+        
+        added = self._write_external("2026-01-22/09-00", "外部录音", 20)
+        result = self.storage.reconcile()
+        self.assertEqual((result['added'], result['updated'], result['removed']), (1, 0, 0))
+        self.assertEqual(self.storage.get("2026-01-22/09-00")['original_content'], "外部录音")
+        self.assertEqual(self.storage.stats.get_day("2026-01-22")['duration'], 20)
+        
+        self._write_external("2026-01-22/09-00", "外部修改后的录音", 30)
+        os.utime(added, (added.stat().st_atime, added.stat().st_mtime + 10))
+        (self.test_storage_path / "2026-01-22" / "09-00.corrected.txt").write_text(
+            "=== 文本纠错结果 ===\n---\n外部纠错\n---\n", encoding='utf-8')
+        self.assertEqual(self.storage.reconcile(date="2026-01-22")['updated'], 1)
+        detail = self.storage.get("2026-01-22/09-00")
+        self.assertEqual(detail['corrected_content'], "外部纠错")
+        self.assertEqual(self.storage.stats.get_day("2026-01-22")['duration'], 30)
+        self.assertEqual(self.storage.stats.get_day("2026-01-22")['count'], 1)
+        
+        # 本机纠错更新了索引中的 mtime，不会被当作外部修改
+        self.storage.save_corrected("2026-01-21/15-30", "本机纠错", [])
+        self.assertEqual(self.storage.reconcile()['updated'], 0)
+        
+        (self.test_storage_path / "2026-01-21" / "15-30.txt").unlink()
+        result = self.storage.reconcile()
+        self.assertEqual((result['added'], result['updated'], result['removed']), (0, 0, 1))
+        self.assertEqual(self.storage.stats.get_day("2026-01-21")['count'], 0)
+        self.assertEqual(self.storage.index.count(), 1)
+    
+    def test_get_syncs_external_changes(self):
+        """get 发现外部新增/删除的录音时同步更新每日统计"""
+        self.assertEqual(self.storage.stats.get_day("2026-01-22")['count'], 0)
+        added = self._write_external("2026-01-22/09-00", "外部录音", 20)
+        self.assertEqual(self.storage.get("2026-01-22/09-00")['original_content'], "外部录音")
+        self.assertEqual(self.storage.stats.get_day("2026-01-22")['count'], 1)
+        self.assertEqual(self.storage.stats.get_day("2026-01-22")['duration'], 20)
+        
+        added.unlink()
+        self.assertIsNone(self.storage.get("2026-01-22/09-00"))
+        self.assertEqual(self.storage.stats.get_day("2026-01-22")['count'], 0)
+        self.assertIsNone(self.storage.index.get("2026-01-22/09-00"))
+    
+    def test_sync_recording_audio(self):
+        """外部新增/删除音频时更新索引的音频路径"""
+        import numpy as np
+        import wave
+        wav_path = self.test_storage_path / "2026-01-21" / "15-30.wav"
+        with wave.open(str(wav_path), 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(np.zeros(1600, dtype=np.int16).tobytes())
+        self.assertEqual(self.storage.sync_recording("2026-01-21/15-30"), "updated")
+        self.assertEqual(self.storage.get("2026-01-21/15-30")['audio_path'], str(wav_path))
+        self.assertIsNone(self.storage.sync_recording("2026-01-21/15-30"))
+        self.assertEqual(self.storage.stats.get_day("2026-01-21")['count'], 1)
+        
+        wav_path.unlink()
+        self.assertEqual(self.storage.sync_recording("2026-01-21/15-30"), "updated")
+        self.assertIsNone(self.storage.get("2026-01-21/15-30")['audio_path'])
+    
+    def test_events_debounced(self):
+        """同一条录音的事件合并，临时文件和根目录文件忽略，去抖期间不同步"""
+        watcher = self._watcher(debounce=60)
+        date_dir = self.test_storage_path / "2026-01-22"
+        for name in ("09-00.txt", "09-00.wav", "09-00.corrected.txt", "09-00.txt.tmp", "09-00.wav.!sync",
+                     ".sync"):
+            watcher.notify(date_dir / name)
+        watcher.notify(self.test_storage_path / ".recordings_index.db-wal")
+        watcher.notify(self.test_storage_path / "2026-01-23")
+        self.assertEqual(set(watcher._pending), {("2026-01-22", "09-00"), ("2026-01-23", None)})
+        self.assertEqual(watcher.stats['ignored'], 4)
+        
+        self._write_external("2026-01-22/09-00", "外部录音", 5)
+        due, wait = watcher._take_due(time.monotonic())
+        self.assertEqual(due, [])
+        self.assertGreater(wait, 50)
+        watcher.flush()
+        self.assertEqual(watcher.stats['added'], 1)
+        self.assertIsNotNone(self.storage.index.get("2026-01-22/09-00"))
+    
+    def test_background_sync(self):
+        """后台线程：启动时先做一致性检查，事件去抖后同步，删除日期目录时移除当天录音"""
+        import shutil
+        self._write_external("2026-01-22/09-00", "程序未运行时同步来的录音", 5)
+        watcher = self._watcher(debounce=0.05, poll_interval=3600)
+        watcher.start()
+        try:
+            for _ in range(100):
+                if watcher.stats['checks']:
+                    break
+                time.sleep(0.02)
+            self.assertEqual(watcher.stats['check_fixes'], 1)
+            
+            path = self._write_external("2026-01-22/10-00", "外部录音", 5)
+            watcher.notify(path)
+            shutil.rmtree(self.test_storage_path / "2026-01-21")
+            watcher.notify(self.test_storage_path / "2026-01-21")
+            for _ in range(100):
+                if not watcher.get_status()['pending'] and watcher.stats['removed']:
+                    break
+                time.sleep(0.02)
+            self.assertIsNotNone(self.storage.index.get("2026-01-22/10-00"))
+            self.assertEqual(self.storage.index.count(), 2)
+            self.assertEqual(self.storage.stats.get_day("2026-01-22")['count'], 2)
+            self.assertEqual(self.storage.stats.get_day("2026-01-21")['count'], 0)
+        finally:
+            watcher.stop()
+        self.assertFalse(watcher.get_status()['running'])
+    
+    def test_watchdog_events(self):
+        """安装了 watchdog 时，外部写入的文件无需手动通知即可同步"""
+        from src.storage_watcher import WATCHDOG_AVAILABLE
+        if not WATCHDOG_AVAILABLE:
+            self.skipTest("未安装 watchdog")
+        watcher = self._watcher(debounce=0.1, use_watchdog=True)
+        watcher.start()
+        try:
+            self.assertNotEqual(watcher.backend, 'polling')
+            self._write_external("2026-01-22/09-00", "外部录音", 5)
+            for _ in range(150):
+                if self.storage.index.get("2026-01-22/09-00") is not None:
+                    break
+                time.sleep(0.02)
+            self.assertIsNotNone(self.storage.index.get("2026-01-22/09-00"))
+        finally:
+            watcher.stop()
+    
+
+class TestEndpointSegmenter(unittest.TestCase):
+    """测试流式识别器端点分段（使用模拟识别器：非零音频每 1600 个采样识别出一个字，静音块为端点）"""
+    
+    def setUp(self):
+        import numpy as np
+        from src.endpoint_segmenter import EndpointSegmenter
+        self.gate = threading.Event()
+        self.gate.set()
+        self.blocked = threading.Event()
+        self.order = []
+        test = self
+        
+        class FakeStream:
+            def __init__(self):
+                self.text = ''
+                self.silence = False
+                self.finished = False
+            def accept_waveform(self, sample_rate, samples):
+                if self.finished:
+                    raise RuntimeError('流已结束')
+                if samples.max() > 0.8:   # 慢速块：阻塞在解码中
+                    test.blocked.set()
+                    test.gate.wait(5)
+                    test.order.append('accept_done')
+                self.silence = not samples.any()
+                self.text += '字' * (int(np.count_nonzero(samples)) // 1600)
+            def input_finished(self):
+                self.finished = True
+        
+        class FakeRecognizer:
+            def __init__(self):
+                self.streams = []
+            def create_stream(self):
+                self.streams.append(FakeStream())
+                return self.streams[-1]
+            def is_ready(self, stream):
+                stream.text  # 流被置为 None 时抛出 AttributeError
+                return False
+            def decode_stream(self, stream):
+                pass
+            def is_endpoint(self, stream):
+                return stream.silence and bool(stream.text)
+            def reset(self, stream):
+                stream.text = ''
+            def get_result(self, stream):
+                return stream.text
+        
+        self.recognizer = FakeRecognizer()
+        self.segments = []
+        self.segmenter = EndpointSegmenter(self.recognizer,
+                                           on_segment_callback=lambda audio, meta: self.segments.append(meta))
+        self.speech = np.full(1600, 0.5, dtype=np.float32)
+        self.silence = np.zeros(1600, dtype=np.float32)
+    
+    def tearDown(self):
+        self.gate.set()
+        self.segmenter.stop()
+    
+    def test_endpoint_segments(self):
+        """端点处切分，flush 输出最后一段"""
+        for chunk in (self.speech, self.speech, self.silence, self.silence, self.speech):
+            self.segmenter.process_chunk(chunk)
+        self.segmenter.flush()
+        self.assertEqual([m['text'] for m in self.segments], ['字字', '字'])
+        self.assertEqual([m['segment_index'] for m in self.segments], [1, 2])
+        self.assertAlmostEqual(self.segments[1]['start_time'], 0.3)
+        self.assertEqual(self.segments[0]['segmenter'], 'endpoint')
+        self.assertEqual(self.segmenter.get_stats()['segments_count'], 2)
+    
+    def test_reset_waits_for_decode(self):
+        """重置由解码线程执行：等正在解码的块完成，丢弃排队的音频，下次录音使用新的识别流"""
+        import numpy as np
+        self.gate.clear()
+        self.segmenter.process_chunk(np.full(1600, 0.9, dtype=np.float32))
+        self.assertTrue(self.blocked.wait(2))
+        self.segmenter.process_chunk(self.speech)   # 排队中，重置时丢弃
+        
+        resetter = threading.Thread(target=lambda: (self.segmenter.reset(), self.order.append('reset_done')))
+        resetter.start()
+        time.sleep(0.05)
+        self.assertTrue(resetter.is_alive())
+        self.gate.set()
+        resetter.join(2)
+        self.assertEqual(self.order, ['accept_done', 'reset_done'])
+        self.assertIsNone(self.segmenter.stream)
+        
+        self.segmenter.process_chunk(self.speech)
+        self.segmenter.flush()
+        self.assertEqual([(m['segment_index'], m['text']) for m in self.segments], [(1, '字')])
+        self.assertEqual(len(self.recognizer.streams), 2)
+
+
 class TestIntegration(unittest.TestCase):
     """集成测试"""
     
@@ -276,6 +2374,29 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestAudioRecorder))
     suite.addTests(loader.loadTestsFromTestCase(TestASREngine))
     suite.addTests(loader.loadTestsFromTestCase(TestFileStorage))
+    suite.addTests(loader.loadTestsFromTestCase(TestASRTuner))
+    suite.addTests(loader.loadTestsFromTestCase(TestASREngineManager))
+    suite.addTests(loader.loadTestsFromTestCase(TestRemoteWorker))
+    suite.addTests(loader.loadTestsFromTestCase(TestWakeListener))
+    suite.addTests(loader.loadTestsFromTestCase(TestIncrementalCorrector))
+    suite.addTests(loader.loadTestsFromTestCase(TestCorrectionCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestMicroBatcher))
+    suite.addTests(loader.loadTestsFromTestCase(TestTextChunker))
+    suite.addTests(loader.loadTestsFromTestCase(TestModelManager))
+    suite.addTests(loader.loadTestsFromTestCase(TestOnnxCorrectEngine))
+    suite.addTests(loader.loadTestsFromTestCase(TestLlamaCppPrefixCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestConfusionDict))
+    suite.addTests(loader.loadTestsFromTestCase(TestConfidenceGate))
+    suite.addTests(loader.loadTestsFromTestCase(TestCorrectorWorker))
+    suite.addTests(loader.loadTestsFromTestCase(TestRecordingIndex))
+    suite.addTests(loader.loadTestsFromTestCase(TestStatsAggregator))
+    suite.addTests(loader.loadTestsFromTestCase(TestRecordingSidecar))
+    suite.addTests(loader.loadTestsFromTestCase(TestAudioPreview))
+    suite.addTests(loader.loadTestsFromTestCase(TestWaveformPeaks))
+    suite.addTests(loader.loadTestsFromTestCase(TestStorageMaintenance))
+    suite.addTests(loader.loadTestsFromTestCase(TestAudioCodec))
+    suite.addTests(loader.loadTestsFromTestCase(TestStorageWatcher))
+    suite.addTests(loader.loadTestsFromTestCase(TestEndpointSegmenter))
     suite.addTests(loader.loadTestsFromTestCase(TestIntegration))
     
     # 运行测试